@@ -8,18 +8,28 @@ Strips metadata noise while preserving:
 - Tool REJECTIONS (always preserved in full — these signal user corrections)
 - User edits / redirects attached to rejections
 
+Sessions are compacted in a process pool; a session whose output is newer
+than its .jsonl is skipped, so a rerun only does new or changed sessions.
+The logs written are then added to the BM25 keyword index of the output
+directory (log_index.py), which query_memory.py searches.
+
 Usage:
-    python3 compact_logs.py [project_dir] [output_dir]
+    python3 compact_logs.py [project_dir] [output_dir] [--jobs N] [--force]
     python3 compact_logs.py  # defaults: ~/.claude/projects/  ./compact_logs/
 """
 
+import argparse
 import json
 import os
-import sys
+import sqlite3
 import glob
+import time
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
 
+from log_index import LogIndex
+
 REJECTION_MARKER = "The user doesn't want to proceed with this tool use"
 
 # Map source project dir names → canonical output dir names.
@@ -276,9 +286,56 @@ def render_events(events, session_id, filepath):
     return "\n".join(lines)
 
 
+def compact_file(filepath, proj_root, out_root, force=False):
+    """
+    Compact one session; returns (report line, written log path), with
+    (None, None) if it was skipped.
+    """
+    session_id = Path(filepath).stem
+    # Walk up to find the project dir (immediate child of proj_root)
+    rel = Path(filepath).relative_to(proj_root)
+    raw_proj = rel.parts[0]
+    proj_name = PROJECT_ALIASES.get(raw_proj, raw_proj)
+
+    out_subdir = os.path.join(out_root, proj_name)
+    out_path = os.path.join(out_subdir, f"{session_id}.txt")
+    if not force and os.path.exists(out_path) and \
+            os.path.getmtime(out_path) >= os.path.getmtime(filepath):
+        return None, None
+
+    try:
+        events = parse_session(filepath)
+    except Exception as e:
+        return f"  ERROR parsing {filepath}: {e}", None
+
+    if not events:
+        return None, None
+
+    # Count rejections for quick summary
+    rejections = [e for e in events if e["kind"] == "rejection"]
+
+    os.makedirs(out_subdir, exist_ok=True)
+    with open(out_path, "w", encoding="utf-8") as f:
+        f.write(render_events(events, session_id, filepath))
+
+    size_in = os.path.getsize(filepath)
+    size_out = os.path.getsize(out_path)
+    pct = 100 * size_out // max(size_in, 1)
+    rej_note = f"  {len(rejections)} rejection(s)" if rejections else ""
+    line = f"  {proj_name}/{session_id[:8]}… {size_in//1024}KB → {size_out//1024}KB ({pct}%){rej_note}"
+    return line, out_path
+
+
 def main():
-    proj_root = sys.argv[1] if len(sys.argv) > 1 else os.path.expanduser("~/.claude/projects")
-    out_root = sys.argv[2] if len(sys.argv) > 2 else "./compact_logs"
+    parser = argparse.ArgumentParser(description="Compact Claude Code conversation logs")
+    parser.add_argument("proj_root", nargs="?", default=os.path.expanduser("~/.claude/projects"))
+    parser.add_argument("out_root", nargs="?", default="./compact_logs")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Worker processes (default: CPU count)")
+    parser.add_argument("--force", action="store_true", help="Recompact sessions that are up to date")
+    args = parser.parse_args()
+    proj_root, out_root = args.proj_root, args.out_root
+    jobs = args.jobs or os.cpu_count() or 1
 
     os.makedirs(out_root, exist_ok=True)
 
@@ -288,37 +345,33 @@ def main():
 
     print(f"Found {len(all_jsonl)} session files under {proj_root}")
 
-    for filepath in all_jsonl:
-        session_id = Path(filepath).stem
-        # Walk up to find the project dir (immediate child of proj_root)
-        rel = Path(filepath).relative_to(proj_root)
-        raw_proj = rel.parts[0]
-        proj_name = PROJECT_ALIASES.get(raw_proj, raw_proj)
-
+    started = time.time()
+    n = len(all_jsonl)
+    args_lists = (all_jsonl, [proj_root] * n, [out_root] * n, [args.force] * n)
+    if jobs > 1 and n > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(compact_file, *args_lists, chunksize=8))
+    else:
+        results = list(map(compact_file, *args_lists))
+    written = []
+    for line, out_path in results:
+        if line:
+            print(line)
+        if out_path:
+            written.append(out_path)
+    print(f"Compacted {len(written)} session(s), {n - len(written)} up to date or empty "
+          f"({time.time() - started:.1f}s)")
+
+    if written:
         try:
-            events = parse_session(filepath)
-        except Exception as e:
-            print(f"  ERROR parsing {filepath}: {e}")
-            continue
-
-        if not events:
-            continue
-
-        # Count rejections for quick summary
-        rejections = [e for e in events if e["kind"] == "rejection"]
-
-        out_subdir = os.path.join(out_root, proj_name)
-        os.makedirs(out_subdir, exist_ok=True)
-        out_path = os.path.join(out_subdir, f"{session_id}.txt")
-
-        with open(out_path, "w", encoding="utf-8") as f:
-            f.write(render_events(events, session_id, filepath))
-
-        size_in = os.path.getsize(filepath)
-        size_out = os.path.getsize(out_path)
-        pct = 100 * size_out // size_in
-        rej_note = f"  {len(rejections)} rejection(s)" if rejections else ""
-        print(f"  {proj_name}/{session_id[:8]}… {size_in//1024}KB → {size_out//1024}KB ({pct}%){rej_note}")
+            index = LogIndex(out_root)
+            index.update(written)
+            stats = index.stats()
+            index.close()
+            print(f"Keyword index: {len(written)} log(s) updated, {stats['windows']} windows "
+                  f"over {stats['files']} logs")
+        except sqlite3.Error as e:
+            print(f"Keyword index not updated ({e}); query_memory.py will catch up")
 
 
 if __name__ == "__main__":
@@ -5,35 +5,12 @@ Analyze DMA conflicts for INAV flight controller target configurations
 Based on INAV timer definitions and STM32 reference manual DMA mappings.
 """
 
-# DMA mappings for F405 (from dma_resolver.html and INAV timer_def_stm32f4xx.h)
-dma_map_f405 = {
-    'TIM1_CH1': [[2,6,0], [2,1,6], [2,3,6]],
-    'TIM1_CH2': [[2,6,0], [2,2,6]],
-    'TIM1_CH3': [[2,6,0], [2,6,6]],
-    'TIM1_CH4': [[2,4,6]],
-    'TIM2_CH1': [[1,5,3]],
-    'TIM2_CH2': [[1,6,3]],
-    'TIM2_CH3': [[1,1,3]],
-    'TIM2_CH4': [[1,7,3], [1,6,3]],
-    'TIM3_CH1': [[1,4,5]],
-    'TIM3_CH2': [[1,5,5]],
-    'TIM3_CH3': [[1,7,5]],
-    'TIM3_CH4': [[1,2,5]],
-    'TIM4_CH1': [[1,0,2]],
-    'TIM4_CH2': [[1,3,2]],
-    'TIM4_CH3': [[1,7,2]],
-    'TIM5_CH1': [[1,2,6]],
-    'TIM5_CH2': [[1,4,6]],
-    'TIM5_CH3': [[1,0,6]],
-    'TIM5_CH4': [[1,1,6], [1,3,6]],
-    'TIM8_CH1': [[2,2,0], [2,2,7]],
-    'TIM8_CH2': [[2,2,0], [2,3,7]],
-    'TIM8_CH3': [[2,2,0], [2,4,7]],
-    'TIM8_CH4': [[2,7,7]],
-    # TIM12 - EXISTS on F405 but has NO DMA support!
-    'TIM12_CH1': [],  # NO DMA
-    'TIM12_CH2': [],  # NO DMA
-}
+from mcu_pin_db import load_family
+
+# Timer/peripheral DMA mappings come from the compiled MCU database
+# (mcu_pin_db.py: datasheet AF tables + DMA resolver maps)
+MCU = "F405"
+mcu = load_family(MCU)
 
 # Timer configuration from target.c - FrSky F405
 timers = [
@@ -49,31 +26,19 @@ timers = [
     {'name': 'LED strip', 'tim': 'TIM2', 'ch': 'CH1', 'pin': 'PA15', 'dma_flag': 0},
 ]
 
-# UART DMA streams (from target.h - all 6 UARTs enabled)
+# UART DMA streams (all 6 UARTs enabled in target.h)
 # Note: INAV typically uses INTERRUPT mode, not DMA mode for UARTs
-uart_dma = [
-    {'name': 'UART1_RX', 'dma': [2, 2]},
-    {'name': 'UART1_TX', 'dma': [2, 7]},
-    {'name': 'UART2_RX', 'dma': [1, 5]},
-    {'name': 'UART2_TX', 'dma': [1, 6]},
-    {'name': 'UART3_RX', 'dma': [1, 1]},
-    {'name': 'UART3_TX', 'dma': [1, 3]},
-    {'name': 'UART4_RX', 'dma': [1, 2]},
-    {'name': 'UART4_TX', 'dma': [1, 4]},
-    {'name': 'UART5_RX', 'dma': [1, 0]},
-    {'name': 'UART5_TX', 'dma': [1, 7]},
-    {'name': 'UART6_RX', 'dma': [2, 1]},
-    {'name': 'UART6_TX', 'dma': [2, 6]},
-]
+uart_dma = [{'name': name, 'dma': dma} for name, dma in mcu.peripheral_dma.items()
+            if name.startswith('UART')]
 
 # ADC DMA (from target.h)
 adc_dma = [
-    {'name': 'ADC1', 'dma': [2, 0]},
+    {'name': 'ADC1', 'dma': mcu.peripheral_dma['ADC1']},
 ]
 
 def analyze_dma_conflicts():
     print("="*80)
-    print("DMA CONFLICT ANALYSIS - FrSky F405")
+    print(f"DMA CONFLICT ANALYSIS - FrSky F405 ({mcu.title})")
     print("="*80)
     print()
 
@@ -89,16 +54,15 @@ def analyze_dma_conflicts():
     for timer in timers:
         key = f"{timer['tim']}_{timer['ch']}"
 
-        if key not in dma_map_f405:
+        dma_options = mcu.dma_options(timer['tim'], timer['ch'])
+        if dma_options is None:
             errors.append(f"❌ {timer['name']}: No DMA mapping for {key}")
             print(f"❌ {timer['name']:20s} {key:12s} {timer['pin']:6s} - NO DMA MAPPING")
             continue
 
-        dma_options = dma_map_f405[key]
-
-        # Check for NO DMA support (empty list)
+        # Check for NO DMA support (timer channel exists, but no DMA request)
         if len(dma_options) == 0:
-            warnings.append(f"⚠️  {timer['name']}: TIM12 has NO DMA - PWM/OneShot only, NO DShot!")
+            warnings.append(f"⚠️  {timer['name']}: {timer['tim']} has NO DMA - PWM/OneShot only, NO DShot!")
             print(f"⚠️  {timer['name']:20s} {key:12s} {timer['pin']:6s} → NO DMA (PWM/OneShot only)")
             continue
 
@@ -110,7 +74,7 @@ def analyze_dma_conflicts():
             continue
 
         dma = dma_options[dma_flag]
-        dma_str = f"DMA{dma[0]} Stream {dma[1]}"
+        dma_str = mcu.dma_name(dma)
         stream_key = f"DMA{dma[0]}_S{dma[1]}"
 
         timer_dma_assignments.append({
@@ -138,7 +102,7 @@ def analyze_dma_conflicts():
 
     # Check UART conflicts (but note they're usually not used)
     for uart in uart_dma:
-        dma_str = f"DMA{uart['dma'][0]} Stream {uart['dma'][1]}"
+        dma_str = mcu.dma_name(uart['dma'])
         stream_key = f"DMA{uart['dma'][0]}_S{uart['dma'][1]}"
 
         if stream_key in used_streams:
@@ -151,7 +115,7 @@ def analyze_dma_conflicts():
 
     # Check ADC
     for adc in adc_dma:
-        dma_str = f"DMA{adc['dma'][0]} Stream {adc['dma'][1]}"
+        dma_str = mcu.dma_name(adc['dma'])
         stream_key = f"DMA{adc['dma'][0]}_S{adc['dma'][1]}"
 
         if stream_key in used_streams:
@@ -0,0 +1,637 @@
+#!/usr/bin/env python3
+"""
+DMA assignment solver for INAV targets (F405, F7, H7, AT32F435).
+
+Reads the DEF_TIM() outputs of a target.c (and the DMA users of its
+target.h), then searches every timer channel / DMA option combination for
+conflict-free assignments:
+
+  - every output uses its own timer channel
+  - every DMA stream (AT32: channel) is used at most once, including the
+    streams reserved by ADC / UART DMA / SPI DMA
+  - as many DSHOT-capable outputs as possible get a DMA option
+    (motors, TIM_USE_OUTPUT_AUTO and the LED strip want one; servo,
+    beeper and input timers do not)
+  - among the best, the fewest changes to the target's current DEF_TIM
+    timer channels and dmaopts
+
+The search is branch and bound over bitmasks: outputs are taken
+fewest-options-first, each output tries its current setting first, and a
+branch is cut as soon as it cannot beat the best assignment found so far
+(remaining outputs vs. free streams they could still use). Timer and DMA
+data come from mcu_pin_db.py.
+
+Usage:
+    # Check and solve one target (directory or target.c)
+    python3 dma_solver.py solve path/to/target/FRSKYF405
+    python3 dma_solver.py solve target.c --mcu F405 --alternates
+
+    # List up to 10 optimal assignments
+    python3 dma_solver.py solve path/to/target --enumerate 10
+
+    # Audit every target (and build variant) below one or more directories,
+    # in parallel, with a JSON report
+    python3 dma_solver.py batch ~/inav/src/main/target --json dma-report.json
+
+Options:
+    --alternates    Also try the other timer channels each pin can carry
+    --uart-dma      Reserve UART DMA streams (INAV uses interrupts by default)
+    --spi-dma       Reserve SPI DMA streams
+
+A target directory can build several boards (one target_<mcu>(NAME) line
+each in its CMakeLists.txt); target.h and target.c are read once per
+board with NAME defined and #if/#ifdef blocks resolved.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from mcu_pin_db import FamilyDB, load_family
+
+# Stop a single search after this many nodes (the result is then the best found)
+MAX_NODES = 1_000_000
+
+DEF_TIM_RE = re.compile(
+    r'^\s*DEF_TIM\s*\(\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*,\s*([^,]+?)\s*,\s*(\w+)\s*,\s*(\w+)\s*\)'
+    r'\s*,?\s*(?://\s*(.*))?$',
+    re.MULTILINE,
+)
+ADC_DMA_RE = re.compile(r'#define\s+(ADC\d)_DMA_STREAM\s+DMA(\d)_(?:Stream|Channel)(\d)')
+MCU_RE = re.compile(r'(AT32F43\w|STM32[FH]\d\w\w|\b[FH]\d{3})', re.IGNORECASE)
+# CMakeLists.txt: target_stm32f405xg(MATEKF405 SKIP_RELEASES)
+CMAKE_TARGET_RE = re.compile(r'^\s*target_(\w+)\s*\(\s*(\w+)', re.MULTILINE)
+MAX_OUTPUTS_RE = re.compile(r'#define\s+MAX_PWM_OUTPUT_PORTS\s+(\d+)')
+CONDITIONALS = ("if", "ifdef", "ifndef", "elif", "else", "endif")
+DIRECTIVE_RE = re.compile(r'^\s*#\s*(\w+)\s*(.*?)\s*(?://.*)?$')
+
+# Usages that need DMA: DSHOT motors and the LED strip
+DMA_USAGES = ("OUTPUT_AUTO", "MOTOR", "LED")
+
+
+@dataclass
+class Output:
+    """One DEF_TIM() line"""
+    name: str
+    tim: str
+    ch: str
+    pin: str
+    usage: str
+    dmaopt: int
+    line: int = 0
+
+    @property
+    def wants_dma(self) -> bool:
+        return any(u in self.usage for u in DMA_USAGES)
+
+
+@dataclass
+class Choice:
+    """What one output gets in an assignment"""
+    timer: str                  # timer channel key, e.g. TIM3_CH2
+    dmaopt: int | None          # None: no DMA (PWM/OneShot only)
+    dma: list | None = None
+    changes: int = 0            # differences from the target's DEF_TIM
+
+
+@dataclass
+class Solution:
+    choices: list
+    dshot: int
+    changes: int
+
+
+@dataclass
+class Problem:
+    family: FamilyDB
+    outputs: list
+    reserved: dict = field(default_factory=dict)     # "DMA2_S0" -> user
+    alternates: bool = False
+    variant: str = ""
+    max_outputs: int | None = None                   # MAX_PWM_OUTPUT_PORTS
+
+
+# ---- Parsing ----------------------------------------------------------------
+
+def _condition(expr: str, defines: set) -> bool:
+    """Value of an #if expression; only defined() and boolean operators are understood"""
+    expr = re.sub(r'defined\s*\(?\s*(\w+)\s*\)?', lambda m: str(m.group(1) in defines), expr)
+    expr = expr.replace("&&", " and ").replace("||", " or ")
+    expr = re.sub(r'!(?!=)', " not ", expr)
+    try:
+        return bool(eval(expr, {"__builtins__": {}}, {}))
+    except Exception:
+        return True         # unknown macro arithmetic: keep the block
+
+
+def preprocess(text: str, defines: set) -> str:
+    """
+    text with the conditional directives and the lines of inactive blocks
+    blanked (line numbers are kept). #define / #undef in active lines update defines.
+    """
+    out = []
+    # Per nesting level: (block active, some branch already taken)
+    stack = []
+    active = True
+    for line in text.split("\n"):
+        m = DIRECTIVE_RE.match(line)
+        directive, arg = m.groups() if m else (None, "")
+        if directive in ("if", "ifdef", "ifndef"):
+            if directive == "ifdef":
+                taken = arg.split()[0] in defines if arg else False
+            elif directive == "ifndef":
+                taken = arg.split()[0] not in defines if arg else True
+            else:
+                taken = _condition(arg, defines)
+            stack.append((active, active and taken))
+            active = active and taken
+        elif directive in ("elif", "else") and stack:
+            parent, done = stack[-1]
+            taken = parent and not done and (directive == "else" or _condition(arg, defines))
+            stack[-1] = (parent, done or taken)
+            active = taken
+        elif directive == "endif" and stack:
+            active = stack.pop()[0]
+        elif active and directive == "define" and arg:
+            defines.add(re.match(r'\w+', arg).group(0))
+        elif active and directive == "undef" and arg:
+            defines.discard(arg.split()[0])
+        out.append(line if active and directive not in CONDITIONALS else "")
+    return "\n".join(out)
+
+
+def parse_timers(text: str) -> list[Output]:
+    """DEF_TIM(tim, ch, pin, usage, flags, dmaopt) lines of a target.c"""
+    outputs = []
+    for m in DEF_TIM_RE.finditer(text):
+        tim, ch, pin, usage, _flags, dmaopt, comment = m.groups()
+        line = text.count("\n", 0, m.start()) + 1
+        name = (comment or "").strip() or f"{pin} ({usage.replace('TIM_USE_', '')})"
+        try:
+            opt = int(dmaopt, 0)
+        except ValueError:
+            opt = 0
+        outputs.append(Output(name, tim, ch, pin, usage.strip(), opt, line))
+    return outputs
+
+
+def parse_reserved(text: str, family: FamilyDB, uart_dma: bool = False,
+                   spi_dma: bool = False) -> dict[str, str]:
+    """DMA streams target.h takes away from the timers: stream key -> user"""
+    reserved = {}
+    for adc, dma, stream in ADC_DMA_RE.findall(text):
+        reserved[stream_key([int(dma), int(stream)])] = adc
+    if not reserved and re.search(r'#define\s+USE_ADC\b', text) and "ADC1" in family.peripheral_dma:
+        reserved[stream_key(family.peripheral_dma["ADC1"])] = "ADC1"
+    for name, dma in family.peripheral_dma.items():
+        if uart_dma and name.startswith("UART") and re.search(rf'#define\s+USE_{name[:5]}\b', text):
+            reserved.setdefault(stream_key(dma), name)
+        if spi_dma and name.startswith("SPI") and re.search(rf'#define\s+{name[:4]}_SCK_PIN\b', text):
+            reserved.setdefault(stream_key(dma), name)
+    return reserved
+
+
+def stream_key(dma: list) -> str:
+    return f"DMA{dma[0]}_S{dma[1]}"
+
+
+def target_variants(target_dir: Path) -> list[tuple[str, str | None]]:
+    """(board name, MCU) for every target_<mcu>(NAME) in CMakeLists.txt, else the directory"""
+    cmake = target_dir / "CMakeLists.txt"
+    if cmake.is_file():
+        variants = [(name, mcu) for mcu, name in CMAKE_TARGET_RE.findall(cmake.read_text(errors="replace"))]
+        if variants:
+            return variants
+    return [(target_dir.name, None)]
+
+
+def detect_mcu(target_dir: Path) -> str | None:
+    """MCU family from target.mk / target.h, else the directory name"""
+    for name in ("target.mk", "target.h"):
+        path = target_dir / name
+        if path.is_file():
+            m = MCU_RE.search(path.read_text(errors="replace"))
+            if m:
+                return m.group(1)
+    m = MCU_RE.search(target_dir.name) or re.search(r'(f405|f7\d\d|h7\d\d|f43[57])', str(target_dir), re.I)
+    return m.group(1) if m else None
+
+
+def load_problem(target: Path, mcu: str | None = None, alternates: bool = False,
+                 uart_dma: bool = False, spi_dma: bool = False, variant: str | None = None) -> Problem:
+    """Problem for one board of a target directory (or its target.c); default: the first board"""
+    target = Path(target)
+    target_dir = target.parent if target.is_file() else target
+    target_c = target if target.is_file() else target_dir / "target.c"
+    variants = dict(target_variants(target_dir))
+    if variant is None:
+        variant = next(iter(variants))
+    elif variant not in variants:
+        raise ValueError(f"{target_dir} does not build {variant} (boards: {', '.join(variants)})")
+    mcu = mcu or variants[variant] or detect_mcu(target_dir)
+    if mcu is None:
+        raise ValueError(f"cannot tell the MCU of {target_dir} (use --mcu)")
+    family = load_family(mcu)
+
+    # target.c includes target.h, so its defines select the target.c blocks too
+    defines = {variant}
+    target_h = target_dir / "target.h"
+    header = preprocess(target_h.read_text(errors="replace"), defines) if target_h.is_file() else ""
+    outputs = parse_timers(preprocess(target_c.read_text(errors="replace"), defines))
+    reserved = parse_reserved(header, family, uart_dma, spi_dma)
+    m = MAX_OUTPUTS_RE.search(header)
+    return Problem(family, outputs, reserved, alternates, variant, int(m.group(1)) if m else None)
+
+
+# ---- Checking the current configuration --------------------------------------
+
+def check_current(problem: Problem) -> tuple[list[Choice], list[str], list[str]]:
+    """(choices, errors, warnings) for the DEF_TIM lines as written"""
+    family = problem.family
+    used_streams = dict(problem.reserved)
+    used_timers = {}
+    choices, errors, warnings = [], [], []
+    for out in problem.outputs:
+        key = family.timer_key(out.tim, out.ch)
+        options = family.dma_options(key)
+        if key in used_timers:
+            errors.append(f"{out.name}: {key} is also used by {used_timers[key]}")
+        used_timers.setdefault(key, out.name)
+        if options is None:
+            errors.append(f"{out.name}: {key} does not exist on {family.title}")
+            choices.append(Choice(key, None))
+            continue
+        pins = [pin for pin, _ in family.timer_pins(key)]
+        if pins and out.pin.upper() not in pins:
+            errors.append(f"{out.name}: {out.pin} cannot carry {key} (pins: {', '.join(pins)})")
+        if not options:
+            if out.wants_dma:
+                warnings.append(f"{out.name}: {key} has no DMA - PWM/OneShot only, no DSHOT")
+            choices.append(Choice(key, None))
+            continue
+        if out.dmaopt >= len(options):
+            errors.append(f"{out.name}: dmaopt {out.dmaopt} out of range for {key} (0-{len(options) - 1})")
+            choices.append(Choice(key, None))
+            continue
+        dma = options[out.dmaopt]
+        skey = stream_key(dma)
+        if out.wants_dma:
+            if skey in used_streams:
+                errors.append(f"{out.name}: {family.dma_name(dma)} conflicts with {used_streams[skey]}")
+                choices.append(Choice(key, None))
+                continue
+            used_streams[skey] = out.name
+        choices.append(Choice(key, out.dmaopt, dma))
+    auto = sum(1 for out in problem.outputs if "OUTPUT_AUTO" in out.usage)
+    if problem.max_outputs is not None and auto and auto != problem.max_outputs:
+        warnings.append(f"{auto} TIM_USE_OUTPUT_AUTO outputs but MAX_PWM_OUTPUT_PORTS is {problem.max_outputs}")
+    return choices, errors, warnings
+
+
+# ---- Search -----------------------------------------------------------------
+
+class Solver:
+    """Branch-and-bound search over one Problem (see module docstring)."""
+
+    def __init__(self, problem: Problem, max_nodes: int = MAX_NODES):
+        self.problem = problem
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.truncated = False
+        family = problem.family
+        outputs = problem.outputs
+
+        stream_bits = {}
+
+        def stream_bit(dma):
+            return 1 << stream_bits.setdefault(stream_key(dma), len(stream_bits))
+
+        self.reserved_mask = 0
+        for key in problem.reserved:
+            self.reserved_mask |= 1 << stream_bits.setdefault(key, len(stream_bits))
+
+        timer_bits = {}
+        # Per output: [(choice, timer bit, stream bit)], current setting first
+        self.options = []
+        for out in outputs:
+            current = family.timer_key(out.tim, out.ch)
+            timers = [current]
+            if problem.alternates:
+                timers += [t for t in family.pin_timers(out.pin) if t != current]
+            opts = []
+            for timer in timers:
+                tbit = 1 << timer_bits.setdefault(timer, len(timer_bits))
+                changed = int(timer != current)
+                dma_options = family.dma_options(timer) or []
+                if out.wants_dma:
+                    order = sorted(range(len(dma_options)), key=lambda k: k != out.dmaopt)
+                    for k in order:
+                        dma = dma_options[k]
+                        opts.append((Choice(timer, k, dma, changed + int(k != out.dmaopt)),
+                                     tbit, stream_bit(dma)))
+                # Without DMA (always possible; the only option for servos etc.)
+                opts.append((Choice(timer, None, None, changed), tbit, 0))
+            self.options.append(opts)
+
+        # Most constrained outputs first: fewest DMA options
+        self.order = sorted(range(len(outputs)),
+                            key=lambda i: sum(1 for o in self.options[i] if o[2]) or 1 << 30)
+        # Streams any later output could still use (for the bound)
+        self.suffix_streams = [0] * (len(outputs) + 1)
+        self.suffix_wanting = [0] * (len(outputs) + 1)
+        for depth in range(len(outputs) - 1, -1, -1):
+            i = self.order[depth]
+            mask = 0
+            for _, _, sbit in self.options[i]:
+                mask |= sbit
+            self.suffix_streams[depth] = self.suffix_streams[depth + 1] | mask
+            self.suffix_wanting[depth] = self.suffix_wanting[depth + 1] + int(bool(mask))
+
+    def _search(self, depth, timers, streams, dshot, changes, picked, accept):
+        """
+        Depth-first search; accept(dshot, changes) -> None to cut, or a
+        callable receiving each complete assignment.
+        """
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            self.truncated = True
+            return
+        if depth == len(self.order):
+            sink = accept(dshot, changes)
+            if sink is not None:
+                sink(picked)
+            return
+        # Optimistic bound: each remaining output with a DMA option gets a free stream
+        free = self.suffix_streams[depth] & ~streams
+        bound = dshot + min(self.suffix_wanting[depth], bin(free).count("1"))
+        if accept(bound, changes) is None:
+            return
+        i = self.order[depth]
+        for choice, tbit, sbit in self.options[i]:
+            if timers & tbit or streams & sbit:
+                continue
+            picked[i] = choice
+            self._search(depth + 1, timers | tbit, streams | sbit,
+                         dshot + (1 if sbit else 0), changes + choice.changes, picked, accept)
+            if self.truncated:
+                return
+
+    def solve(self) -> Solution | None:
+        """Best assignment: most DSHOT outputs, then fewest changes"""
+        best = [None]
+
+        def accept(dshot, changes):
+            current = best[0]
+            if current is not None and (dshot < current.dshot or
+                                        (dshot == current.dshot and changes >= current.changes)):
+                return None
+            return lambda picked: best.__setitem__(0, Solution(list(picked), dshot, changes))
+
+        self._search(0, 0, self.reserved_mask, 0, 0, [None] * len(self.order), accept)
+        return best[0]
+
+    def enumerate(self, min_dshot: int, limit: int | None = None):
+        """Conflict-free assignments with at least min_dshot DSHOT outputs"""
+        found = []
+
+        class _Done(Exception):
+            pass
+
+        def collect(picked):
+            found.append(Solution(list(picked), sum(1 for c in picked if c.dmaopt is not None),
+                                  sum(c.changes for c in picked)))
+            if limit is not None and len(found) >= limit:
+                raise _Done
+
+        def accept(dshot, changes):
+            return collect if dshot >= min_dshot else None
+
+        try:
+            self._search(0, 0, self.reserved_mask, 0, 0, [None] * len(self.order), accept)
+        except _Done:
+            pass
+        return sorted(found, key=lambda s: (-s.dshot, s.changes))
+
+
+# ---- Reports ----------------------------------------------------------------
+
+def format_choice(family: FamilyDB, out: Output, choice: Choice) -> str:
+    dma = f"dmaopt {choice.dmaopt}: {family.dma_name(choice.dma)}" if choice.dmaopt is not None \
+        else ("NO DMA (PWM/OneShot only)" if out.wants_dma else "no DMA needed")
+    changed = []
+    if choice.timer != family.timer_key(out.tim, out.ch):
+        changed.append(f"was {out.tim}_{out.ch}")
+    if choice.dmaopt is not None and choice.dmaopt != out.dmaopt:
+        changed.append(f"was dmaopt {out.dmaopt}")
+    note = f"  <- {', '.join(changed)}" if changed else ""
+    return f"  {out.name[:28]:28s} {out.pin:5s} {choice.timer:12s} {dma}{note}"
+
+
+def def_tim_line(family: FamilyDB, out: Output, choice: Choice) -> str:
+    tim, ch = choice.timer.split("_", 1)
+    return (f"DEF_TIM({tim}, {ch}, {out.pin}, {out.usage}, 0, "
+            f"{choice.dmaopt if choice.dmaopt is not None else 0}),  // {out.name}")
+
+
+def solve_target(target: Path, args) -> int:
+    try:
+        problem = load_problem(target, args.mcu, args.alternates, args.uart_dma, args.spi_dma,
+                               args.variant)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+    family = problem.family
+    outputs = problem.outputs
+    if not outputs:
+        print(f"No DEF_TIM() outputs in {target}")
+        return 2
+    print(f"{problem.variant} ({target}) — {family.title}, {len(outputs)} outputs, "
+          f"{family.dma_requests} DMA streams, reserved: {', '.join(f'{k} ({v})' for k, v in problem.reserved.items()) or 'none'}")
+
+    _, errors, warnings = check_current(problem)
+    print("\nCurrent configuration: " + ("OK" if not errors else f"{len(errors)} error(s)"))
+    for msg in errors:
+        print(f"  🔴 {msg}")
+    for msg in warnings:
+        print(f"  ⚠️  {msg}")
+
+    solver = Solver(problem)
+    started = time.perf_counter()
+    best = solver.solve()
+    elapsed = (time.perf_counter() - started) * 1e3
+    wanting = sum(1 for out in outputs if out.wants_dma)
+    if best is None:
+        # Every output needs its own timer channel (e.g. one listed twice)
+        print(f"\nNo conflict-free assignment exists ({solver.nodes} nodes, {elapsed:.1f} ms"
+              f"{', node limit reached' if solver.truncated else ''}); see the errors above")
+        return 1
+    print(f"\nBest assignment: {best.dshot}/{wanting} DSHOT-capable outputs with DMA, "
+          f"{best.changes} change(s) ({solver.nodes} nodes, {elapsed:.1f} ms"
+          f"{', node limit reached' if solver.truncated else ''})")
+    for out, choice in zip(outputs, best.choices):
+        print(format_choice(family, out, choice))
+    if best.changes:
+        print("\n  target.c:")
+        for out, choice in zip(outputs, best.choices):
+            print(f"    {def_tim_line(family, out, choice)}")
+
+    if args.enumerate:
+        solutions = Solver(problem).enumerate(best.dshot, args.enumerate)
+        print(f"\n{len(solutions)} assignment(s) with {best.dshot} DSHOT outputs"
+              f"{' (limit reached)' if len(solutions) >= args.enumerate else ''}:")
+        for n, sol in enumerate(solutions, 1):
+            parts = [f"{c.timer}:{c.dmaopt if c.dmaopt is not None else '-'}" for c in sol.choices]
+            print(f"  {n:3d}. [{sol.changes} changes] {' '.join(parts)}")
+    return 1 if errors else 0
+
+
+def find_targets(roots: list[Path]) -> list[Path]:
+    """Directories below roots that contain a target.c"""
+    targets = set()
+    for root in roots:
+        root = Path(root)
+        if (root / "target.c").is_file():
+            targets.add(root)
+        targets.update(p.parent for p in root.rglob("target.c"))
+    return sorted(targets)
+
+
+def audit_target(target_dir: Path, variant: str, options: dict) -> dict:
+    """Report entry for one board: current check + best assignment (runs in a worker)"""
+    entry = {"target": target_dir.name, "variant": variant, "path": str(target_dir)}
+    try:
+        problem = load_problem(target_dir, options["mcu"], options["alternates"],
+                               options["uart_dma"], options["spi_dma"], variant)
+    except (OSError, ValueError) as e:
+        return {**entry, "status": "skipped", "reason": str(e)}
+    if not problem.outputs:
+        return {**entry, "status": "skipped", "reason": "no DEF_TIM() outputs"}
+    family = problem.family
+    current, errors, warnings = check_current(problem)
+    solver = Solver(problem)
+    best = solver.solve()
+    wanting = [out.wants_dma for out in problem.outputs]
+    entry.update({
+        "status": "error" if errors else "ok",
+        "mcu": family.name,
+        "outputs": len(problem.outputs),
+        "dma_outputs": sum(wanting),
+        "max_outputs": problem.max_outputs,
+        "reserved": problem.reserved,
+        "current_dshot": sum(1 for want, c in zip(wanting, current) if want and c.dmaopt is not None),
+        "truncated": solver.truncated,
+        "errors": errors,
+        "warnings": warnings,
+    })
+    if best is None:
+        # e.g. one timer channel on two outputs; errors says which
+        return {**entry, "status": "error", "error": "no conflict-free assignment"}
+    entry.update({
+        "best_dshot": best.dshot,
+        "changes": best.changes,
+        "solution": [{"name": out.name, "pin": out.pin, "timer": c.timer, "dmaopt": c.dmaopt,
+                      "dma": family.dma_name(c.dma) if c.dma else None}
+                     for out, c in zip(problem.outputs, best.choices)],
+    })
+    return entry
+
+
+def batch(roots: list[Path], args) -> int:
+    targets = find_targets(roots)
+    if not targets:
+        print("No target.c found", file=sys.stderr)
+        return 2
+    started = time.perf_counter()
+    jobs = args.jobs or os.cpu_count() or 1
+    options = {"mcu": args.mcu, "alternates": args.alternates,
+               "uart_dma": args.uart_dma, "spi_dma": args.spi_dma}
+    boards = [(target, variant) for target in targets for variant, _ in target_variants(target)]
+    if jobs > 1 and len(boards) > 1:
+        # Each board is independent; workers load the MCU database once each
+        with ProcessPoolExecutor(max_workers=min(jobs, len(boards))) as pool:
+            report = list(pool.map(audit_target, *zip(*boards), [options] * len(boards),
+                                   chunksize=max(1, len(boards) // (jobs * 4))))
+    else:
+        report = [audit_target(target, variant, options) for target, variant in boards]
+    elapsed = time.perf_counter() - started
+
+    failed = [entry for entry in report if entry["status"] == "error"]
+    summary = {
+        "targets": len(targets),
+        "boards": len(report),
+        "checked": sum(1 for entry in report if entry["status"] != "skipped"),
+        "errors": len(failed),
+        "improvable": sum(1 for entry in report if entry.get("best_dshot", 0) > entry.get("current_dshot", 0)),
+        "seconds": round(elapsed, 3),
+    }
+    if args.json:
+        text = json.dumps({"summary": summary, "boards": report}, indent=1)
+        if args.json == "-":
+            print(text)
+            return 1 if failed else 0
+        Path(args.json).write_text(text + "\n")
+
+    print(f"{'Board':28s} {'MCU':9s} {'Out':>3s} {'Status':8s} {'DSHOT now':>9s} {'Best':>5s} {'Changes':>7s}")
+    for entry in report:
+        if entry["status"] == "skipped":
+            print(f"{entry['variant'][:28]:28s} {'?':9s} {'':>3s} skipped: {entry['reason']}")
+            continue
+        row = (f"{entry['variant'][:28]:28s} {entry['mcu']:9s} {entry['outputs']:3d} {entry['status']:8s} "
+               f"{entry['current_dshot']:>5d}/{entry['dma_outputs']:<3d}")
+        if "error" in entry:
+            print(f"{row} {entry['error']}")
+        else:
+            print(f"{row} {entry['best_dshot']:>5d} {entry['changes']:7d}")
+        if args.verbose:
+            for msg in entry["errors"]:
+                print(f"    🔴 {msg}")
+            for msg in entry["warnings"]:
+                print(f"    ⚠️  {msg}")
+    print(f"\n{summary['boards']} board(s) in {summary['targets']} target(s): {summary['errors']} with DMA errors, "
+          f"{summary['improvable']} could drive more DSHOT outputs ({elapsed:.1f}s, {jobs} jobs)"
+          + (f"\nReport: {args.json}" if args.json else ""))
+    return 1 if failed else 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Find conflict-free timer/DMA assignments for INAV targets",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--mcu", help="MCU family (F405, F722, F745, F765, H743, AT32F435); default: detected")
+    common.add_argument("--alternates", action="store_true",
+                        help="Also try the other timer channels each pin can carry")
+    common.add_argument("--uart-dma", action="store_true", help="Reserve UART DMA streams")
+    common.add_argument("--spi-dma", action="store_true", help="Reserve SPI DMA streams")
+    sub = parser.add_subparsers(dest="command")
+    solve_parser = sub.add_parser("solve", parents=[common], help="Check and solve one target")
+    solve_parser.add_argument("target", type=Path, help="Target directory or target.c")
+    solve_parser.add_argument("--variant", help="Board to check when the directory builds several")
+    solve_parser.add_argument("--enumerate", type=int, metavar="N",
+                              help="Also list up to N assignments with the best DSHOT count")
+    batch_parser = sub.add_parser("batch", parents=[common], help="Check every target below the given directories")
+    batch_parser.add_argument("roots", type=Path, nargs="*",
+                              default=[Path(__file__).resolve().parents[3]],
+                              help="Directories to scan for target.c (default: the claude/ tree)")
+    batch_parser.add_argument("-j", "--jobs", type=int, help="Worker processes (default: CPU count)")
+    batch_parser.add_argument("--json", metavar="FILE", help="Write a JSON report to FILE ('-' for stdout)")
+    batch_parser.add_argument("-v", "--verbose", action="store_true", help="Show the errors and warnings of each board")
+    args = parser.parse_args()
+
+    if args.command == "solve":
+        sys.exit(solve_target(args.target, args))
+    elif args.command == "batch":
+        sys.exit(batch(args.roots, args))
+    parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
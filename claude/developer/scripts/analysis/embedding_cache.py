@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""
+embedding_cache.py - Persistent embedding cache keyed by text content hash.
+
+Wraps a ChromaDB embedding function so text that was embedded before
+(overlapping chunk windows, re-ingested sessions, re-extracted memories) is
+read back instead of run through the model again. Vectors are stored as
+float16 in SQLite, keyed by a 16-byte BLAKE2b hash of model name + text.
+
+Callers pass the vectors to upsert(embeddings=...), so the collections keep
+their configured embedding function (ChromaDB checks it against the stored
+collection config) and the model only runs for cache misses.
+
+Every vector is returned as it is stored (float16 rounded, as float32), so
+a text gets the same embedding whether it was a hit or a miss.
+
+Usage:
+    from embedding_cache import CachedEmbedder
+
+    embed = CachedEmbedder(DefaultEmbeddingFunction())
+    collection.upsert(ids=ids, documents=docs, embeddings=embed(docs))
+    print(embed.hits, embed.misses)
+
+    python3 embedding_cache.py            # cache stats
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+
+import numpy as np
+
+CACHE_PATH = os.path.join(os.path.dirname(__file__), "../../../../claude/log-memories/embedding-cache.sqlite")
+LOOKUP_BATCH = 500          # keys per SELECT ... IN (...)
+
+
+def model_name(ef):
+    """Name that identifies the embedding model of a ChromaDB embedding function."""
+    try:
+        name = ef.name()
+    except Exception:
+        name = NotImplemented
+    if not isinstance(name, str):
+        name = type(ef).__name__
+    model = getattr(ef, "model_name", None) or getattr(ef, "MODEL_NAME", None)
+    return f"{name}:{model}" if model else name
+
+
+class CachedEmbedder:
+    """Callable texts → vectors; the model runs only for texts not in the cache."""
+
+    def __init__(self, ef, path=None):
+        self.ef = ef
+        self.model = model_name(ef)
+        self.path = os.path.abspath(path or CACHE_PATH)
+        self.hits = 0
+        self.misses = 0
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            # The Stop hook and a bulk ingest may write at the same time
+            self._db = sqlite3.connect(self.path, timeout=30)
+            self._db.execute("PRAGMA journal_mode = WAL")
+            self._db.execute("PRAGMA synchronous = NORMAL")
+            self._db.execute("CREATE TABLE IF NOT EXISTS vectors "
+                             "(key BLOB PRIMARY KEY, dim INTEGER, vec BLOB) WITHOUT ROWID")
+        return self._db
+
+    def key(self, text):
+        return hashlib.blake2b(f"{self.model}\0{text}".encode("utf-8", "replace"),
+                               digest_size=16).digest()
+
+    def lookup(self, keys):
+        """key → float16 vector for the keys that are cached"""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), LOOKUP_BATCH):
+            batch = unique[i:i + LOOKUP_BATCH]
+            rows = self.db.execute(
+                f"SELECT key, dim, vec FROM vectors WHERE key IN ({','.join('?' * len(batch))})", batch)
+            for key, dim, vec in rows:
+                arr = np.frombuffer(vec, dtype=np.float16)
+                if len(arr) == dim:
+                    found[key] = arr
+        return found
+
+    def __call__(self, input):
+        texts = list(input)
+        keys = [self.key(t) for t in texts]
+        found = self.lookup(keys)
+
+        missing = {}   # key → first index of a text that needs the model
+        for i, key in enumerate(keys):
+            if key not in found and key not in missing:
+                missing[key] = i
+        if missing:
+            computed = self.ef([texts[i] for i in missing.values()])
+            rows = []
+            for key, vec in zip(missing, computed):
+                arr = np.asarray(vec, dtype=np.float16)
+                found[key] = arr
+                rows.append((key, len(arr), arr.tobytes()))
+            with self.db:
+                self.db.executemany("INSERT OR REPLACE INTO vectors VALUES (?, ?, ?)", rows)
+
+        self.misses += len(missing)
+        self.hits += len(texts) - len(missing)
+        return [found[key].astype(np.float32) for key in keys]
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+
+def stats(path=None):
+    path = os.path.abspath(path or CACHE_PATH)
+    if not os.path.exists(path):
+        print(f"No embedding cache at {path}")
+        return
+    db = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    count, size = db.execute("SELECT count(*), coalesce(sum(length(vec)), 0) FROM vectors").fetchone()
+    db.close()
+    print(f"{path}\n  {count} vectors, {size / 1e6:.1f} MB of float16 data, "
+          f"{os.path.getsize(path) / 1e6:.1f} MB on disk")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Embedding cache statistics")
+    parser.add_argument("--path", default=None, help=f"Cache file (default: {os.path.abspath(CACHE_PATH)})")
+    args = parser.parse_args()
+    stats(args.path)
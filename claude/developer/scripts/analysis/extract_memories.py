@@ -100,13 +100,25 @@ Field rules:
 Output only the JSON object, no prose before or after."""
 
 
+_embedder = None
+
+
+def get_embedder():
+    """Embedding function with the persistent content-hash cache in front of it."""
+    global _embedder
+    if _embedder is None:
+        from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+        from embedding_cache import CachedEmbedder
+        _embedder = CachedEmbedder(DefaultEmbeddingFunction())
+    return _embedder
+
+
 def get_db_collection():
     import chromadb
-    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
     client = chromadb.PersistentClient(path=DB_PATH)
     return client.get_or_create_collection(
         name=COLLECTION,
-        embedding_function=DefaultEmbeddingFunction(),
+        embedding_function=get_embedder().ef,
         metadata={"hnsw:space": "cosine"},
     )
 
@@ -338,7 +350,9 @@ def store_entries(collection, entries, session_id, project, log_file):
         })
 
     if ids:
-        collection.upsert(ids=ids, documents=docs, metadatas=metas)
+        # Vectors come from the embedding cache (re-extracted lessons are not re-embedded)
+        collection.upsert(ids=ids, documents=docs, metadatas=metas,
+                          embeddings=get_embedder()(docs))
 
     return len(ids)
 
@@ -2,20 +2,31 @@
 """
 ingest_session.py - Compact and ingest a Claude Code session into ChromaDB.
 
-Called after each turn via the Stop hook. Uses a delta checkpoint so only
-new lines are processed, keeping per-turn cost low.
+Called after each turn via the Stop hook. A per-session state file keeps
+the byte offset already read plus the events of the last chunk window that
+new events can still extend, so each run parses only the appended records
+and embeds only the chunks they change — cost per turn follows the new
+content, not the session length.
+
+Bulk ingestion (--all) parses and chunks sessions in a process pool and
+embeds the chunks in fixed-size batches through one shared embedder in the
+main process. A session's state is written only once all of its chunks are
+stored, so an interrupted run resumes where it stopped.
 
 Usage:
     python3 ingest_session.py <session.jsonl>
     python3 ingest_session.py <session.jsonl> --db-path /path/to/chromadb
+    python3 ingest_session.py --all [--jobs 8] [--batch-size 256]
 """
 
 import json
 import os
 import sys
 import glob
+import time
 import hashlib
 import argparse
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # Lazy imports — only loaded when embedding is needed
@@ -25,6 +36,10 @@ _embedder = None
 
 CHUNK_EVENT_SIZE = 6        # events per chunk
 CHUNK_OVERLAP = 2           # events overlap between chunks
+MAX_PENDING_TOOLS = 50      # unanswered tool calls carried to the next run
+STATE_VERSION = 1
+EMBED_BATCH = 256           # chunks per embedding / upsert call in bulk ingest
+PROGRESS_INTERVAL = 5.0     # seconds between bulk progress lines
 DB_PATH = os.path.join(os.path.dirname(__file__), "../../../../claude/log-memories/chromadb")
 CHECKPOINT_DIR = os.path.join(os.path.dirname(__file__), "../../../../claude/log-memories/checkpoints")
 COLLECTION_NAME = "session_memories"
@@ -85,8 +100,16 @@ def parse_jsonl(filepath):
     return records
 
 
-def records_to_events(records):
-    """Convert raw records to a flat list of text events (same logic as compact_logs.py)."""
+def records_to_events(records, state=None):
+    """
+    Convert raw records to a flat list of text events (same logic as compact_logs.py).
+
+    With a state dict (see new_state()) the records continue an earlier
+    call: tool calls still waiting for their result and the assistant
+    message behind the last event are carried over, and state is updated
+    in place. state["replaces_tail"] is set when that message was streamed
+    on into these records, so its earlier event must be dropped.
+    """
     # Deduplicate streamed assistant messages — last record per message id wins
     seen = {}
     for i, r in enumerate(records):
@@ -97,12 +120,14 @@ def records_to_events(records):
     final_asst = set(seen.values())
     emitted = set()
 
-    # Map tool_use_id → (name, input)
-    tool_map = {}
-    for i in final_asst:
+    # Map tool_use_id → formatted call
+    tool_map = dict(state["tools"]) if state else {}
+    for i in sorted(final_asst):
         for c in records[i].get("message", {}).get("content", []):
             if isinstance(c, dict) and c.get("type") == "tool_use":
-                tool_map[c["id"]] = (c.get("name", "?"), c.get("input", {}))
+                tool_map[c["id"]] = fmt_tool(c.get("name", "?"), c.get("input", {}))
+    answered = set()
+    tail_mid = state.get("tail_mid") if state else None
 
     events = []
     for i, r in enumerate(records):
@@ -135,6 +160,10 @@ def records_to_events(records):
                 elif ct == "tool_use":
                     parts.append("TOOL: " + fmt_tool(c.get("name", "?"), c.get("input", {})))
             if parts:
+                if state is not None:
+                    if mid and mid == state.get("tail_mid"):
+                        state["replaces_tail"] = True
+                    tail_mid = mid
                 events.append("\n".join(parts))
 
         elif t == "user":
@@ -149,17 +178,18 @@ def records_to_events(records):
                 if text.startswith("<") and len(text) > 2000:
                     continue
                 events.append("USER: " + truncate(text, MAX_TEXT_LEN))
+                tail_mid = None
             elif isinstance(content, list):
                 for item in content:
                     if not isinstance(item, dict) or item.get("type") != "tool_result":
                         continue
                     tid = item.get("tool_use_id", "")
-                    info = tool_map.get(tid)
+                    answered.add(tid)
                     rc = item.get("content", "")
                     is_err = item.get("is_error", False)
 
                     if is_rejection(item):
-                        call = fmt_tool(info[0], info[1]) if info else "?"
+                        call = tool_map.get(tid, "?")
                         redirect = extract_redirect(str(rc))
                         line = f"⚠️ REJECTED: {call}"
                         if redirect:
@@ -167,16 +197,29 @@ def records_to_events(records):
                         events.append(line)
                     elif is_err:
                         events.append("ERROR: " + truncate(str(rc), 200))
+                    else:
+                        continue
+                    tail_mid = None
 
+    if state is not None:
+        pending = [(tid, call) for tid, call in tool_map.items() if tid not in answered]
+        state["tools"] = dict(pending[-MAX_PENDING_TOOLS:])
+        state["tail_mid"] = tail_mid
     return events
 
 
-def chunk_events(events, session_id, project):
-    """Slide a window over events to produce overlapping chunks."""
+def chunk_events(events, session_id, project, first_event=0):
+    """
+    Slide a window over events to produce overlapping chunks.
+
+    events may be the tail of the session's events starting at event number
+    first_event (a chunk start); ids and indexes are those of the full list.
+    """
     chunks = []
     step = CHUNK_EVENT_SIZE - CHUNK_OVERLAP
-    for start in range(0, max(1, len(events) - CHUNK_OVERLAP), step):
-        window = events[start: start + CHUNK_EVENT_SIZE]
+    total = first_event + len(events)
+    for start in range(first_event, max(1, total - CHUNK_OVERLAP), step):
+        window = events[start - first_event: start - first_event + CHUNK_EVENT_SIZE]
         if not window:
             break
         text = "\n".join(window)
@@ -206,11 +249,15 @@ def get_db(db_path):
         from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
     except ImportError:
         return None  # chromadb not installed — caller skips ingest
+    from embedding_cache import CachedEmbedder
 
     os.makedirs(db_path, exist_ok=True)
     _chroma_client = chromadb.PersistentClient(path=db_path)
 
+    # Chunks are upserted with vectors from the embedding cache; the model
+    # only runs for text it has not embedded before
     ef = DefaultEmbeddingFunction()
+    _embedder = CachedEmbedder(ef)
     _collection = _chroma_client.get_or_create_collection(
         name=COLLECTION_NAME,
         embedding_function=ef,
@@ -221,22 +268,135 @@ def get_db(db_path):
 
 def checkpoint_path(session_id):
     os.makedirs(CHECKPOINT_DIR, exist_ok=True)
-    return os.path.join(CHECKPOINT_DIR, f"{session_id}.offset")
+    return os.path.join(CHECKPOINT_DIR, f"{session_id}.state.json")
+
+
+def new_state():
+    """
+    offset:   bytes of the JSONL already ingested
+    base:     event number of events[0] (always a chunk start)
+    events:   events from the first chunk that new events can still change
+    tools:    tool_use_id → formatted call, for calls without a result yet
+    tail_mid: assistant message id behind the last event (None if not one)
+    """
+    return {"version": STATE_VERSION, "offset": 0, "base": 0, "events": [],
+            "tools": {}, "tail_mid": None}
 
 
 def read_checkpoint(session_id):
+    try:
+        with open(checkpoint_path(session_id)) as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return new_state()
+    return state if state.get("version") == STATE_VERSION else new_state()
+
+
+def write_checkpoint(session_id, state):
     p = checkpoint_path(session_id)
-    if os.path.exists(p):
+    with open(p + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(p + ".tmp", p)
+
+
+def read_new_records(filepath, offset):
+    """
+    Records appended after byte offset, and the offset after the last one
+    read. A trailing line that is not valid JSON yet (still being written)
+    is left for the next run.
+    """
+    with open(filepath, "rb") as f:
+        f.seek(offset)
+        data = f.read()
+    lines = data.split(b"\n")
+    tail = lines.pop()
+    end = len(data) - len(tail)
+    if tail.strip():
         try:
-            return int(open(p).read().strip())
+            json.loads(tail)
+            lines.append(tail)
+            end = len(data)
         except ValueError:
             pass
-    return 0
+    records = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            records.append(json.loads(line.decode("utf-8", errors="replace")))
+        except json.JSONDecodeError:
+            pass
+    return records, offset + end
+
+
+def next_base(total):
+    """First chunk start whose window does not yet hold CHUNK_EVENT_SIZE events before event total"""
+    step = CHUNK_EVENT_SIZE - CHUNK_OVERLAP
+    return max(0, -(-(total - CHUNK_EVENT_SIZE) // step) * step)
+
+
+def session_project(jsonl_path):
+    proj_root = os.path.expanduser("~/.claude/projects")
+    try:
+        return Path(jsonl_path).relative_to(proj_root).parts[0]
+    except ValueError:
+        return "unknown"
+
+
+def is_ingested(jsonl_path):
+    """True if the session's checkpoint covers the whole file."""
+    state = read_checkpoint(Path(jsonl_path).stem)
+    return state["offset"] == os.path.getsize(jsonl_path)
+
+
+def prepare_session(jsonl_path):
+    """
+    Parse what was appended to a session since its checkpoint.
+
+    Returns (session_id, chunks, state) — upsert the chunks, then write the
+    state — or None if there is nothing new. Does not touch the database,
+    so bulk ingest runs it in worker processes.
+    """
+    session_id = Path(jsonl_path).stem
+    size  = os.path.getsize(jsonl_path)
+    state = read_checkpoint(session_id)
+    if state["offset"] > size:
+        state = new_state()  # file was rewritten — start over (chunk ids are stable)
+    if size == state["offset"]:
+        return None  # nothing new
+
+    # Parse only the appended records; state carries what they depend on
+    records, offset = read_new_records(jsonl_path, state["offset"])
+    if offset == state["offset"]:
+        return None  # only a partly written line so far
+
+    events = state["events"]
+    new_events = records_to_events(records, state)
+    if state.pop("replaces_tail", False) and events:
+        events.pop()
+        changed = True
+    else:
+        changed = bool(new_events)
+    events = events + new_events
+    base = state["base"]
+
+    # Every chunk from base on contains a new (or replaced) event
+    chunks = chunk_events(events, session_id, session_project(jsonl_path), base) if changed else []
 
+    new_base = max(base, next_base(base + len(events)))
+    state.update(offset=offset, base=new_base, events=events[new_base - base:])
+    return session_id, chunks, state
 
-def write_checkpoint(session_id, line_count):
-    with open(checkpoint_path(session_id), "w") as f:
-        f.write(str(line_count))
+
+def upsert_chunks(collection, chunks, embeddings=None):
+    collection.upsert(
+        ids        = [c["id"]   for c in chunks],
+        documents  = [c["text"] for c in chunks],
+        metadatas  = [{k: v for k, v in c.items() if k not in ("id", "text")}
+                      for c in chunks],
+        embeddings = embeddings,
+    )
 
 
 def ingest(jsonl_path, db_path=None):
@@ -247,76 +407,109 @@ def ingest(jsonl_path, db_path=None):
         print(f"[ingest] File not found: {jsonl_path}", file=sys.stderr)
         return
 
-    session_id = Path(jsonl_path).stem
-    proj_root  = os.path.expanduser("~/.claude/projects")
-    try:
-        rel      = Path(jsonl_path).relative_to(proj_root)
-        project  = rel.parts[0]
-    except ValueError:
-        project = "unknown"
+    prepared = prepare_session(jsonl_path)
+    if prepared is None:
+        return
+    session_id, chunks, state = prepared
 
-    # Count lines to detect new content since last checkpoint
-    with open(jsonl_path, encoding="utf-8", errors="replace") as f:
-        all_lines = f.readlines()
-    total_lines = len(all_lines)
+    if chunks:
+        collection = get_db(db_path)
+        if collection is None:
+            return  # chromadb not installed
 
-    last = read_checkpoint(session_id)
-    if total_lines <= last:
-        return  # nothing new
+        upsert_chunks(collection, chunks, _embedder([c["text"] for c in chunks]))
 
-    # Parse only new lines (delta), but include all for proper dedup context
-    records = []
-    for line in all_lines:
-        line = line.strip()
-        if not line:
-            continue
-        try:
-            records.append(json.loads(line))
-        except json.JSONDecodeError:
-            pass
+        rejections = sum(1 for c in chunks if c["has_rejection"])
+        rej_note   = f", {rejections} rejection chunk(s)" if rejections else ""
+        print(f"[ingest] {session_id[:8]}… {len(chunks)} chunks upserted{rej_note}"
+              f" ({_embedder.hits} cached)")
 
-    events = records_to_events(records)
-    if not events:
-        write_checkpoint(session_id, total_lines)
-        return
+    write_checkpoint(session_id, state)
 
-    chunks = chunk_events(events, session_id, project)
-    if not chunks:
-        write_checkpoint(session_id, total_lines)
-        return
 
-    collection = get_db(db_path)
-    if collection is None:
-        return  # chromadb not installed
-
-    # Upsert all chunks (idempotent — chunk IDs are stable)
-    collection.upsert(
-        ids       = [c["id"]   for c in chunks],
-        documents = [c["text"] for c in chunks],
-        metadatas = [{k: v for k, v in c.items() if k not in ("id", "text")}
-                     for c in chunks],
-    )
-
-    new_chunks = len(chunks)
-    rejections = sum(1 for c in chunks if c["has_rejection"])
-    rej_note   = f", {rejections} rejection chunk(s)" if rejections else ""
-    print(f"[ingest] {session_id[:8]}… {new_chunks} chunks upserted{rej_note}")
+def _prepare_worker(jsonl_path):
+    try:
+        return jsonl_path, prepare_session(jsonl_path), None
+    except Exception as e:
+        return jsonl_path, None, str(e)
 
-    write_checkpoint(session_id, total_lines)
 
+def ingest_all(proj_root=None, db_path=None, jobs=None, batch_size=EMBED_BATCH):
+    """
+    Bulk-ingest all sessions across all projects.
 
-def ingest_all(proj_root=None, db_path=None):
-    """Bulk-ingest all sessions across all projects."""
+    Workers parse and chunk sessions; the main process embeds and upserts
+    chunks batch_size at a time and writes each session's checkpoint once
+    its last chunk is stored. Sessions already fully ingested are skipped.
+    """
     proj_root = proj_root or os.path.expanduser("~/.claude/projects")
     db_path   = db_path   or os.path.abspath(DB_PATH)
+    jobs      = jobs or os.cpu_count() or 1
 
     all_jsonl = sorted(glob.glob(os.path.join(proj_root, "**/*.jsonl"), recursive=True))
-    print(f"[ingest_all] {len(all_jsonl)} session files found")
-    for path in all_jsonl:
-        try:
-            ingest(path, db_path)
-        except Exception as e:
-            print(f"[ingest_all] ERROR {path}: {e}", file=sys.stderr)
+    todo = [path for path in all_jsonl if not is_ingested(path)]
+    print(f"[ingest_all] {len(all_jsonl)} session files found, "
+          f"{len(all_jsonl) - len(todo)} already ingested")
+    if not todo:
+        return
+
+    collection = get_db(db_path)
+    if collection is None:
+        print("[ingest_all] chromadb not installed — nothing ingested", file=sys.stderr)
+        return
+
+    buffer  = []   # chunks waiting for the next batch
+    waiting = {}   # session_id → [chunks not yet stored, state]
+    stats   = {"files": 0, "chunks": 0, "errors": 0}
+    started = last_report = time.time()
+
+    def flush(final=False):
+        while len(buffer) >= batch_size or (final and buffer):
+            batch = buffer[:batch_size]
+            del buffer[:batch_size]
+            upsert_chunks(collection, batch, _embedder([c["text"] for c in batch]))
+            stats["chunks"] += len(batch)
+            for c in batch:
+                entry = waiting[c["session_id"]]
+                entry[0] -= 1
+                if entry[0] == 0:
+                    write_checkpoint(c["session_id"], entry[1])
+                    del waiting[c["session_id"]]
+
+    def report(final=False):
+        elapsed = max(time.time() - started, 1e-6)
+        rate = stats["files"] / elapsed
+        eta = f", ETA {(len(todo) - stats['files']) / rate:.0f}s" if rate and not final else ""
+        print(f"[ingest_all] {stats['files']}/{len(todo)} files, {stats['chunks']} chunks embedded "
+              f"({_embedder.hits} from cache; {stats['chunks'] / elapsed:.1f} chunks/s, "
+              f"{rate:.1f} files/s{eta})", flush=True)
+
+    pool = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    try:
+        results = pool.map(_prepare_worker, todo, chunksize=4) if pool else map(_prepare_worker, todo)
+        for path, prepared, error in results:
+            stats["files"] += 1
+            if error:
+                stats["errors"] += 1
+                print(f"[ingest_all] ERROR {path}: {error}", file=sys.stderr)
+            elif prepared is not None:
+                session_id, chunks, state = prepared
+                if chunks:
+                    waiting[session_id] = [len(chunks), state]
+                    buffer.extend(chunks)
+                    flush()
+                else:
+                    write_checkpoint(session_id, state)
+            if time.time() - last_report >= PROGRESS_INTERVAL:
+                report()
+                last_report = time.time()
+        flush(final=True)
+    finally:
+        if pool:
+            pool.shutdown(cancel_futures=True)
+    report(final=True)
+    if stats["errors"]:
+        print(f"[ingest_all] {stats['errors']} file(s) failed", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -324,9 +517,13 @@ if __name__ == "__main__":
     parser.add_argument("jsonl", nargs="?", help="Path to session .jsonl (omit for bulk ingest)")
     parser.add_argument("--db-path", default=None)
     parser.add_argument("--all", action="store_true", help="Bulk-ingest all sessions")
+    parser.add_argument("--jobs", "-j", type=int, default=None,
+                        help="Parser processes for bulk ingest (default: CPU count)")
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH,
+                        help=f"Chunks per embedding batch in bulk ingest (default: {EMBED_BATCH})")
     args = parser.parse_args()
 
     if args.all or not args.jsonl:
-        ingest_all(db_path=args.db_path)
+        ingest_all(db_path=args.db_path, jobs=args.jobs, batch_size=args.batch_size)
     else:
         ingest(args.jsonl, db_path=args.db_path)
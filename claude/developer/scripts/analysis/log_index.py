@@ -0,0 +1,246 @@
+#!/usr/bin/env python3
+"""
+log_index.py - Incremental BM25 keyword index over the compacted session logs.
+
+Every compacted log (<log_root>/<project>/<session>.txt) is split into
+overlapping windows of WINDOW_LINES lines, and each window is a row of a
+SQLite FTS5 table, so a query is a posting-list lookup ranked with FTS5's
+built-in BM25 instead of a regex scan of every file. A files table keeps
+each log's size, mtime and the rowid range of its windows: update()
+re-indexes only the logs that changed and drops the windows of logs that
+are gone, deleting by rowid rather than scanning the table for the path.
+
+compact_logs.py updates the index for the logs it writes; query_memory.py
+syncs it (cheap stat per file) before searching, so logs written by other
+means are picked up too. The index lives in <log_root>/.log-index.sqlite.
+
+Query syntax: plain words, ranked by BM25 over windows containing any of
+them (more matching and rarer words rank higher); "quoted words" must
+appear as a phrase.
+
+Usage:
+    python3 log_index.py                         # sync the default log root
+    python3 log_index.py --rebuild
+    python3 log_index.py --query "MATEKF405 DMA conflict" --n 5
+"""
+
+import argparse
+import os
+import re
+import sqlite3
+import threading
+
+LOG_ROOT     = os.path.join(os.path.dirname(__file__), "../../../../claude/log-memories/compacted-logs")
+INDEX_NAME   = ".log-index.sqlite"
+
+WINDOW_LINES = 12       # lines per indexed window
+WINDOW_STEP  = 6        # windows overlap by half, so no match sits on a window edge only
+SCHEMA_VERSION = 2
+
+TOKEN_RE  = re.compile(r"\w+", re.UNICODE)
+PHRASE_RE = re.compile(r'"([^"]*)"')
+
+SCHEMA = [
+    "CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)",
+    # Windows of a log get consecutive rowids first_rowid..last_rowid
+    "CREATE TABLE files (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, "
+    "first_rowid INTEGER, last_rowid INTEGER)",
+    # unicode61 splits on anything that is not a letter or digit (TIM12_CH1 → TIM12 CH1)
+    "CREATE VIRTUAL TABLE windows USING fts5("
+    "text, path UNINDEXED, session UNINDEXED, project UNINDEXED, first_line UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2')",
+]
+
+
+def index_path(log_root):
+    return os.path.join(os.path.abspath(log_root), INDEX_NAME)
+
+
+def fts_query(query):
+    """Any of the words (OR), each quoted phrase as a phrase; None if no tokens."""
+    terms = [f'"{" ".join(TOKEN_RE.findall(p))}"' for p in PHRASE_RE.findall(query)
+             if TOKEN_RE.search(p)]
+    terms += [f'"{t}"' for t in TOKEN_RE.findall(PHRASE_RE.sub(" ", query))]
+    return " OR ".join(dict.fromkeys(terms)) or None
+
+
+def split_windows(lines):
+    """(first line index, text) of each overlapping window; blank-only windows are skipped."""
+    windows = []
+    for start in range(0, max(1, len(lines) - WINDOW_LINES + WINDOW_STEP), WINDOW_STEP):
+        text = "\n".join(lines[start:start + WINDOW_LINES]).strip()
+        if text:
+            windows.append((start, text))
+    return windows
+
+
+class LogIndex:
+    """FTS5 window index of one log root (see module docstring)."""
+
+    def __init__(self, log_root=LOG_ROOT):
+        self.log_root = os.path.abspath(log_root)
+        self.path = index_path(log_root)
+        self.lock = threading.Lock()
+        self._db = None
+
+    @property
+    def db(self):
+        if self._db is None:
+            os.makedirs(self.log_root, exist_ok=True)
+            # Shared by the query server's threads; self.lock serializes use
+            db = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("PRAGMA synchronous = NORMAL")
+            version = None
+            try:
+                row = db.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+                version = row and row[0]
+            except sqlite3.Error:
+                pass
+            if version != str(SCHEMA_VERSION):
+                with db:
+                    for table in ("windows", "files", "meta"):
+                        db.execute(f"DROP TABLE IF EXISTS {table}")
+                    for statement in SCHEMA:
+                        db.execute(statement)
+                    db.execute("INSERT INTO meta VALUES ('version', ?)", (str(SCHEMA_VERSION),))
+            self._db = db
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def log_files(self):
+        """path → (size, mtime_ns) of every compacted log under the root"""
+        found = {}
+        for dirpath, _, filenames in os.walk(self.log_root):
+            for name in filenames:
+                if name.endswith(".txt"):
+                    path = os.path.join(dirpath, name)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    found[path] = (st.st_size, st.st_mtime_ns)
+        return found
+
+    def update(self, paths=None):
+        """
+        Re-index the given logs (default: every log whose size or mtime
+        changed, plus dropping logs that are gone). Returns the number of
+        logs indexed.
+        """
+        with self.lock:
+            db = self.db
+            indexed, rowids = {}, {}
+            for path, size, mtime, first, last in db.execute("SELECT * FROM files"):
+                indexed[path] = (size, mtime)
+                rowids[path] = (first, last)
+            if paths is None:
+                current = self.log_files()
+                gone = set(indexed) - set(current)
+                changed = [p for p, stamp in current.items() if indexed.get(p) != stamp]
+            else:
+                current = {}
+                for p in map(os.path.abspath, paths):
+                    try:
+                        st = os.stat(p)
+                        current[p] = (st.st_size, st.st_mtime_ns)
+                    except OSError:
+                        pass
+                gone = {os.path.abspath(p) for p in paths} - set(current)
+                changed = [p for p, stamp in current.items() if indexed.get(p) != stamp]
+            if not gone and not changed:
+                return 0
+
+            with db:
+                for path in gone | set(changed):
+                    # path is UNINDEXED: deleting by it would scan every window
+                    first, last = rowids.get(path, (None, None))
+                    if first is not None:
+                        db.execute("DELETE FROM windows WHERE rowid BETWEEN ? AND ?", (first, last))
+                    db.execute("DELETE FROM files WHERE path = ?", (path,))
+                row = db.execute("SELECT rowid FROM windows ORDER BY rowid DESC LIMIT 1").fetchone()
+                next_rowid = (row[0] if row else 0) + 1
+                for path in changed:
+                    try:
+                        with open(path, encoding="utf-8", errors="replace") as f:
+                            lines = f.read().splitlines()
+                    except OSError:
+                        continue
+                    session = os.path.splitext(os.path.basename(path))[0]
+                    project = os.path.basename(os.path.dirname(path))
+                    rows = [(next_rowid + k, text, path, session, project, first)
+                            for k, (first, text) in enumerate(split_windows(lines))]
+                    db.executemany("INSERT INTO windows (rowid, text, path, session, project, first_line) "
+                                   "VALUES (?, ?, ?, ?, ?, ?)", rows)
+                    first, last = (next_rowid, next_rowid + len(rows) - 1) if rows else (None, None)
+                    next_rowid += len(rows)
+                    db.execute("INSERT INTO files VALUES (?, ?, ?, ?, ?)", (path, *current[path], first, last))
+            return len(changed)
+
+    def rebuild(self):
+        with self.lock:
+            with self.db:
+                self.db.execute("DELETE FROM windows")
+                self.db.execute("DELETE FROM files")
+        return self.update()
+
+    def search(self, query, n=5, only_rejections=False):
+        """
+        Best windows by BM25, at most one per stretch of a log (overlapping
+        windows of the same file are skipped). Hit dicts as in query_memory.
+        """
+        match = fts_query(query)
+        if match is None:
+            return []
+        if only_rejections:
+            match = f'({match}) AND "REJECTED"'
+        sql = ("SELECT text, path, session, project, first_line, bm25(windows) AS rank "
+               "FROM windows WHERE windows MATCH ? ORDER BY rank LIMIT ?")
+        hits = []
+        taken = {}      # path → first lines of windows already returned
+        with self.lock:
+            rows = self.db.execute(sql, (match, n * 4)).fetchall()
+        for text, path, session, project, first, rank in rows:
+            if any(abs(first - other) < WINDOW_LINES for other in taken.get(path, ())):
+                continue
+            taken.setdefault(path, []).append(first)
+            hits.append({
+                "text":      text,
+                "session":   session[:8],
+                "project":   project,
+                "score":     round(-rank, 3),   # FTS5 bm25() is lower-is-better
+                "rejection": "REJECTED" in text,
+                "source":    "keyword",
+                "line":      first + 1,
+            })
+            if len(hits) >= n:
+                break
+        return hits
+
+    def stats(self):
+        with self.lock:
+            files = self.db.execute("SELECT count(*) FROM files").fetchone()[0]
+            windows = self.db.execute("SELECT count(*) FROM windows").fetchone()[0]
+        return {"files": files, "windows": windows, "path": self.path}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="BM25 keyword index over compacted session logs")
+    parser.add_argument("log_root", nargs="?", default=LOG_ROOT)
+    parser.add_argument("--rebuild", action="store_true", help="Re-index every log")
+    parser.add_argument("--query", help="Search the index after syncing it")
+    parser.add_argument("--n", type=int, default=5)
+    args = parser.parse_args()
+
+    index = LogIndex(args.log_root)
+    count = index.rebuild() if args.rebuild else index.update()
+    stats = index.stats()
+    print(f"{count} log(s) indexed; {stats['files']} logs, {stats['windows']} windows in {stats['path']}")
+    if args.query:
+        for hit in index.search(args.query, args.n):
+            print(f"\n[{hit['score']}] {hit['project']}/{hit['session']}… line {hit['line']}")
+            print(hit["text"])
@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+MCU pin / alternate-function / timer / DMA database for every MCU family.
+
+Compiles, into one lookup structure per family:
+
+  - the alternate-function tables extracted from the datasheets
+    (docs/targets/<family>/alternate-functions.tsv, written by each
+    parse_af_table.py)
+  - the timer DMA request mappings, burst DMA and pin timer alternates of
+    the DMA resolver (raytools/dma_resolver/dma_maps.js)
+  - the fixed UART/SPI/ADC DMA streams INAV uses on each family
+
+and keeps indexes by pin, by peripheral function and by timer channel, so
+"which pins can carry TIM3_CH2 and which DMA streams can it use" is a
+couple of dict lookups. The compiled database is cached as
+docs/targets/mcu-pin-db.json and rebuilt automatically when any source
+file changes.
+
+Families: F405, F722, F745, F765, H743, AT32F435 (aliases such as
+STM32F405xG, F7, H7, AT32F437 are accepted). AT32 names timers TMRn; TIMn
+is accepted for lookups on every family.
+
+DMA options are [dma, stream, channel] lists in dmaopt order, i.e. option
+k is what DEF_TIM(..., k) / dmaopt k selects. On AT32F435 "stream" is the
+0-based DMA channel (DMAMUX, any request on any channel).
+
+Usage:
+    python3 mcu_pin_db.py timer F405 TIM3_CH2      # pins + DMA options
+    python3 mcu_pin_db.py pin F722 PB0             # AF row + timer channels
+    python3 mcu_pin_db.py function AT32F435 uart4  # functions matching a substring
+    python3 mcu_pin_db.py build                    # rebuild the cache
+
+    from mcu_pin_db import load_family
+
+    f405 = load_family("F405")
+    for pin, af in f405.timer_pins("TIM3_CH2"):
+        print(pin, af, f405.dma_options("TIM3_CH2"))
+"""
+
+import argparse
+import json
+import re
+import sys
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+TARGET_DOCS = HERE.parents[1] / "docs" / "targets"
+DMA_MAPS_JS = HERE.parents[3] / "raytools" / "dma_resolver" / "dma_maps.js"
+DB_CACHE = TARGET_DOCS / "mcu-pin-db.json"
+
+# Bump when the compiled layout changes; older caches are rebuilt
+DB_VERSION = 1
+
+# name -> AF table directory, dma_maps.js tables, DMA request lines
+FAMILIES = {
+    "F405": {
+        "title": "STM32F405/F407",
+        "af_dir": "stm32f405",
+        "dma_map": "dmaMapF405",
+        "burst_dma_map": "burstDmaMapF405",
+        "pin_alternates": "pinAlternatesCommon",
+        "dma_requests": 16,
+    },
+    "F722": {
+        "title": "STM32F722/F723",
+        "af_dir": "stm32f722",
+        "dma_map": "dmaMapF7",
+        "burst_dma_map": "burstDmaMapF7",
+        "pin_alternates": "pinAlternatesCommon",
+        "dma_requests": 16,
+    },
+    "F745": {
+        "title": "STM32F745/F746",
+        "af_dir": "stm32f745",
+        "dma_map": "dmaMapF7",
+        "burst_dma_map": "burstDmaMapF7",
+        "pin_alternates": "pinAlternatesCommon",
+        "dma_requests": 16,
+    },
+    "F765": {
+        "title": "STM32F765/F767",
+        "af_dir": "stm32f765",
+        "dma_map": "dmaMapF7",
+        "burst_dma_map": "burstDmaMapF7",
+        "pin_alternates": "pinAlternatesCommon",
+        "dma_requests": 16,
+    },
+    "H743": {
+        "title": "STM32H743/H750",
+        "af_dir": None,        # no extracted AF table; timer pins come from pin_alternates
+        "dma_map": "dmaMapH7",
+        "burst_dma_map": "burstDmaMapH7",
+        "pin_alternates": "pinAlternatesCommon",
+        "dma_requests": 16,
+    },
+    "AT32F435": {
+        "title": "AT32F435/F437",
+        "af_dir": "at32f435",
+        "dma_map": "dmaMapAT32F435",
+        "burst_dma_map": "burstDmaMapAT32F435",
+        "pin_alternates": "pinAlternatesAT32F435",
+        "dma_requests": 14,
+    },
+}
+
+FAMILY_ALIASES = {
+    "F4": "F405", "F407": "F405",
+    "F7": "F745", "F746": "F745", "F723": "F722", "F767": "F765",
+    "H7": "H743", "H750": "H743", "H742": "H743",
+    "AT32": "AT32F435", "AT32F437": "AT32F435",
+}
+
+# Fixed peripheral DMA streams INAV uses ([dma, stream]); from the DMA
+# resolver (parseTargetH) and target.h ADC definitions
+_STM32F4F7_PERIPHERAL_DMA = {
+    "SPI1_RX": [2, 0], "SPI1_TX": [2, 3],
+    "SPI2_RX": [1, 3], "SPI2_TX": [1, 4],
+    "SPI3_RX": [1, 0], "SPI3_TX": [1, 5],
+    "UART1_RX": [2, 2], "UART1_TX": [2, 7],
+    "UART2_RX": [1, 5], "UART2_TX": [1, 6],
+    "UART3_RX": [1, 1], "UART3_TX": [1, 3],
+    "UART4_RX": [1, 2], "UART4_TX": [1, 4],
+    "UART5_RX": [1, 0], "UART5_TX": [1, 7],
+    "UART6_RX": [2, 1], "UART6_TX": [2, 6],
+    "ADC1": [2, 0],
+}
+PERIPHERAL_DMA = {
+    "F405": _STM32F4F7_PERIPHERAL_DMA,
+    "F722": _STM32F4F7_PERIPHERAL_DMA,
+    "F745": _STM32F4F7_PERIPHERAL_DMA,
+    "F765": _STM32F4F7_PERIPHERAL_DMA,
+    "H743": {},         # DMAMUX: peripheral requests are assigned at runtime
+    "AT32F435": {
+        "SPI1_RX": [2, 1], "SPI1_TX": [2, 2],
+        "SPI2_RX": [1, 3], "SPI2_TX": [1, 4],
+        "SPI3_RX": [1, 5], "SPI3_TX": [1, 6],
+        "UART1_RX": [2, 3], "UART1_TX": [2, 4],
+        "UART2_RX": [1, 5], "UART2_TX": [1, 6],
+        "UART3_RX": [1, 1], "UART3_TX": [1, 2],
+        "UART4_RX": [1, 3], "UART4_TX": [1, 4],
+        "UART5_RX": [1, 7], "UART5_TX": [2, 1],
+        "UART6_RX": [2, 5], "UART6_TX": [2, 6],
+        "UART7_RX": [2, 7], "UART7_TX": [1, 1],
+        "UART8_RX": [1, 2], "UART8_TX": [1, 3],
+    },
+}
+
+PIN_RE = re.compile(r'^P[A-K]\d{1,2}$', re.IGNORECASE)
+# TIM2_CH1, TIM2_CH1_ETR, TIM1_CH2N, TMR3_CH4 -> (prefix, timer, channel)
+TIMER_CHANNEL_RE = re.compile(r'^(TIM|TMR)(\d+)_(CH\d)(N?)(?:_|$)')
+_JS_CONST_RE = re.compile(r'export const (\w+)\s*=\s*\{(|.*?\n)\};', re.DOTALL)
+_JS_ENTRY_RE = re.compile(r"'(\w+)'\s*:\s*\[(.*?)\]\s*,?\s*$", re.MULTILINE)
+
+
+# ---- Compilation ------------------------------------------------------------
+
+def _source_files() -> list[Path]:
+    files = [DMA_MAPS_JS]
+    for spec in FAMILIES.values():
+        if spec["af_dir"]:
+            files.append(TARGET_DOCS / spec["af_dir"] / "alternate-functions.tsv")
+    return files
+
+
+def _source_stamp() -> list:
+    stamp = [DB_VERSION]
+    for path in _source_files():
+        try:
+            st = path.stat()
+            stamp.append([str(path), st.st_size, st.st_mtime_ns])
+        except FileNotFoundError:
+            stamp.append([str(path), None, None])
+    return stamp
+
+
+def parse_dma_maps(path: Path = DMA_MAPS_JS) -> dict[str, dict]:
+    """
+    The object literals of dma_maps.js: DMA maps become {key: [[dma, stream,
+    channel], ...]}, pin alternate tables {pin: ["TIM1_CH1", ...]}.
+    """
+    if not path.is_file():
+        return {}
+    tables = {}
+    for name, body in _JS_CONST_RE.findall(path.read_text()):
+        table = {}
+        for key, value in _JS_ENTRY_RE.findall(body):
+            triples = re.findall(r'\[\s*(\d+)\s*,\s*(\d+)\s*,\s*(\d+)\s*\]', value)
+            if triples:
+                table[key] = [[int(n) for n in t] for t in triples]
+                continue
+            alternates = re.findall(r"tim:\s*'(\w+)'\s*,\s*ch:\s*'(\w+)'", value)
+            table[key] = [f"{tim}_{ch}" for tim, ch in alternates]
+        tables[name] = table
+    return tables
+
+
+def timer_channel(function: str) -> str | None:
+    """Timer channel a function name drives: TIM2_CH1_ETR -> TIM2_CH1, TIM1_CH2N -> TIM1_CH2N"""
+    m = TIMER_CHANNEL_RE.match(function)
+    return f"{m.group(1)}{m.group(2)}_{m.group(3)}{m.group(4)}" if m else None
+
+
+def _read_af_table(path: Path) -> tuple[str, dict[str, dict[int, str]]]:
+    """(column prefix "AF"/"MUX", {pin: {af: cell}}) from alternate-functions.tsv"""
+    pins: dict[str, dict[int, str]] = {}
+    with open(path) as f:
+        header = f.readline().rstrip("\n").split("\t")
+        prefix = re.match(r'[A-Z]+', header[1]).group() if len(header) > 1 else "AF"
+        numbers = [int(re.sub(r'\D', '', col)) for col in header[1:]]
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if not parts or not PIN_RE.match(parts[0]):
+                continue
+            pins[parts[0].upper()] = {n: cell for n, cell in zip(numbers, parts[1:])
+                                      if cell and cell != "-"}
+    return prefix, pins
+
+
+def compile_family(name: str, js_tables: dict[str, dict]) -> dict:
+    """Compile one family's tables and indexes (JSON-serializable)."""
+    spec = FAMILIES[name]
+    af_prefix = "AF"
+    pins: dict[str, dict[int, str]] = {}
+    if spec["af_dir"]:
+        tsv = TARGET_DOCS / spec["af_dir"] / "alternate-functions.tsv"
+        if tsv.is_file():
+            af_prefix, pins = _read_af_table(tsv)
+
+    functions: dict[str, list] = {}
+    timer_channels: dict[str, list] = {}
+    for pin, afs in pins.items():
+        for af, cell in afs.items():
+            # One cell can carry several functions: "I2S4_SD/SPI4_MOSI"
+            for function in filter(None, cell.split("/")):
+                functions.setdefault(function, []).append([pin, af])
+                channel = timer_channel(function)
+                if channel:
+                    entries = timer_channels.setdefault(channel, [])
+                    if [pin, af] not in entries:
+                        entries.append([pin, af])
+
+    # No AF table (H743): timer pins from the resolver's pin alternates. Its
+    # "common" table spans F4/F7/H7, so it is not merged into real AF tables.
+    if not pins:
+        for pin, channels in js_tables.get(spec["pin_alternates"], {}).items():
+            for channel in channels:
+                timer_channels.setdefault(channel, []).append([pin, None])
+
+    dma = {key: list(options) for key, options in js_tables.get(spec["dma_map"], {}).items()}
+    for channel in timer_channels:
+        dma.setdefault(channel, [])      # known channel without a DMA request
+    return {
+        "name": name,
+        "title": spec["title"],
+        "af_prefix": af_prefix,
+        "timer_prefix": "TMR" if name.startswith("AT32") else "TIM",
+        "dma_requests": spec["dma_requests"],
+        "pins": {pin: {str(af): cell for af, cell in afs.items()} for pin, afs in pins.items()},
+        "functions": functions,
+        "timer_channels": timer_channels,
+        "dma": dma,
+        "burst_dma": js_tables.get(spec["burst_dma_map"], {}),
+        "peripheral_dma": PERIPHERAL_DMA[name],
+    }
+
+
+def compile_db() -> dict:
+    js_tables = parse_dma_maps()
+    return {
+        "stamp": _source_stamp(),
+        "families": {name: compile_family(name, js_tables) for name in FAMILIES},
+    }
+
+
+def load_db(force: bool = False) -> dict:
+    """The compiled database, from the cache if its sources are unchanged."""
+    if not force and DB_CACHE.is_file():
+        try:
+            data = json.loads(DB_CACHE.read_text())
+            if data.get("stamp") == _source_stamp():
+                return data
+        except ValueError:
+            pass
+    data = compile_db()
+    try:
+        tmp = DB_CACHE.with_name(DB_CACHE.name + ".tmp")
+        tmp.write_text(json.dumps(data, separators=(",", ":")))
+        tmp.replace(DB_CACHE)
+    except OSError:
+        pass        # read-only checkout: use the compiled data uncached
+    return data
+
+
+# ---- Lookup -----------------------------------------------------------------
+
+def family_name(name: str) -> str:
+    """Canonical family for F405, STM32F405xG, stm32f7, AT32F437ZMT7, ..."""
+    key = name.upper().replace("STM32", "")
+    if key in FAMILIES:
+        return key
+    for alias in sorted(list(FAMILIES) + list(FAMILY_ALIASES), key=len, reverse=True):
+        if key.startswith(alias):
+            return FAMILY_ALIASES.get(alias, alias)
+    raise ValueError(f"unknown MCU family {name!r} (known: {', '.join(FAMILIES)})")
+
+
+class FamilyDB:
+    """Lookups for one MCU family (see module docstring)."""
+
+    def __init__(self, data: dict):
+        self.name = data["name"]
+        self.title = data["title"]
+        self.af_prefix = data["af_prefix"]
+        self.timer_prefix = data["timer_prefix"]
+        self.dma_requests = data["dma_requests"]
+        self.pins = data["pins"]
+        self.functions = data["functions"]
+        self.timer_channels = data["timer_channels"]
+        self.dma = data["dma"]
+        self.burst_dma = data["burst_dma"]
+        self.peripheral_dma = data["peripheral_dma"]
+        self._functions_upper = {f.upper(): f for f in self.functions}
+
+    def timer_key(self, tim: str, ch: str | None = None) -> str:
+        """"TIM3", "CH2" or "TIM3_CH2" -> this family's key (TMR3_CH2 on AT32)"""
+        key = (f"{tim}_{ch}" if ch else tim).upper()
+        return re.sub(r'^(TIM|TMR)', self.timer_prefix, key)
+
+    def pin_afs(self, pin: str) -> dict[str, str]:
+        """{"AF1": "TIM2_CH1_ETR", ...} for a pin ({} if not in the AF table)"""
+        return {f"{self.af_prefix}{af}": cell for af, cell in self.pins.get(pin.upper(), {}).items()}
+
+    def pin_timers(self, pin: str) -> list[str]:
+        """Timer channels a pin can carry"""
+        pin = pin.upper()
+        return [channel for channel, entries in self.timer_channels.items()
+                if any(entry[0] == pin for entry in entries)]
+
+    def function_pins(self, function: str) -> list[tuple[str, int]]:
+        """(pin, af) for an exact function name (case-insensitive)"""
+        name = self._functions_upper.get(function.upper())
+        return [tuple(entry) for entry in self.functions.get(name, [])]
+
+    def find_functions(self, text: str) -> list[str]:
+        """Function names containing text (case-insensitive), sorted"""
+        text = text.upper()
+        return sorted(f for upper, f in self._functions_upper.items() if text in upper)
+
+    def timer_pins(self, tim: str, ch: str | None = None) -> list[tuple[str, int | None]]:
+        """(pin, af) for every pin that can carry the timer channel (af None if not in the AF table)"""
+        return [tuple(entry) for entry in self.timer_channels.get(self.timer_key(tim, ch), [])]
+
+    def dma_options(self, tim: str, ch: str | None = None) -> list[list[int]] | None:
+        """
+        DMA options of a timer channel in dmaopt order; [] if the channel
+        exists but has no DMA request, None if the channel is unknown.
+        """
+        return self.dma.get(self.timer_key(tim, ch))
+
+    def burst_dma_options(self, tim: str) -> list[list[int]]:
+        return self.burst_dma.get(self.timer_key(tim), [])
+
+    def dma_name(self, dma: list[int]) -> str:
+        if self.name == "AT32F435":
+            return f"DMA{dma[0]} Channel {dma[1] + 1}"
+        return f"DMA{dma[0]} Stream {dma[1]}"
+
+
+_loaded: dict[str, FamilyDB] = {}
+
+
+def load_family(name: str) -> FamilyDB:
+    name = family_name(name)
+    if name not in _loaded:
+        families = load_db()["families"]
+        _loaded.update({n: FamilyDB(data) for n, data in families.items()})
+    return _loaded[name]
+
+
+# ---- Reports ----------------------------------------------------------------
+
+def print_timer(db: FamilyDB, key: str) -> bool:
+    key = db.timer_key(key)
+    options = db.dma_options(key)
+    pins = db.timer_pins(key)
+    if options is None and not pins:
+        return False
+    print(f"{key} on {db.title}:")
+    for pin, af in pins:
+        print(f"  {pin:5} {db.af_prefix}{af}" if af is not None else f"  {pin:5} (timer alternate)")
+    if options:
+        for opt, dma in enumerate(options):
+            print(f"  dmaopt {opt}: {db.dma_name(dma)} Channel {dma[2]}"
+                  if db.name != "AT32F435" else f"  dmaopt {opt}: {db.dma_name(dma)}")
+    else:
+        print("  no DMA request (PWM/OneShot only, no DShot)")
+    return True
+
+
+def print_pin(db: FamilyDB, pin: str) -> bool:
+    afs = db.pin_afs(pin)
+    timers = db.pin_timers(pin)
+    if not afs and not timers:
+        return False
+    print(f"Alternate functions for {pin.upper()} on {db.title}:")
+    for col, cell in afs.items():
+        print(f"  {col:5}: {cell}")
+    for channel in timers:
+        options = db.dma_options(channel) or []
+        streams = ", ".join(db.dma_name(dma) for dma in options) or "no DMA"
+        print(f"  {channel:12} {streams}")
+    return True
+
+
+def print_functions(db: FamilyDB, text: str) -> bool:
+    names = db.find_functions(text)
+    for name in names:
+        pins = ", ".join(f"{pin}({db.af_prefix}{af})" for pin, af in db.functions[name])
+        print(f"  {name:35} {pins}")
+    return bool(names)
+
+
+def af_search(family: str, keyword: str) -> bool:
+    """
+    Alternate-function lookup for search_indexes.py: a pin name shows its
+    AF row and timer channels; anything else lists the functions whose
+    name contains the keyword, with DMA options for timer channels.
+    Returns True if anything was found.
+    """
+    db = load_family(family)
+    banner = "=" * 70
+    if PIN_RE.match(keyword):
+        print(f"\n{banner}")
+        found = print_pin(db, keyword)
+        print(banner if found else f"  Pin '{keyword}' not found in the AF table")
+        return found
+
+    channel = db.timer_key(keyword)
+    # TIM3 finds TMR3_* on AT32
+    names = db.find_functions(keyword) or db.find_functions(channel)
+    if not names and db.dma_options(channel) is None:
+        return False
+    print(f"\n{banner}")
+    print(f"  AF Table — {len(names)} match(es) for '{keyword}'")
+    print(banner)
+    print_functions(db, keyword)
+    if db.dma_options(channel) is not None:
+        print()
+        print_timer(db, channel)
+    return True
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Pin / alternate-function / timer / DMA lookups for INAV MCU families",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    sub = parser.add_subparsers(dest="command")
+    for command, arg, help_text in (
+        ("timer", "channel", "Pins and DMA options of a timer channel (TIM3_CH2)"),
+        ("pin", "pin", "AF row and timer channels of a pin (PB0)"),
+        ("function", "text", "Functions containing text, with their pins (USART1, SPI2_SCK)"),
+    ):
+        p = sub.add_parser(command, help=help_text)
+        p.add_argument("family", help=f"MCU family ({', '.join(FAMILIES)})")
+        p.add_argument(arg)
+    sub.add_parser("build", help=f"Recompile the database cache ({DB_CACHE.name})")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        data = load_db(force=True)
+        for name, family in data["families"].items():
+            print(f"  {name:9} {len(family['pins']):4d} pins, {len(family['functions']):4d} functions, "
+                  f"{len(family['timer_channels']):3d} timer channels, "
+                  f"{sum(1 for v in family['dma'].values() if v):3d} with DMA")
+        print(f"Written: {DB_CACHE}")
+        return
+    if args.command is None:
+        parser.print_help()
+        return
+
+    try:
+        db = load_family(args.family)
+    except ValueError as e:
+        sys.exit(str(e))
+    if args.command == "timer":
+        found = print_timer(db, args.channel)
+    elif args.command == "pin":
+        found = print_pin(db, args.pin)
+    else:
+        found = print_functions(db, args.text)
+    if not found:
+        sys.exit(f"No match on {db.title}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,124 +3,353 @@
 query_memory.py - Hybrid semantic + keyword search over session memories.
 
 Vector search (ChromaDB) catches semantic synonyms and paraphrases.
-Ripgrep fallback catches exact domain-specific tokens (board names, registers, etc.)
+Keyword search catches exact domain-specific tokens (board names, registers, etc.)
+from the BM25 window index of the compacted logs (log_index.py). The two
+ranked lists are merged by reciprocal-rank fusion; the score shown is the
+fused score. An ingest chunk and a log window cover the same stretch of a
+session when they share a USER:/CLAUDE: line, so a passage both searches
+find is shown once and ranks above one only either finds.
+
+Importing chromadb and loading the embedding model dominate a cold query,
+so run the warm server once; it keeps the collection, the embedder and the
+keyword index open, runs vector and keyword retrieval concurrently,
+and the command line only sends the query over a Unix socket:
+
+    python3 query_memory.py --serve &            # socket: see --socket
+    python3 query_memory.py "MATEKF405 DMA conflict"
+
+Without a server the query is answered in-process, as before.
 
 Usage:
     python3 query_memory.py "why do ESCs reboot during config save"
     python3 query_memory.py "MATEKF405 DMA conflict"  --n 8
     python3 query_memory.py "my question"  --only-rejections
+    python3 query_memory.py --serve [--socket PATH]
+
+Protocol: one JSON object per line each way, e.g.
+    {"op": "query", "query": "DMA", "n": 5, "only_rejections": false,
+     "db_path": "...", "log_root": "..."}   → {"hits": [...]}
+    {"op": "ping"}                           → {"ok": true, ...}
+Errors come back as {"error": "..."}.
 """
 
 import argparse
+import json
 import os
-import subprocess
+import re
+import signal
+import socket
 import sys
+import threading
+import time
 from pathlib import Path
 
+# The client path imports only the above; chromadb, the thread pool,
+# socketserver and log_index are imported where the engine / server need them
+
 DB_PATH     = os.path.join(os.path.dirname(__file__), "../../../../claude/log-memories/chromadb")
 LOG_ROOT    = os.path.join(os.path.dirname(__file__), "../../../../claude/log-memories/compacted-logs")
 COLLECTION  = "session_memories"
 
+LOG_RESCAN_SECS = 2.0       # how often the server looks for new/changed logs
+RRF_K           = 60        # reciprocal-rank fusion constant
+UTTERANCE_KEY   = 60        # chars of a USER:/CLAUDE: line compared across hits
+UTTERANCE_MIN   = 8         # shorter lines ("ok", "yes") don't identify a passage
 
-def vector_search(query, n, only_rejections, db_path):
-    import chromadb
-    from chromadb.utils import embedding_functions
+UTTERANCE_RE = re.compile(r"^(?:USER|CLAUDE): *(.+)$", re.MULTILINE)
 
-    ef = embedding_functions.SentenceTransformerEmbeddingFunction(
-        model_name="all-MiniLM-L6-v2"
-    )
-    client = chromadb.PersistentClient(path=os.path.abspath(db_path))
+
+def default_socket_path():
+    if os.environ.get("MEMORY_QUERY_SOCKET"):
+        return Path(os.environ["MEMORY_QUERY_SOCKET"])
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if not runtime:
+        import tempfile
+        runtime = tempfile.gettempdir()
+    return Path(runtime) / f"inav-memory-{os.getuid()}.sock"
+
+
+class VectorIndex:
+    """The ChromaDB collection and query embedder, opened once and kept."""
+
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        self.ef = None
+        self.col = None
+        self.stamp = None
+        self.lock = threading.Lock()
+
+    def _db_stamp(self):
+        try:
+            st = os.stat(os.path.join(self.db_path, "chroma.sqlite3"))
+            return st.st_size, st.st_mtime_ns
+        except OSError:
+            return None
+
+    def _open(self):
+        import chromadb
+        from chromadb.utils import embedding_functions
+
+        if self.ef is None:
+            self.ef = embedding_functions.SentenceTransformerEmbeddingFunction(
+                model_name="all-MiniLM-L6-v2"
+            )
+        if self.col is not None:
+            # Reopen so chunks ingested by other processes are visible
+            try:
+                from chromadb.api.client import SharedSystemClient
+                SharedSystemClient.clear_system_cache()
+            except (ImportError, AttributeError):
+                pass
+        client = chromadb.PersistentClient(path=self.db_path)
+        try:
+            self.col = client.get_collection(name=COLLECTION, embedding_function=self.ef)
+        except Exception:
+            self.col = None
+        # Opening the client itself touches the database file
+        self.stamp = self._db_stamp()
+
+    def search(self, query, n, only_rejections):
+        with self.lock:
+            if self.col is None or self._db_stamp() != self.stamp:
+                try:
+                    self._open()
+                except ImportError as e:
+                    print(f"[vector] unavailable ({e}) — keyword results only", file=sys.stderr)
+                    return []
+            if self.col is None:
+                print("[vector] Collection not found — run ingest_session.py --all first", file=sys.stderr)
+                return []
+
+            where = {"has_rejection": True} if only_rejections else None
+            kwargs = dict(query_embeddings=self.ef([query]), n_results=min(n, self.col.count() or 1))
+            if where:
+                kwargs["where"] = where
+            results = self.col.query(**kwargs)
+
+        docs  = results.get("documents", [[]])[0]
+        metas = results.get("metadatas", [[]])[0]
+        dists = results.get("distances", [[]])[0]
+
+        hits = []
+        for doc, meta, dist in zip(docs, metas, dists):
+            hits.append({
+                "text":       doc,
+                "session":    meta.get("session_id", "?")[:8],
+                "project":    meta.get("project", "?"),
+                "score":      round(1 - dist, 3),   # cosine similarity
+                "rejection":  meta.get("has_rejection", False),
+                "source":     "vector",
+            })
+        return hits
+
+
+class KeywordIndex:
+    """
+    The BM25 window index of the compacted logs (log_index.py), synced
+    with the log directory at most every LOG_RESCAN_SECS before a search.
+    """
+
+    def __init__(self, log_root):
+        from log_index import LogIndex
+        self.log_root = os.path.abspath(log_root)
+        self.index = LogIndex(self.log_root)
+        self.synced = None
+        self.lock = threading.Lock()
+
+    def refresh(self, now=None):
+        now = now or time.monotonic()
+        with self.lock:
+            if self.synced is not None and now - self.synced < LOG_RESCAN_SECS:
+                return
+            self.index.update()
+            self.synced = now
+
+    def search(self, query, n, only_rejections=False):
+        if not os.path.isdir(self.log_root):
+            return []
+        self.refresh()
+        return self.index.search(query, n, only_rejections)
+
+
+def utterances(text):
+    """
+    Start of every USER:/CLAUDE: line of a hit, whitespace-normalized. Ingest
+    chunks and compacted-log windows format tool lines differently and
+    truncate text at different lengths, but agree on these.
+    """
+    keys = {" ".join(m.group(1).split())[:UTTERANCE_KEY] for m in UTTERANCE_RE.finditer(text)}
+    return {k for k in keys if len(k) >= UTTERANCE_MIN} or {text[:UTTERANCE_KEY]}
+
+
+def fuse_hits(vector_hits, keyword_hits, n):
+    """
+    Reciprocal-rank fusion: each passage scores sum(1 / (RRF_K + rank)) over
+    the lists that found it. Hits of the same session that share an
+    utterance are one passage; a list counts once per passage (its best
+    rank), and its further hits of that passage are dropped as overlaps.
+    """
+    entries = []
+    for hits in (vector_hits, keyword_hits):
+        for rank, h in enumerate(hits, 1):
+            keys = utterances(h["text"])
+            entry = next((e for e in entries
+                          if e["hit"]["session"] == h["session"] and e["keys"] & keys), None)
+            if entry is None:
+                entries.append({"hit": h, "keys": keys, "rrf": 1 / (RRF_K + rank), "sources": {h["source"]}})
+            elif h["source"] not in entry["sources"]:
+                entry["rrf"] += 1 / (RRF_K + rank)
+                entry["sources"].add(h["source"])
+                entry["keys"] |= keys
+                entry["hit"] = dict(entry["hit"], source="both")
+    ranked = sorted(entries, key=lambda e: -e["rrf"])
+    return [dict(e["hit"], score=round(e["rrf"], 4)) for e in ranked[:n]]
+
+
+class MemoryEngine:
+    """Vector + keyword retrieval over one DB / log root, run concurrently."""
+
+    def __init__(self, db_path=DB_PATH, log_root=LOG_ROOT):
+        from concurrent.futures import ThreadPoolExecutor
+        self.vector = VectorIndex(db_path)
+        self.keyword = KeywordIndex(log_root)
+        self.pool = ThreadPoolExecutor(max_workers=2)
+
+    def serves(self, db_path, log_root):
+        return (os.path.abspath(db_path) == self.vector.db_path and
+                os.path.abspath(log_root) == self.keyword.log_root)
+
+    def warm(self):
+        """Load the collection and the embedding model, and sync the keyword index, now."""
+        self.keyword.refresh()
+        try:
+            self.vector.search("warm up", 1, False)
+        except Exception as e:
+            print(f"[vector] unavailable: {e}", file=sys.stderr)
+
+    def query(self, query, n=5, only_rejections=False):
+        v_future = self.pool.submit(self.vector.search, query, n, only_rejections)
+        k_hits = self.keyword.search(query, n, only_rejections)
+        return fuse_hits(v_future.result(), k_hits, n)
+
+
+# ---- Request handling / server ---------------------------------------------
+
+def handle_request(engine, request):
     try:
-        col = client.get_collection(name=COLLECTION, embedding_function=ef)
-    except Exception:
-        print("[vector] Collection not found — run ingest_session.py --all first", file=sys.stderr)
-        return []
-
-    where = {"has_rejection": True} if only_rejections else None
-    kwargs = dict(query_texts=[query], n_results=min(n, col.count() or 1))
-    if where:
-        kwargs["where"] = where
-
-    results = col.query(**kwargs)
-    docs  = results.get("documents", [[]])[0]
-    metas = results.get("metadatas", [[]])[0]
-    dists = results.get("distances", [[]])[0]
-
-    hits = []
-    for doc, meta, dist in zip(docs, metas, dists):
-        hits.append({
-            "text":       doc,
-            "session":    meta.get("session_id", "?")[:8],
-            "project":    meta.get("project", "?"),
-            "score":      round(1 - dist, 3),   # cosine similarity
-            "rejection":  meta.get("has_rejection", False),
-            "source":     "vector",
-        })
-    return hits
-
-
-def keyword_search(query, n, log_root):
-    """Ripgrep across compacted logs for exact-token matches."""
-    if not os.path.isdir(log_root):
-        return []
+        op = request.get("op", "query")
+        if op == "query":
+            if not engine.serves(request.get("db_path", DB_PATH), request.get("log_root", LOG_ROOT)):
+                return {"error": "server uses a different --db-path/--log-root", "paths": True}
+            return {"hits": engine.query(request["query"], request.get("n", 5),
+                                         request.get("only_rejections", False))}
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "db_path": engine.vector.db_path,
+                    "log_root": engine.keyword.log_root, "logs": engine.keyword.index.stats()["files"]}
+        raise ValueError(f"unknown op {op!r}")
+    except Exception as e:      # bad requests, ChromaDB errors, ...: report, keep serving
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def serve(engine, socket_path):
+    """Serve queries on a Unix socket until interrupted."""
+    import socketserver
+
+    class _RequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as e:
+                    response = {"error": f"invalid JSON: {e}"}
+                else:
+                    response = handle_request(self.server.engine, request)
+                self.wfile.write(json.dumps(response).encode() + b"\n")
+                self.wfile.flush()
+
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        if MemoryClient(socket_path).ping():
+            raise RuntimeError(f"a server is already listening on {socket_path}")
+        socket_path.unlink()
+    engine.warm()
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), _RequestHandler)
+    server.daemon_threads = True
+    server.engine = engine
+    print(f"memory query server listening on {socket_path}", file=sys.stderr)
+    # Exit through the finally below on kill as well, so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
     try:
-        result = subprocess.run(
-            ["rg", "--context", "4", "--max-count", str(n * 2),
-             "--glob", "*.txt", query, log_root],
-            capture_output=True, text=True, timeout=10
-        )
-        raw = result.stdout.strip()
-    except (FileNotFoundError, subprocess.TimeoutExpired):
-        return []
-
-    if not raw:
-        return []
-
-    # Group by file, each match becomes one hit
-    hits = []
-    current_file = None
-    current_lines = []
-    for line in raw.splitlines():
-        if line.startswith(log_root) or (os.sep in line and line.endswith(":")):
-            if current_file and current_lines:
-                hits.append(_rg_hit(current_file, current_lines))
-            current_file = line.split(":")[0]
-            current_lines = [line[len(current_file)+1:]]
-        elif line == "--":
-            if current_file and current_lines:
-                hits.append(_rg_hit(current_file, current_lines))
-            current_lines = []
-        else:
-            current_lines.append(line)
-
-    if current_file and current_lines:
-        hits.append(_rg_hit(current_file, current_lines))
-
-    return hits[:n]
-
-
-def _rg_hit(filepath, lines):
-    p = Path(filepath)
-    return {
-        "text":      "\n".join(lines),
-        "session":   p.stem[:8],
-        "project":   p.parent.name,
-        "score":     None,
-        "rejection": any("REJECTED" in l for l in lines),
-        "source":    "keyword",
-    }
-
-
-def merge_hits(vector_hits, keyword_hits, n):
-    """Deduplicate by session prefix + first 60 chars; vector hits rank first."""
-    seen = set()
-    merged = []
-    for h in vector_hits + keyword_hits:
-        key = h["session"] + h["text"][:60]
-        if key not in seen:
-            seen.add(key)
-            merged.append(h)
-    return merged[:n]
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+
+class MemoryClient:
+    """
+    Send queries to a running server; without one (or if it serves other
+    paths), answer them with an in-process MemoryEngine.
+    """
+
+    def __init__(self, socket_path=None, use_server=True, db_path=DB_PATH, log_root=LOG_ROOT):
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+        self.use_server = use_server
+        self.db_path = db_path
+        self.log_root = log_root
+        self.engine = None
+        self._sock = None
+        self._reader = None
+
+    def _connect(self):
+        if self._sock is not None:
+            return True
+        if not self.use_server or not self.socket_path.exists():
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            return False
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        return True
+
+    def request(self, request):
+        if self._connect():
+            try:
+                self._sock.sendall(json.dumps(request).encode() + b"\n")
+                line = self._reader.readline()
+                if line:
+                    response = json.loads(line)
+                    if not response.get("paths"):
+                        return response
+            except OSError:
+                pass
+            self.close()
+            self.use_server = False     # server gone or serving other paths; answer locally
+        if self.engine is None:
+            self.engine = MemoryEngine(self.db_path, self.log_root)
+        return handle_request(self.engine, request)
+
+    def ping(self):
+        return self._connect() and "ok" in self.request({"op": "ping"})
+
+    def query(self, query, n=5, only_rejections=False):
+        return self.request({"op": "query", "query": query, "n": n, "only_rejections": only_rejections,
+                             "db_path": os.path.abspath(self.db_path),
+                             "log_root": os.path.abspath(self.log_root)})
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = self._reader = None
 
 
 def print_results(hits, query):
@@ -139,16 +368,32 @@ def print_results(hits, query):
 
 
 if __name__ == "__main__":
-    parser = argparse.ArgumentParser()
-    parser.add_argument("query", help="Natural language query")
+    parser = argparse.ArgumentParser(
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("query", nargs="?", help="Natural language query")
     parser.add_argument("--n",   type=int, default=5, help="Number of results (default 5)")
     parser.add_argument("--only-rejections", action="store_true",
                         help="Restrict to chunks containing user corrections")
     parser.add_argument("--db-path",  default=DB_PATH)
     parser.add_argument("--log-root", default=LOG_ROOT)
+    parser.add_argument("--serve", action="store_true", help="Run the warm query server")
+    parser.add_argument("--socket", type=Path, default=None,
+                        help=f"Server socket (default: {default_socket_path()}, or $MEMORY_QUERY_SOCKET)")
+    parser.add_argument("--local", action="store_true", help="Don't use a running server")
     args = parser.parse_args()
 
-    v_hits = vector_search(args.query, args.n, args.only_rejections, args.db_path)
-    k_hits = keyword_search(args.query, args.n, args.log_root)
-    merged = merge_hits(v_hits, k_hits, args.n)
-    print_results(merged, args.query)
+    if args.serve:
+        serve(MemoryEngine(args.db_path, args.log_root), args.socket or default_socket_path())
+        sys.exit(0)
+    if not args.query:
+        parser.error("a query is required (or --serve)")
+
+    client = MemoryClient(args.socket, use_server=not args.local,
+                          db_path=args.db_path, log_root=args.log_root)
+    response = client.query(args.query, args.n, args.only_rejections)
+    client.close()
+    if "error" in response:
+        sys.exit(f"Error: {response['error']}")
+    print_results(response["hits"], args.query)
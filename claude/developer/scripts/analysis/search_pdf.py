@@ -18,9 +18,14 @@ Options:
     -s, --sections      Show section headings only (no query needed)
     --index             Build/rebuild the text cache and exit
     --no-cache          Force re-extract even if cache exists
-
-The text cache is stored as <pdf_file>.txt next to the PDF file.
-The index of section headings is stored as <pdf_file>.index.json.
+    -j N, --jobs N      Worker processes for extraction/indexing (default: CPU count)
+
+The text cache is stored as <pdf_file>.txt next to the PDF file, with a
+page offset table in <pdf_file>.pages (scripts/pdfindexer/page_store.py),
+so --page N reads just that page from the cache.
+The index of section headings is stored as <pdf_file>.index.json. It is
+built in page chunks across a process pool and only rebuilt when the text
+cache changes.
 """
 
 import sys
@@ -28,57 +33,46 @@ import os
 import re
 import json
 import argparse
-import subprocess
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "pdfindexer"))
+from page_store import PageStore, map_page_chunks, text_cache_path  # noqa: E402
+
 
 # ---- Text extraction --------------------------------------------------------
 
 def cache_path(pdf_path: Path) -> Path:
-    return pdf_path.with_suffix(pdf_path.suffix + ".txt")
+    return text_cache_path(pdf_path)
 
 
 def index_path(pdf_path: Path) -> Path:
     return pdf_path.with_suffix(pdf_path.suffix + ".index.json")
 
 
-def extract_text(pdf_path: Path, force: bool = False) -> str:
-    """Extract full text from PDF using pdftotext, caching result."""
-    out = cache_path(pdf_path)
-    if not force and out.exists() and out.stat().st_mtime >= pdf_path.stat().st_mtime:
-        return out.read_text(encoding="utf-8", errors="replace")
-
-    print(f"Extracting text from {pdf_path.name} ...", file=sys.stderr)
-    # -layout preserves column layout; -enc UTF-8; -eol unix
-    result = subprocess.run(
-        ["pdftotext", "-layout", "-enc", "UTF-8", "-eol", "unix",
-         str(pdf_path), "-"],
-        capture_output=True,
-    )
-    if result.returncode != 0:
-        sys.exit(f"pdftotext failed: {result.stderr.decode()}")
-
-    text = result.stdout.decode("utf-8", errors="replace")
-    out.write_text(text, encoding="utf-8")
-    print(f"Cached to {out.name}", file=sys.stderr)
-    return text
-
-
-# ---- Parsing: split by page ------------------------------------------------
-
-PAGE_SEP = "\x0c"  # form-feed character pdftotext uses between pages
-
-
-def split_pages(text: str) -> list[tuple[int, list[str]]]:
-    """Return list of (page_number, lines) tuples (1-based page numbers)."""
-    raw_pages = text.split(PAGE_SEP)
-    pages = []
-    for i, raw in enumerate(raw_pages):
-        lines = raw.splitlines()
-        # Skip empty trailing page
-        if lines or i < len(raw_pages) - 1:
-            pages.append((i + 1, lines))
-    return pages
+def open_store(pdf_path: Path, force: bool = False, jobs: int | None = None) -> PageStore:
+    """Page store for the PDF, extracting the text first if needed."""
+    try:
+        return PageStore(pdf_path).ensure(force=force, jobs=jobs)
+    except RuntimeError as e:
+        sys.exit(str(e))
+
+
+def load_pages(pdf_path: Path, force: bool = False,
+               only_page: int | None = None) -> list[tuple[int, list[str]]]:
+    """
+    Return list of (page_number, lines) tuples (1-based page numbers),
+    extracting the text once with pdftotext. With only_page just that page
+    is read from the cache.
+    """
+    store = open_store(pdf_path, force=force)
+    try:
+        if only_page is not None:
+            if not 1 <= only_page <= store.page_count:
+                return []
+            return [(only_page, store.page_lines(only_page))]
+        return [(num, text.splitlines()) for num, text in store.iter_pages()]
+    finally:
+        store.close()
 
 
 # ---- Section heading detection ---------------------------------------------
@@ -109,24 +103,48 @@ def detect_sections(pages: list[tuple[int, list[str]]]) -> list[dict]:
     return sections
 
 
+def _chunk_sections(pdf_path: Path, first: int, last: int) -> list[dict]:
+    """detect_sections() for pages first..last (runs in a worker process)."""
+    store = PageStore(pdf_path).ensure()
+    try:
+        return detect_sections([(num, text.splitlines()) for num, text in store.iter_pages(first, last)])
+    finally:
+        store.close()
+
+
+def merge_sections(partials: list[list[dict]]) -> list[dict]:
+    """Concatenate per-chunk sections in page order; the first occurrence of a number wins."""
+    sections = []
+    seen = set()
+    for partial in partials:
+        for s in partial:
+            if s["section"] not in seen:
+                seen.add(s["section"])
+                sections.append(s)
+    return sections
+
+
 # ---- Index building --------------------------------------------------------
 
-def build_index(pdf_path: Path, force: bool = False) -> dict:
-    """Build or load the section index."""
+def build_index(pdf_path: Path, force: bool = False, jobs: int | None = None) -> dict:
+    """Build or load the section index (rebuilt only when the text cache changed)."""
     idx = index_path(pdf_path)
-    txt = cache_path(pdf_path)
 
-    if (not force and idx.exists()
-            and idx.stat().st_mtime >= pdf_path.stat().st_mtime):
+    store = open_store(pdf_path, force=force, jobs=jobs)
+    source = store.source_stamp()
+    page_count = store.page_count
+    store.close()
+
+    if not force and idx.exists():
         with idx.open() as f:
-            return json.load(f)
+            data = json.load(f)
+        if data.get("source") == source:
+            return data
 
-    text = extract_text(pdf_path, force=force)
-    pages = split_pages(text)
-    sections = detect_sections(pages)
-    data = {"pdf": str(pdf_path), "pages": len(pages), "sections": sections}
+    sections = merge_sections(map_page_chunks(pdf_path, _chunk_sections, jobs=jobs))
+    data = {"pdf": str(pdf_path), "source": source, "pages": page_count, "sections": sections}
     idx.write_text(json.dumps(data, indent=2), encoding="utf-8")
-    print(f"Index written to {idx.name} ({len(sections)} sections, {len(pages)} pages)",
+    print(f"Index written to {idx.name} ({len(sections)} sections, {page_count} pages)",
           file=sys.stderr)
     return data
 
@@ -220,6 +238,8 @@ def main() -> None:
                         help="Build/rebuild the text cache and section index, then exit")
     parser.add_argument("--no-cache", action="store_true",
                         help="Force re-extraction even if cache exists")
+    parser.add_argument("-j", "--jobs", type=int, metavar="N",
+                        help="Worker processes for extraction and indexing (default: CPU count)")
 
     args = parser.parse_args()
     pdf_path = Path(args.pdf).expanduser().resolve()
@@ -229,13 +249,13 @@ def main() -> None:
 
     # --index mode
     if args.index:
-        data = build_index(pdf_path, force=args.no_cache)
+        data = build_index(pdf_path, force=args.no_cache, jobs=args.jobs)
         print(f"Index ready: {data['pages']} pages, {len(data['sections'])} sections")
         return
 
     # --sections mode
     if args.sections:
-        data = build_index(pdf_path, force=args.no_cache)
+        data = build_index(pdf_path, force=args.no_cache, jobs=args.jobs)
         print(f"\nSection headings in {pdf_path.name}:\n")
         for s in data["sections"]:
             print(f"  p.{s['page']:>4}  {s['section']:<12}  {s['title']}")
@@ -244,8 +264,7 @@ def main() -> None:
     if not args.query:
         parser.error("A search query is required (or use --sections / --index)")
 
-    text = extract_text(pdf_path, force=args.no_cache)
-    pages = split_pages(text)
+    pages = load_pages(pdf_path, force=args.no_cache, only_page=args.page)
     results = search(pages, args.query,
                      ignore_case=args.ignore_case,
                      context_lines=args.context,
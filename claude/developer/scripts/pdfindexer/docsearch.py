@@ -0,0 +1,775 @@
+#!/usr/bin/env python3
+"""
+Unified search across every indexed PDF under claude/developer/docs
+
+One engine for all datasheets, reference manuals and books: each PDF has
+a full-text index (pdf_text_index.py, built on first use), queries are
+ranked with BM25 over pages across all selected documents, and page text
+is sliced out of the memory-mapped text cache (page_store.py).
+
+Run it as a warm server so repeated queries pay neither Python startup
+of the engine, nor document discovery, nor index/page loading:
+
+    ./docsearch.py serve &              # Unix socket (see --socket)
+    ./docsearch.py search "DMA stream"  # answered by the server if running
+
+Without a server every command runs the engine in-process.
+
+Query syntax:
+    DMA stream          pages containing both terms, ranked (--any: either)
+    "DMA stream"        phrase
+    TIM1_CH1            one term: the phrase "TIM1 CH1"
+    TIM*                prefix
+
+Usage:
+    ./docsearch.py search "DMA request" --doc stm32h7 --pages
+    ./docsearch.py pages STM32Ref 512 514
+    ./docsearch.py list
+    ./docsearch.py build                # index every document now
+    ./docsearch.py serve --stdio        # JSON lines on stdin/stdout
+
+Protocol (socket and stdio): one JSON object per line each way, e.g.
+    {"op": "search", "query": "DMA", "docs": ["stm32h7"], "limit": 20}
+    {"op": "pages", "doc": "STM32Ref", "pages": [512], "context": 1}
+    {"op": "documents"}
+Errors come back as {"error": "..."}.
+"""
+
+import argparse
+import json
+import math
+import os
+import re
+import shlex
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from page_store import PageStore, text_cache_path
+from pdf_text_index import PDFTextIndex, fts_query
+
+DOCS_ROOT = Path(__file__).resolve().parents[2] / "docs"
+
+# BM25 parameters (the usual defaults)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Matching lines kept per page in a hit
+MAX_LINES_PER_HIT = 8
+
+
+def default_socket_path() -> Path:
+    if os.environ.get("DOCSEARCH_SOCKET"):
+        return Path(os.environ["DOCSEARCH_SOCKET"])
+    runtime = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return Path(runtime) / f"inav-docsearch-{os.getuid()}.sock"
+
+
+def parse_query(query: str) -> List[str]:
+    """
+    Split a query into FTS5 phrase queries, one per term: "quoted text"
+    is one term, otherwise whitespace separates terms. A trailing * on a
+    term makes it a prefix.
+    """
+    try:
+        words = shlex.split(query)
+    except ValueError:
+        words = query.replace('"', " ").split()
+    terms = []
+    for word in words:
+        try:
+            terms.append(fts_query(word))
+        except ValueError:
+            continue    # punctuation only
+    if not terms:
+        raise ValueError(f"no searchable terms in {query!r}")
+    return terms
+
+
+def page_ranges(pages: List[int], context: int = 0, last_page: Optional[int] = None) -> List[tuple]:
+    """Expand pages by +/- context and merge them into (first, last) ranges."""
+    expanded = set()
+    for page in pages:
+        for offset in range(-context, context + 1):
+            p = max(1, page + offset)
+            if last_page is None or p <= last_page:
+                expanded.add(p)
+    ranges = []
+    for p in sorted(expanded):
+        if ranges and p <= ranges[-1][1] + 1:
+            ranges[-1][1] = p
+        else:
+            ranges.append([p, p])
+    return [tuple(r) for r in ranges]
+
+
+class Document:
+    """One PDF: its full-text index and page store."""
+
+    def __init__(self, pdf, name: Optional[str] = None, description: str = ""):
+        self.pdf = Path(pdf).resolve()
+        self.name = name or self.pdf.stem
+        self.description = description
+        self.index = PDFTextIndex(self.pdf)
+        self.store = PageStore(self.pdf)
+        self._stamp = None
+        self._page_tokens: List[int] = []
+
+    @property
+    def available(self) -> bool:
+        return self.pdf.exists() or text_cache_path(self.pdf).exists()
+
+    def refresh(self):
+        """(Re)open the index if the text cache is new or changed since last use."""
+        cache = text_cache_path(self.pdf)
+        stamp = cache.stat().st_mtime_ns if cache.exists() else None
+        if stamp is not None and stamp == self._stamp:
+            return
+        self.index.close()
+        self.index.ensure()
+        self._stamp = text_cache_path(self.pdf).stat().st_mtime_ns
+        self._page_tokens = self.index.page_tokens()
+        self.store.ensure()
+
+    @property
+    def page_count(self) -> int:
+        return len(self._page_tokens)
+
+    @property
+    def token_count(self) -> int:
+        return sum(self._page_tokens)
+
+    def page_tokens(self, page: int) -> int:
+        return self._page_tokens[page - 1]
+
+    def postings(self, term: str) -> Dict[int, List[tuple]]:
+        """page -> [(line, text), ...] for one FTS5 term, in document order"""
+        hits: Dict[int, List[tuple]] = {}
+        for page, line, text in self.index.db.execute(
+                "SELECT page, line, text FROM lines WHERE lines MATCH ? ORDER BY rowid", (term,)):
+            hits.setdefault(page, []).append((line, text))
+        return hits
+
+    def page_text(self, first: int, last: int) -> str:
+        """Pages first..last like `pdftotext -f first -l last` prints them"""
+        return self.store.pages(first, last)
+
+    def describe(self) -> dict:
+        if not self._page_tokens and self.index.is_current():
+            self.refresh()
+        return {"name": self.name, "pdf": str(self.pdf), "description": self.description,
+                "pages": self.page_count or None}
+
+
+class SearchEngine:
+    """Documents by resolved PDF path; BM25 page ranking across any subset."""
+
+    def __init__(self, root: Path = DOCS_ROOT):
+        self.root = Path(root)
+        self.documents: Dict[str, Document] = {}
+        self._discovered = False
+
+    def add(self, pdf, name: Optional[str] = None, description: str = "") -> Document:
+        key = str(Path(pdf).resolve())
+        doc = self.documents.get(key)
+        if doc is None:
+            doc = self.documents[key] = Document(pdf, name, description)
+        else:
+            if name:
+                doc.name = name
+            if description:
+                doc.description = description
+        return doc
+
+    def discover(self):
+        """Register every PDF under the docs root (once)."""
+        if self._discovered:
+            return
+        for pdf in sorted(self.root.rglob("*.pdf")):
+            key = str(pdf.resolve())
+            if key not in self.documents:
+                self.add(pdf, name=str(pdf.relative_to(self.root).with_suffix("")))
+        self._discovered = True
+
+    def select(self, docs: Optional[List[str]] = None) -> List[Document]:
+        """
+        Documents for a list of PDF paths or name filters (case-insensitive
+        substring of the document name or path); all documents if empty.
+        """
+        if not docs:
+            self.discover()
+            return [d for d in self.documents.values() if d.available]
+        selected = []
+        for spec in docs:
+            path = Path(spec)
+            if path.is_absolute() and path.suffix.lower() == ".pdf":
+                found = [self.add(path)]
+            else:
+                self.discover()
+                needle = spec.lower()
+                found = [d for d in self.documents.values()
+                         if needle in d.name.lower() or needle in str(d.pdf).lower()]
+                if not found:
+                    raise ValueError(f"no document matches {spec!r}")
+            selected.extend(d for d in found if d.available and d not in selected)
+        return selected
+
+    def _ready(self, docs: List[Document]) -> List[Document]:
+        ready = []
+        for doc in docs:
+            try:
+                doc.refresh()
+                ready.append(doc)
+            except (OSError, RuntimeError) as e:
+                print(f"Skipping {doc.name}: {e}", file=sys.stderr)
+        return ready
+
+    def search(self, query: str, docs: Optional[List[str]] = None, limit: int = 20,
+               match_any: bool = False) -> dict:
+        """
+        Rank pages of the selected documents for query. Returns
+        {"query", "total", "hits": [{"doc", "pdf", "page", "score", "lines"}]}
+        with hits best first and "lines" the matching [line, text] pairs.
+        """
+        started = time.perf_counter()
+        terms = parse_query(query)
+        selected = self._ready(self.select(docs))
+
+        # Collection statistics over all selected documents, so scores compare across them
+        page_total = sum(d.page_count for d in selected) or 1
+        avg_tokens = (sum(d.token_count for d in selected) / page_total) or 1.0
+        per_doc = [(doc, [doc.postings(term) for term in terms]) for doc in selected]
+        doc_freq = [sum(len(postings[i]) for _, postings in per_doc) for i in range(len(terms))]
+        idf = [math.log(1 + (page_total - n + 0.5) / (n + 0.5)) for n in doc_freq]
+
+        hits = []
+        for doc, postings in per_doc:
+            pages = set().union(*postings)
+            if not match_any:
+                pages.intersection_update(*postings)
+            for page in pages:
+                length_norm = BM25_K1 * (1 - BM25_B + BM25_B * doc.page_tokens(page) / avg_tokens)
+                score = 0.0
+                lines = {}
+                for weight, term_postings in zip(idf, postings):
+                    matched = term_postings.get(page)
+                    if matched:
+                        tf = len(matched)
+                        score += weight * tf * (BM25_K1 + 1) / (tf + length_norm)
+                        lines.update(matched)
+                hits.append({"doc": doc.name, "pdf": str(doc.pdf), "page": page,
+                             "score": round(score, 4),
+                             "lines": sorted(lines.items())[:MAX_LINES_PER_HIT],
+                             "matched_lines": len(lines)})
+
+        hits.sort(key=lambda h: (-h["score"], h["doc"], h["page"]))
+        return {"query": query, "total": len(hits), "hits": hits[:limit] if limit else hits,
+                "documents": len(selected), "elapsed_ms": round((time.perf_counter() - started) * 1e3, 2)}
+
+    def pages(self, doc: str, pages: List[int], context: int = 0) -> dict:
+        """Text of pages (+/- context) of one document, merged into ranges"""
+        selected = self._ready(self.select([doc]))
+        if not selected and Path(doc).is_absolute():
+            raise ValueError(f"{doc} is not available")
+        if len(selected) != 1:
+            raise ValueError(f"{doc!r} matches {len(selected)} documents")
+        document = selected[0]
+        ranges = page_ranges(pages, context, document.page_count)
+        return {"doc": document.name, "pdf": str(document.pdf),
+                "ranges": [{"first": first, "last": last, "text": document.page_text(first, last)}
+                           for first, last in ranges]}
+
+    def describe(self, docs: Optional[List[str]] = None) -> dict:
+        return {"documents": [d.describe() for d in self.select(docs)]}
+
+    def build(self, docs: Optional[List[str]] = None) -> dict:
+        """Create/refresh the index of every selected document"""
+        selected = self.select(docs)
+        ready = self._ready(selected)
+        return {"indexed": [d.name for d in ready],
+                "skipped": [d.name for d in selected if d not in ready]}
+
+
+# ---- Request handling / server ---------------------------------------------
+
+def handle_request(engine: SearchEngine, request: dict) -> dict:
+    try:
+        op = request.get("op", "search")
+        if op == "search":
+            return engine.search(request["query"], request.get("docs"),
+                                 limit=request.get("limit", 20), match_any=request.get("any", False))
+        if op == "pages":
+            return engine.pages(request["doc"], request["pages"], request.get("context", 0))
+        if op == "documents":
+            return engine.describe(request.get("docs"))
+        if op == "build":
+            return engine.build(request.get("docs"))
+        if op == "ping":
+            return {"ok": True, "pid": os.getpid(), "documents": len(engine.documents)}
+        raise ValueError(f"unknown op {op!r}")
+    except Exception as e:      # bad requests, FTS5 syntax errors, ...: report, keep serving
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as e:
+                response = {"error": f"invalid JSON: {e}"}
+            else:
+                # One request at a time: the engine and its sqlite connections are shared
+                with self.server.lock:
+                    response = handle_request(self.server.engine, request)
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+            self.wfile.flush()
+
+
+def serve(engine: SearchEngine, socket_path: Path, preload: bool = True):
+    """Serve requests on a Unix socket until interrupted."""
+    socket_path = Path(socket_path)
+    if socket_path.exists():
+        if SearchClient(socket_path).ping():
+            raise RuntimeError(f"a server is already listening on {socket_path}")
+        socket_path.unlink()
+    if preload:
+        built = engine.build()
+        print(f"Loaded {len(built['indexed'])} documents", file=sys.stderr)
+    server = socketserver.ThreadingUnixStreamServer(str(socket_path), _RequestHandler)
+    server.daemon_threads = True
+    server.engine = engine
+    server.lock = threading.Lock()
+    print(f"docsearch listening on {socket_path}", file=sys.stderr)
+    # Exit through the finally below on kill as well, so the socket is removed
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        socket_path.unlink(missing_ok=True)
+
+
+def serve_stdio(engine: SearchEngine):
+    """Answer one JSON request per stdin line with one JSON line on stdout."""
+    for line in sys.stdin:
+        if not line.strip():
+            continue
+        try:
+            response = handle_request(engine, json.loads(line))
+        except json.JSONDecodeError as e:
+            response = {"error": f"invalid JSON: {e}"}
+        sys.stdout.write(json.dumps(response) + "\n")
+        sys.stdout.flush()
+
+
+class SearchClient:
+    """
+    Send requests to a running server; without one, answer them with an
+    in-process SearchEngine (created on first use).
+    """
+
+    def __init__(self, socket_path: Optional[Path] = None, use_server: bool = True,
+                 engine_factory: Callable[[], SearchEngine] = SearchEngine):
+        self.socket_path = Path(socket_path) if socket_path else default_socket_path()
+        self.use_server = use_server
+        self.engine_factory = engine_factory
+        self.engine: Optional[SearchEngine] = None
+        self._sock = None
+        self._reader = None
+
+    def _connect(self) -> bool:
+        if self._sock is not None:
+            return True
+        if not self.use_server or not self.socket_path.exists():
+            return False
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(str(self.socket_path))
+        except OSError:
+            sock.close()
+            return False
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+        return True
+
+    @property
+    def remote(self) -> bool:
+        return self._connect()
+
+    def request(self, request: dict) -> dict:
+        if self._connect():
+            try:
+                self._sock.sendall(json.dumps(request).encode() + b"\n")
+                line = self._reader.readline()
+                if line:
+                    return json.loads(line)
+            except OSError:
+                pass
+            self.close()
+            self.use_server = False     # server went away; answer locally from now on
+        if self.engine is None:
+            self.engine = self.engine_factory()
+        return handle_request(self.engine, request)
+
+    def ping(self) -> bool:
+        return self._connect() and "ok" in self.request({"op": "ping"})
+
+    def close(self):
+        if self._sock is not None:
+            self._reader.close()
+            self._sock.close()
+            self._sock = self._reader = None
+
+    def search(self, query: str, docs: Optional[List[str]] = None, limit: int = 20,
+               match_any: bool = False) -> dict:
+        return self.request({"op": "search", "query": query, "docs": docs, "limit": limit, "any": match_any})
+
+    def pages(self, doc: str, pages: List[int], context: int = 0) -> dict:
+        return self.request({"op": "pages", "doc": doc, "pages": pages, "context": context})
+
+
+def check(response: dict) -> dict:
+    """Exit with the error message if the request failed."""
+    if "error" in response:
+        sys.exit(f"Error: {response['error']}")
+    return response
+
+
+# ---- Shared front end for the per-location search_indexes.py scripts -------
+
+MAX_RESULTS = 20  # Default cap; use --max to override
+
+
+def available_keywords(keyword_dir: Optional[Path]) -> list:
+    """Sorted keyword names (without .txt) of a pdfindexer keyword index."""
+    if keyword_dir is None or not Path(keyword_dir).is_dir():
+        return []
+    return sorted(f.stem for f in Path(keyword_dir).glob("*.txt"))
+
+
+def parse_keyword_file(path: Path):
+    """Parse a pdfindexer keyword file into (keyword, occurrences, [(page, line), ...])."""
+    keyword, count, entries = "", 0, []
+    with open(path) as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if line.startswith("Keyword: "):
+                keyword = line[len("Keyword: "):]
+            elif line.startswith("Occurrences: "):
+                count = int(line[len("Occurrences: "):])
+            else:
+                m = re.match(r"Page\s+(\d+):\s*(.*)", line)
+                if m:
+                    entries.append((int(m.group(1)), m.group(2)))
+    return keyword, count, entries
+
+
+def find_keyword_file(keyword_dir: Optional[Path], keyword: str) -> Optional[Path]:
+    """The keyword file for keyword (exact name first, then case-insensitive), or None."""
+    if keyword_dir is None or not Path(keyword_dir).is_dir():
+        return None
+    exact = Path(keyword_dir) / f"{keyword}.txt"
+    if exact.is_file():
+        return exact
+    kw_lower = keyword.lower()
+    for candidate in sorted(Path(keyword_dir).glob("*.txt")):
+        if candidate.stem.lower() == kw_lower:
+            return candidate
+    return None
+
+
+def rg_fallback(keyword: str, search_dir: Path, exclude: tuple = ()) -> bool:
+    """Fall back to rg -i over the text files next to the PDFs."""
+    cmd = ["rg", "-i", "--glob", "!*.pdf", "--glob", "!*.pdf.txt"]
+    for pattern in exclude:
+        cmd += ["--glob", f"!{pattern}"]
+    try:
+        result = subprocess.run(cmd + ["-n", keyword, str(search_dir)], capture_output=True, text=True)
+    except FileNotFoundError:
+        return False
+    if not result.stdout.strip():
+        return False
+    lines = result.stdout.strip().split("\n")
+    print(f"\n--- rg fallback: {len(lines)} match(es) for '{keyword}' ---")
+    for line in lines[:50]:
+        print(f"  {line}")
+    if len(lines) > 50:
+        print(f"  ... ({len(lines) - 50} more matches)")
+    return True
+
+
+def print_pages(response: dict):
+    for r in response["ranges"]:
+        print(f"--- Pages {r['first']}–{r['last']} ---\n{r['text']}")
+
+
+def search_indexes(client: SearchClient, keyword: str, indexes: dict, names: list,
+                   extract: bool = True, context: int = 0, max_results: int = MAX_RESULTS,
+                   match_any: bool = False) -> bool:
+    """
+    Ranked search over the given indexes: one block per index (best index
+    first) with its top pages, then the text of those pages.
+    """
+    def has_text(name):
+        pdf = Path(indexes[name]["pdf"])
+        return text_cache_path(pdf).exists()
+
+    grouped: Dict[str, list] = {}
+    searchable = [name for name in names if Path(indexes[name]["pdf"]).exists() or has_text(name)]
+    if searchable:
+        by_pdf = {str(Path(indexes[name]["pdf"]).resolve()): name for name in searchable}
+        result = check(client.search(keyword, list(by_pdf), limit=0, match_any=match_any))
+        for hit in result["hits"]:
+            grouped.setdefault(by_pdf.get(hit["pdf"], hit["doc"]), []).append(hit)
+
+    # Documents still without a text cache (PDF missing, or text extraction
+    # failed) are searched in their keyword files instead
+    found_any = search_keyword_files(keyword, indexes,
+                                     [name for name in names if not has_text(name)], max_results)
+
+    for name, hits in grouped.items():
+        info = indexes.get(name, {})
+        pdf = Path(hits[0]["pdf"])
+        truncated = len(hits) > max_results
+        print(f"\n{'=' * 70}")
+        print(f"  {name} — {info.get('description', '')}")
+        print(f"  Query: {keyword}  |  {len(hits)} matching pages  |  PDF: {pdf.name}")
+        if truncated:
+            print(f"  ⚠  Too many results ({len(hits)} pages) — showing best {max_results}.")
+            print(f"     Use --max N to raise the limit, or a more specific keyword.")
+        print('=' * 70)
+
+        shown = hits[:max_results]
+        for hit in shown:
+            (first_line, first_text), *more = hit["lines"]
+            print(f"  Page {hit['page']:4d} ({hit['score']:5.2f}): {first_text}")
+            for _, text in more[:2]:
+                print(f"       {'':7}   {text}")
+            if hit["matched_lines"] > 3:
+                print(f"       {'':7}   (+{hit['matched_lines'] - 3} more lines)")
+
+        if extract and not truncated:
+            pages = sorted(h["page"] for h in shown)
+            print(f"\n  --- Page text for {len(pages)} page(s) ---\n")
+            print_pages(check(client.pages(hits[0]["pdf"], pages, context)))
+        elif extract:
+            print(f"\n  (Page text skipped — refine your keyword or use --max)\n")
+
+    return found_any or bool(grouped)
+
+
+def search_keyword_files(keyword: str, indexes: dict, names: list,
+                         max_results: int = MAX_RESULTS) -> bool:
+    """
+    Page listing from the pre-built keyword files of the given indexes, for
+    documents without a text cache (no page text to show).
+    """
+    found_any = False
+    for name in names:
+        path = find_keyword_file(indexes[name].get("keywords"), keyword)
+        if path is None:
+            continue
+        found_any = True
+        kw, count, entries = parse_keyword_file(path)
+        print(f"\n{'=' * 70}")
+        print(f"  {name} — {indexes[name]['description']}")
+        print(f"  Keyword: {kw}  |  {count} occurrences  |  no page text, keyword index only")
+        if len(entries) > max_results:
+            print(f"  ⚠  Too many results ({len(entries)}) — showing first {max_results}.")
+            print(f"     Use --max N to raise the limit, or a more specific keyword.")
+        print('=' * 70)
+        for page, text in entries[:max_results]:
+            print(f"  Page {page:4d}: {text}")
+    return found_any
+
+
+def list_keywords(indexes: dict, names: list):
+    """Print the pre-built keyword lists for the given indexes."""
+    for name in names:
+        kws = available_keywords(indexes[name].get("keywords"))
+        print(f"\n{name} — {indexes[name]['description']}  ({len(kws)} keywords)")
+        print("-" * 60)
+        for kw in kws:
+            print(f"  {kw}")
+
+
+def match_keywords(substring: str, indexes: dict, names: list):
+    """Find keywords whose name contains the given substring (case-insensitive)."""
+    sub = substring.lower()
+    found_any = False
+    for name in names:
+        kws = [k for k in available_keywords(indexes[name].get("keywords")) if sub in k.lower()]
+        if not kws:
+            continue
+        found_any = True
+        print(f"\n{name} — {indexes[name]['description']}")
+        print("-" * 60)
+        for kw in kws:
+            print(f"  {kw}")
+
+    if not found_any:
+        print(f"No keywords matching '{substring}' found.", file=sys.stderr)
+        sys.exit(1)
+
+
+def run_index_cli(indexes: dict, description: str, doc: str = None, base: Path = None,
+                  extra_search: Optional[Callable[[str], bool]] = None, rg_exclude: tuple = ()):
+    """
+    Command line of a per-location search_indexes.py.
+
+    indexes maps an index name to {"description", "pdf", "keywords"} with
+    absolute paths ("keywords" is the pdfindexer keyword directory, used by
+    --list/--match, and searched for documents without PDF text).
+    extra_search(keyword) runs before the document search and returns True
+    if it printed anything.
+    """
+    # Gracefully handle broken pipe (e.g. when piped to head)
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+    parser = argparse.ArgumentParser(
+        description=description,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=doc,
+    )
+    parser.add_argument("keyword", nargs="?", help="Term, phrase (quoted) or prefix* to search for")
+    parser.add_argument("--index", "-i", choices=list(indexes.keys()),
+                        help="Search only this index (default: all)")
+    parser.add_argument("--no-extract", "-n", action="store_true",
+                        help="Skip page text — show only the ranked page listing")
+    parser.add_argument("--context", "-C", type=int, default=0,
+                        help="Extra context pages to show around each match (default: 0)")
+    parser.add_argument("--any", action="store_true",
+                        help="Match pages containing any of the words (default: all)")
+    parser.add_argument("--list", "-l", action="store_true",
+                        help="List the pre-built keywords instead of searching")
+    parser.add_argument("--match", "-m", metavar="SUBSTR",
+                        help="Find keywords whose name contains SUBSTR (case-insensitive)")
+    parser.add_argument("--max", type=int, default=MAX_RESULTS,
+                        help=f"Max pages to show per index (default: {MAX_RESULTS}). "
+                             "Page text is skipped when this limit is hit.")
+    args = parser.parse_args()
+    names = [args.index] if args.index else list(indexes.keys())
+
+    if args.list:
+        list_keywords(indexes, names)
+    elif args.match:
+        match_keywords(args.match, indexes, names)
+    elif args.keyword:
+        found_any = extra_search(args.keyword) if extra_search else False
+        client = SearchClient()
+        found_any |= search_indexes(client, args.keyword, indexes, names,
+                                    extract=not args.no_extract, context=args.context,
+                                    max_results=args.max, match_any=args.any)
+        client.close()
+        if not found_any and not (base and rg_fallback(args.keyword, base, rg_exclude)):
+            print(f"'{args.keyword}' not found in any document or text file.", file=sys.stderr)
+            print("Use --match to fuzzy-search keyword names, or --list to browse.", file=sys.stderr)
+            sys.exit(1)
+    else:
+        parser.print_help()
+
+
+# ---- CLI -------------------------------------------------------------------
+
+def main():
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+    parser = argparse.ArgumentParser(
+        description="Ranked search across all indexed PDFs under claude/developer/docs",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__,
+    )
+    parser.add_argument("--socket", type=Path, default=None,
+                        help=f"Server socket (default: {default_socket_path()}, or $DOCSEARCH_SOCKET)")
+    parser.add_argument("--local", action="store_true", help="Don't use a running server")
+    parser.add_argument("--root", type=Path, default=DOCS_ROOT, help="Documents directory")
+    subparsers = parser.add_subparsers(dest="command")
+
+    search_parser = subparsers.add_parser("search", help="Ranked search")
+    search_parser.add_argument("query")
+    search_parser.add_argument("--doc", "-d", action="append",
+                               help="Restrict to documents whose name/path contains this (repeatable)")
+    search_parser.add_argument("--limit", "-n", type=int, default=20, help="Hits to show (default: 20)")
+    search_parser.add_argument("--any", action="store_true", help="Pages with any term (default: all terms)")
+    search_parser.add_argument("--pages", "-p", action="store_true", help="Also print the text of the hit pages")
+    search_parser.add_argument("--json", action="store_true", help="Print the raw JSON response")
+
+    pages_parser = subparsers.add_parser("pages", help="Print pages of one document")
+    pages_parser.add_argument("doc", help="Document name/path (substring) or PDF path")
+    pages_parser.add_argument("page", type=int, nargs="+")
+    pages_parser.add_argument("--context", "-C", type=int, default=0)
+
+    list_parser = subparsers.add_parser("list", help="List documents")
+    list_parser.add_argument("--doc", "-d", action="append")
+
+    build_parser = subparsers.add_parser("build", help="Extract and index documents now")
+    build_parser.add_argument("--doc", "-d", action="append")
+
+    serve_parser = subparsers.add_parser("serve", help="Run the warm search server")
+    serve_parser.add_argument("--stdio", action="store_true", help="JSON lines on stdin/stdout instead of a socket")
+    serve_parser.add_argument("--lazy", action="store_true", help="Load documents on first query, not at startup")
+
+    args = parser.parse_args()
+    engine_factory = lambda: SearchEngine(args.root)  # noqa: E731
+
+    if args.command == "serve":
+        if args.stdio:
+            serve_stdio(engine_factory())
+        else:
+            try:
+                serve(engine_factory(), args.socket or default_socket_path(), preload=not args.lazy)
+            except RuntimeError as e:
+                sys.exit(f"Error: {e}")
+        return
+
+    client = SearchClient(args.socket, use_server=not args.local, engine_factory=engine_factory)
+
+    if args.command == "search":
+        result = check(client.search(args.query, args.doc, args.limit, args.any))
+        if args.json:
+            print(json.dumps(result, indent=2))
+            return
+        source = "server" if client.remote else "local"
+        print(f"{result['total']} matching pages in {result['documents']} documents "
+              f"({result['elapsed_ms']:.1f} ms, {source})\n")
+        for hit in result["hits"]:
+            print(f"{hit['score']:6.2f}  {hit['doc']}  p.{hit['page']}")
+            for line, text in hit["lines"][:3]:
+                print(f"          {line:4d}: {text}")
+        if args.pages:
+            for hit in result["hits"]:
+                print(f"\n{'=' * 70}\n  {hit['doc']} page {hit['page']}\n{'=' * 70}")
+                print_pages(check(client.pages(hit["pdf"], [hit["page"]])))
+
+    elif args.command == "pages":
+        print_pages(check(client.pages(args.doc, args.page, args.context)))
+
+    elif args.command == "list":
+        for d in check(client.request({"op": "documents", "docs": args.doc}))["documents"]:
+            pages = f"{d['pages']:5d} pages" if d["pages"] else "  (not loaded)"
+            print(f"{pages}  {d['name']}")
+
+    elif args.command == "build":
+        result = check(client.request({"op": "build", "docs": args.doc}))
+        print(f"Indexed {len(result['indexed'])} documents")
+        for name in result["skipped"]:
+            print(f"  skipped: {name}")
+
+    else:
+        parser.print_help()
+    client.close()
+
+
+if __name__ == "__main__":
+    main()
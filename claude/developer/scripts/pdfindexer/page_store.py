@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+Per-PDF page store: text extracted once, any page range as one mmap slice
+
+pdftotext runs once per PDF and its -layout output is cached as
+<pdf>.txt (pages separated by form feeds). A page offset table,
+<pdf>.pages, records where each page starts, so reading pages N..M is a
+single slice of the memory-mapped text file instead of a pdftotext run
+per range. The table is rebuilt (one pass over the text) whenever the
+text cache changes.
+
+Large PDFs are extracted in page chunks (pdfinfo for the page count,
+then one `pdftotext -f -l` per chunk, `jobs` at a time); the chunks are
+concatenated in order, which gives the same text as a single run.
+map_page_chunks() runs a function over page chunks of the cache in a
+process pool for the index builders (pdf_text_index.py, search_pdf.py).
+
+<pdf>.pages layout (little-endian):
+    header  8s magic b"PDFPAGE1", u64 text size, u64 text mtime_ns, u64 page count
+    body    (page count + 1) x u64 byte offsets; page n (1-based) is
+            text[offsets[n-1]:offsets[n] - 1] (the -1 drops its form feed)
+
+Usage:
+    from page_store import PageStore
+
+    store = PageStore("STM32Ref.pdf").ensure()
+    print(store.page_count)
+    print(store.pages(512, 514))     # like `pdftotext -layout -f 512 -l 514`
+
+    # [func(pdf, first, last) for each chunk], computed by worker processes
+    results = map_page_chunks("STM32Ref.pdf", func, jobs=8)
+"""
+
+import mmap
+import os
+import re
+import struct
+import subprocess
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Iterator, List, Optional
+
+PAGE_SEP = "\x0c"  # form-feed character pdftotext uses between pages
+
+OFFSETS_MAGIC = b"PDFPAGE1"
+OFFSETS_HEADER = struct.Struct("<8sQQQ")
+
+# Pages per extraction / processing chunk; smaller documents use one chunk
+CHUNK_PAGES = 100
+
+PDFTOTEXT = ["pdftotext", "-layout", "-enc", "UTF-8", "-eol", "unix"]
+
+
+def text_cache_path(pdf_path: Path) -> Path:
+    pdf_path = Path(pdf_path)
+    return pdf_path.with_suffix(pdf_path.suffix + ".txt")
+
+
+def offsets_path(pdf_path: Path) -> Path:
+    pdf_path = Path(pdf_path)
+    return pdf_path.with_suffix(pdf_path.suffix + ".pages")
+
+
+def default_jobs() -> int:
+    return os.cpu_count() or 1
+
+
+def page_chunks(count: int, chunk_pages: int = CHUNK_PAGES) -> List[tuple]:
+    """(first, last) page ranges covering 1..count"""
+    return [(first, min(count, first + chunk_pages - 1)) for first in range(1, count + 1, chunk_pages)]
+
+
+def pdf_page_count(pdf_path: Path) -> Optional[int]:
+    """Page count from pdfinfo, or None if it is unavailable"""
+    try:
+        result = subprocess.run(["pdfinfo", str(pdf_path)], capture_output=True)
+    except FileNotFoundError:
+        return None
+    m = re.search(rb"^Pages:\s+(\d+)", result.stdout, re.MULTILINE)
+    return int(m.group(1)) if result.returncode == 0 and m else None
+
+
+def _run_pdftotext(pdf_path: Path, first: Optional[int] = None, last: Optional[int] = None) -> bytes:
+    cmd = list(PDFTOTEXT)
+    if first is not None:
+        cmd += ["-f", str(first), "-l", str(last)]
+    result = subprocess.run(cmd + [str(pdf_path), "-"], capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"pdftotext failed: {result.stderr.decode(errors='replace')}")
+    return result.stdout
+
+
+def _extract_chunked(pdf_path: Path, jobs: int) -> bytes:
+    count = pdf_page_count(pdf_path) if jobs > 1 else None
+    if count is None or count <= CHUNK_PAGES:
+        return _run_pdftotext(pdf_path)
+    chunks = page_chunks(count)
+    print(f"  {count} pages in {len(chunks)} chunks, {jobs} at a time", file=sys.stderr)
+    # Each pdftotext is its own process; threads only wait on them
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        return b"".join(pool.map(lambda chunk: _run_pdftotext(pdf_path, *chunk), chunks))
+
+
+def extract_text(pdf_path: Path, force: bool = False, jobs: Optional[int] = None) -> Path:
+    """
+    Make sure <pdf>.txt holds the full -layout text of the PDF and return
+    its path. An up-to-date cache is reused; an existing cache is also
+    used when pdftotext is not installed or the PDF itself is absent.
+    """
+    pdf_path = Path(pdf_path)
+    out = text_cache_path(pdf_path)
+    if out.exists() and (not pdf_path.exists() or
+                         (not force and out.stat().st_mtime >= pdf_path.stat().st_mtime)):
+        return out
+
+    print(f"Extracting text from {pdf_path.name} ...", file=sys.stderr)
+    try:
+        text = _extract_chunked(pdf_path, jobs or default_jobs())
+    except FileNotFoundError:
+        if out.exists():
+            print(f"pdftotext not found, using existing {out.name}", file=sys.stderr)
+            return out
+        raise RuntimeError("pdftotext not found (install poppler-utils)")
+
+    tmp = out.with_name(out.name + ".tmp")
+    tmp.write_bytes(text)
+    tmp.replace(out)
+    print(f"Cached to {out.name}", file=sys.stderr)
+    return out
+
+
+def page_offsets(data) -> array:
+    """Start offset of every page plus an end sentinel; a trailing empty page is dropped."""
+    offsets = array("Q", [0])
+    sep = PAGE_SEP.encode()
+    pos = data.find(sep)
+    while pos >= 0:
+        offsets.append(pos + 1)
+        pos = data.find(sep, pos + 1)
+    if offsets[-1] < len(data):
+        offsets.append(len(data) + 1)     # last page has no form feed after it
+    return offsets
+
+
+class PageStore:
+    """Memory-mapped page access to one PDF's text cache (see module docstring)."""
+
+    def __init__(self, pdf_file):
+        self.pdf_file = Path(pdf_file)
+        self.text_file = text_cache_path(self.pdf_file)
+        self.offsets_file = offsets_path(self.pdf_file)
+        self._file = None
+        self._map = None
+        self._offsets: Optional[array] = None
+        self._stamp = None
+
+    def source_stamp(self) -> str:
+        """Identifies the current text cache; derived indexes store it to detect changes"""
+        return "{}:{}".format(*self._text_stamp())
+
+    def _text_stamp(self) -> tuple:
+        st = self.text_file.stat()
+        return st.st_size, st.st_mtime_ns
+
+    def _load_offsets(self, stamp: tuple) -> Optional[array]:
+        try:
+            with open(self.offsets_file, "rb") as f:
+                magic, size, mtime_ns, count = OFFSETS_HEADER.unpack(f.read(OFFSETS_HEADER.size))
+                if magic != OFFSETS_MAGIC or (size, mtime_ns) != stamp:
+                    return None
+                offsets = array("Q")
+                offsets.frombytes(f.read())
+        except (OSError, struct.error, ValueError):
+            return None
+        if sys.byteorder != "little":
+            offsets.byteswap()
+        return offsets if len(offsets) == count + 1 else None
+
+    def _save_offsets(self, stamp: tuple, offsets: array):
+        body = array("Q", offsets)
+        if sys.byteorder != "little":
+            body.byteswap()
+        tmp = self.offsets_file.with_name(self.offsets_file.name + ".tmp")
+        with open(tmp, "wb") as f:
+            f.write(OFFSETS_HEADER.pack(OFFSETS_MAGIC, stamp[0], stamp[1], len(offsets) - 1))
+            f.write(body.tobytes())
+        tmp.replace(self.offsets_file)
+
+    def ensure(self, force: bool = False, jobs: Optional[int] = None) -> "PageStore":
+        """Extract the text if needed, then map it and load (or rebuild) the offset table."""
+        extract_text(self.pdf_file, force=force, jobs=jobs)
+        stamp = self._text_stamp()
+        if self._map is not None and stamp == self._stamp and not force:
+            return self
+        self.close()
+
+        self._file = open(self.text_file, "rb")
+        # mmap cannot map an empty file; an empty bytes object behaves the same for slicing
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if stamp[0] else b""
+        offsets = None if force else self._load_offsets(stamp)
+        if offsets is None:
+            offsets = page_offsets(self._map)
+            self._save_offsets(stamp, offsets)
+        self._offsets = offsets
+        self._stamp = stamp
+        return self
+
+    def is_stale(self) -> bool:
+        """True if the text cache changed since ensure() (e.g. it was re-extracted)."""
+        try:
+            return self._stamp is None or self._text_stamp() != self._stamp
+        except FileNotFoundError:
+            return True
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._file = self._map = self._offsets = self._stamp = None
+
+    @property
+    def page_count(self) -> int:
+        if self._offsets is None:
+            self.ensure()
+        return len(self._offsets) - 1
+
+    def _span(self, first: int, last: int) -> tuple:
+        count = self.page_count
+        first = max(1, first)
+        last = min(count, last)
+        if first > last:
+            return 0, 0
+        return self._offsets[first - 1], self._offsets[last]
+
+    def page_bytes(self, first: int, last: Optional[int] = None) -> bytes:
+        """Raw bytes of pages first..last, each followed by its form feed"""
+        start, end = self._span(first, first if last is None else last)
+        end = min(end, len(self._map))
+        data = self._map[start:end]
+        if end > start and not data.endswith(PAGE_SEP.encode()):
+            data += PAGE_SEP.encode()
+        return data
+
+    def pages(self, first: int, last: Optional[int] = None) -> str:
+        """Pages first..last like `pdftotext -layout -f first -l last` prints them"""
+        return self.page_bytes(first, last).decode("utf-8", errors="replace")
+
+    def page(self, number: int) -> str:
+        """Text of one page without its form feed"""
+        start, end = self._span(number, number)
+        if start == end:
+            return ""
+        return self._map[start:end - 1].decode("utf-8", errors="replace")
+
+    def page_lines(self, number: int) -> List[str]:
+        return self.page(number).splitlines()
+
+    def iter_pages(self, first: int = 1, last: Optional[int] = None) -> Iterator[tuple]:
+        """(page number, text) for every page, or for pages first..last"""
+        last = self.page_count if last is None else min(last, self.page_count)
+        for number in range(max(1, first), last + 1):
+            yield number, self.page(number)
+
+
+def map_page_chunks(pdf_file, func: Callable, jobs: Optional[int] = None,
+                    chunk_pages: int = CHUNK_PAGES) -> list:
+    """
+    [func(pdf_file, first, last) for each page chunk], in page order.
+
+    func must be a module-level function (it is pickled to the workers);
+    each worker opens its own PageStore on the shared text cache. With
+    jobs=1 or a single chunk, func runs once in this process over all pages.
+    """
+    store = PageStore(pdf_file).ensure(jobs=jobs)
+    count = store.page_count
+    store.close()
+    jobs = jobs or default_jobs()
+    chunks = page_chunks(count, chunk_pages)
+    if jobs <= 1 or len(chunks) <= 1:
+        return [func(pdf_file, 1, count)]
+    with ProcessPoolExecutor(max_workers=min(jobs, len(chunks))) as pool:
+        return list(pool.map(func, [pdf_file] * len(chunks), *zip(*chunks)))
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Persistent inverted index over the text of a PDF
+
+The text comes from the PDF's page store (page_store.py: pdftotext once,
+cached as <pdf>.txt with a page offset table), and every
+non-blank line is stored in a SQLite FTS5 table with its page and line
+number, plus a token count per page for ranking (docsearch.py). FTS5 keeps token -> (row, position) postings on disk, so term,
+phrase and prefix lookups are a B-tree probe instead of a pdfgrep run
+over the whole PDF.
+
+The index lives next to the PDF as <pdf>.fts.sqlite and is rebuilt
+automatically when the text cache changes (e.g. after the PDF is
+replaced and re-extracted). For large documents the lines and page
+token counts are prepared per page chunk in a process pool
+(page_store.map_page_chunks) and inserted in page order; SQLite itself
+is written by one process.
+
+Query syntax (search()):
+    DMA                 token (case-insensitive)
+    DMA channel         phrase: the tokens adjacent, in order, on one line
+    DMA_SxCR            same as the phrase "DMA SxCR" (punctuation splits tokens)
+    TIM*                prefix: TIM, TIM1, TIMx_CCR1, ...
+    raw=True            the query is passed to FTS5 as is
+                        (AND / OR / NOT / NEAR(...) / column filters)
+
+Usage:
+    from pdf_text_index import PDFTextIndex
+
+    index = PDFTextIndex("STM32Ref.pdf")
+    for page, line, text in index.search("DMA stream"):
+        print(page, line, text)
+"""
+
+import re
+import sqlite3
+import sys
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from page_store import PageStore, map_page_chunks, text_cache_path
+
+# Bump when the table layout or tokenizer changes; older files are rebuilt
+SCHEMA_VERSION = 2
+
+# unicode61 splits on anything that is not a letter or digit, like the
+# query tokenizer below. prefix= keeps extra postings for 2/3-character
+# prefixes so short prefix queries (TIM*, DMA*) stay index lookups.
+FTS_TABLE = (
+    "CREATE VIRTUAL TABLE lines USING fts5("
+    "text, page UNINDEXED, line UNINDEXED, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def index_db_path(pdf_path: Path) -> Path:
+    return pdf_path.with_suffix(pdf_path.suffix + ".fts.sqlite")
+
+
+def fts_query(query: str, prefix: bool = False) -> str:
+    """
+    Turn a plain search string into an FTS5 phrase query. A trailing '*'
+    (or prefix=True) makes the last token a prefix match.
+    """
+    query = query.strip()
+    if query.endswith("*"):
+        prefix = True
+        query = query.rstrip("*")
+    tokens = TOKEN_RE.findall(query)
+    if not tokens:
+        raise ValueError(f"no searchable tokens in {query!r}")
+    return '"' + " ".join(tokens) + '"' + ("*" if prefix else "")
+
+
+def _chunk_rows(pdf_file: Path, first: int, last: int) -> Tuple[list, list]:
+    """
+    Rows for pages first..last: (text, page, line) for every non-blank
+    line (1-based numbering) and (page, token count) for every page.
+    """
+    store = PageStore(pdf_file).ensure()
+    rows = []
+    tokens = []
+    try:
+        for page_num, page in store.iter_pages(first, last):
+            count = 0
+            for line_num, line in enumerate(page.splitlines(), 1):
+                text = line.strip()
+                if text:
+                    rows.append((text, page_num, line_num))
+                    count += len(TOKEN_RE.findall(text))
+            tokens.append((page_num, count))
+    finally:
+        store.close()
+    return rows, tokens
+
+
+class PDFTextIndex:
+    """FTS5 line index for one PDF (see module docstring)."""
+
+    def __init__(self, pdf_file, db_file: Optional[Path] = None):
+        self.pdf_file = Path(pdf_file)
+        self.db_file = Path(db_file) if db_file else index_db_path(self.pdf_file)
+        self._db: Optional[sqlite3.Connection] = None
+
+    # ---- Build --------------------------------------------------------------
+
+    def _source_stamp(self, text_file: Path) -> str:
+        st = text_file.stat()
+        return f"{SCHEMA_VERSION}:{st.st_size}:{st.st_mtime_ns}"
+
+    def _stored_stamp(self) -> Optional[str]:
+        if not self.db_file.exists():
+            return None
+        try:
+            db = sqlite3.connect(f"file:{self.db_file}?mode=ro", uri=True)
+            try:
+                row = db.execute("SELECT value FROM meta WHERE key = 'source'").fetchone()
+            finally:
+                db.close()
+        except sqlite3.Error:
+            return None
+        return row[0] if row else None
+
+    def is_current(self) -> bool:
+        text_file = text_cache_path(self.pdf_file)
+        if not text_file.exists():
+            return False
+        if self.pdf_file.exists() and text_file.stat().st_mtime < self.pdf_file.stat().st_mtime:
+            return False
+        return self._stored_stamp() == self._source_stamp(text_file)
+
+    def build(self, force: bool = False, jobs: Optional[int] = None) -> int:
+        """
+        (Re)build the index from the text cache; returns the number of
+        lines indexed. jobs limits the worker processes (default: CPU count).
+        """
+        store = PageStore(self.pdf_file).ensure(force=force, jobs=jobs)
+        text_file = store.text_file
+        store.close()
+        chunks = map_page_chunks(self.pdf_file, _chunk_rows, jobs=jobs)
+
+        self.close()
+        tmp = self.db_file.with_name(self.db_file.name + ".tmp")
+        tmp.unlink(missing_ok=True)
+        db = sqlite3.connect(tmp)
+        try:
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("PRAGMA synchronous = OFF")
+            db.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+            db.execute(FTS_TABLE)
+            db.execute("CREATE TABLE pages (page INTEGER PRIMARY KEY, tokens INTEGER)")
+            # Rows go in document order, so rowid order is (page, line) order
+            page_count = 0
+            for rows, tokens in chunks:
+                db.executemany("INSERT INTO lines (text, page, line) VALUES (?, ?, ?)", rows)
+                db.executemany("INSERT INTO pages VALUES (?, ?)", tokens)
+                page_count += len(tokens)
+            count = db.execute("SELECT count(*) FROM lines").fetchone()[0]
+            db.execute("INSERT INTO lines (lines) VALUES ('optimize')")
+            db.executemany("INSERT INTO meta VALUES (?, ?)", [
+                ("source", self._source_stamp(text_file)),
+                ("pdf", self.pdf_file.name),
+                ("pages", str(page_count)),
+                ("lines", str(count)),
+            ])
+            db.commit()
+        finally:
+            db.close()
+        tmp.replace(self.db_file)
+        return count
+
+    def ensure(self, jobs: Optional[int] = None) -> "PDFTextIndex":
+        """Build the index if it is missing or older than the text cache."""
+        if not self.is_current():
+            count = self.build(jobs=jobs)
+            print(f"Indexed {count} lines of {self.pdf_file.name} -> {self.db_file.name}",
+                  file=sys.stderr)
+        return self
+
+    # ---- Query --------------------------------------------------------------
+
+    @property
+    def db(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.ensure()
+            # Read-only; callers sharing it across threads serialize access themselves
+            self._db = sqlite3.connect(f"file:{self.db_file}?mode=ro", uri=True, check_same_thread=False)
+        return self._db
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def meta(self) -> dict:
+        return dict(self.db.execute("SELECT key, value FROM meta"))
+
+    def search(self, query: str, case_sensitive: bool = False, raw: bool = False,
+               limit: Optional[int] = None, prefix: bool = False) -> List[Tuple[int, int, str]]:
+        """
+        (page, line, text) for every line matching query, in document order.
+
+        FTS5 matching is case-insensitive; with case_sensitive the lines are
+        filtered afterwards for the query text (ignored for raw queries).
+        prefix makes the last token a prefix match, as a trailing '*' does.
+        """
+        match = query if raw else fts_query(query, prefix)
+        sql = "SELECT page, line, text FROM lines WHERE lines MATCH ? ORDER BY rowid"
+        params = [match]
+        if limit is not None and not (case_sensitive and not raw):
+            sql += " LIMIT ?"
+            params.append(limit)
+        rows = self.db.execute(sql, params).fetchall()
+
+        if case_sensitive and not raw:
+            needle = query.strip().rstrip("*")
+            rows = [row for row in rows if needle in row[2]]
+            if limit is not None:
+                rows = rows[:limit]
+        return rows
+
+    def page_tokens(self) -> List[int]:
+        """Token count of every page; index 0 is page 1."""
+        return [row[0] for row in self.db.execute("SELECT tokens FROM pages ORDER BY page")]
+
+    def count(self, query: str, raw: bool = False) -> int:
+        match = query if raw else fts_query(query)
+        return self.db.execute("SELECT count(*) FROM lines WHERE lines MATCH ?", (match,)).fetchone()[0]
+
+    def pages(self, query: str, raw: bool = False) -> List[int]:
+        """Distinct pages with at least one matching line."""
+        match = query if raw else fts_query(query)
+        return [row[0] for row in self.db.execute(
+            "SELECT DISTINCT page FROM lines WHERE lines MATCH ? ORDER BY page", (match,))]
@@ -9,8 +9,15 @@ Usage:
     # Using a config file
     ./pdfindexer.py --config mybook.yaml build-index
 
-    # Search for a term
+    # Search for a term (phrase, or prefix with a trailing *)
     ./pdfindexer.py --pdf document.pdf search "keyword"
+    ./pdfindexer.py --pdf document.pdf search "TIM*"
+
+    # FTS5 query syntax (AND / OR / NOT / NEAR)
+    ./pdfindexer.py --pdf document.pdf search --fts 'DMA AND (stream OR channel)'
+
+    # Build the full-text index only (also done on first search)
+    ./pdfindexer.py --pdf document.pdf build-text-index
 
     # Extract pages to text
     ./pdfindexer.py --pdf document.pdf extract 100 150 --output extracted.txt
@@ -18,6 +25,11 @@ Usage:
     # Find all occurrences with context
     ./pdfindexer.py --pdf document.pdf find "term" --context 2
 
+Searches use a persistent full-text index (pdf_text_index.py):
+the PDF text is extracted once with pdftotext into <pdf>.txt and
+indexed into <pdf>.fts.sqlite, so lookups need no subprocess. Page
+text (extract, find) is sliced from the same cache (page_store.py).
+
 Config file format (YAML):
     pdf_file: path/to/document.pdf
     index_dir: search-index
@@ -28,12 +40,23 @@ Config file format (YAML):
 """
 
 import argparse
+import json
+import sqlite3
 import subprocess
 import sys
-import yaml
+import time
 from pathlib import Path
 from typing import List, Tuple, Optional
 
+from page_store import PageStore
+from pdf_text_index import PDFTextIndex
+
+
+# Written to the keyword index directory: which text index and keywords it was built from
+INDEX_STATE_FILE = ".index-state.json"
+# How keyword files match; files built with other semantics are rewritten
+KEYWORD_MATCH = "prefix"
+
 
 class PDFIndexer:
     """Generic PDF indexer that can work with any PDF document."""
@@ -54,6 +77,9 @@ class PDFIndexer:
         if not self.pdf_file.exists():
             raise FileNotFoundError(f"PDF not found at {self.pdf_file}")
 
+        self.text_index = PDFTextIndex(self.pdf_file)
+        self.page_store = PageStore(self.pdf_file)
+
     @classmethod
     def from_config(cls, config_file: Path):
         """
@@ -65,6 +91,8 @@ class PDFIndexer:
         Returns:
             PDFIndexer instance
         """
+        import yaml     # only needed for config files
+
         with open(config_file, 'r') as f:
             config = yaml.safe_load(f)
 
@@ -81,45 +109,43 @@ class PDFIndexer:
 
     def extract_pages(self, start: int, end: int, output_file: Optional[str] = None,
                      layout: bool = True) -> Optional[str]:
-        """Extract text from specific page range using pdftotext."""
-        cmd = ["pdftotext"]
+        """
+        Text of a page range. Layout text is sliced from the page store;
+        layout=False runs pdftotext without -layout for the range.
+        """
         if layout:
-            cmd.append("-layout")
-        cmd.extend(["-f", str(start), "-l", str(end), str(self.pdf_file)])
+            text = self.page_store.ensure().pages(start, end)
+        else:
+            cmd = ["pdftotext", "-f", str(start), "-l", str(end), str(self.pdf_file), "-"]
+            text = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
 
         if output_file:
-            cmd.append(output_file)
-            subprocess.run(cmd, check=True)
+            Path(output_file).write_text(text)
             print(f"Extracted pages {start}-{end} to {output_file}")
             return None
-        else:
-            cmd.append("-")
-            result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-            return result.stdout
-
-    def search_term(self, term: str, case_sensitive: bool = False) -> List[Tuple[int, str]]:
-        """Search for a term in the PDF and return (page_num, line) tuples."""
-        cmd = ["pdfgrep", "-n"]
-        if not case_sensitive:
-            cmd.append("-i")
-        cmd.extend([term, str(self.pdf_file)])
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
-
-        matches = []
-        for line in result.stdout.splitlines():
-            if ":" in line:
-                page_str, content = line.split(":", 1)
-                try:
-                    page_num = int(page_str)
-                    matches.append((page_num, content.strip()))
-                except ValueError:
-                    continue
-
-        return matches
-
-    def build_keyword_index(self, output_base: Optional[Path] = None):
-        """Build search index for all configured keywords."""
+        return text
+
+    def search_term(self, term: str, case_sensitive: bool = False,
+                    raw: bool = False, prefix: bool = False) -> List[Tuple[int, str]]:
+        """
+        Search for a term in the full-text index and return (page_num, line)
+        tuples. The term is matched as a phrase of whole tokens (trailing *
+        or prefix=True for a prefix); raw passes FTS5 query syntax through
+        unchanged.
+        """
+        rows = self.text_index.search(term, case_sensitive=case_sensitive, raw=raw, prefix=prefix)
+        return [(page, text) for page, _, text in rows]
+
+    def build_keyword_index(self, output_base: Optional[Path] = None, force: bool = False,
+                            jobs: Optional[int] = None):
+        """
+        Build search index for all configured keywords. Only keywords that
+        are new, or all of them if the PDF text changed, are rewritten;
+        files of keywords dropped from the config are removed.
+
+        Keywords are prefix queries, so "DMA" also finds DMA2 and "GPIO"
+        finds GPIOA, close to the substring matches of the old pdfgrep run.
+        """
         if not self.keywords:
             print("Error: No keywords configured. Use --keywords or a config file.", file=sys.stderr)
             sys.exit(1)
@@ -134,11 +160,32 @@ class PDFIndexer:
         print(f"PDF: {self.pdf_file}")
         print(f"Output: {output_path}\n")
 
+        # One text extraction and one index build; every keyword is then a lookup
+        started = time.perf_counter()
+        self.text_index.ensure(jobs=jobs)
+        source = self.text_index.meta()["source"]
+
+        state_file = output_path / INDEX_STATE_FILE
+        state = {}
+        if state_file.exists() and not force:
+            try:
+                state = json.loads(state_file.read_text())
+            except ValueError:
+                state = {}
+        built = state.get("keywords", {}) \
+            if state.get("source") == source and state.get("match") == KEYWORD_MATCH else {}
+        keywords = {}
+        skipped = 0
+
         for keyword in self.keywords:
             safe_name = keyword.replace(" ", "-").replace("/", "-")
             output_file = output_path / f"{safe_name}.txt"
+            keywords[keyword] = output_file.name
+            if built.get(keyword) == output_file.name and output_file.exists():
+                skipped += 1
+                continue
 
-            matches = self.search_term(keyword, case_sensitive=False)
+            matches = self.search_term(keyword, case_sensitive=False, prefix=True)
 
             with open(output_file, "w") as f:
                 f.write(f"Keyword: {keyword}\n")
@@ -150,7 +197,25 @@ class PDFIndexer:
 
             print(f"  {keyword:30s} - {len(matches):3d} occurrences -> {output_file.name}")
 
-        print(f"\nIndex built in {output_path}/")
+        # Drop files of keywords removed from the config (only ones this index wrote)
+        for keyword, name in state.get("keywords", {}).items():
+            if keyword not in keywords and name not in keywords.values():
+                (output_path / name).unlink(missing_ok=True)
+                print(f"  {keyword:30s} - removed {name}")
+
+        state_file.write_text(json.dumps({"source": source, "match": KEYWORD_MATCH,
+                                          "keywords": keywords}, indent=2))
+        if skipped:
+            print(f"\n{skipped} keyword(s) unchanged since the last build")
+        print(f"\nIndex built in {output_path}/ ({time.perf_counter() - started:.1f}s)")
+
+    def build_text_index(self, force: bool = False, jobs: Optional[int] = None):
+        """Extract the PDF text and (re)build the full-text index."""
+        started = time.perf_counter()
+        count = self.text_index.build(force=force, jobs=jobs)
+        meta = self.text_index.meta()
+        print(f"Indexed {count} lines on {meta['pages']} pages -> {self.text_index.db_file} "
+              f"({time.perf_counter() - started:.1f}s)")
 
     def find_with_context(self, term: str, context_lines: int = 2, max_pages: int = 5):
         """Find term and show surrounding context by extracting relevant pages."""
@@ -162,7 +227,7 @@ class PDFIndexer:
 
         print(f"Found {len(matches)} occurrences of '{term}':\n")
 
-        # Group matches by page to avoid redundant extractions
+        # Group matches by page; each page range is one slice of the page store
         pages_with_matches = set(page for page, _ in matches)
 
         for page in sorted(pages_with_matches)[:max_pages]:
@@ -177,9 +242,8 @@ class PDFIndexer:
             text = self.extract_pages(start_page, end_page, output_file=None, layout=True)
             print(text)
 
-            if len(pages_with_matches) > max_pages:
-                print(f"\n... (showing first {max_pages} of {len(pages_with_matches)} pages)")
-                break
+        if len(pages_with_matches) > max_pages:
+            print(f"\n... (showing first {max_pages} of {len(pages_with_matches)} pages)")
 
     def create_claude_guide(self, title: str = None, output_file: str = None):
         """Create a CLAUDE.md guide file for discoverability."""
@@ -299,20 +363,8 @@ This approach can be used for **any large PDF**. See:
             return "\n".join(f"- {kw}" for kw in self.keywords)
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Generic PDF indexer and search tool",
-        formatter_class=argparse.RawDescriptionHelpFormatter,
-        epilog=__doc__
-    )
-
-    parser.add_argument("--config", "-c", type=Path, help="YAML config file")
-    parser.add_argument("--pdf", type=Path, help="PDF file to index (if not using config)")
-    parser.add_argument("--keywords", nargs="+", help="Keywords to index (if not using config)")
-    parser.add_argument("--index-dir", default="search-index", help="Index directory name")
-
-    subparsers = parser.add_subparsers(dest="command", help="Command to run")
-
+def add_commands(subparsers):
+    """Register the document commands (shared with the per-document pdf_indexer.py scripts)."""
     # Extract command
     extract_parser = subparsers.add_parser("extract", help="Extract page range to text")
     extract_parser.add_argument("start_page", type=int, help="First page to extract")
@@ -324,6 +376,8 @@ def main():
     search_parser = subparsers.add_parser("search", help="Search for a term")
     search_parser.add_argument("term", help="Term to search for")
     search_parser.add_argument("--case-sensitive", "-s", action="store_true")
+    search_parser.add_argument("--fts", action="store_true",
+                               help="Term is an FTS5 query (AND/OR/NOT/NEAR, \"phrases\", prefix*)")
 
     # Find with context
     find_parser = subparsers.add_parser("find", help="Find term with surrounding context")
@@ -334,7 +388,102 @@ def main():
                             help="Maximum pages to show (default: 5)")
 
     # Build index
-    subparsers.add_parser("build-index", help="Build keyword index")
+    build_parser = subparsers.add_parser("build-index", help="Build keyword index")
+    build_parser.add_argument("--force", action="store_true",
+                              help="Rewrite every keyword file, not just new or outdated ones")
+    build_parser.add_argument("--jobs", "-j", type=int,
+                              help="Worker processes for text extraction/indexing (default: CPU count)")
+
+    # Build full-text index
+    text_index_parser = subparsers.add_parser("build-text-index",
+                                              help="Extract text and build the full-text search index")
+    text_index_parser.add_argument("--force", action="store_true",
+                                   help="Re-run pdftotext even if the text cache is current")
+    text_index_parser.add_argument("--jobs", "-j", type=int,
+                                   help="Worker processes for text extraction/indexing (default: CPU count)")
+
+
+def run_command(indexer: PDFIndexer, args, parser, output_base: Optional[Path] = None):
+    """Execute a command registered by add_commands()."""
+    try:
+        _run_command(indexer, args, parser, output_base)
+    except RuntimeError as e:       # text extraction failed (e.g. pdftotext missing)
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def _run_command(indexer: PDFIndexer, args, parser, output_base: Optional[Path]):
+    if args.command == "extract":
+        text = indexer.extract_pages(args.start_page, args.end_page, args.output,
+                                     layout=not args.no_layout)
+        if text is not None:
+            print(text, end="")
+
+    elif args.command == "search":
+        started = time.perf_counter()
+        try:
+            matches = indexer.search_term(args.term, args.case_sensitive, raw=args.fts)
+        except (ValueError, sqlite3.OperationalError) as e:
+            print(f"Error: invalid query '{args.term}': {e}", file=sys.stderr)
+            sys.exit(1)
+        elapsed_ms = (time.perf_counter() - started) * 1e3
+        print(f"Found {len(matches)} occurrences ({elapsed_ms:.1f} ms):\n")
+        for page, line in matches:
+            print(f"Page {page:4d}: {line}")
+
+    elif args.command == "find":
+        indexer.find_with_context(args.term, args.context, args.max_pages)
+
+    elif args.command == "build-index":
+        indexer.build_keyword_index(output_base, force=args.force, jobs=args.jobs)
+
+    elif args.command == "build-text-index":
+        indexer.build_text_index(force=args.force, jobs=args.jobs)
+
+    else:
+        parser.print_help()
+
+
+def document_main(pdf_file: Path, keywords: List[str], description: str, doc: str = None,
+                  output_base: Optional[Path] = None):
+    """
+    Command line for a script bound to one PDF and keyword list (the
+    pdf_indexer.py next to each document index). build-index writes to
+    output_base/search-index.
+    """
+    parser = argparse.ArgumentParser(
+        description=description,
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=doc
+    )
+    add_commands(parser.add_subparsers(dest="command", help="Command to run"))
+    args = parser.parse_args()
+    if args.command is None:
+        parser.print_help()
+        return
+
+    try:
+        indexer = PDFIndexer(pdf_file, keywords=keywords)
+    except FileNotFoundError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    run_command(indexer, args, parser, output_base)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generic PDF indexer and search tool",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog=__doc__
+    )
+
+    parser.add_argument("--config", "-c", type=Path, help="YAML config file")
+    parser.add_argument("--pdf", type=Path, help="PDF file to index (if not using config)")
+    parser.add_argument("--keywords", nargs="+", help="Keywords to index (if not using config)")
+    parser.add_argument("--index-dir", default="search-index", help="Index directory name")
+
+    subparsers = parser.add_subparsers(dest="command", help="Command to run")
+    add_commands(subparsers)
 
     # Create guide
     guide_parser = subparsers.add_parser("create-guide", help="Create CLAUDE.md guide file")
@@ -353,28 +502,10 @@ def main():
         parser.print_help()
         sys.exit(1)
 
-    # Execute command
-    if args.command == "extract":
-        indexer.extract_pages(args.start_page, args.end_page, args.output,
-                            layout=not args.no_layout)
-
-    elif args.command == "search":
-        matches = indexer.search_term(args.term, args.case_sensitive)
-        print(f"Found {len(matches)} occurrences:\n")
-        for page, line in matches:
-            print(f"Page {page:4d}: {line}")
-
-    elif args.command == "find":
-        indexer.find_with_context(args.term, args.context, args.max_pages)
-
-    elif args.command == "build-index":
-        indexer.build_keyword_index()
-
-    elif args.command == "create-guide":
+    if args.command == "create-guide":
         indexer.create_claude_guide(args.title, args.output)
-
     else:
-        parser.print_help()
+        run_command(indexer, args, parser)
 
 
 if __name__ == "__main__":
@@ -20,55 +20,57 @@ Options:
 """
 
 import csv
+import os
 import sys
 import argparse
 from pathlib import Path
 import numpy as np
 from typing import List, Dict, Tuple
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                '..', 'inav', 'blackbox', 'analysis'))
+from blackbox_cache import open_columns
+from stability_segments import ChannelLimit, find_stable_segments
+
 
 def parse_log_file(log_path: str) -> Tuple[np.ndarray, List[str]]:
     """
     Parse the flight log CSV file and extract key time-series data.
 
+    The CSV is decoded once into a column cache next to the log
+    (blackbox_cache.py); later runs only map the four columns used here.
+
     Returns:
         data: numpy array with columns [time_s, airspeed_ms, pitch_deg, throttle]
         fieldnames: list of column names
     """
     print(f"Reading log file: {log_path}")
 
-    with open(log_path, 'r') as f:
-        reader = csv.DictReader(f)
-        # Strip whitespace from field names
-        reader.fieldnames = [name.strip() for name in reader.fieldnames]
-
-        data_list = []
-        first_time = None
+    cols = open_columns(log_path)
+    missing = [c for c in ('time (us)', 'AirSpeed', 'attitude[1]', 'motor[0]') if c not in cols]
+    if missing:
+        raise KeyError(f"{log_path} has no column(s) {missing}")
 
-        for row in reader:
-            try:
-                time_us = int(row['time (us)'])
-                if first_time is None:
-                    first_time = time_us
+    time_us = cols['time (us)'].astype(np.float64)
+    airspeed_cms = cols['AirSpeed'].astype(np.float64)  # cm/s
+    pitch_decideg = cols['attitude[1]'].astype(np.float64)  # decidegrees
+    throttle = cols['motor[0]'].astype(np.float64)
 
-                time_s = (time_us - first_time) / 1e6  # Convert to seconds from start
-                airspeed_cms = int(row['AirSpeed'])  # cm/s
-                airspeed_ms = airspeed_cms / 100.0  # Convert to m/s
-                pitch_decideg = int(row['attitude[1]'])  # decidegrees
-                pitch_deg = pitch_decideg / 10.0  # Convert to degrees
-                throttle = int(row['motor[0]'])
+    # Skip rows with missing data (empty CSV cells are NaN in the cache)
+    valid = np.isfinite(time_us) & np.isfinite(airspeed_cms) & np.isfinite(pitch_decideg) & np.isfinite(throttle)
+    time_us = time_us[valid]
 
-                data_list.append([time_s, airspeed_ms, pitch_deg, throttle])
-            except (ValueError, KeyError) as e:
-                # Skip rows with missing or invalid data
-                continue
+    data = np.column_stack([
+        (time_us - time_us[0]) / 1e6,   # seconds from start
+        airspeed_cms[valid] / 100.0,    # m/s
+        pitch_decideg[valid] / 10.0,    # degrees
+        throttle[valid],
+    ])
+    print(f"Loaded {len(data)} data points")
+    print(f"Duration: {data[-1, 0]:.1f} seconds")
+    print(f"Sampling rate: {len(data) / data[-1, 0]:.1f} Hz")
 
-        data = np.array(data_list)
-        print(f"Loaded {len(data)} data points")
-        print(f"Duration: {data[-1, 0]:.1f} seconds")
-        print(f"Sampling rate: {len(data) / data[-1, 0]:.1f} Hz")
-
-        return data, ['time_s', 'airspeed_ms', 'pitch_deg', 'throttle']
+    return data, ['time_s', 'airspeed_ms', 'pitch_deg', 'throttle']
 
 
 def find_stable_periods(
@@ -97,85 +99,41 @@ def find_stable_periods(
     """
     window_samples = int(min_duration * sampling_rate)
     stable_periods = []
-    period_id = 0
 
     print(f"\nSearching for stable periods...")
     print(f"  Window size: {window_samples} samples ({min_duration}s)")
     print(f"  Thresholds: airspeed={airspeed_var_threshold} m/s, "
           f"pitch={pitch_var_threshold}°, throttle={throttle_var_threshold}")
 
-    i = 0
-    while i <= len(data) - window_samples:
-        window = data[i:i+window_samples]
-
-        # Extract parameters
-        time_s = window[:, 0]
-        airspeed = window[:, 1]
-        pitch = window[:, 2]
-        throttle = window[:, 3]
-
-        # Calculate statistics
-        airspeed_mean = np.mean(airspeed)
-        airspeed_std = np.std(airspeed)
-        pitch_mean = np.mean(pitch)
-        pitch_std = np.std(pitch)
-        throttle_mean = np.mean(throttle)
-        throttle_std = np.std(throttle)
-
-        # Check if period is stable and not idle
-        is_stable = (
-            airspeed_std <= airspeed_var_threshold and
-            pitch_std <= pitch_var_threshold and
-            throttle_std <= throttle_var_threshold and
-            throttle_mean >= min_throttle
-        )
-
-        if is_stable:
-            # Try to extend the stable period
-            end_idx = i + window_samples
-            while end_idx < len(data):
-                # Check if adding next sample keeps period stable
-                extended_window = data[i:end_idx+1]
-
-                ext_airspeed_std = np.std(extended_window[:, 1])
-                ext_pitch_std = np.std(extended_window[:, 2])
-                ext_throttle_std = np.std(extended_window[:, 3])
-                ext_throttle_mean = np.mean(extended_window[:, 3])
-
-                if (ext_airspeed_std <= airspeed_var_threshold and
-                    ext_pitch_std <= pitch_var_threshold and
-                    ext_throttle_std <= throttle_var_threshold and
-                    ext_throttle_mean >= min_throttle):
-                    end_idx += 1
-                else:
-                    break
-
-            # Use the extended period
-            final_window = data[i:end_idx]
-            duration = final_window[-1, 0] - final_window[0, 0]
-
-            period = {
-                'period_id': period_id,
-                'start_time': final_window[0, 0],
-                'end_time': final_window[-1, 0],
-                'duration': duration,
-                'airspeed_mean': np.mean(final_window[:, 1]),
-                'airspeed_std': np.std(final_window[:, 1]),
-                'pitch_mean': np.mean(final_window[:, 2]),
-                'pitch_std': np.std(final_window[:, 2]),
-                'throttle_mean': np.mean(final_window[:, 3]),
-                'throttle_std': np.std(final_window[:, 3]),
-                'num_samples': len(final_window)
-            }
-
-            stable_periods.append(period)
-            period_id += 1
-
-            # Jump to end of this period to avoid overlaps
-            i = end_idx
-        else:
-            # Move window forward
-            i += 1
+    # A window is stable when every std is within its threshold and the mean
+    # throttle is not idle; stable windows are extended sample by sample and
+    # the search resumes at the end of each period (no overlaps). Rolling
+    # sums keep this linear in the log length.
+    limits = [
+        ChannelLimit(max_std=airspeed_var_threshold),
+        ChannelLimit(max_std=pitch_var_threshold),
+        ChannelLimit(max_std=throttle_var_threshold, min_mean=min_throttle),
+    ]
+    segments = find_stable_segments(data[:, 1:4], limits, window_samples)
+
+    for period_id, (start, end) in enumerate(segments):
+        final_window = data[start:end]
+        duration = final_window[-1, 0] - final_window[0, 0]
+
+        period = {
+            'period_id': period_id,
+            'start_time': final_window[0, 0],
+            'end_time': final_window[-1, 0],
+            'duration': duration,
+            'airspeed_mean': np.mean(final_window[:, 1]),
+            'airspeed_std': np.std(final_window[:, 1]),
+            'pitch_mean': np.mean(final_window[:, 2]),
+            'pitch_std': np.std(final_window[:, 2]),
+            'throttle_mean': np.mean(final_window[:, 3]),
+            'throttle_std': np.std(final_window[:, 3]),
+            'num_samples': len(final_window)
+        }
+        stable_periods.append(period)
 
     print(f"Found {len(stable_periods)} stable periods")
 
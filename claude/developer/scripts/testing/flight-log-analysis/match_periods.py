@@ -28,8 +28,25 @@ import csv
 import sys
 import argparse
 from pathlib import Path
-from typing import List, Dict, Tuple
-import itertools
+from typing import Callable, List, Dict, Optional, Tuple
+import numpy as np
+
+# (scenario, variable held constant, variables that must differ, summary line)
+SCENARIOS = (
+    ('A', 'throttle', ('pitch',), 'Scenario A: Same throttle, different pitch'),
+    ('B', 'airspeed', ('pitch', 'throttle'), 'Scenario B: Same airspeed, different pitch/throttle'),
+    ('C', 'pitch', ('throttle',), 'Scenario C: Same pitch, different throttle'),
+)
+
+# Candidate pairs generated and filtered per block in pairs_within()
+PAIR_BLOCK = 1 << 21
+
+MATCH_FIELDS = sorted([
+    'scenario', 'period_1', 'period_2', 'time_1', 'time_2',
+    'throttle_1', 'throttle_2', 'throttle_diff',
+    'pitch_1', 'pitch_2', 'pitch_diff',
+    'airspeed_1', 'airspeed_2', 'airspeed_diff',
+])
 
 
 def load_stable_periods(csv_path: str) -> List[Dict]:
@@ -59,6 +76,118 @@ def load_stable_periods(csv_path: str) -> List[Dict]:
     return periods
 
 
+def period_columns(periods: List[Dict]) -> Dict[str, np.ndarray]:
+    """Stable periods as one array per field (the layout the matcher works on)."""
+    return {
+        'period_id': np.array([p['period_id'] for p in periods], dtype=np.int64),
+        'throttle': np.array([p['throttle_mean'] for p in periods], dtype=np.float64),
+        'airspeed': np.array([p['airspeed_mean'] for p in periods], dtype=np.float64),
+        'pitch': np.array([p['pitch_mean'] for p in periods], dtype=np.float64),
+        'time': np.array([f"{p['start_time']:.1f}-{p['end_time']:.1f}" for p in periods]),
+    }
+
+
+def pairs_within(values: np.ndarray, tolerance: float,
+                 keep: Optional[Callable[[np.ndarray, np.ndarray], np.ndarray]] = None,
+                 block_pairs: int = PAIR_BLOCK) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    All index pairs (i, j), i < j, with |values[i] - values[j]| <= tolerance
+    (and keep(i, j) true, if given), in itertools.combinations order.
+
+    Sorts once and takes, for every value, the run of larger values inside
+    the tolerance window, so the cost is O(P log P + candidates) instead of
+    checking all P^2 pairs. Candidates are generated and filtered about
+    block_pairs at a time to bound memory.
+    """
+    n = len(values)
+    order = np.argsort(values, kind='stable')
+    ordered = values[order]
+    # Widen the window by a few ulps of the operands (values[j] - values[i]
+    # rounds at their scale, not the bound's), then apply the exact test below
+    bound = ordered + tolerance
+    bound += 4 * np.spacing(np.abs(ordered) + tolerance)
+    hi = np.searchsorted(ordered, bound, side='right')
+    counts = np.maximum(hi - np.arange(n) - 1, 0)
+    ends = np.cumsum(counts)
+
+    found_i, found_j = [], []
+    first = 0
+    while first < n:
+        # Sorted positions [first, last) hold at most ~block_pairs candidates
+        last = max(first + 1, int(np.searchsorted(ends, ends[first] - counts[first] + block_pairs, side='right')))
+        run = counts[first:last]
+        left = np.repeat(np.arange(first, last), run)
+        run_start = np.repeat(np.cumsum(run) - run, run)
+        right = left + 1 + (np.arange(len(left)) - run_start)
+        first = last
+
+        a, b = order[left], order[right]
+        i, j = np.minimum(a, b), np.maximum(a, b)
+        mask = np.abs(values[i] - values[j]) <= tolerance
+        if keep is not None:
+            mask &= keep(i, j)
+        found_i.append(i[mask])
+        found_j.append(j[mask])
+
+    if not found_i:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    i, j = np.concatenate(found_i), np.concatenate(found_j)
+    sort = np.lexsort((j, i))
+    return i[sort], j[sort]
+
+
+def match_scenario(cols: Dict[str, np.ndarray], scenario: str, tolerance: float,
+                   min_diffs: Dict[str, float]) -> Dict[str, np.ndarray]:
+    """
+    Matches for one scenario as columns (see SCENARIOS).
+
+    Pairs hold the scenario's variable within `tolerance` and differ by at
+    least min_diffs[var] in each other variable. *_diff columns are
+    period_2 - period_1, except the held variable in A and C which is the
+    absolute difference (as the CSV has always had it).
+    """
+    _, held, differ, _ = next(entry for entry in SCENARIOS if entry[0] == scenario)
+
+    def differs(i, j):
+        mask = np.ones(len(i), dtype=bool)
+        for var in differ:
+            mask &= np.abs(cols[var][i] - cols[var][j]) >= min_diffs[var]
+        return mask
+
+    i, j = pairs_within(cols[held], tolerance, differs)
+
+    out = {
+        'scenario': np.full(len(i), scenario),
+        'period_1': cols['period_id'][i],
+        'period_2': cols['period_id'][j],
+        'time_1': cols['time'][i],
+        'time_2': cols['time'][j],
+    }
+    for var in ('throttle', 'pitch', 'airspeed'):
+        first, second = cols[var][i], cols[var][j]
+        out[f'{var}_1'] = first
+        out[f'{var}_2'] = second
+        out[f'{var}_diff'] = np.abs(first - second) if var == held and scenario != 'B' else second - first
+    return out
+
+
+def match_all(periods: List[Dict], throttle_tolerance: float, airspeed_tolerance: float,
+              pitch_tolerance: float, min_pitch_diff: float,
+              min_throttle_diff: float) -> Dict[str, Dict[str, np.ndarray]]:
+    """Matches for every scenario, keyed 'A'/'B'/'C', as column arrays."""
+    cols = period_columns(periods)
+    tolerances = {'throttle': throttle_tolerance, 'airspeed': airspeed_tolerance, 'pitch': pitch_tolerance}
+    min_diffs = {'pitch': min_pitch_diff, 'throttle': min_throttle_diff}
+    return {scenario: match_scenario(cols, scenario, tolerances[held], min_diffs)
+            for scenario, held, _, _ in SCENARIOS}
+
+
+def match_rows(matches: Dict[str, np.ndarray], limit: Optional[int] = None) -> List[Dict]:
+    """Column matches as a list of per-pair dicts (the first `limit` only)."""
+    columns = {k: v[:limit].tolist() for k, v in matches.items()}
+    return [dict(zip(columns, values)) for values in zip(*columns.values())]
+
+
 def find_scenario_a_matches(
     periods: List[Dict],
     throttle_tolerance: float,
@@ -68,34 +197,8 @@ def find_scenario_a_matches(
     Scenario A: Same throttle, different pitch
     Answers: How does pitch affect airspeed at constant throttle?
     """
-    matches = []
-
-    for p1, p2 in itertools.combinations(periods, 2):
-        throttle_diff = abs(p1['throttle_mean'] - p2['throttle_mean'])
-        pitch_diff = abs(p1['pitch_mean'] - p2['pitch_mean'])
-        airspeed_diff = p2['airspeed_mean'] - p1['airspeed_mean']
-
-        # Same throttle, different pitch
-        if throttle_diff <= throttle_tolerance and pitch_diff >= min_pitch_diff:
-            match = {
-                'scenario': 'A',
-                'period_1': p1['period_id'],
-                'period_2': p2['period_id'],
-                'throttle_1': p1['throttle_mean'],
-                'throttle_2': p2['throttle_mean'],
-                'throttle_diff': throttle_diff,
-                'pitch_1': p1['pitch_mean'],
-                'pitch_2': p2['pitch_mean'],
-                'pitch_diff': p2['pitch_mean'] - p1['pitch_mean'],
-                'airspeed_1': p1['airspeed_mean'],
-                'airspeed_2': p2['airspeed_mean'],
-                'airspeed_diff': airspeed_diff,
-                'time_1': f"{p1['start_time']:.1f}-{p1['end_time']:.1f}",
-                'time_2': f"{p2['start_time']:.1f}-{p2['end_time']:.1f}",
-            }
-            matches.append(match)
-
-    return matches
+    return match_rows(match_scenario(period_columns(periods), 'A', throttle_tolerance,
+                                     {'pitch': min_pitch_diff}))
 
 
 def find_scenario_b_matches(
@@ -108,36 +211,8 @@ def find_scenario_b_matches(
     Scenario B: Same airspeed, different pitch/throttle
     Answers: How do pitch and throttle trade off to maintain airspeed?
     """
-    matches = []
-
-    for p1, p2 in itertools.combinations(periods, 2):
-        airspeed_diff = abs(p1['airspeed_mean'] - p2['airspeed_mean'])
-        pitch_diff = abs(p1['pitch_mean'] - p2['pitch_mean'])
-        throttle_diff = abs(p1['throttle_mean'] - p2['throttle_mean'])
-
-        # Same airspeed, different pitch and throttle
-        if (airspeed_diff <= airspeed_tolerance and
-            pitch_diff >= min_pitch_diff and
-            throttle_diff >= min_throttle_diff):
-            match = {
-                'scenario': 'B',
-                'period_1': p1['period_id'],
-                'period_2': p2['period_id'],
-                'airspeed_1': p1['airspeed_mean'],
-                'airspeed_2': p2['airspeed_mean'],
-                'airspeed_diff': p2['airspeed_mean'] - p1['airspeed_mean'],
-                'pitch_1': p1['pitch_mean'],
-                'pitch_2': p2['pitch_mean'],
-                'pitch_diff': p2['pitch_mean'] - p1['pitch_mean'],
-                'throttle_1': p1['throttle_mean'],
-                'throttle_2': p2['throttle_mean'],
-                'throttle_diff': p2['throttle_mean'] - p1['throttle_mean'],
-                'time_1': f"{p1['start_time']:.1f}-{p1['end_time']:.1f}",
-                'time_2': f"{p2['start_time']:.1f}-{p2['end_time']:.1f}",
-            }
-            matches.append(match)
-
-    return matches
+    return match_rows(match_scenario(period_columns(periods), 'B', airspeed_tolerance,
+                                     {'pitch': min_pitch_diff, 'throttle': min_throttle_diff}))
 
 
 def find_scenario_c_matches(
@@ -149,66 +224,35 @@ def find_scenario_c_matches(
     Scenario C: Same pitch, different throttle
     Answers: How does throttle affect airspeed at constant pitch?
     """
-    matches = []
-
-    for p1, p2 in itertools.combinations(periods, 2):
-        pitch_diff = abs(p1['pitch_mean'] - p2['pitch_mean'])
-        throttle_diff = abs(p1['throttle_mean'] - p2['throttle_mean'])
-        airspeed_diff = p2['airspeed_mean'] - p1['airspeed_mean']
-
-        # Same pitch, different throttle
-        if pitch_diff <= pitch_tolerance and throttle_diff >= min_throttle_diff:
-            match = {
-                'scenario': 'C',
-                'period_1': p1['period_id'],
-                'period_2': p2['period_id'],
-                'pitch_1': p1['pitch_mean'],
-                'pitch_2': p2['pitch_mean'],
-                'pitch_diff': pitch_diff,
-                'throttle_1': p1['throttle_mean'],
-                'throttle_2': p2['throttle_mean'],
-                'throttle_diff': p2['throttle_mean'] - p1['throttle_mean'],
-                'airspeed_1': p1['airspeed_mean'],
-                'airspeed_2': p2['airspeed_mean'],
-                'airspeed_diff': airspeed_diff,
-                'time_1': f"{p1['start_time']:.1f}-{p1['end_time']:.1f}",
-                'time_2': f"{p2['start_time']:.1f}-{p2['end_time']:.1f}",
-            }
-            matches.append(match)
-
-    return matches
+    return match_rows(match_scenario(period_columns(periods), 'C', pitch_tolerance,
+                                     {'throttle': min_throttle_diff}))
 
 
-def write_matched_periods(matches: List[Dict], output_path: str):
-    """Write matched periods to CSV file."""
-    if not matches:
+def write_matched_periods(matches: Dict[str, Dict[str, np.ndarray]], output_path: str):
+    """Write matched periods (match_all() output) to CSV file."""
+    if not any(len(m['scenario']) for m in matches.values()):
         print(f"No matched periods to write!")
         return
 
     print(f"\nWriting results to: {output_path}")
 
-    # Determine all unique fieldnames
-    fieldnames = set()
-    for match in matches:
-        fieldnames.update(match.keys())
-    fieldnames = sorted(list(fieldnames))
-
     with open(output_path, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
-        writer.writeheader()
-        writer.writerows(matches)
+        writer = csv.writer(f)
+        writer.writerow(MATCH_FIELDS)
+        for scenario_matches in matches.values():
+            writer.writerows(zip(*(scenario_matches[name].tolist() for name in MATCH_FIELDS)))
 
 
-def print_match_summary(matches: List[Dict], scenario: str, description: str):
+def print_match_summary(matches: Dict[str, np.ndarray], scenario: str, description: str):
     """Print summary of matches for a scenario."""
-    scenario_matches = [m for m in matches if m['scenario'] == scenario]
+    total = len(matches['scenario'])
 
     print(f"\n{description}")
-    print(f"  Total matches: {len(scenario_matches)}")
+    print(f"  Total matches: {total}")
 
-    if scenario_matches:
+    if total:
         print(f"\n  Top 5 matches:")
-        for i, match in enumerate(scenario_matches[:5]):
+        for i, match in enumerate(match_rows(matches, 5)):
             if scenario == 'A':
                 print(f"    {i+1}. Periods {match['period_1']} & {match['period_2']}: "
                       f"throttle={match['throttle_1']:.0f}, "
@@ -265,41 +309,23 @@ def main():
     print(f"  Minimum differences: pitch={args.min_diff_pitch}°, "
           f"throttle={args.min_diff_throttle}, airspeed={args.min_diff_airspeed} m/s")
 
-    # Find matches for each scenario
-    all_matches = []
-
-    scenario_a = find_scenario_a_matches(
+    # Find matches for every scenario
+    all_matches = match_all(
         periods,
         args.throttle_tol,
-        args.min_diff_pitch
-    )
-    all_matches.extend(scenario_a)
-    print_match_summary(scenario_a, 'A',
-                        'Scenario A: Same throttle, different pitch')
-
-    scenario_b = find_scenario_b_matches(
-        periods,
         args.airspeed_tol,
-        args.min_diff_pitch,
-        args.min_diff_throttle
-    )
-    all_matches.extend(scenario_b)
-    print_match_summary(scenario_b, 'B',
-                        'Scenario B: Same airspeed, different pitch/throttle')
-
-    scenario_c = find_scenario_c_matches(
-        periods,
         args.pitch_tol,
+        args.min_diff_pitch,
         args.min_diff_throttle
     )
-    all_matches.extend(scenario_c)
-    print_match_summary(scenario_c, 'C',
-                        'Scenario C: Same pitch, different throttle')
+    for scenario, _, _, description in SCENARIOS:
+        print_match_summary(all_matches[scenario], scenario, description)
 
     # Write output
     write_matched_periods(all_matches, args.output)
 
-    print(f"\nTotal matches across all scenarios: {len(all_matches)}")
+    total = sum(len(m['scenario']) for m in all_matches.values())
+    print(f"\nTotal matches across all scenarios: {total}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Regression checks for pairs_within() in match_periods.py.
+
+pairs_within() must return exactly the pairs the all-pairs loop it
+replaced finds, including pairs whose difference lands on the tolerance
+after floating-point rounding (the data is logged at 0.1 resolution, so
+such ties are common).
+
+Usage:
+    python3 test_match_periods.py
+    python3 -m pytest test_match_periods.py
+"""
+
+import itertools
+
+import numpy as np
+
+from match_periods import pairs_within
+
+
+def brute_force(values, tolerance):
+    """The original itertools.combinations test"""
+    return [(i, j) for i, j in itertools.combinations(range(len(values)), 2)
+            if abs(values[i] - values[j]) <= tolerance]
+
+
+def test_pair_on_tolerance_boundary():
+    # -0.1 - -2.1 rounds to 2.0, but -2.1 + 2.0 rounds below -0.1
+    i, j = pairs_within(np.array([-2.1, -0.1]), 2.0)
+    assert list(zip(i.tolist(), j.tolist())) == [(0, 1)]
+
+
+def test_matches_brute_force():
+    rng = np.random.default_rng(8)
+    for trial in range(200):
+        # Values on a 0.1 grid, so differences hit the tolerance exactly
+        scale = rng.choice([1, 10, 100, 2000])
+        values = np.round(rng.uniform(-scale, scale, rng.integers(2, 80)), 1)
+        tolerance = float(rng.choice([0.1, 0.5, 1.0, 2.0, 50.0]))
+        i, j = pairs_within(values, tolerance, block_pairs=int(rng.integers(1, 64)))
+        assert list(zip(i.tolist(), j.tolist())) == brute_force(values.tolist(), tolerance), \
+            f"trial {trial}: tolerance {tolerance}"
+
+
+if __name__ == "__main__":
+    test_pair_on_tolerance_boundary()
+    test_matches_brute_force()
+    print("pairs_within: all checks passed")
@@ -0,0 +1,410 @@
+#!/usr/bin/env python3
+"""
+blackbox_cache.py - On-disk columnar cache for decoded blackbox logs
+
+Analysis scripts used to re-read the same multi-hundred-MB blackbox_decode
+CSV with csv.DictReader on every run, building a Python dict per row. This
+module parses a log once and stores every field as its own .npy file next
+to the log; later runs memory-map only the columns they touch:
+
+    from blackbox_cache import open_columns
+    cols = open_columns('LOG_00001.01.csv')
+    t = cols['time (us)']            # np.memmap, no other column is read
+    m0 = cols['motor[0]']
+
+Sources:
+- blackbox_decode CSV (.csv): header names are stripped of whitespace,
+  otherwise kept as-is ('time (us)', 'BaroAlt (cm)'). Integer columns are
+  narrowed to the smallest signed dtype that holds them; columns with decimals,
+  empty cells (NaN) or values beyond int64 become float64; text columns
+  such as 'flightModeFlags (flags)' are stored as category codes + labels.
+- Raw blackbox log (.TXT/.BBL, detected by its 'H Product:' header):
+  decoded with blackbox_log.decode_file. Main fields use the raw log names
+  ('time', 'motor[0]'); G/H/S frame fields are prefixed 'gps/', 'gps_home/'
+  and 'slow/' (each with its own 'main_index' column).
+
+Layout:
+    LOG_00001.01.csv
+    LOG_00001.01.csv.cols/
+        source.json        size + mtime of the source when last hashed
+        <content hash>/    one directory per log content
+            meta.json      column names, dtypes, category labels
+            0000.npy ...   one array per column
+
+The cache is keyed by a BLAKE2b hash of the log contents, so a re-decoded
+or overwritten log is never served stale data. Hashing reads the whole
+file, so source.json remembers the hash for the current size/mtime: a
+second open of an unchanged log reads two small JSON files and nothing
+else. Directories for older contents of the same path are removed when a
+new one is built.
+
+Usage:
+    python3 blackbox_cache.py LOG_00001.01.csv              # build / show
+    python3 blackbox_cache.py LOG_00001.01.csv --rebuild
+    python3 blackbox_cache.py LOG_00001.TXT --index 0 --columns time,motor[0]
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from blackbox_log import LOG_START, decode_file
+
+CACHE_VERSION = 2
+CACHE_SUFFIX = '.cols'
+
+# Lines parsed per block while building from CSV. The first block is small:
+# it is parsed row by row to learn which columns are int/float/text
+_CSV_PROBE_ROWS = 1 << 10
+_CSV_CHUNK_ROWS = 1 << 16
+_HASH_BLOCK = 1 << 20
+
+# Column kinds while parsing CSV, in upgrade order
+_KIND_INT = 'i'
+_KIND_FLOAT = 'f'
+_KIND_TEXT = 'U'
+
+
+def content_hash(path: str) -> str:
+    """BLAKE2b-128 hex digest of a file's contents."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_root(path: str) -> str:
+    return path + CACHE_SUFFIX
+
+
+class ColumnStore:
+    """
+    Read-only view of one cached log. Columns are memory-mapped on first
+    access; nothing is read for columns that are never used.
+
+    store[name] returns the column array. For text (category) columns this
+    builds the string array; use categories(name) to work on the codes.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json')) as f:
+            self.meta = json.load(f)
+        self._entries = {c['name']: c for c in self.meta['columns']}
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    @property
+    def columns(self) -> List[str]:
+        return [c['name'] for c in self.meta['columns']]
+
+    @property
+    def rows(self) -> int:
+        """Row count of the main table (CSV rows, or main frames of a raw log)."""
+        return self.meta['rows']
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _array(self, name: str) -> np.ndarray:
+        array = self._arrays.get(name)
+        if array is None:
+            entry = self._entries[name]
+            file = os.path.join(self.directory, entry['file'])
+            # numpy cannot mmap a zero-length array
+            array = np.load(file, mmap_mode='r' if entry['length'] else None)
+            self._arrays[name] = array
+        return array
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name not in self._entries:
+            raise KeyError(name)
+        labels = self._entries[name].get('labels')
+        if labels is not None:
+            return np.asarray(labels)[self._array(name)]
+        return self._array(name)
+
+    def get(self, name: str, default=None):
+        return self[name] if name in self._entries else default
+
+    def categories(self, name: str) -> Tuple[np.ndarray, List[str]]:
+        """(codes, labels) of a text column: labels[codes[i]] is row i."""
+        labels = self._entries[name].get('labels')
+        if labels is None:
+            raise TypeError(f"column '{name}' is numeric, not a text column")
+        return self._array(name), labels
+
+
+def _narrow(values: np.ndarray) -> np.ndarray:
+    """
+    Smallest signed integer dtype holding every value (int64 arrays only).
+    Never unsigned, so np.diff() and subtraction on a column can go negative.
+    """
+    if not len(values):
+        return values.astype(np.int8)
+    dtype = np.result_type(np.min_scalar_type(min(int(values.min()), -1)),
+                           np.min_scalar_type(-1 - int(values.max())))
+    if dtype.kind != 'i':
+        return values
+    return values.astype(dtype, copy=False)
+
+
+def _convert(values, kind: str) -> Tuple[np.ndarray, str]:
+    """Parse one CSV column block as int, else float (empty = NaN), else text."""
+    if kind == _KIND_INT:
+        try:
+            return _narrow(np.fromiter(map(int, values), np.int64, len(values))), _KIND_INT
+        except (ValueError, OverflowError):
+            pass
+    if kind in (_KIND_INT, _KIND_FLOAT):
+        try:
+            return np.array([v if v.strip() else 'nan' for v in values], dtype=np.float64), _KIND_FLOAT
+        except ValueError:
+            pass
+    return np.char.strip(np.array(values, dtype=str)), _KIND_TEXT
+
+
+def _load_block(lines: List[str], usecols: List[int], dtype) -> np.ndarray:
+    return np.loadtxt(lines, delimiter=',', dtype=dtype, usecols=usecols, ndmin=2, comments=None)
+
+
+def _parse_csv_block(lines: List[str], width: int, kinds: List[str], blocks: List[list]) -> int:
+    """
+    Append one block of CSV lines to the per-column block lists.
+
+    The fast path hands each column kind to np.loadtxt; a block that it
+    rejects (decimals in an int column, empty cells, a truncated last line)
+    is re-parsed row by row, which also upgrades the column kinds.
+    Returns the number of rows added.
+    """
+    try:
+        parsed = {}
+        for kind, dtype in ((_KIND_INT, np.int64), (_KIND_FLOAT, np.float64), (_KIND_TEXT, str)):
+            usecols = [j for j in range(width) if kinds[j] == kind]
+            if usecols:
+                block = _load_block(lines, usecols, dtype)
+                for n, j in enumerate(usecols):
+                    parsed[j] = block[:, n]
+        rows = len(parsed[0])
+        if any(len(column) != rows for column in parsed.values()):
+            raise ValueError("ragged block")
+        for j, column in parsed.items():
+            if kinds[j] == _KIND_INT:
+                column = _narrow(column)
+            elif kinds[j] == _KIND_TEXT:
+                column = np.char.strip(column)
+            blocks[j].append(column)
+        return rows
+    except (ValueError, OverflowError):
+        pass
+
+    rows = [row for row in csv.reader(lines) if len(row) == width]
+    if not rows:
+        return 0
+    for j, values in enumerate(zip(*rows)):
+        column, kinds[j] = _convert(values, kinds[j])
+        blocks[j].append(column)
+    return len(rows)
+
+
+def _join(blocks: List[np.ndarray], kind: str) -> Tuple[np.ndarray, Optional[List[str]]]:
+    """Concatenate one column's blocks as its final kind; text becomes codes + labels."""
+    if kind == _KIND_TEXT:
+        text = np.concatenate([b if b.dtype.kind == 'U' else b.astype(str) for b in blocks])
+        labels, codes = np.unique(text, return_inverse=True)
+        return _narrow(codes.astype(np.int64)), labels.tolist()
+    if kind == _KIND_FLOAT:
+        return np.concatenate([b.astype(np.float64, copy=False) for b in blocks]), None
+    return np.concatenate(blocks), None
+
+
+def _csv_columns(path: str) -> Iterator[Tuple[str, np.ndarray, Optional[List[str]]]]:
+    with open(path, newline='') as f:
+        header = next(csv.reader([f.readline()]), None)
+        if not header:
+            raise ValueError(f"{path}: empty CSV")
+        names = [name.strip() for name in header]
+        width = len(names)
+        kinds = [_KIND_INT] * width
+        blocks: List[list] = [[] for _ in names]
+        size = _CSV_PROBE_ROWS
+        while True:
+            lines = list(islice(f, size))
+            if not lines:
+                break
+            _parse_csv_block(lines, width, kinds, blocks)
+            size = _CSV_CHUNK_ROWS
+
+    for j, name in enumerate(names):
+        if not blocks[j]:
+            yield name, np.zeros(0, dtype=np.int8), None
+            continue
+        column, labels = _join(blocks[j], kinds[j])
+        blocks[j] = None
+        yield name, column, labels
+
+
+def _log_columns(path: str, index: int) -> Iterator[Tuple[str, np.ndarray, Optional[List[str]]]]:
+    log = decode_file(path)[index]
+    for name, column in log.main.items():
+        yield name, column, None
+    for prefix, group in (('gps/', log.gps), ('gps_home/', log.gps_home), ('slow/', log.slow)):
+        for name, column in group.items():
+            yield prefix + name, column, None
+
+
+def _is_raw_log(path: str) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(len(LOG_START)) == LOG_START
+
+
+def _build(path: str, directory: str, index: int):
+    """Decode `path` into a fresh cache directory (written aside, then renamed)."""
+    raw = _is_raw_log(path)
+    source = _log_columns(path, index) if raw else _csv_columns(path)
+    tmp = f"{directory}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+
+    columns = []
+    rows = 0
+    try:
+        for n, (name, column, labels) in enumerate(source):
+            file = f"{n:04d}.npy"
+            np.save(os.path.join(tmp, file), np.ascontiguousarray(column))
+            entry = {'name': name, 'file': file, 'dtype': column.dtype.str, 'length': len(column)}
+            if labels is not None:
+                entry['labels'] = labels
+            columns.append(entry)
+            if '/' not in name:
+                rows = max(rows, len(column))
+    except BaseException:
+        shutil.rmtree(tmp, ignore_errors=True)
+        raise
+
+    meta = {'version': CACHE_VERSION, 'source': os.path.basename(path),
+            'format': 'blackbox' if raw else 'csv', 'log_index': index if raw else None,
+            'rows': rows, 'columns': columns}
+    with open(os.path.join(tmp, 'meta.json'), 'w') as f:
+        json.dump(meta, f)
+    try:
+        os.replace(tmp, directory)
+    except OSError:
+        # Another process finished the same build first
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _source_key(path: str, root: str, rehash: bool) -> str:
+    """Content hash of `path`, reusing the last one if size and mtime are unchanged."""
+    st = os.stat(path)
+    stamp = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    record = os.path.join(root, 'source.json')
+    if not rehash:
+        try:
+            with open(record) as f:
+                saved = json.load(f)
+            if saved.get('size') == stamp['size'] and saved.get('mtime_ns') == stamp['mtime_ns']:
+                return saved['key']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    key = content_hash(path)
+    os.makedirs(root, exist_ok=True)
+    with open(record + '.tmp', 'w') as f:
+        json.dump(dict(stamp, key=key), f)
+    os.replace(record + '.tmp', record)
+    return key
+
+
+def _remove_stale(root: str, key: str):
+    for entry in os.listdir(root):
+        full = os.path.join(root, entry)
+        if os.path.isdir(full) and not entry.startswith(key):
+            shutil.rmtree(full, ignore_errors=True)
+
+
+def open_columns(path: str, index: int = -1, rebuild: bool = False) -> ColumnStore:
+    """
+    Open the column cache for a blackbox CSV or raw log, building it if needed.
+
+    index selects the log within a raw .TXT/.BBL file (default: the last
+    one); it is ignored for CSV. rebuild forces a re-hash and re-decode.
+    """
+    root = cache_root(path)
+    key = _source_key(path, root, rehash=rebuild)
+    if not _is_raw_log(path):
+        name = key
+    else:
+        name = f"{key}-log{index}" if index >= 0 else f"{key}-last"
+    directory = os.path.join(root, name)
+    meta = os.path.join(directory, 'meta.json')
+
+    if rebuild and os.path.isdir(directory):
+        shutil.rmtree(directory, ignore_errors=True)
+    if os.path.exists(meta):
+        store = ColumnStore(directory)
+        if store.meta.get('version') == CACHE_VERSION:
+            return store
+        shutil.rmtree(directory, ignore_errors=True)
+
+    _remove_stale(root, key)
+    _build(path, directory, index)
+    return ColumnStore(directory)
+
+
+def _dir_size(directory: str) -> int:
+    return sum(os.path.getsize(os.path.join(directory, f)) for f in os.listdir(directory))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Build/inspect the columnar cache of a blackbox log')
+    parser.add_argument('log', help='blackbox_decode CSV or raw .TXT/.BBL log')
+    parser.add_argument('--index', type=int, default=-1, help='Log within a raw file (default: last)')
+    parser.add_argument('--columns', help='Comma-separated columns to summarise')
+    parser.add_argument('--rebuild', action='store_true', help='Ignore any existing cache')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        print(f"ERROR: {args.log} not found")
+        sys.exit(1)
+
+    start = time.perf_counter()
+    store = open_columns(args.log, args.index, args.rebuild)
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    store = open_columns(args.log, args.index)
+    second = time.perf_counter() - start
+
+    source_mb = os.path.getsize(args.log) / 1e6
+    print(f"{args.log}: {store.rows} rows, {len(store)} columns ({store.meta['format']})")
+    print(f"  Cache: {store.directory} ({_dir_size(store.directory) / 1e6:.1f} MB, source {source_mb:.1f} MB)")
+    print(f"  Open: {first * 1000:.0f} ms first, {second * 1000:.1f} ms cached")
+
+    if args.columns:
+        print(f"\n  {'column':<28} {'dtype':>8} {'min':>14} {'max':>14}")
+        for name in args.columns.split(','):
+            if name not in store:
+                print(f"  {name:<28} (not in cache)")
+                continue
+            column = store[name]
+            if column.dtype.kind == 'U' or not len(column):
+                print(f"  {name:<28} {column.dtype.str:>8} {len(set(column.tolist()))} distinct values")
+                continue
+            print(f"  {name:<28} {column.dtype.str:>8} {column.min():>14} {column.max():>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,1016 @@
+#!/usr/bin/env python3
+"""
+blackbox_log.py - In-process INAV blackbox log decoder with columnar output
+
+Decodes a blackbox .TXT/.BBL file straight into one NumPy array per field,
+so analysis scripts no longer shell out to blackbox_decode and re-parse its
+CSV with csv.DictReader.
+
+Handles:
+- Headers (H lines): field definitions for I/P/G/H/S frames, sysconfig
+  values used by predictors (minthrottle, motorOutput, vbatref, intervals)
+- Frames: I (intra), P (inter), G (GPS), H (GPS home), S (slow), E (event)
+- Encodings: SIGNED_VB, UNSIGNED_VB, NEG_14BIT, TAG8_8SVB, TAG2_3S32,
+  TAG8_4S16 (data version 2), TAG2_3SVARIABLE, NULL
+- Predictors: ZERO, PREVIOUS, STRAIGHT_LINE, AVERAGE_2, MINTHROTTLE,
+  MOTOR_0, INC, HOME_COORD, 1500, VBATREF, LAST_MAIN_FRAME_TIME, MINMOTOR
+- Corrupt/truncated frames: dropped, decoder resyncs on the next frame
+  marker and ignores P frames until the next I frame (as blackbox_decode)
+
+Two passes:
+1. A sequential pass walks the byte stream and stores the raw (unpredicted)
+   field values. Varints are built on decode_blackbox_frames'
+   decode_unsigned_vb/decode_signed_vb; runs of one-byte varints (most
+   deltas) are located with a regex and decoded in C. Logs over
+   PARALLEL_MIN_BYTES are cut into one chunk per CPU: every chunk after the
+   first starts at an I frame verified by SYNC_FRAMES clean frames after
+   it, and the chunks are joined only if their boundaries agree (otherwise
+   the log is rescanned sequentially).
+2. Predictors are applied with NumPy. Each I frame resets the history, so
+   P frame k of every I-frame group depends only on frames k-1 and k-2 of
+   the same group: the decoder steps k = 1..(frames per I interval) and
+   predicts that position for all groups and all fields at once, i.e.
+   ~16-32 vectorized steps for the whole log instead of a Python loop per
+   frame per field.
+
+One core scans ~30k (noisy deltas) to ~150k (SITL) main frames per second,
+so a 30-minute 1 kHz log (1.8M frames) takes seconds on a multi-core
+machine. Check with --bench.
+
+Values are returned as int32 (uint32 for unsigned fields), wrapped like
+blackbox_decode. Field names are the raw log names ('time',
+'rcData[3]'), without the CSV unit suffixes ('time (us)').
+
+Usage:
+    python3 blackbox_log.py LOG_00001.TXT                 # summary
+    python3 blackbox_log.py LOG_00001.TXT --fields time,navTgtVel[2]
+    python3 blackbox_log.py LOG_00001.TXT --bench         # decode speed
+
+From another script:
+    from blackbox_log import load_log
+    log = load_log('LOG_00001.TXT')
+    t = log.time_s
+    vz = log.main['navTgtVel[2]']
+"""
+
+import argparse
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from decode_blackbox_frames import decode_signed_vb, decode_unsigned_vb
+
+# Field encodings (blackbox_fielddefs.h)
+ENCODING_SIGNED_VB = 0
+ENCODING_UNSIGNED_VB = 1
+ENCODING_NEG_14BIT = 3
+ENCODING_TAG8_8SVB = 6
+ENCODING_TAG2_3S32 = 7
+ENCODING_TAG8_4S16 = 8
+ENCODING_NULL = 9
+ENCODING_TAG2_3SVARIABLE = 10
+
+# Field predictors
+PREDICT_0 = 0
+PREDICT_PREVIOUS = 1
+PREDICT_STRAIGHT_LINE = 2
+PREDICT_AVERAGE_2 = 3
+PREDICT_MINTHROTTLE = 4
+PREDICT_MOTOR_0 = 5
+PREDICT_INC = 6
+PREDICT_HOME_COORD = 7
+PREDICT_1500 = 8
+PREDICT_VBATREF = 9
+PREDICT_LAST_MAIN_FRAME_TIME = 10
+PREDICT_MINMOTOR = 11
+
+# Events
+EVENT_SYNC_BEEP = 0
+EVENT_INFLIGHT_ADJUSTMENT = 13
+EVENT_LOGGING_RESUME = 14
+EVENT_FLIGHTMODE = 30
+EVENT_LOG_END = 255
+
+FRAME_MARKERS = b'IPGHSE'
+_MARKER_RE = re.compile(b'[IPGHSE]')
+LOG_START = b'H Product:'
+LOG_END_MESSAGE = b'End of log'
+
+# Zigzag decode of single-byte signed varints (0..127)
+_ZIGZAG = tuple((b >> 1) ^ -(b & 1) for b in range(128))
+_LONG_VARINT_RE = re.compile(b'[\x80-\xff]')
+# Field values are at most 32 bits; longer varints only come from garbage
+_VB_LIMIT = 1 << 32
+
+# Iteration sanity limit between main frames (same as blackbox_decode)
+MAX_ITERATION_JUMP = 500 * 10
+
+# Logs at least this big are scanned in parallel chunks
+PARALLEL_MIN_BYTES = 8 << 20
+# Clean frames required after a candidate I frame to start a chunk there
+SYNC_FRAMES = 8
+# Raw values buffered as Python ints before packing into an int64 array
+_FLUSH_VALUES = 1 << 20
+
+_STAT_KEYS = ('I', 'P', 'G', 'H', 'S', 'E', 'corrupt', 'skipped_bytes', 'p_without_i')
+
+# Sequential-pass ops, one per run of fields sharing an encoding
+_OP_SVB, _OP_UVB, _OP_NEG14, _OP_NULL, _OP_TAG8_8SVB, _OP_TAG2_3S32, _OP_TAG8_4S16, \
+    _OP_TAG2_3SVAR, _OP_INC = range(9)
+
+
+class BlackboxFormatError(ValueError):
+    pass
+
+
+class FrameDef:
+    """Field layout of one frame type, parsed from the 'H Field X ...' headers."""
+
+    def __init__(self, names: List[str], signed: List[int], predictor: List[int],
+                 encoding: List[int]):
+        count = len(names)
+        if not (len(signed) == len(predictor) == len(encoding) == count):
+            raise BlackboxFormatError(
+                f"field definition lengths differ: {count} names, {len(signed)} signed, "
+                f"{len(predictor)} predictors, {len(encoding)} encodings")
+        self.names = names
+        self.signed = signed
+        self.predictor = predictor
+        self.encoding = encoding
+        self.index = {name: i for i, name in enumerate(names)}
+        self.plan = _compile_plan(predictor, encoding)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+
+def _compile_plan(predictor: List[int], encoding: List[int]) -> List[Tuple[int, int]]:
+    """
+    Turn per-field encodings into (op, count) runs for the sequential pass.
+
+    Tagged encodings become one op per group (TAG8_8SVB groups up to 8
+    consecutive fields, TAG2_3S32/TAG2_3SVARIABLE take 3, TAG8_4S16 takes 4).
+    INC fields read nothing; the pass fills them from the iteration counter.
+    """
+    simple = {ENCODING_SIGNED_VB: _OP_SVB, ENCODING_UNSIGNED_VB: _OP_UVB,
+              ENCODING_NEG_14BIT: _OP_NEG14, ENCODING_NULL: _OP_NULL}
+    fixed = {ENCODING_TAG2_3S32: (_OP_TAG2_3S32, 3), ENCODING_TAG8_4S16: (_OP_TAG8_4S16, 4),
+             ENCODING_TAG2_3SVARIABLE: (_OP_TAG2_3SVAR, 3)}
+    plan = []
+    count = len(encoding)
+    i = 0
+    while i < count:
+        if predictor[i] == PREDICT_INC:
+            op, width = _OP_INC, 1
+        elif encoding[i] in simple:
+            op, width = simple[encoding[i]], 1
+        elif encoding[i] == ENCODING_TAG8_8SVB:
+            width = 1
+            while width < 8 and i + width < count and encoding[i + width] == ENCODING_TAG8_8SVB \
+                    and predictor[i + width] != PREDICT_INC:
+                width += 1
+            plan.append((_OP_TAG8_8SVB, width))
+            i += width
+            continue
+        elif encoding[i] in fixed:
+            op, width = fixed[encoding[i]]
+            if i + width > count:
+                raise BlackboxFormatError(f"encoding {encoding[i]} group at field {i} runs past the frame")
+            plan.append((op, width))
+            i += width
+            continue
+        else:
+            raise BlackboxFormatError(f"unsupported encoding {encoding[i]} at field {i}")
+
+        if plan and plan[-1][0] == op and op != _OP_INC:
+            plan[-1] = (op, plan[-1][1] + 1)
+        else:
+            plan.append((op, width))
+        i += 1
+    return plan
+
+
+def _sign_extend(value: int, bits: int) -> int:
+    sign = 1 << (bits - 1)
+    return (value & (sign - 1)) - (value & sign)
+
+
+def _read_tag2_3s32(data, pos: int, append) -> int:
+    lead = data[pos]
+    pos += 1
+    selector = lead >> 6
+    if selector == 0:
+        append(_sign_extend((lead >> 4) & 0x03, 2))
+        append(_sign_extend((lead >> 2) & 0x03, 2))
+        append(_sign_extend(lead & 0x03, 2))
+    elif selector == 1:
+        append(_sign_extend(lead & 0x0F, 4))
+        byte = data[pos]
+        pos += 1
+        append(_sign_extend(byte >> 4, 4))
+        append(_sign_extend(byte & 0x0F, 4))
+    elif selector == 2:
+        append(_sign_extend(lead & 0x3F, 6))
+        append(_sign_extend(data[pos] & 0x3F, 6))
+        append(_sign_extend(data[pos + 1] & 0x3F, 6))
+        pos += 2
+    else:
+        pos = _read_tag2_wide(data, pos, lead, append)
+    return pos
+
+
+def _read_tag2_wide(data, pos: int, lead: int, append) -> int:
+    """Selector 3 of TAG2_3S32/TAG2_3SVARIABLE: 8/16/24/32-bit fields."""
+    for _ in range(3):
+        width = (lead & 0x03) + 1
+        if pos + width > len(data):
+            raise IndexError("truncated TAG2 field")
+        append(int.from_bytes(data[pos:pos + width], 'little', signed=True))
+        pos += width
+        lead >>= 2
+    return pos
+
+
+def _read_tag2_3svariable(data, pos: int, append) -> int:
+    lead = data[pos]
+    pos += 1
+    selector = lead >> 6
+    if selector == 0:
+        append(_sign_extend((lead >> 4) & 0x03, 2))
+        append(_sign_extend((lead >> 2) & 0x03, 2))
+        append(_sign_extend(lead & 0x03, 2))
+    elif selector == 1:
+        # 5-5-4 bits
+        byte1 = data[pos]
+        pos += 1
+        append(_sign_extend((lead & 0x3E) >> 1, 5))
+        append(_sign_extend(((lead & 0x01) << 4) | (byte1 >> 4), 5))
+        append(_sign_extend(byte1 & 0x0F, 4))
+    elif selector == 2:
+        # 8-7-7 bits
+        byte1 = data[pos]
+        byte2 = data[pos + 1]
+        pos += 2
+        append(_sign_extend(((lead & 0x3F) << 2) | (byte1 >> 6), 8))
+        append(_sign_extend(((byte1 & 0x3F) << 1) | (byte2 >> 7), 7))
+        append(_sign_extend(byte2 & 0x7F, 7))
+    else:
+        pos = _read_tag2_wide(data, pos, lead, append)
+    return pos
+
+
+def _read_tag8_4s16(data, pos: int, append) -> int:
+    """Data version 2 layout: 2-bit selectors for 0/4/8/16-bit fields, nibble packed."""
+    selector = data[pos]
+    pos += 1
+    nibble = False
+    buffer = 0
+    for _ in range(4):
+        kind = selector & 0x03
+        if kind == 0:
+            append(0)
+        elif kind == 1:
+            if not nibble:
+                buffer = data[pos]
+                pos += 1
+                append(_sign_extend(buffer >> 4, 4))
+            else:
+                append(_sign_extend(buffer & 0x0F, 4))
+            nibble = not nibble
+        elif kind == 2:
+            if not nibble:
+                append(_sign_extend(data[pos], 8))
+                pos += 1
+            else:
+                high = (buffer << 4) & 0xF0
+                buffer = data[pos]
+                pos += 1
+                append(_sign_extend(high | (buffer >> 4), 8))
+        else:
+            if not nibble:
+                append(_sign_extend((data[pos] << 8) | data[pos + 1], 16))
+                pos += 2
+            else:
+                byte1 = data[pos]
+                byte2 = data[pos + 1]
+                pos += 2
+                append(_sign_extend(((buffer & 0x0F) << 12) | (byte1 << 4) | (byte2 >> 4), 16))
+                buffer = byte2
+        selector >>= 2
+    return pos
+
+
+def _read_fields(data, pos: int, plan, out: List[int], iteration: int) -> int:
+    """Decode one frame body per plan, appending raw values to out."""
+    append = out.append
+    search_long = _LONG_VARINT_RE.search
+    zigzag = _ZIGZAG.__getitem__
+    for op, count in plan:
+        if op == _OP_SVB:
+            while count:
+                # Fields before the next multi-byte varint are one byte each:
+                # decode that stretch in C, then the long one in Python
+                match = search_long(data, pos, pos + count)
+                short = (match.start() if match else pos + count) - pos
+                if short:
+                    out.extend(map(zigzag, data[pos:pos + short]))
+                    pos += short
+                    count -= short
+                if count:
+                    value, pos = decode_signed_vb(data, pos)
+                    if not -_VB_LIMIT < value < _VB_LIMIT:
+                        raise OverflowError("varint longer than 32 bits")
+                    append(value)
+                    count -= 1
+        elif op == _OP_UVB:
+            while count:
+                match = search_long(data, pos, pos + count)
+                short = (match.start() if match else pos + count) - pos
+                if short:
+                    out.extend(data[pos:pos + short])
+                    pos += short
+                    count -= short
+                if count:
+                    value, pos = decode_unsigned_vb(data, pos)
+                    if value >= _VB_LIMIT:
+                        raise OverflowError("varint longer than 32 bits")
+                    append(value)
+                    count -= 1
+        elif op == _OP_TAG8_8SVB:
+            if count == 1:
+                value, pos = decode_signed_vb(data, pos)
+                if not -_VB_LIMIT < value < _VB_LIMIT:
+                    raise OverflowError("varint longer than 32 bits")
+                append(value)
+            else:
+                header = data[pos]
+                pos += 1
+                for _ in range(count):
+                    if header & 1:
+                        byte = data[pos]
+                        if byte < 0x80:
+                            pos += 1
+                            append(_ZIGZAG[byte])
+                        else:
+                            value, pos = decode_signed_vb(data, pos)
+                            if not -_VB_LIMIT < value < _VB_LIMIT:
+                                raise OverflowError("varint longer than 32 bits")
+                            append(value)
+                    else:
+                        append(0)
+                    header >>= 1
+        elif op == _OP_TAG2_3S32:
+            pos = _read_tag2_3s32(data, pos, append)
+        elif op == _OP_TAG8_4S16:
+            pos = _read_tag8_4s16(data, pos, append)
+        elif op == _OP_TAG2_3SVAR:
+            pos = _read_tag2_3svariable(data, pos, append)
+        elif op == _OP_NULL:
+            for _ in range(count):
+                append(0)
+        elif op == _OP_NEG14:
+            for _ in range(count):
+                value, pos = decode_unsigned_vb(data, pos)
+                append(-_sign_extend(value, 14))
+        else:  # _OP_INC: filled with the absolute iteration
+            append(iteration)
+    if pos > len(data):
+        raise IndexError("frame runs past end of data")
+    return pos
+
+
+def _to_field(values: np.ndarray, signed: bool) -> np.ndarray:
+    """Wrap int64 predictor results to the field's 32-bit type, like the firmware."""
+    wrapped = (values & 0xFFFFFFFF).astype(np.uint32)
+    return wrapped.view(np.int32) if signed else wrapped
+
+
+class BlackboxLog:
+    """
+    One decoded log (a file may hold several, one per arm).
+
+    main:      I+P frame fields, one array per field name (int32, or uint32
+               for unsigned fields such as time and loopIteration)
+    gps:       G frame fields, plus 'main_index' (last main frame before it)
+    gps_home:  H frame fields, plus 'main_index'
+    slow:      S frame fields, plus 'main_index'
+    events:    list of dicts ({'type', 'name', 'main_index', ...})
+    stats:     frame counts per type, corrupt frames, bytes skipped
+    """
+
+    def __init__(self, headers: Dict[str, str], frame_defs: Dict[str, FrameDef]):
+        self.headers = headers
+        self.frame_defs = frame_defs
+        self.main: Dict[str, np.ndarray] = {}
+        self.gps: Dict[str, np.ndarray] = {}
+        self.gps_home: Dict[str, np.ndarray] = {}
+        self.slow: Dict[str, np.ndarray] = {}
+        self.events: List[dict] = []
+        self.is_intra = np.zeros(0, dtype=bool)
+        self.stats = dict.fromkeys(_STAT_KEYS, 0)
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.is_intra)
+
+    @property
+    def field_names(self) -> List[str]:
+        return list(self.frame_defs['I'].names)
+
+    @property
+    def time_s(self) -> np.ndarray:
+        """Main frame timestamps in seconds from the first frame."""
+        t = self.main['time'].astype(np.int64)
+        return (t - t[0]) / 1e6 if len(t) else t.astype(np.float64)
+
+    @property
+    def duration_s(self) -> float:
+        t = self.main.get('time')
+        return (int(t[-1]) - int(t[0])) / 1e6 if t is not None and len(t) > 1 else 0.0
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        for group in (self.main, self.gps, self.slow, self.gps_home):
+            if name in group:
+                return group[name]
+        raise KeyError(name)
+
+    def __contains__(self, name: str) -> bool:
+        return any(name in group for group in (self.main, self.gps, self.slow, self.gps_home))
+
+
+def _parse_int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(',')] if value else []
+
+
+def _parse_headers(data, pos: int, end: int) -> Tuple[Dict[str, str], int]:
+    """Read consecutive 'H name:value' lines. Returns (headers, offset of binary data)."""
+    headers = {}
+    while pos < end and data[pos:pos + 2] == b'H ':
+        line_end = data.find(b'\n', pos, end)
+        if line_end < 0:
+            line_end = end
+        line = data[pos + 2:line_end].decode('latin-1').rstrip('\r')
+        name, _, value = line.partition(':')
+        headers[name] = value
+        pos = line_end + 1
+    return headers, pos
+
+
+def _build_frame_defs(headers: Dict[str, str]) -> Dict[str, FrameDef]:
+    defs = {}
+    for frame_type in 'IPGHS':
+        names = headers.get(f'Field {frame_type} name')
+        if frame_type == 'P':
+            names = names or headers.get('Field I name')
+        if not names or f'Field {frame_type} encoding' not in headers:
+            continue
+        names = names.split(',')
+        signed = headers.get(f'Field {frame_type} signed')
+        if signed is None and frame_type == 'P':
+            signed = headers.get('Field I signed')
+        signed = _parse_int_list(signed) if signed else [0] * len(names)
+        defs[frame_type] = FrameDef(names, signed,
+                                    _parse_int_list(headers[f'Field {frame_type} predictor']),
+                                    _parse_int_list(headers[f'Field {frame_type} encoding']))
+    if 'I' not in defs or 'P' not in defs:
+        raise BlackboxFormatError("log headers have no I/P field definitions")
+    if len(defs['I']) != len(defs['P']):
+        raise BlackboxFormatError(f"I frame has {len(defs['I'])} fields but P frame has {len(defs['P'])}")
+    return defs
+
+
+def _frame_interval(headers: Dict[str, str]) -> Tuple[int, int, int]:
+    """(I interval, P numerator, P denominator) from 'I interval' / 'P interval'."""
+    i_interval = max(1, int(headers.get('I interval', '32')))
+    p_interval = headers.get('P interval', '1/1')
+    if '/' in p_interval:
+        num, denom = (int(v) for v in p_interval.split('/', 1))
+    else:
+        num, denom = 1, int(p_interval)
+    return i_interval, max(1, num), max(1, denom)
+
+
+class _Constants:
+    """Sysconfig values referenced by predictors."""
+
+    def __init__(self, headers: Dict[str, str]):
+        self.minthrottle = int(headers.get('minthrottle', '1150'))
+        self.vbatref = int(headers.get('vbatref', '0'))
+        motor_output = headers.get('motorOutput')
+        self.minmotor = int(motor_output.split(',')[0]) if motor_output else self.minthrottle
+
+    def offset(self, predictor: int) -> int:
+        if predictor == PREDICT_MINTHROTTLE:
+            return self.minthrottle
+        if predictor == PREDICT_1500:
+            return 1500
+        if predictor == PREDICT_VBATREF:
+            return self.vbatref
+        if predictor == PREDICT_MINMOTOR:
+            return self.minmotor
+        return 0
+
+
+def _read_event(data, pos: int) -> Tuple[Optional[dict], int]:
+    """Decode an E frame body at pos. Returns (event, new pos); event None = unknown type."""
+    event_type = data[pos]
+    pos += 1
+    if event_type == EVENT_SYNC_BEEP:
+        beep_time, pos = decode_unsigned_vb(data, pos)
+        return {'type': event_type, 'name': 'SYNC_BEEP', 'time': beep_time}, pos
+    if event_type == EVENT_INFLIGHT_ADJUSTMENT:
+        function = data[pos]
+        pos += 1
+        if function & 0x80:
+            value = struct.unpack_from('<f', data, pos)[0]
+            pos += 4
+        else:
+            value, pos = decode_signed_vb(data, pos)
+        return {'type': event_type, 'name': 'INFLIGHT_ADJUSTMENT',
+                'function': function & 0x7F, 'value': value}, pos
+    if event_type == EVENT_LOGGING_RESUME:
+        iteration, pos = decode_unsigned_vb(data, pos)
+        resume_time, pos = decode_unsigned_vb(data, pos)
+        return {'type': event_type, 'name': 'LOGGING_RESUME',
+                'iteration': iteration, 'time': resume_time}, pos
+    if event_type == EVENT_FLIGHTMODE:
+        flags, pos = decode_unsigned_vb(data, pos)
+        last_flags, pos = decode_unsigned_vb(data, pos)
+        return {'type': event_type, 'name': 'FLIGHTMODE', 'flags': flags, 'last_flags': last_flags}, pos
+    if event_type == EVENT_LOG_END:
+        # 'End of log\0', or 'End of log (disarm reason:N)\0' on newer firmware
+        if data[pos:pos + len(LOG_END_MESSAGE)] == LOG_END_MESSAGE:
+            term = data.find(b'\x00', pos, pos + 64)
+            if term >= 0:
+                message = data[pos:term].decode('latin-1')
+                return {'type': event_type, 'name': 'LOG_END', 'message': message}, term + 1
+    return None, pos
+
+
+class _SideStream:
+    """Raw values of one G/H/S frame stream and where each frame sat in the log."""
+
+    def __init__(self):
+        self.raw: List[int] = []
+        self.main_index: List[int] = []   # last main frame before this one (-1 = none)
+        self.home_index: List[int] = []   # G only: last H frame before this one
+
+
+class _Scan:
+    """Result of the sequential pass over one byte range of a log."""
+
+    def __init__(self, defs: Dict[str, FrameDef], start: int):
+        self.start = start          # offset the scan began at
+        self.stop = start           # offset it ended at
+        self.ended = False          # reached end of data or a LOG_END event
+        self.main_chunks: List[np.ndarray] = []
+        self.intra = bytearray()
+        self.side = {t: _SideStream() for t in 'GHS' if t in defs}
+        self.events: List[dict] = []
+        self.stats = dict.fromkeys(_STAT_KEYS, 0)
+
+
+def _scan(defs: Dict[str, FrameDef], interval: Tuple[int, int, int], data, pos: int, end: int,
+          stop_at: Optional[int] = None, max_frames: Optional[int] = None) -> _Scan:
+    """
+    Sequential pass: raw field values and frame bookkeeping for data[pos:end].
+
+    stop_at: stop before the first valid I frame starting at or after this
+    offset (chunk boundary for parallel decoding). max_frames: stop after
+    that many main frames (sync probing).
+    """
+    scan = _Scan(defs, pos)
+    stats = scan.stats
+    intra = scan.intra
+    i_plan = defs['I'].plan
+    p_plan = defs['P'].plan
+    side = {ord(t): (defs[t].plan, stream) for t, stream in scan.side.items()}
+    homes = scan.side.get('H')
+    i_interval, p_num, p_denom = interval
+
+    main_raw: List[int] = []
+    last_iteration = -1
+    stream_valid = False
+    markers = FRAME_MARKERS
+
+    while pos < end:
+        marker = data[pos]
+        frame_start = pos
+        pos += 1
+        plan, stream = side.get(marker, (None, None))
+        mark = len(stream.raw) if stream else len(main_raw)
+        try:
+            if marker == 0x50:  # 'P'
+                if not stream_valid:
+                    stats['p_without_i'] += 1
+                    pos = _resync(data, frame_start + 1, end, stats)
+                    continue
+                # Skip iterations the logging rate leaves out (shouldHaveFrame)
+                iteration = last_iteration + 1
+                while (iteration % i_interval + p_num - 1) % p_denom >= p_num:
+                    iteration += 1
+                pos = _read_fields(data, pos, p_plan, main_raw, iteration)
+                is_i = False
+            elif marker == 0x49:  # 'I'
+                pos = _read_fields(data, pos, i_plan, main_raw, 0)
+                iteration = main_raw[mark]
+                is_i = True
+            elif stream:
+                pos = _read_fields(data, pos, plan, stream.raw, 0)
+                if pos < end and data[pos] not in markers:
+                    del stream.raw[mark:]
+                    stats['corrupt'] += 1
+                    pos = _resync(data, frame_start + 1, end, stats)
+                    continue
+                stream.main_index.append(len(intra) - 1)
+                if marker == 0x47:  # 'G'
+                    stream.home_index.append(len(homes.main_index) - 1 if homes else -1)
+                stats[chr(marker)] += 1
+                continue
+            elif marker == 0x45:  # 'E'
+                event, pos = _read_event(data, pos)
+                if event is None or (event['type'] != EVENT_LOG_END and pos < end
+                                     and data[pos] not in markers):
+                    stats['corrupt'] += 1
+                    pos = _resync(data, frame_start + 1, end, stats)
+                    continue
+                event['main_index'] = len(intra) - 1
+                scan.events.append(event)
+                stats['E'] += 1
+                if event['type'] == EVENT_LOGGING_RESUME:
+                    last_iteration = event['iteration']
+                elif event['type'] == EVENT_LOG_END:
+                    scan.ended = True
+                    break
+                continue
+            else:
+                pos = _resync(data, frame_start + 1, end, stats)
+                continue
+        except (IndexError, OverflowError, struct.error):
+            # Truncated at end of log, or a garbage varint
+            if stream:
+                del stream.raw[mark:]
+            else:
+                del main_raw[mark:]
+                stream_valid = False
+            stats['corrupt'] += 1
+            pos = _resync(data, frame_start + 1, end, stats)
+            continue
+
+        valid = pos >= end or data[pos] in markers
+        if valid and last_iteration >= 0:
+            # >=, as in blackbox-tools: the I frame after a LOGGING_RESUME event
+            # carries the iteration the event set
+            valid = last_iteration <= iteration <= last_iteration + MAX_ITERATION_JUMP or \
+                (is_i and not stream_valid)
+        if not valid:
+            del main_raw[mark:]
+            stats['corrupt'] += 1
+            stream_valid = False
+            pos = _resync(data, frame_start + 1, end, stats)
+            continue
+        if is_i and stop_at is not None and frame_start >= stop_at:
+            del main_raw[mark:]
+            pos = frame_start
+            break
+
+        intra.append(is_i)
+        stats['I' if is_i else 'P'] += 1
+        last_iteration = iteration
+        stream_valid = True
+        if len(main_raw) >= _FLUSH_VALUES:
+            scan.main_chunks.append(np.array(main_raw, dtype=np.int64))
+            main_raw = []
+        if max_frames is not None and len(intra) >= max_frames:
+            break
+
+    if main_raw:
+        scan.main_chunks.append(np.array(main_raw, dtype=np.int64))
+    scan.stop = min(pos, end)
+    scan.ended = scan.ended or pos >= end
+    return scan
+
+
+def _resync(data, pos: int, end: int, stats: dict) -> int:
+    """Skip to the next byte that could start a frame."""
+    match = _MARKER_RE.search(data, pos, end)
+    next_pos = match.start() if match else end
+    stats['skipped_bytes'] += next_pos - pos
+    return next_pos
+
+
+def _find_sync(defs: Dict[str, FrameDef], interval: Tuple[int, int, int], data,
+               pos: int, end: int) -> int:
+    """First offset >= pos where an I frame starts a clean run of SYNC_FRAMES frames."""
+    while True:
+        candidate = data.find(b'I', pos, end)
+        if candidate < 0:
+            return end
+        probe = _scan(defs, interval, data, candidate, end, max_frames=SYNC_FRAMES)
+        clean = not (probe.stats['corrupt'] or probe.stats['skipped_bytes'] or probe.stats['p_without_i'])
+        if clean and probe.intra[:1] == b'\x01' and (len(probe.intra) == SYNC_FRAMES or probe.ended):
+            return candidate
+        pos = candidate + 1
+
+
+def _scan_chunk(path: str, headers: Dict[str, str], start: int, stop: Optional[int],
+                end: int, sync: bool) -> _Scan:
+    """Worker: scan one chunk of a log file (mapped, not read) in a subprocess."""
+    defs = _build_frame_defs(headers)
+    interval = _frame_interval(headers)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        if sync:
+            start = _find_sync(defs, interval, data, start, end)
+        return _scan(defs, interval, data, start, end, stop_at=stop)
+
+
+def _merge_scans(scans: List[_Scan]) -> Optional[_Scan]:
+    """
+    Join chunk scans into one, renumbering frame indexes.
+
+    Returns None if neighbouring chunks disagree on where one ends and the
+    next starts (a corrupt region straddling a boundary); the caller then
+    rescans sequentially.
+    """
+    merged = scans[0]
+    frames = len(merged.intra)
+    homes = len(merged.side['H'].main_index) if 'H' in merged.side else 0
+    for scan in scans[1:]:
+        if merged.ended:
+            break
+        if scan.start != merged.stop:
+            return None
+        for event in scan.events:
+            event['main_index'] += frames
+        merged.events.extend(scan.events)
+        for frame_type, stream in scan.side.items():
+            target = merged.side[frame_type]
+            target.raw.extend(stream.raw)
+            target.main_index.extend(i + frames for i in stream.main_index)
+            target.home_index.extend(i + homes for i in stream.home_index)
+        for key, count in scan.stats.items():
+            merged.stats[key] += count
+        merged.main_chunks.extend(scan.main_chunks)
+        merged.intra.extend(scan.intra)
+        merged.stop = scan.stop
+        merged.ended = scan.ended
+        frames += len(scan.intra)
+        homes += len(scan.side['H'].main_index) if 'H' in scan.side else 0
+    return merged
+
+
+def _predict_main(values: np.ndarray, intra: np.ndarray, defs: Dict[str, FrameDef],
+                  consts: _Constants):
+    """
+    Apply I/P predictors in place to raw values (frames x fields), vectorized.
+
+    I rows only use constant predictors (plus MOTOR_0). P row k of an I-frame
+    group needs rows k-1 and k-2 of the same group (both the I row for k=1),
+    so all groups advance one position per step.
+    """
+    frames = len(values)
+    if not frames:
+        return
+
+    i_def, p_def = defs['I'], defs['P']
+    motor0 = i_def.index.get('motor[0]', -1)
+
+    def apply_constants(out, predictors):
+        for j, predictor in enumerate(predictors):
+            offset = consts.offset(predictor)
+            if offset:
+                out[:, j] += offset
+        for j, predictor in enumerate(predictors):
+            if predictor == PREDICT_MOTOR_0:
+                if motor0 < 0:
+                    raise BlackboxFormatError("MOTOR_0 predictor used but no motor[0] field")
+                out[:, j] += out[:, motor0]
+
+    intra_rows = np.flatnonzero(intra)
+    block = values[intra_rows]
+    apply_constants(block, i_def.predictor)
+    values[intra_rows] = block
+
+    # Position of each row within its I-frame group
+    rows = np.arange(frames)
+    position = rows - np.maximum.accumulate(np.where(intra, rows, 0))
+
+    p_pred = np.array(p_def.predictor)
+    previous = np.flatnonzero(p_pred == PREDICT_PREVIOUS)
+    straight = np.flatnonzero(p_pred == PREDICT_STRAIGHT_LINE)
+    average = np.flatnonzero(p_pred == PREDICT_AVERAGE_2)
+
+    order = np.argsort(position, kind='stable')
+    bounds = np.searchsorted(position[order], np.arange(position.max() + 2))
+    for k in range(1, position.max() + 1):
+        at_k = order[bounds[k]:bounds[k + 1]]
+        prev1 = values[at_k - 1]
+        prev2 = values[at_k - 2] if k > 1 else prev1
+        out = values[at_k]
+        out[:, previous] += prev1[:, previous]
+        out[:, straight] += 2 * prev1[:, straight] - prev2[:, straight]
+        total = prev1[:, average] + prev2[:, average]
+        # C integer division truncates toward zero
+        out[:, average] += np.where(total < 0, -((-total) // 2), total // 2)
+        apply_constants(out, p_def.predictor)
+        values[at_k] = out
+
+
+def _finish_side(frame_def: FrameDef, stream: _SideStream, consts: _Constants,
+                 main_time: Optional[np.ndarray] = None,
+                 home: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+    """Apply G/H/S predictors. These frames keep no history, so PREVIOUS predicts 0."""
+    values = np.array(stream.raw, dtype=np.int64).reshape(-1, len(frame_def))
+    index = np.array(stream.main_index, dtype=np.int64)
+    for j, predictor in enumerate(frame_def.predictor):
+        values[:, j] += consts.offset(predictor)
+        if predictor == PREDICT_HOME_COORD and home is not None:
+            # blackbox_decode predicts GPS_coord[1] from GPS_home[1]
+            values[:, j] += home[:, 1 if frame_def.names[j] == 'GPS_coord[1]' else 0]
+        elif predictor == PREDICT_LAST_MAIN_FRAME_TIME and main_time is not None and len(main_time):
+            values[:, j] += np.where(index >= 0, main_time[np.maximum(index, 0)], 0)
+    out = {name: _to_field(values[:, j], bool(frame_def.signed[j]))
+           for j, name in enumerate(frame_def.names)}
+    out['main_index'] = index
+    return out
+
+
+def _home_for_gps(log: BlackboxLog, gps: _SideStream) -> np.ndarray:
+    """GPS_home[0..1] in effect at each G frame (0 before the first H frame)."""
+    ref = np.array(gps.home_index, dtype=np.int64)
+    home = np.zeros((len(ref), 2), dtype=np.int64)
+    coords = [log.gps_home.get('GPS_home[0]'), log.gps_home.get('GPS_home[1]')]
+    if coords[0] is None or not len(coords[0]):
+        return home
+    table = np.stack([c if c is not None else np.zeros_like(coords[0]) for c in coords], axis=1)
+    known = ref >= 0
+    home[known] = table[ref[known]]
+    return home
+
+
+def _build_log(headers: Dict[str, str], defs: Dict[str, FrameDef], scan: _Scan) -> BlackboxLog:
+    """Vectorized pass: predictors over the raw values of a (merged) scan."""
+    log = BlackboxLog(headers, defs)
+    log.events = scan.events
+    log.stats = scan.stats
+    consts = _Constants(headers)
+    i_def = defs['I']
+
+    if scan.main_chunks:
+        values = np.concatenate(scan.main_chunks).reshape(-1, len(i_def))
+    else:
+        values = np.zeros((0, len(i_def)), dtype=np.int64)
+    scan.main_chunks = []
+    log.is_intra = np.frombuffer(bytes(scan.intra), dtype=np.uint8).astype(bool)
+    _predict_main(values, log.is_intra, defs, consts)
+    log.main = {name: _to_field(values[:, j], bool(i_def.signed[j]))
+                for j, name in enumerate(i_def.names)}
+    del values
+
+    if 'H' in scan.side:
+        log.gps_home = _finish_side(defs['H'], scan.side['H'], consts)
+    if 'S' in scan.side:
+        log.slow = _finish_side(defs['S'], scan.side['S'], consts)
+    if 'G' in scan.side:
+        log.gps = _finish_side(defs['G'], scan.side['G'], consts, log.main.get('time'),
+                               _home_for_gps(log, scan.side['G']))
+    return log
+
+
+def _log_bounds(data) -> List[Tuple[int, int]]:
+    """(start, end) of every log in a file image, split on 'H Product:'."""
+    starts = []
+    pos = data.find(LOG_START)
+    while pos >= 0:
+        starts.append(pos)
+        pos = data.find(LOG_START, pos + 1)
+    if not starts:
+        raise BlackboxFormatError("no 'H Product:' header found - not a blackbox log")
+    return list(zip(starts, starts[1:] + [len(data)]))
+
+
+def _check_version(headers: Dict[str, str], defs: Dict[str, FrameDef]):
+    data_version = int(headers.get('Data version', '2'))
+    if data_version != 2 and any(ENCODING_TAG8_4S16 in d.encoding for d in defs.values()):
+        raise BlackboxFormatError(f"TAG8_4S16 is only supported for data version 2 (log has {data_version})")
+
+
+def decode_logs(data) -> List[BlackboxLog]:
+    """Decode every log in a blackbox file image (bytes or mmap), single process."""
+    logs = []
+    for start, end in _log_bounds(data):
+        headers, pos = _parse_headers(data, start, end)
+        defs = _build_frame_defs(headers)
+        _check_version(headers, defs)
+        logs.append(_build_log(headers, defs, _scan(defs, _frame_interval(headers), data, pos, end)))
+    return logs
+
+
+def decode_file(path: str, workers: Optional[int] = None) -> List[BlackboxLog]:
+    """
+    Decode every log in a file.
+
+    Logs larger than PARALLEL_MIN_BYTES are split into chunks scanned by
+    `workers` processes (default: CPU count). Each chunk after the first
+    starts at a verified I frame; the result is identical to a sequential
+    decode.
+    """
+    workers = workers or os.cpu_count() or 1
+    logs = []
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        bounds = _log_bounds(data)
+        for start, end in bounds:
+            headers, pos = _parse_headers(data, start, end)
+            defs = _build_frame_defs(headers)
+            _check_version(headers, defs)
+            interval = _frame_interval(headers)
+
+            scan = None
+            if workers > 1 and end - pos >= PARALLEL_MIN_BYTES:
+                splits = [pos + (end - pos) * n // workers for n in range(workers)] + [end]
+                with ProcessPoolExecutor(workers) as pool:
+                    futures = [pool.submit(_scan_chunk, path, headers, splits[n],
+                                           splits[n + 1] if n + 1 < workers else None, end, n > 0)
+                               for n in range(workers)]
+                    scan = _merge_scans([future.result() for future in futures])
+            if scan is None:
+                scan = _scan(defs, interval, data, pos, end)
+            logs.append(_build_log(headers, defs, scan))
+    return logs
+
+
+def load_log(path: str, index: int = -1, workers: Optional[int] = None) -> BlackboxLog:
+    """Decode one log from a file (default: the last one, i.e. the latest arm)."""
+    return decode_file(path, workers)[index]
+
+
+def _print_summary(path: str, logs: List[BlackboxLog]):
+    print(f"{path}: {len(logs)} log(s)")
+    for n, log in enumerate(logs):
+        s = log.stats
+        firmware = log.headers.get('Firmware revision', '?')
+        rate = log.frame_count / log.duration_s if log.duration_s else 0.0
+        print(f"\n[{n}] {firmware}")
+        print(f"  Main frames: {log.frame_count} (I {s['I']}, P {s['P']}), "
+              f"{log.duration_s:.1f}s @ {rate:.0f} Hz")
+        print(f"  G {s['G']}, H {s['H']}, S {s['S']}, E {s['E']}; corrupt {s['corrupt']}, "
+              f"skipped {s['skipped_bytes']} bytes")
+        print(f"  Fields: {len(log.field_names)} main, {len(log.gps) - 1 if log.gps else 0} GPS, "
+              f"{len(log.slow) - 1 if log.slow else 0} slow")
+
+
+def _print_fields(log: BlackboxLog, names: List[str]):
+    print(f"\n  {'field':<24} {'min':>12} {'max':>12} {'mean':>14}")
+    for name in names:
+        if name not in log:
+            print(f"  {name:<24} (not in log)")
+            continue
+        column = log[name]
+        if not len(column):
+            print(f"  {name:<24} (no samples)")
+            continue
+        print(f"  {name:<24} {column.min():>12} {column.max():>12} {column.mean():>14.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Decode an INAV blackbox log to NumPy columns')
+    parser.add_argument('log', help='Blackbox .TXT/.BBL file')
+    parser.add_argument('--index', type=int, help='Only show this log within the file')
+    parser.add_argument('--fields', help='Comma-separated fields to summarise (min/max/mean)')
+    parser.add_argument('--workers', type=int, help='Decode processes for large logs (default: CPU count)')
+    parser.add_argument('--bench', action='store_true', help='Time the decode')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    try:
+        logs = decode_file(args.log, args.workers)
+    except BlackboxFormatError as e:
+        print(f"ERROR: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - start
+
+    if args.index is not None:
+        logs = [logs[args.index]]
+    _print_summary(args.log, logs)
+    if args.fields:
+        for log in logs:
+            _print_fields(log, args.fields.split(','))
+
+    if args.bench:
+        size = os.path.getsize(args.log)
+        frames = sum(log.frame_count for log in logs)
+        fields = max(len(log.field_names) for log in logs)
+        print(f"\nDecoded {size / 1e6:.1f} MB, {frames} main frames x {fields} fields in {elapsed:.2f}s "
+              f"({size / 1e6 / elapsed:.1f} MB/s, {frames / elapsed:,.0f} frames/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -11,14 +11,19 @@ Usage:
   2. python3 blackbox_mc_althold_test.py
 """
 
-import sys, time, os, struct, threading, socket, subprocess, glob
+import sys, time, os, struct, threading, socket, glob
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'msp'))
+from msp_frame import MSPFrameDecoder, encode_v1, encode_v2
+from blackbox_log import BlackboxFormatError, load_log
+from stability_segments import RollingStats, time_windows
 
 SITL_HOST = 'localhost'
 RC_PORT   = 5761
 MSP_PORT  = 5760
 
 SITL_DIR  = "/home/raymorris/Documents/planes/inavflight/inav2/build_sitl_pr11359"
-DECODER   = "/home/raymorris/Documents/planes/inavflight/blackbox-tools/obj/blackbox_decode"
 
 MAX_CLIMB         = 700
 ALT_HOLD_DEADBAND = 40
@@ -61,58 +66,25 @@ BLOCKING_BITS = (BIT_CALIB | BIT_RC_LINK | BIT_THROTTLE | BIT_CLI |
                  (1<<1) | (1<<11) | (1<<12))
 
 
-def _crc8(data):
-    crc = 0
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            crc = ((crc << 1) ^ 0xD5) & 0xFF if (crc & 0x80) else (crc << 1) & 0xFF
-    return crc
-
 def v1(cmd, data=None):
-    d = bytes(data or [])
-    cs = len(d) ^ cmd
-    for b in d: cs ^= b
-    return bytes([0x24, 0x4D, 0x3C, len(d), cmd]) + d + bytes([cs])
+    return encode_v1(cmd, bytes(data or []))
 
 def v2(cmd, data=None):
-    p = bytes(data or [])
-    h = bytes([0x24, 0x58, 0x3C, 0x00,
-               cmd & 0xFF, (cmd >> 8) & 0xFF,
-               len(p) & 0xFF, (len(p) >> 8) & 0xFF])
-    return h + p + bytes([_crc8(h[3:] + p)])
-
-def parse(buf):
-    i = 0
-    while i < len(buf) - 4:
-        if buf[i] == 0x24:
-            if buf[i+1] == 0x4D and i+5 <= len(buf):
-                sz = buf[i+3]
-                if i+5+sz <= len(buf):
-                    return buf[i+4], buf[i+5:i+5+sz]
-            elif buf[i+1] == 0x58 and i+9 <= len(buf):
-                sz  = buf[i+6] | (buf[i+7] << 8)
-                cmd = buf[i+4] | (buf[i+5] << 8)
-                if i+9+sz <= len(buf):
-                    return cmd, buf[i+8:i+8+sz]
-        i += 1
-    return None, None
+    return encode_v2(cmd, bytes(data or []))
 
 def xchg(sock, frame, timeout=1.5):
     try: sock.sendall(frame)
     except Exception as e:
         print(f"  send error: {e}"); return None, None
     sock.settimeout(timeout)
-    buf, dl = b"", time.time() + timeout
+    dec, dl = MSPFrameDecoder(), time.time() + timeout
     while time.time() < dl:
         try:
-            c = sock.recv(1024)
-            if not c: break
-            buf += c
-            cmd, d = parse(buf)
-            if cmd is not None: return cmd, d
+            if not dec.recv_from(sock): break
+            for f in dec.frames():
+                if not f.is_request: return f.cmd, bytes(f.payload)
         except socket.timeout: break
-    return parse(buf)
+    return None, None
 
 def send_drop(sock, frame):
     try:
@@ -329,15 +301,11 @@ def run_flight(rc_sock, msp_sock):
 def decode_and_analyze(logfile):
     print(f"\n[Decode] {logfile} ({os.path.getsize(logfile)} bytes)")
 
-    res = subprocess.run([DECODER, "--stdout", logfile],
-                         capture_output=True, text=True, timeout=60)
-    if res.returncode != 0:
-        print(f"  ERROR: rc={res.returncode}: {res.stderr[:500]}"); return
-    if not res.stdout.strip():
-        print(f"  ERROR: empty output"); return
-
-    lines = res.stdout.splitlines()
-    cols  = [c.strip() for c in lines[0].split(',')]
+    try:
+        log = load_log(logfile)
+    except BlackboxFormatError as e:
+        print(f"  ERROR: {e}"); return
+    cols = log.field_names
 
     # mcPosAxisP[2] = posControl.pids.pos[Z].output_constrained = targetVel = climbRateDemand
     # This is the direct output of the rcClimbRate formula, signed (negative = descend)
@@ -351,42 +319,25 @@ def decode_and_analyze(logfile):
         print(f"  mcPosAxisP[2]/navTgtVel[2] not found. Nav cols: {[c for c in cols if 'nav' in c.lower() or 'mc' in c.lower()]}")
         return
 
-    vz_idx   = cols.index(vz_col)
-    time_idx = cols.index('time (us)') if 'time (us)' in cols else 0
-    thr_idx  = cols.index(thr_col) if thr_col else None
-    print(f"  '{vz_col}' col={vz_idx}, throttle=rcData[3] col={thr_idx}")
-
-    records = []
-    for line in lines[1:]:
-        parts = line.split(',')
-        if len(parts) <= vz_idx: continue
-        try:
-            records.append((int(parts[time_idx].strip()),
-                            int(parts[vz_idx].strip()),
-                            int(parts[thr_idx].strip()) if thr_idx else 0))
-        except ValueError: continue
+    print(f"  '{vz_col}', throttle={thr_col}")
 
-    if not records:
+    if not log.frame_count:
         print("  No records."); return
 
-    t0  = records[0][0]
-    dur = (records[-1][0] - t0) / 1e6
-    print(f"  {len(records)} records, {dur:.1f}s")
-
-    # Find 1.5s windows with stable navTgtVel[2]
-    stable, i = [], 0
-    while i < len(records):
-        t_s  = records[i][0]
-        vals = [(v, th) for t, v, th in records if t_s <= t < t_s + 1_500_000]
-        if len(vals) >= 20:
-            vs = [v for v, _ in vals]
-            mean = sum(vs) / len(vs)
-            std  = (sum((x-mean)**2 for x in vs)/len(vs))**0.5
-            if std < 25:
-                stable.append([t_s-t0, mean, std, len(vals),
-                                sum(th for _, th in vals)/len(vals)])
-        while i < len(records) and records[i][0] < t_s + 1_000_000:
-            i += 1
+    t_us = log.main['time'].astype(np.int64)
+    vz   = log.main[vz_col]
+    thr  = log.main[thr_col] if thr_col else np.zeros(log.frame_count)
+    t0  = int(t_us[0])
+    dur = (t_us[-1] - t0) / 1e6
+    print(f"  {log.frame_count} records, {dur:.1f}s")
+
+    # Find 1.5s windows (starting every 1s) with stable navTgtVel[2]
+    starts, ends = time_windows(t_us, 1_500_000, 1_000_000)
+    mean, std = RollingStats(np.column_stack([vz, thr])).range_stats(starts, ends)
+    count = ends - starts
+    keep = (count >= 20) & (std[:, 0] < 25)
+    stable = [[int(t_us[s]) - t0, float(m[0]), float(sd[0]), int(c), float(m[1])]
+              for s, m, sd, c in zip(starts[keep], mean[keep], std[keep], count[keep])]
 
     if not stable:
         print("  No stable windows found."); return
@@ -420,9 +371,6 @@ def main():
     print(f"hover={HOVER_THR}, idle={IDLE_THR}, deadband={ALT_HOLD_DEADBAND}, max_climb={MAX_CLIMB}")
     print("=" * 70)
 
-    if not os.path.exists(DECODER):
-        print(f"ERROR: decoder not found at {DECODER}"); return 1
-
     print("[1] CLI config...")
     configure_via_cli()
     print("    Waiting 12s for reboot...")
@@ -3,13 +3,15 @@
 Generate detailed motor timeline showing when anomalies occur
 and highlighting the 24-second target window
 """
-import csv
 import sys
+import numpy as np
 
-# Read the CSV file
-with open('inav_0011.01.csv', 'r') as f:
-    reader = csv.DictReader(f)
-    rows = list(reader)
+from blackbox_cache import open_columns
+
+# Decoded once into a column cache next to the CSV (blackbox_cache.py)
+cols = open_columns('inav_0011.01.csv')
+time_s = cols['time (us)'] / 1_000_000
+motors = [cols[f'motor[{k}]'] for k in range(4)]
 
 disarm_time = 177.846  # From our analysis
 target_time = disarm_time + 24.0
@@ -21,53 +23,26 @@ print(f"\nDisarm time: {disarm_time:.3f}s")
 print(f"Target time (24s after disarm): {target_time:.3f}s")
 print()
 
+# Largest motor change from each row to the next (empty cells count as 0)
+values = np.stack([np.nan_to_num(m).astype(np.int64) for m in motors])
+max_delta = np.zeros(len(time_s), dtype=np.int64)
+if len(time_s) > 1:
+    max_delta[:-1] = np.abs(np.diff(values, axis=1)).max(axis=0)
+
 # Create timeline buckets (every 5 seconds after disarm)
+after = np.flatnonzero(time_s >= disarm_time)
+bucket_of = ((time_s[after] - disarm_time) / 5.0).astype(np.int64)  # 5-second buckets
 buckets = {}
-for i, row in enumerate(rows):
-    time_us = int(row['time (us)'])
-    time_s = time_us / 1_000_000
-
-    if time_s < disarm_time:
-        continue
-
-    time_since_disarm = time_s - disarm_time
-    bucket_idx = int(time_since_disarm / 5.0)  # 5-second buckets
-
-    if bucket_idx not in buckets:
-        buckets[bucket_idx] = {
-            'start_time': bucket_idx * 5.0,
-            'end_time': (bucket_idx + 1) * 5.0,
-            'anomaly_count': 0,
-            'max_delta': 0,
-            'samples': 0
-        }
-
-    buckets[bucket_idx]['samples'] += 1
-
-    # Check for anomalies
-    if i < len(rows) - 1:
-        try:
-            m0_curr = int(row['motor[0]']) if row['motor[0]'] else 0
-            m0_next = int(rows[i+1]['motor[0]']) if rows[i+1]['motor[0]'] else 0
-            m1_curr = int(row['motor[1]']) if row['motor[1]'] else 0
-            m1_next = int(rows[i+1]['motor[1]']) if rows[i+1]['motor[1]'] else 0
-            m2_curr = int(row['motor[2]']) if row['motor[2]'] else 0
-            m2_next = int(rows[i+1]['motor[2]']) if rows[i+1]['motor[2]'] else 0
-            m3_curr = int(row['motor[3]']) if row['motor[3]'] else 0
-            m3_next = int(rows[i+1]['motor[3]']) if rows[i+1]['motor[3]'] else 0
-
-            max_delta = max(
-                abs(m0_next - m0_curr),
-                abs(m1_next - m1_curr),
-                abs(m2_next - m2_curr),
-                abs(m3_next - m3_curr)
-            )
-
-            if max_delta > 50:
-                buckets[bucket_idx]['anomaly_count'] += 1
-                buckets[bucket_idx]['max_delta'] = max(buckets[bucket_idx]['max_delta'], max_delta)
-        except ValueError:
-            pass
+for bucket_idx in np.unique(bucket_of).tolist():
+    deltas = max_delta[after[bucket_of == bucket_idx]]
+    anomalies = deltas[deltas > 50]
+    buckets[bucket_idx] = {
+        'start_time': bucket_idx * 5.0,
+        'end_time': (bucket_idx + 1) * 5.0,
+        'anomaly_count': len(anomalies),
+        'max_delta': int(anomalies.max()) if len(anomalies) else 0,
+        'samples': len(deltas)
+    }
 
 print("\nTIMELINE (5-second buckets after disarm):")
 print("-" * 80)
@@ -123,18 +98,16 @@ key_times = [
 
 for target_t in key_times:
     # Find closest row
-    closest_row = min(range(len(rows)),
-                     key=lambda i: abs(int(rows[i]['time (us)']) / 1_000_000 - target_t))
-    row = rows[closest_row]
-    time_s = int(row['time (us)']) / 1_000_000
-
-    print(f"\nTime {target_t:.1f}s (actual: {time_s:.3f}s, row {closest_row}):")
-    print(f"  Motor[0]: {row['motor[0]']}")
-    print(f"  Motor[1]: {row['motor[1]']}")
-    print(f"  Motor[2]: {row['motor[2]']}")
-    print(f"  Motor[3]: {row['motor[3]']}")
-
-    if 23.0 <= (time_s - disarm_time) <= 25.0:
+    closest_row = int(np.argmin(np.abs(time_s - target_t)))
+    time_s_row = time_s[closest_row]
+
+    print(f"\nTime {target_t:.1f}s (actual: {time_s_row:.3f}s, row {closest_row}):")
+    print(f"  Motor[0]: {motors[0][closest_row]}")
+    print(f"  Motor[1]: {motors[1][closest_row]}")
+    print(f"  Motor[2]: {motors[2][closest_row]}")
+    print(f"  Motor[3]: {motors[3][closest_row]}")
+
+    if 23.0 <= (time_s_row - disarm_time) <= 25.0:
         print("  >>> IN TARGET WINDOW <<<")
 
 print("\n" + "=" * 80)
@@ -42,8 +42,15 @@ Usage:
         --duration 10.0 \\
         --speed 2.0
 
+    # 1 kHz gyro log at 2x, with per-frame send lateness saved
+    python3 replay_blackbox_to_fc.py \\
+        --csv blackbox.01.csv \\
+        --port tcp:localhost:5761 \\
+        --speed 2.0 \\
+        --lateness-out lateness.csv
+
 Requirements:
-    pip install mspapi2
+    pip install mspapi2 numpy
 
 Author: Claude Code
 Date: 2026-01-01
@@ -52,10 +59,14 @@ Date: 2026-01-01
 import sys
 import time
 import argparse
-import csv
 import struct
 from pathlib import Path
 
+import numpy as np
+
+from blackbox_cache import open_columns
+from replay_scheduler import DEFAULT_SPIN_S, RealtimeScheduler
+
 # Add mspapi2 to path
 import os
 project_root = Path(__file__).resolve().parents[3]  # Up to inavflight/
@@ -70,10 +81,18 @@ except ImportError:
     print(f"Or install from: {project_root}/mspapi2")
     sys.exit(1)
 
+INT16_RANGE = (-32768, 32767)
+UINT32_RANGE = (0, 0xFFFFFFFF)
 
-def send_msp_simulator(api: MSPApi, row: dict, has_gps: bool = False):
+
+def _clamp(value, lo, hi):
+    """Saturate a sensor value to its payload field, as encode_imu_payloads() does"""
+    return max(lo, min(hi, value))
+
+
+def encode_msp_simulator(row: dict, has_gps: bool = False) -> bytes:
     """
-    Send sensor data via MSP_SIMULATOR (0x201F).
+    Build the MSP_SIMULATOR (0x201F) payload for one log row.
 
     This is the HITL (Hardware In The Loop) command that sends all sensor data.
 
@@ -91,6 +110,9 @@ def send_msp_simulator(api: MSPApi, row: dict, has_gps: bool = False):
     - Barometer: pressure (uint32 Pa)
     - Magnetometer: X, Y, Z (3× int16, firmware divides by 20)
 
+    Sensor values outside their field's range (e.g. magADC × 20) are
+    saturated; missing or non-finite ones use the fallbacks below.
+
     FIRMWARE MODIFICATION REQUIRED:
     Stock INAV hardcodes GPS EPH=100cm and EPV=100cm in fc_msp.c:4233-4234.
     This tool now sends real EPH/EPV values, but requires modified firmware to read them.
@@ -169,10 +191,10 @@ def send_msp_simulator(api: MSPApi, row: dict, has_gps: bool = False):
         acc_x = int(float(row['accSmooth[0]']) / 512.0 * 1000.0)
         acc_y = int(float(row['accSmooth[1]']) / 512.0 * 1000.0)
         acc_z = int(float(row['accSmooth[2]']) / 512.0 * 1000.0)
-    except (KeyError, ValueError):
+    except (KeyError, ValueError, OverflowError):
         # Fallback: 1G on Z axis (stationary)
         acc_x, acc_y, acc_z = 0, 0, 1000
-    msg.extend(struct.pack('<hhh', acc_x, acc_y, acc_z))
+    msg.extend(struct.pack('<hhh', *(_clamp(v, *INT16_RANGE) for v in (acc_x, acc_y, acc_z))))
 
     # Gyro (X, Y, Z) - 3× int16 (deg/s × 16)
     # gyroADC is already in deg/s × 16 format
@@ -180,9 +202,9 @@ def send_msp_simulator(api: MSPApi, row: dict, has_gps: bool = False):
         gyro_x = int(float(row['gyroADC[0]']))
         gyro_y = int(float(row['gyroADC[1]']))
         gyro_z = int(float(row['gyroADC[2]']))
-    except (KeyError, ValueError):
+    except (KeyError, ValueError, OverflowError):
         gyro_x, gyro_y, gyro_z = 0, 0, 0
-    msg.extend(struct.pack('<hhh', gyro_x, gyro_y, gyro_z))
+    msg.extend(struct.pack('<hhh', *(_clamp(v, *INT16_RANGE) for v in (gyro_x, gyro_y, gyro_z))))
 
     # Barometer pressure (uint32 Pa)
     # BaroAlt is altitude in cm, convert to pressure
@@ -190,9 +212,9 @@ def send_msp_simulator(api: MSPApi, row: dict, has_gps: bool = False):
     try:
         baro_alt_cm = float(row['BaroAlt (cm)'])
         baro_pressure = int(101325 - (baro_alt_cm / 100.0) * 12)
-    except (KeyError, ValueError):
+    except (KeyError, ValueError, OverflowError):
         baro_pressure = 101325  # Sea level
-    msg.extend(struct.pack('<I', baro_pressure))
+    msg.extend(struct.pack('<I', _clamp(baro_pressure, *UINT32_RANGE)))
 
     # Magnetometer (X, Y, Z) - 3× int16
     # Firmware divides by 20 (fc_msp.c:4265)
@@ -200,13 +222,19 @@ def send_msp_simulator(api: MSPApi, row: dict, has_gps: bool = False):
         mag_x = int(float(row['magADC[0]']) * 20)
         mag_y = int(float(row['magADC[1]']) * 20)
         mag_z = int(float(row['magADC[2]']) * 20)
-    except (KeyError, ValueError):
+    except (KeyError, ValueError, OverflowError):
         mag_x, mag_y, mag_z = 0, 0, 0
-    msg.extend(struct.pack('<hhh', mag_x, mag_y, mag_z))
+    msg.extend(struct.pack('<hhh', *(_clamp(v, *INT16_RANGE) for v in (mag_x, mag_y, mag_z))))
+
+    return bytes(msg)
+
+
+def send_msp_simulator(api: MSPApi, row: dict, has_gps: bool = False):
+    """Send sensor data via MSP_SIMULATOR (see encode_msp_simulator for the format)."""
+    msg_bytes = encode_msp_simulator(row, has_gps)
 
     # Send MSP_SIMULATOR command
     try:
-        msg_bytes = bytes(msg)
         api._serial.send(int(InavMSP.MSP_SIMULATOR), msg_bytes)
         # Debug: Print message size for first few GPS packets
         if has_gps and row.get('GPS_eph'):
@@ -295,9 +323,25 @@ def enable_hitl_mode(api: MSPApi, gps_home=None):
     return True
 
 
-def load_blackbox_csv(csv_file, start_time=0.0, duration=None):
+# Main CSV columns read by encode_msp_simulator() (GPS_* only if merged into the CSV)
+REPLAY_COLUMNS = (
+    'accSmooth[0]', 'accSmooth[1]', 'accSmooth[2]',
+    'gyroADC[0]', 'gyroADC[1]', 'gyroADC[2]',
+    'magADC[0]', 'magADC[1]', 'magADC[2]',
+    'BaroAlt (cm)',
+    'GPS_fixType', 'GPS_numSat', 'GPS_coord[0]', 'GPS_coord[1]', 'GPS_altitude',
+    'GPS_speed (m/s)', 'GPS_ground_course', 'GPS_velned[0]', 'GPS_velned[1]', 'GPS_velned[2]',
+    'GPS_eph', 'GPS_epv', 'GPS_hdop',
+)
+
+
+def load_blackbox_columns(csv_file, start_time=0.0, duration=None):
     """
-    Load blackbox CSV data.
+    Load blackbox CSV data as columns.
+
+    The CSV is decoded once into a column cache next to it
+    (blackbox_cache.py); only the time column and REPLAY_COLUMNS are read,
+    and only for the requested time range.
 
     Args:
         csv_file: Path to decoded blackbox CSV file
@@ -305,51 +349,183 @@ def load_blackbox_csv(csv_file, start_time=0.0, duration=None):
         duration: Duration in seconds (None = entire log)
 
     Returns:
-        List of dicts with 'time_us', 'rel_time', and 'row' keys
+        (time_us, rel_time, columns): int64 timestamps, seconds since log
+        start, and a dict of the REPLAY_COLUMNS present in the log
     """
     print(f"Loading blackbox data from: {csv_file}")
 
-    data = []
-    with open(csv_file) as f:
-        reader = csv.DictReader(f)
-        first_time = None
-
-        for row in reader:
-            time_us = int(row['time (us)'])
-            if first_time is None:
-                first_time = time_us
+    cols = open_columns(csv_file)
+    time_us = cols['time (us)'].astype(np.int64)
+    if not len(time_us):
+        print("  Loaded 0 samples")
+        return time_us, np.zeros(0), {}
+    rel_time = (time_us - time_us[0]) / 1e6
 
-            rel_time_s = (time_us - first_time) / 1e6
-
-            # Filter by time range
-            if rel_time_s < start_time:
-                continue
-            if duration and rel_time_s > start_time + duration:
-                break
+    # Time is monotonic within one log: slice the range instead of filtering rows
+    first = int(np.searchsorted(rel_time, start_time, side='left'))
+    last = len(rel_time)
+    if duration:
+        last = int(np.searchsorted(rel_time, start_time + duration, side='right'))
 
-            data.append({
-                'time_us': time_us,
-                'rel_time': rel_time_s,
-                'row': row
-            })
+    columns = {name: np.asarray(cols[name][first:last]) for name in REPLAY_COLUMNS if name in cols}
 
-    print(f"  Loaded {len(data)} samples")
+    print(f"  Loaded {last - first} samples")
     if duration:
         print(f"  Filtered to {start_time}s - {start_time + duration}s")
 
-    return data
+    return time_us[first:last], rel_time[first:last], columns
+
 
+# MSP_SIMULATOR payload without GPS data, field for field as encode_msp_simulator()
+# builds it (packed, little-endian, 30 bytes)
+IMU_PAYLOAD = np.dtype([
+    ('version', 'u1'), ('flags', 'u1'), ('attitude', '<u2', 3),
+    ('acc', '<i2', 3), ('gyro', '<i2', 3), ('baro', '<u4'), ('mag', '<i2', 3),
+])
 
-def replay_to_fc(csv_file, port, start_time=0.0, duration=None, speed=1.0):
+
+def _payload_field(columns, names, convert, fallback, count, lo, hi):
+    """
+    convert(column) for each of `names`, truncated toward zero like int().
+    Samples where any value is missing or not finite get `fallback`, as the
+    per-row try/except in encode_msp_simulator() does.
+    """
+    fallback = np.array(fallback, dtype=np.float64)
+    try:
+        values = np.column_stack([convert(np.asarray(columns[name], dtype=np.float64))
+                                  for name in names])
+    except (KeyError, ValueError):
+        return np.broadcast_to(fallback, (count, len(names))).copy()
+    bad = ~np.isfinite(values).all(axis=1)
+    values[bad] = fallback
+    return np.clip(np.trunc(values), lo, hi)
+
+
+def encode_imu_payloads(columns, count):
+    """
+    MSP_SIMULATOR payloads (no GPS) for `count` samples at once, as one
+    IMU_PAYLOAD record array. Byte-identical to encode_msp_simulator(row)
+    per row (both saturate out-of-range values), without building a dict
+    and struct.pack per sample.
+    """
+    payloads = np.zeros(count, dtype=IMU_PAYLOAD)
+    payloads['version'] = 2     # SIMULATOR_MSP_VERSION
+    payloads['flags'] = 0x01    # HITL_ENABLE
+    payloads['acc'] = _payload_field(columns, ['accSmooth[0]', 'accSmooth[1]', 'accSmooth[2]'],
+                                     lambda v: v / 512.0 * 1000.0, (0, 0, 1000), count, *INT16_RANGE)
+    payloads['gyro'] = _payload_field(columns, ['gyroADC[0]', 'gyroADC[1]', 'gyroADC[2]'],
+                                      lambda v: v, (0, 0, 0), count, *INT16_RANGE)
+    payloads['baro'] = _payload_field(columns, ['BaroAlt (cm)'],
+                                      lambda v: 101325 - (v / 100.0) * 12, (101325,), count,
+                                      *UINT32_RANGE)[:, 0]
+    payloads['mag'] = _payload_field(columns, ['magADC[0]', 'magADC[1]', 'magADC[2]'],
+                                     lambda v: v * 20, (0, 0, 0), count, *INT16_RANGE)
+    return payloads
+
+
+class ReplayFrames:
+    """
+    Pre-encoded MSP_SIMULATOR payload for every replayed sample.
+
+    IMU-only frames are slices of one encode_imu_payloads() buffer; the
+    few frames that carry a GPS fix (~10 Hz) are encoded up front with
+    encode_msp_simulator(). Nothing is encoded inside the replay loop.
+    """
+
+    def __init__(self, columns, count, gps_index, gps_rows):
+        self._buffer = encode_imu_payloads(columns, count).tobytes()
+        self._size = IMU_PAYLOAD.itemsize
+        self._count = count
+        self._gps = {}
+        for k in np.flatnonzero(gps_index >= 0).tolist():
+            row = {name: values[k].item() for name, values in columns.items()}
+            row.update(gps_rows[gps_index[k]])
+            self._gps[k] = encode_msp_simulator(row, has_gps=True)
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, k):
+        frame = self._gps.get(k)
+        if frame is None:
+            frame = self._buffer[k * self._size:(k + 1) * self._size]
+        return frame
+
+
+# A GPS fix is sent with the nearest IMU sample if closer than this (GPS is ~10 Hz)
+GPS_MATCH_WINDOW_US = 50000
+
+
+def load_gps_csv(gps_csv_file):
+    """
+    Load GPS fixes from a blackbox_decode .gps.csv (through the column cache).
+
+    Returns (times, rows): sorted unique 'time (us)' values and the row dict
+    for each. A repeated timestamp keeps its last row.
+    """
+    cols = open_columns(gps_csv_file)
+    times = cols['time (us)'].astype(np.int64)
+    # Last occurrence of each timestamp, in time order
+    unique, last_reversed = np.unique(times[::-1], return_index=True)
+    keep = len(times) - 1 - last_reversed
+
+    names = cols.columns
+    values = [cols[name][keep].tolist() for name in names]
+    rows = [dict(zip(names, row)) for row in zip(*values)]
+    return unique.tolist(), rows
+
+
+def align_gps(imu_times, gps_times, window_us=GPS_MATCH_WINDOW_US):
+    """
+    Yield, for each IMU timestamp (ascending), the index of the GPS fix to
+    send with it, or -1.
+
+    Each IMU sample takes the nearest GPS fix not used yet (the earlier fix
+    on a tie) if it is within window_us, so every fix is sent at most once.
+    Both timelines are sorted, so only two candidates exist per sample: the
+    latest unused fix at or before it (top of `behind`) and the first fix
+    after it. Linear in len(imu_times) + len(gps_times).
+    """
+    behind = []     # unused fixes at or before the current IMU time, ascending
+    ahead = 0       # first fix after the current IMU time (all from here are unused)
+    count = len(gps_times)
+
+    for t in imu_times:
+        while ahead < count and gps_times[ahead] <= t:
+            behind.append(ahead)
+            ahead += 1
+
+        before = t - gps_times[behind[-1]] if behind else None
+        after = gps_times[ahead] - t if ahead < count else None
+
+        if before is not None and (after is None or before <= after):
+            if before < window_us:
+                yield behind.pop()
+                continue
+        elif after is not None and after < window_us:
+            ahead += 1
+            yield ahead - 1
+            continue
+        yield -1
+
+
+def replay_to_fc(csv_file, port, start_time=0.0, duration=None, speed=1.0,
+                 spin_s=DEFAULT_SPIN_S, batch_s=0.0, lateness_out=None):
     """
     Replay blackbox sensor data to flight controller.
 
+    Every MSP_SIMULATOR payload is encoded before the replay starts; the
+    loop only waits for each deadline (RealtimeScheduler) and writes.
+
     Args:
         csv_file: Path to decoded blackbox CSV file
         port: Serial port or TCP address (e.g., 'tcp:localhost:5761', '/dev/ttyACM0')
         start_time: Start time in seconds (relative to log start)
         duration: Duration in seconds (None = entire log)
         speed: Playback speed multiplier (1.0 = real-time)
+        spin_s: Busy-wait this long before each send instead of sleeping
+        batch_s: Send every frame due within this many seconds in one wakeup
+        lateness_out: Optional CSV path for per-frame send lateness
     """
 
     print("=" * 70)
@@ -365,58 +541,35 @@ def replay_to_fc(csv_file, port, start_time=0.0, duration=None, speed=1.0):
     print()
 
     # Load blackbox data
-    data = load_blackbox_csv(csv_file, start_time, duration)
-    if not data:
+    time_us, rel_time, columns = load_blackbox_columns(csv_file, start_time, duration)
+    count = len(time_us)
+    if not count:
         print("ERROR: No data loaded")
         return
 
     # Load GPS data from .gps.csv file if it exists
     # GPS data arrives at ~10 Hz, should NOT be repeated for every IMU sample
     gps_csv_file = csv_file.replace('.01.csv', '.01.gps.csv')
-    gps_data = {}
+    gps_times, gps_rows = [], []
     if Path(gps_csv_file).exists():
         print(f"Loading GPS data from: {gps_csv_file}")
-        with open(gps_csv_file) as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                time_us = int(row['time (us)'])
-                gps_data[time_us] = row
-        print(f"  Loaded {len(gps_data)} GPS samples (~10 Hz)")
+        gps_times, gps_rows = load_gps_csv(gps_csv_file)
+        print(f"  Loaded {len(gps_rows)} GPS samples (~10 Hz)")
     else:
         print("  No GPS data file found (.gps.csv)")
 
-    # Mark which samples have NEW GPS data (don't repeat GPS)
-    # GPS arrives at ~10 Hz, attach GPS to nearest IMU sample
-    # Track which GPS timestamps we've already used to avoid repeating GPS
-    gps_times = sorted(gps_data.keys())
-    used_gps_times = set()
-
-    for sample in data:
-        time_us = sample['time_us']
-
-        # Find nearest GPS timestamp to this IMU sample
-        nearest_gps_time = None
-        min_diff = float('inf')
-
-        for gps_time in gps_times:
-            diff = abs(gps_time - time_us)
-            if diff < min_diff and gps_time not in used_gps_times:
-                min_diff = diff
-                nearest_gps_time = gps_time
-
-        # Only use GPS if within 50ms (typical GPS update period is ~100ms)
-        if nearest_gps_time and min_diff < 50000:  # 50ms in microseconds
-            sample['gps'] = gps_data[nearest_gps_time]
-            sample['has_new_gps'] = True
-            used_gps_times.add(nearest_gps_time)  # Mark as used
-        else:
-            sample['gps'] = None
-            sample['has_new_gps'] = False
+    # Mark which samples have NEW GPS data (don't repeat GPS): each fix goes
+    # with the nearest IMU sample within 50ms, once
+    gps_index = np.fromiter(align_gps(time_us.tolist(), gps_times), dtype=np.int64, count=count)
+
+    # Encode every payload now so the replay loop only sends
+    frames = ReplayFrames(columns, count, gps_index, gps_rows)
+    print(f"Encoded {count} MSP_SIMULATOR frames ({np.count_nonzero(gps_index >= 0)} with GPS)")
 
     # Estimate sample rate
-    if len(data) > 1:
-        time_diff = data[-1]['rel_time'] - data[0]['rel_time']
-        sample_rate = len(data) / time_diff if time_diff > 0 else 0
+    if count > 1:
+        time_diff = rel_time[-1] - rel_time[0]
+        sample_rate = count / time_diff if time_diff > 0 else 0
         print(f"Sample rate: ~{sample_rate:.1f} Hz")
     print()
 
@@ -439,27 +592,23 @@ def replay_to_fc(csv_file, port, start_time=0.0, duration=None, speed=1.0):
     # Get GPS home position from blackbox header (GPS_home_lat/lon)
     # NOT from first GPS sample, which might be mid-flight!
     gps_home = None
-    if len(data) > 0:
-        # Find first sample with GPS data to extract GPS_home
-        for sample in data:
-            if sample.get('has_new_gps') and sample['gps']:
-                # Use GPS_home from blackbox, not GPS_coord!
-                gps_row = sample['gps']
-                if 'GPS_home_lat' in gps_row and 'GPS_home_lon' in gps_row:
-                    gps_home = {
-                        'GPS_coord[0]': gps_row['GPS_home_lat'],  # Use home position
-                        'GPS_coord[1]': gps_row['GPS_home_lon'],  # Use home position
-                        'GPS_altitude': gps_row.get('GPS_altitude', 0),  # Use first sample's altitude
-                        'GPS_eph': gps_row.get('GPS_eph', 100),
-                        'GPS_epv': gps_row.get('GPS_epv', 100),
-                    }
-                    print(f"Using GPS home from blackbox: {float(gps_home['GPS_coord[0]']):.6f}, {float(gps_home['GPS_coord[1]']):.6f}")
-                    break
-                else:
-                    # Fallback: use first GPS position if GPS_home not available
-                    gps_home = sample['gps']
-                    print(f"WARNING: GPS_home not in blackbox, using first GPS position: {float(gps_home['GPS_coord[0]']):.6f}, {float(gps_home['GPS_coord[1]']):.6f}")
-                    break
+    matched = np.flatnonzero(gps_index >= 0)
+    if len(matched):
+        # Use GPS_home from blackbox, not GPS_coord!
+        gps_row = gps_rows[gps_index[matched[0]]]
+        if 'GPS_home_lat' in gps_row and 'GPS_home_lon' in gps_row:
+            gps_home = {
+                'GPS_coord[0]': gps_row['GPS_home_lat'],  # Use home position
+                'GPS_coord[1]': gps_row['GPS_home_lon'],  # Use home position
+                'GPS_altitude': gps_row.get('GPS_altitude', 0),  # Use first sample's altitude
+                'GPS_eph': gps_row.get('GPS_eph', 100),
+                'GPS_epv': gps_row.get('GPS_epv', 100),
+            }
+            print(f"Using GPS home from blackbox: {float(gps_home['GPS_coord[0]']):.6f}, {float(gps_home['GPS_coord[1]']):.6f}")
+        else:
+            # Fallback: use first GPS position if GPS_home not available
+            gps_home = gps_row
+            print(f"WARNING: GPS_home not in blackbox, using first GPS position: {float(gps_home['GPS_coord[0]']):.6f}, {float(gps_home['GPS_coord[1]']):.6f}")
 
     # Enable HITL mode and set home position
     if not enable_hitl_mode(api, gps_home):
@@ -475,44 +624,31 @@ def replay_to_fc(csv_file, port, start_time=0.0, duration=None, speed=1.0):
     print("Press Ctrl+C to stop")
     print()
 
-    # Replay loop
-    start_wall_time = time.time()
-    last_display_time = 0
-    sent_count = 0
+    code = int(InavMSP.MSP_SIMULATOR)
+    serial = api._serial
 
-    try:
-        for i, sample in enumerate(data):
-            # Merge GPS data into row if this sample has new GPS data
-            row = sample['row'].copy()
-            if sample.get('has_new_gps') and sample['gps']:
-                # Merge GPS fields into the row
-                row.update(sample['gps'])
-
-            if send_msp_simulator(api, row, has_gps=sample.get('has_new_gps', False)):
-                sent_count += 1
-
-            # Display progress every second
-            rel_time = sample['rel_time']
-            if rel_time - last_display_time >= 1.0:
-                if sample.get('has_new_gps') and sample['gps']:
-                    gps = sample['gps']
-                    eph = float(gps.get('GPS_eph', 0))
-                    sats = int(gps.get('GPS_numSat', 0))
-                    hdop = float(gps.get('GPS_hdop', 0))
-                    print(f"[{rel_time:6.1f}s] GPS: EPH={eph:4.0f}cm, Sats={sats:2d}, HDOP={hdop:.2f}")
-                else:
-                    print(f"[{rel_time:6.1f}s] IMU only (no new GPS)")
-                last_display_time = rel_time
-
-            # Sleep to maintain playback speed
-            if i < len(data) - 1:
-                time_delta = data[i + 1]['rel_time'] - rel_time
-                elapsed = time.time() - start_wall_time
-                target = (rel_time - data[0]['rel_time']) / speed
-                sleep_time = target - elapsed
-                if sleep_time > 0:
-                    time.sleep(sleep_time)
+    def send(payload):
+        try:
+            serial.send(code, payload)
+            return True
+        except Exception as e:
+            print(f"Error sending MSP_SIMULATOR: {e}")
+            return False
+
+    def progress(k):
+        # Display progress every second of log time
+        if gps_index[k] >= 0:
+            gps = gps_rows[gps_index[k]]
+            eph = float(gps.get('GPS_eph', 0))
+            sats = int(gps.get('GPS_numSat', 0))
+            hdop = float(gps.get('GPS_hdop', 0))
+            print(f"[{rel_time[k]:6.1f}s] GPS: EPH={eph:4.0f}cm, Sats={sats:2d}, HDOP={hdop:.2f}")
+        else:
+            print(f"[{rel_time[k]:6.1f}s] IMU only (no new GPS)")
 
+    scheduler = RealtimeScheduler(send, speed=speed, spin_s=spin_s, batch_s=batch_s)
+    try:
+        scheduler.run(rel_time, frames, progress=progress)
     except KeyboardInterrupt:
         print()
         print("Stopped by user")
@@ -520,9 +656,14 @@ def replay_to_fc(csv_file, port, start_time=0.0, duration=None, speed=1.0):
     finally:
         api.close()
 
+    stats = scheduler.stats
     print()
     print("=" * 70)
-    print(f"✓ Replayed {sent_count}/{len(data)} sensor samples")
+    print(f"✓ Replayed {stats.sent - stats.failed}/{count} sensor samples")
+    stats.print_summary()
+    if lateness_out:
+        stats.write_csv(lateness_out, rel_time)
+        print(f"Per-frame lateness written to: {lateness_out}")
     print("=" * 70)
     print()
     print("Next steps:")
@@ -560,6 +701,13 @@ Examples:
                         help='Duration in seconds (default: entire log)')
     parser.add_argument('--speed', type=float, default=1.0,
                         help='Playback speed multiplier (default: 1.0)')
+    parser.add_argument('--spin-us', type=float, default=DEFAULT_SPIN_S * 1e6,
+                        help='Busy-wait this long before each frame instead of sleeping '
+                             f'(default: {DEFAULT_SPIN_S * 1e6:g})')
+    parser.add_argument('--batch-ms', type=float, default=0.0,
+                        help='Send all frames due within this window in one wakeup (default: 0, off)')
+    parser.add_argument('--lateness-out', metavar='FILE',
+                        help='Write per-frame send lateness to this CSV')
 
     args = parser.parse_args()
 
@@ -570,7 +718,9 @@ Examples:
         print("Decode blackbox first with: blackbox_decode <file>.TXT")
         sys.exit(1)
 
-    replay_to_fc(args.csv, args.port, args.start_time, args.duration, args.speed)
+    replay_to_fc(args.csv, args.port, args.start_time, args.duration, args.speed,
+                 spin_s=args.spin_us / 1e6, batch_s=args.batch_ms / 1e3,
+                 lateness_out=args.lateness_out)
 
 
 if __name__ == '__main__':
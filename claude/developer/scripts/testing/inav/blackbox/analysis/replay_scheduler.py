@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+replay_scheduler.py - Drift-free real-time frame scheduler for log replay
+
+Sends pre-built frames at their log timestamps (optionally sped up) and
+records how late each one actually went out, so a replay can show that
+the FC saw the log at the intended rate.
+
+- Deadlines are absolute: start + (t_log - t_first) / speed on the
+  time.perf_counter() clock, so a late frame never shifts the ones after
+  it (no drift from accumulated sleep overshoot).
+- time.sleep() covers all but the last `spin_s` before a deadline, then a
+  busy-wait hits it to within a few microseconds. OS sleep granularity
+  alone (~0.1-1 ms, worse on some kernels) cannot hold 500 Hz-1 kHz.
+- Optional batching: with batch_s > 0, every frame due within batch_s of
+  the current one is sent in the same wakeup (through send_batch if given,
+  e.g. one socket write). Those frames go out early; that shows up as
+  negative lateness.
+- When the sender falls behind, frames are sent back-to-back until it
+  catches up; none are skipped.
+
+Usage:
+    from replay_scheduler import RealtimeScheduler
+
+    scheduler = RealtimeScheduler(send=lambda payload: port.write(payload), speed=2.0)
+    stats = scheduler.run(times_s, payloads)
+    stats.print_summary()
+"""
+
+import time
+from typing import Callable, List, Optional, Sequence
+
+import numpy as np
+
+# Busy-wait this long before each deadline instead of sleeping
+DEFAULT_SPIN_S = 0.0008
+
+# Lateness above this counts as a late frame in the summary
+LATE_THRESHOLD_S = 0.001
+
+
+class LatenessStats:
+    """Per-frame send lateness (actual - scheduled, seconds) for one replay run."""
+
+    def __init__(self, count: int, speed: float):
+        self.speed = speed
+        self.lateness = np.full(count, np.nan)
+        self.sent = 0
+        self.failed = 0
+        self.batches = 0
+        self.elapsed_s = 0.0
+        self.log_span_s = 0.0
+
+    @property
+    def frames(self) -> np.ndarray:
+        """Lateness of the frames actually sent (a run can be interrupted)."""
+        return self.lateness[:self.sent]
+
+    def summary(self) -> dict:
+        late = self.frames * 1e3
+        rate = self.sent / self.elapsed_s if self.elapsed_s > 0 else 0.0
+        intended = (self.sent - 1) / (self.log_span_s / self.speed) if self.log_span_s > 0 else 0.0
+        out = {'sent': self.sent, 'failed': self.failed, 'batches': self.batches,
+               'elapsed_s': self.elapsed_s, 'rate_hz': rate, 'intended_hz': intended}
+        if len(late):
+            p50, p95, p99 = np.percentile(late, [50, 95, 99])
+            out.update(p50_ms=p50, p95_ms=p95, p99_ms=p99, max_ms=float(late.max()),
+                       min_ms=float(late.min()),
+                       late_frames=int(np.count_nonzero(late > LATE_THRESHOLD_S * 1e3)))
+        return out
+
+    def print_summary(self):
+        s = self.summary()
+        print(f"Sent {s['sent']} frames in {s['elapsed_s']:.2f}s ({s['rate_hz']:.1f} Hz, "
+              f"intended {s['intended_hz']:.1f} Hz at {self.speed:g}x), "
+              f"{s['batches']} wakeups, {s['failed']} send failures")
+        if 'p50_ms' in s:
+            print(f"Lateness: p50 {s['p50_ms']:.3f} ms, p95 {s['p95_ms']:.3f} ms, p99 {s['p99_ms']:.3f} ms, "
+                  f"max {s['max_ms']:.3f} ms (min {s['min_ms']:.3f} ms); "
+                  f"{s['late_frames']} frames > {LATE_THRESHOLD_S * 1e3:g} ms late")
+
+    def write_csv(self, path: str, times_s: Sequence[float]):
+        """One line per sent frame: index, log time, lateness in microseconds."""
+        with open(path, 'w') as f:
+            f.write("frame,log_time_s,lateness_us\n")
+            for k, (t, late) in enumerate(zip(np.asarray(times_s[:self.sent]).tolist(),
+                                              (self.frames * 1e6).tolist())):
+                f.write(f"{k},{t:.6f},{late:.1f}\n")
+
+
+class RealtimeScheduler:
+    """
+    Send frames[k] at times_s[k] (log seconds, ascending) scaled by 1/speed.
+
+    send(frame) is called for each frame; a falsy return (other than None)
+    counts as a failure. With batch_s > 0 and send_batch set, frames due
+    together are passed to send_batch(list) in one call instead.
+    """
+
+    def __init__(self, send: Callable, speed: float = 1.0, spin_s: float = DEFAULT_SPIN_S,
+                 batch_s: float = 0.0, send_batch: Optional[Callable[[List], object]] = None):
+        if speed <= 0:
+            raise ValueError("speed must be positive")
+        self.send = send
+        self.send_batch = send_batch
+        self.speed = speed
+        self.spin_s = spin_s
+        self.batch_s = batch_s
+        self.stats: Optional[LatenessStats] = None
+
+    def run(self, times_s: Sequence[float], frames: Sequence,
+            progress: Optional[Callable[[int], None]] = None,
+            progress_every_s: float = 1.0, lead_s: float = 0.01) -> LatenessStats:
+        """
+        Replay all frames; returns (and keeps in self.stats) the lateness
+        record. progress(k) is called after frame k whenever another
+        progress_every_s of log time has been replayed. On
+        KeyboardInterrupt self.stats holds the frames sent so far.
+        """
+        times = np.asarray(times_s, dtype=np.float64)
+        count = len(times)
+        stats = self.stats = LatenessStats(count, self.speed)
+        if not count:
+            return stats
+
+        clock = time.perf_counter
+        sleep = time.sleep
+        spin = self.spin_s
+        # Deadlines on the perf_counter clock, computed once
+        start = clock() + lead_s
+        due = start + (times - times[0]) / self.speed
+        due_list = due.tolist()
+        batch_s = self.batch_s
+        lateness = stats.lateness
+        times_list = times.tolist()
+        next_progress = times_list[0] + progress_every_s
+
+        k = 0
+        try:
+            while k < count:
+                deadline = due_list[k]
+                remaining = deadline - clock()
+                if remaining > spin:
+                    sleep(remaining - spin)
+                while clock() < deadline:
+                    pass
+
+                last = k + 1
+                if batch_s > 0:
+                    last = int(np.searchsorted(due, deadline + batch_s, side='right'))
+
+                now = clock()
+                if last - k > 1 and self.send_batch is not None:
+                    result = self.send_batch([frames[j] for j in range(k, last)])
+                    if result is not None and not result:
+                        stats.failed += last - k
+                    for j in range(k, last):
+                        lateness[j] = now - due_list[j]
+                else:
+                    for j in range(k, last):
+                        lateness[j] = clock() - due_list[j]
+                        result = self.send(frames[j])
+                        if result is not None and not result:
+                            stats.failed += 1
+                stats.batches += 1
+                stats.sent = last
+                k = last
+
+                if progress is not None and times_list[k - 1] >= next_progress:
+                    progress(k - 1)
+                    next_progress = times_list[k - 1] + progress_every_s
+        finally:
+            stats.elapsed_s = clock() - start
+            stats.log_span_s = float(times[stats.sent - 1] - times[0]) if stats.sent else 0.0
+        return stats
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+stability_segments.py - Linear-time stability segmentation for flight logs
+
+Finds stretches of a log where several channels hold steady: standard
+deviation under a limit and mean inside bounds (e.g. airspeed, pitch and
+throttle for find_stable_periods.py, climb rate demand for the althold
+test).
+
+RollingStats keeps per-channel prefix sums of x and x^2 (offset by the
+channel mean so float64 keeps its precision on large values such as
+timestamps). The mean and population std of any [start, end) range of
+every channel is then O(1), and vectorized over arrays of ranges.
+
+find_stable_segments() checks every candidate window start in one vector
+operation, then grows each stable segment in doubling blocks until the
+first sample that breaks a limit. Segments never overlap, so a log of N
+samples costs O(N) vectorized work no matter how long the segments are,
+instead of recomputing np.std over the window for every sample.
+
+Usage:
+    from stability_segments import ChannelLimit, find_stable_segments
+
+    limits = [ChannelLimit(max_std=0.5),                  # airspeed m/s
+              ChannelLimit(max_std=2.0),                  # pitch deg
+              ChannelLimit(max_std=50, min_mean=1100)]    # throttle
+    for start, end in find_stable_segments(data, limits, window=60):
+        print(data[start:end].mean(axis=0))
+"""
+
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+class ChannelLimit:
+    """Stability criteria for one channel. Unset (None) limits are not checked."""
+
+    def __init__(self, max_std: Optional[float] = None, min_mean: Optional[float] = None,
+                 max_mean: Optional[float] = None):
+        self.max_std = max_std
+        self.min_mean = min_mean
+        self.max_mean = max_mean
+
+    def __repr__(self) -> str:
+        return f"ChannelLimit(max_std={self.max_std}, min_mean={self.min_mean}, max_mean={self.max_mean})"
+
+
+class RollingStats:
+    """
+    Range statistics over a (samples, channels) array via prefix sums.
+
+    range_stats(starts, ends) returns the mean and population std (as
+    np.std) of rows [start, end) for every channel, for any number of
+    ranges at once.
+    """
+
+    def __init__(self, data: np.ndarray):
+        data = np.asarray(data, dtype=np.float64)
+        if data.ndim == 1:
+            data = data[:, None]
+        self.length, self.channels = data.shape
+        self._offset = data.mean(axis=0) if self.length else np.zeros(self.channels)
+        centered = data - self._offset
+        self._sum = np.zeros((self.length + 1, self.channels))
+        self._sum_sq = np.zeros((self.length + 1, self.channels))
+        np.cumsum(centered, axis=0, out=self._sum[1:])
+        np.cumsum(centered * centered, axis=0, out=self._sum_sq[1:])
+
+    def range_stats(self, starts, ends) -> Tuple[np.ndarray, np.ndarray]:
+        """(mean, std), each shaped (ranges, channels). Ranges must be non-empty."""
+        starts = np.asarray(starts)
+        ends = np.asarray(ends)
+        count = (ends - starts)[..., None].astype(np.float64)
+        mean = (self._sum[ends] - self._sum[starts]) / count
+        var = (self._sum_sq[ends] - self._sum_sq[starts]) / count - mean * mean
+        return mean + self._offset, np.sqrt(np.maximum(var, 0.0))
+
+
+def stable_ranges(stats: RollingStats, starts, ends, limits: Sequence[Optional[ChannelLimit]]) -> np.ndarray:
+    """Boolean mask: which [start, end) ranges meet every channel's limits."""
+    mean, std = stats.range_stats(starts, ends)
+    ok = np.ones(len(mean), dtype=bool)
+    for c, limit in enumerate(limits):
+        if limit is None:
+            continue
+        if limit.max_std is not None:
+            ok &= std[:, c] <= limit.max_std
+        if limit.min_mean is not None:
+            ok &= mean[:, c] >= limit.min_mean
+        if limit.max_mean is not None:
+            ok &= mean[:, c] <= limit.max_mean
+    return ok
+
+
+def _grow(stats: RollingStats, start: int, end: int, limits, block: int) -> int:
+    """Largest end' >= end such that [start, e) is stable for every e in (end, end']."""
+    n = stats.length
+    while end < n:
+        ends = np.arange(end + 1, min(n, end + block) + 1)
+        ok = stable_ranges(stats, np.full(len(ends), start), ends, limits)
+        bad = np.flatnonzero(~ok)
+        if len(bad):
+            return int(ends[bad[0]]) - 1
+        end = int(ends[-1])
+        block *= 2
+    return end
+
+
+def find_stable_segments(data: np.ndarray, limits: Sequence[Optional[ChannelLimit]], window: int,
+                         extend: bool = True) -> List[Tuple[int, int]]:
+    """
+    Non-overlapping [start, end) segments where every channel meets its limits.
+
+    Scans left to right: the first start whose `window` samples are stable
+    opens a segment, which (with extend=True) grows one sample at a time
+    while the whole segment stays stable; the scan resumes at its end.
+    This is the same greedy rule as find_stable_periods.py always used.
+    """
+    data = np.asarray(data)
+    if data.ndim == 1:
+        data = data[:, None]
+    if len(limits) != data.shape[1]:
+        raise ValueError(f"{len(limits)} limits for {data.shape[1]} channels")
+    n = len(data)
+    if window < 1 or n < window:
+        return []
+
+    stats = RollingStats(data)
+    starts = np.arange(n - window + 1)
+    candidates = np.flatnonzero(stable_ranges(stats, starts, starts + window, limits))
+
+    segments = []
+    pos = 0
+    while True:
+        k = np.searchsorted(candidates, pos)
+        if k == len(candidates):
+            break
+        start = int(candidates[k])
+        end = start + window
+        if extend:
+            end = _grow(stats, start, end, limits, window)
+        segments.append((start, end))
+        pos = end
+    return segments
+
+
+def time_windows(t: np.ndarray, span: float, hop: float) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (starts, ends) of windows over sorted timestamps t: each window holds
+    the samples with t[start] <= t < t[start] + span, and the next window
+    starts at the first sample at or after t[start] + hop.
+    """
+    t = np.asarray(t)
+    starts = []
+    i = 0
+    while i < len(t):
+        starts.append(i)
+        i = max(i + 1, int(np.searchsorted(t, t[i] + hop, side='left')))
+    starts = np.array(starts, dtype=np.int64)
+    ends = np.searchsorted(t, t[starts] + span, side='left') if len(starts) else starts
+    return starts, np.asarray(ends, dtype=np.int64)
@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+"""
+CRSF RC Link Emulator
+
+Drives an RC link the way a transmitter does: one RC_CHANNELS_PACKED frame
+per slot at a fixed rate (50-1000 Hz), while decoding the telemetry the FC
+sends back on the same connection.
+
+- One selectors loop: telemetry is read (until the socket is drained) and
+  parsed with CRSFStreamParser whenever the loop waits, so nothing is
+  trimmed or dropped under load.
+- Slot deadlines are absolute on time.perf_counter(): start + k / rate.
+  The loop waits in select() until `spin_s` before a deadline, then
+  busy-waits. A late send never shifts later slots; if a whole slot is
+  missed it is skipped and counted (a radio never bursts frames).
+- LinkReport keeps constant-memory histograms of the send interval and
+  send lateness, and the telemetry latency per frame type (arrival time
+  minus the last RC send, i.e. how quickly the FC answered).
+
+Usage:
+    from crsf_link_emulator import RCLinkEmulator
+
+    link = RCLinkEmulator(sock, rate_hz=500, frame_source=lambda k, t: frame)
+    report = link.run(duration_s=30)
+    report.print_report()
+"""
+
+import selectors
+import socket
+import time
+from typing import Callable, Dict, Optional
+
+from crsf_protocol import CRSFFrame, CRSFStreamParser, frame_name
+
+# Busy-wait this long before each slot instead of waiting in select()
+DEFAULT_SPIN_S = 0.0005
+
+# Resolution of the timing histograms
+HISTOGRAM_BIN_S = 10e-6
+
+
+class Histogram:
+    """Fixed-width histogram with running count/mean/min/max (constant memory)"""
+
+    def __init__(self, bin_s: float, max_s: float):
+        self.bin_s = bin_s
+        self.bins = [0] * (int(max_s / bin_s) + 1)    # last bin collects overflow
+        self.count = 0
+        self.total = 0.0
+        self.min = float('inf')
+        self.max = float('-inf')
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        index = int(value / self.bin_s) if value > 0 else 0
+        self.bins[min(index, len(self.bins) - 1)] += 1
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """Upper edge of the bin holding the q-th percentile (q in 0-100)"""
+        if not self.count:
+            return 0.0
+        target = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.bins):
+            seen += n
+            if seen >= target and n:
+                return min((i + 1) * self.bin_s, self.max)
+        return self.max
+
+    def print_bars(self, rows: int = 20, width: int = 40, unit: float = 1e3, label: str = "ms"):
+        """Text histogram: the used range in at most `rows` lines (lower edge, count, bar)"""
+        used = [i for i, n in enumerate(self.bins) if n]
+        if not used:
+            return
+        group = max(1, -(-(used[-1] - used[0] + 1) // rows))
+        lines = []
+        for first in range(used[0], used[-1] + 1, group):
+            lines.append((first, sum(self.bins[first:first + group])))
+        peak = max(n for _, n in lines) or 1
+        for first, n in lines:
+            if n:
+                edge = "+" if first + group >= len(self.bins) else " "
+                print(f"  {first * self.bin_s * unit:7.3f}{edge}{label} {n:7d} {'#' * max(1, n * width // peak)}")
+
+
+class LinkReport:
+    """Send timing and telemetry latency for one emulator run"""
+
+    def __init__(self, rate_hz: float):
+        interval = 1.0 / rate_hz
+        self.rate_hz = rate_hz
+        self.intervals = Histogram(HISTOGRAM_BIN_S, interval * 4)
+        self.lateness = Histogram(HISTOGRAM_BIN_S, interval * 2)
+        self.telemetry_latency: Dict[int, Histogram] = {}
+        self.telemetry_max_s = max(interval * 4, 0.05)
+        self.sent = 0
+        self.missed_slots = 0
+        self.elapsed_s = 0.0
+
+    def add_telemetry(self, frame_type: int, latency_s: float):
+        hist = self.telemetry_latency.get(frame_type)
+        if hist is None:
+            hist = self.telemetry_latency[frame_type] = Histogram(HISTOGRAM_BIN_S, self.telemetry_max_s)
+        hist.add(latency_s)
+
+    def print_report(self, stats=None):
+        ms = 1e3
+        nominal = 1.0 / self.rate_hz
+        rate = self.sent / self.elapsed_s if self.elapsed_s > 0 else 0.0
+        print(f"RC frames: {self.sent} in {self.elapsed_s:.1f}s ({rate:.1f} Hz, target {self.rate_hz:g} Hz), "
+              f"{self.missed_slots} slots missed")
+        iv = self.intervals
+        if iv.count:
+            print(f"Send interval: mean {iv.mean * ms:.3f} ms (nominal {nominal * ms:.3f}), "
+                  f"p50 {iv.percentile(50) * ms:.3f}, p99 {iv.percentile(99) * ms:.3f}, "
+                  f"min {iv.min * ms:.3f}, max {iv.max * ms:.3f} ms")
+            iv.print_bars()
+        late = self.lateness
+        if late.count:
+            print(f"Send lateness: p50 {late.percentile(50) * ms:.3f} ms, p99 {late.percentile(99) * ms:.3f} ms, "
+                  f"max {late.max * ms:.3f} ms")
+        if self.telemetry_latency:
+            print("Telemetry latency after last RC frame:")
+            for frame_type in sorted(self.telemetry_latency):
+                hist = self.telemetry_latency[frame_type]
+                count_rate = hist.count / self.elapsed_s if self.elapsed_s > 0 else 0.0
+                print(f"  {frame_name(frame_type):15s}: {hist.count:6d} frames ({count_rate:6.1f} Hz) "
+                      f"p50 {hist.percentile(50) * ms:6.2f} ms, p95 {hist.percentile(95) * ms:6.2f} ms, "
+                      f"max {hist.max * ms:6.2f} ms")
+        if stats is not None:
+            print(f"Telemetry stream: {stats.crc_errors} CRC failures, {stats.sync_errors} sync errors "
+                  f"({stats.resync_bytes} bytes skipped)")
+
+
+class RCLinkEmulator:
+    """
+    Send frame_source(k, t) in slot k (t = seconds since start) at rate_hz
+    and decode telemetry on the same socket until duration_s, the source
+    returns None, or the connection closes.
+
+    on_frame(k) is called after each send; on_telemetry(frame, latency_s)
+    for each telemetry frame received.
+    """
+
+    def __init__(self, sock: socket.socket, rate_hz: float,
+                 frame_source: Callable[[int, float], Optional[bytes]],
+                 spin_s: float = DEFAULT_SPIN_S,
+                 on_frame: Optional[Callable[[int], None]] = None,
+                 on_telemetry: Optional[Callable[[CRSFFrame, float], None]] = None):
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        self.sock = sock
+        self.rate_hz = rate_hz
+        self.frame_source = frame_source
+        self.spin_s = spin_s
+        self.on_frame = on_frame
+        self.on_telemetry = on_telemetry
+        self.parser = CRSFStreamParser()
+        self.report = LinkReport(rate_hz)
+        self.closed = False
+        self._pending = b''
+        self._last_send = None
+
+    def _read(self):
+        now = time.perf_counter()
+        while True:
+            try:
+                chunk = self.sock.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            if not chunk:
+                self.closed = True
+                return
+            for frame in self.parser.feed(chunk):
+                latency = now - self._last_send if self._last_send is not None else 0.0
+                self.report.add_telemetry(frame.type, latency)
+                if self.on_telemetry is not None:
+                    self.on_telemetry(frame, latency)
+
+    def _write(self, data: bytes):
+        data = self._pending + data
+        try:
+            sent = self.sock.send(data)
+        except (BlockingIOError, InterruptedError):
+            sent = 0
+        self._pending = data[sent:]
+
+    def run(self, duration_s: Optional[float] = None) -> LinkReport:
+        """Run the link; on KeyboardInterrupt self.report holds the run so far"""
+        sock = self.sock
+        sock.setblocking(False)
+        # select() takes microsecond timeouts; epoll/poll round up to whole
+        # milliseconds, which would overshoot every slot at 500 Hz+
+        selector = selectors.SelectSelector()
+        selector.register(sock, selectors.EVENT_READ)
+        write_registered = False
+
+        clock = time.perf_counter
+        interval = 1.0 / self.rate_hz
+        spin = self.spin_s
+        report = self.report
+        start = clock()
+        end = start + duration_s if duration_s else None
+        k = 0
+        last_sent_at = None
+
+        try:
+            while not self.closed:
+                deadline = start + k * interval
+                if end is not None and deadline >= end:
+                    break
+
+                # Wait for the slot, handling telemetry (and a backed-up send) meanwhile
+                wait = deadline - clock() - spin
+                want_write = bool(self._pending)
+                if want_write != write_registered:
+                    selector.modify(sock, selectors.EVENT_READ | (selectors.EVENT_WRITE if want_write else 0))
+                    write_registered = want_write
+                for key, mask in selector.select(wait if wait > 0 else 0):
+                    if mask & selectors.EVENT_READ:
+                        self._read()
+                    if mask & selectors.EVENT_WRITE:
+                        self._write(b'')
+                if clock() < deadline - spin:
+                    continue
+                while clock() < deadline:
+                    pass
+
+                now = clock()
+                # A whole slot late: skip to the current slot, never burst
+                behind = int((now - deadline) / interval)
+                if behind:
+                    report.missed_slots += behind
+                    k += behind
+                    deadline = start + k * interval
+
+                frame = self.frame_source(k, deadline - start)
+                if frame is None:
+                    break
+                now = clock()
+                self._write(frame)
+                self._last_send = now
+                report.lateness.add(now - deadline)
+                if last_sent_at is not None:
+                    report.intervals.add(now - last_sent_at)
+                last_sent_at = now
+                report.sent += 1
+                if self.on_frame is not None:
+                    self.on_frame(k)
+                k += 1
+        finally:
+            report.elapsed_s = clock() - start
+            selector.close()
+        return report
+
+
+def schedule_source(frames) -> Callable[[int, float], Optional[bytes]]:
+    """frame_source for a precomputed schedule, e.g. crsf_rc_encoder.encode_rc_frames() output"""
+    stream = memoryview(frames.tobytes() if hasattr(frames, 'tobytes') else b''.join(frames))
+    size = len(stream) // len(frames) if len(frames) else 0
+    count = len(frames)
+
+    def source(k: int, t: float) -> Optional[bytes]:
+        if k >= count:
+            return None
+        return stream[k * size:(k + 1) * size]
+    return source
@@ -55,6 +55,8 @@ import sys
 import time
 import struct
 
+from crsf_protocol import crc8_dvb_s2 as crsf_crc8
+
 DEVICE = sys.argv[1] if len(sys.argv) > 1 else "/dev/ttyACM0"
 CRSF_BAUD = 420000
 
@@ -63,15 +65,7 @@ CRSF_BAUD = 420000
 # ---------------------------------------------------------------------------
 def crc8_dvb_s2(data: bytes) -> int:
     """CRC8-DVB-S2: poly=0xD5, init=0. Covers type+payload, not addr/len."""
-    crc = 0
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc = ((crc << 1) ^ 0xD5) & 0xFF
-            else:
-                crc = (crc << 1) & 0xFF
-    return crc
+    return crsf_crc8(0, data)
 
 
 # ---------------------------------------------------------------------------
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+CRSF Framing Library
+
+Shared CRSF constants, CRC and frame parsing for the tools in this
+directory (crsf_stream_parser.py, crsf_rc_sender.py,
+crsf_passthrough_ping.py, test_*.py).
+
+Frame layout: [Address][Length][Type][Payload...][CRC8]
+- Length counts Type + Payload + CRC (2..CRSF_PAYLOAD_SIZE_MAX + 2)
+- CRC8 DVB-S2 (poly 0xD5, init 0) covers Type + Payload
+
+CRSFStreamParser is incremental: feed() it whatever the socket or serial
+port returned and it yields the complete frames. It reads by offset and
+compacts its buffer once per feed() call, so the buffer never holds more
+than one partial frame. A bad length byte starts a sync search that skips
+forward to the next plausible frame start; skipped bytes are counted, not
+printed. CRSFStats keeps per-type counts and rates, CRC failures and
+resync bytes, so a multi-hour capture is validated in constant memory.
+
+Usage:
+    from crsf_protocol import CRSFStreamParser
+
+    parser = CRSFStreamParser()
+    while True:
+        for frame in parser.feed(sock.recv(4096)):
+            print(frame)
+    parser.stats.print_summary()
+"""
+
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# CRSF Constants
+CRSF_ADDRESS_BROADCAST = 0x00
+CRSF_ADDRESS_FLIGHT_CONTROLLER = 0xC8
+CRSF_ADDRESS_RADIO_TRANSMITTER = 0xEA
+CRSF_ADDRESS_CRSF_RECEIVER = 0xEC
+CRSF_ADDRESS_CRSF_TRANSMITTER = 0xEE
+
+CRSF_PAYLOAD_SIZE_MAX = 62
+CRSF_FRAME_SIZE_MAX = 64
+CRSF_FRAME_LENGTH_MIN = 2                           # Type + CRC
+CRSF_FRAME_LENGTH_MAX = CRSF_FRAME_SIZE_MAX - 2     # Type + Payload + CRC
+
+# Frame types
+CRSF_FRAMETYPE_GPS = 0x02
+CRSF_FRAMETYPE_VARIO_SENSOR = 0x07
+CRSF_FRAMETYPE_BATTERY_SENSOR = 0x08
+CRSF_FRAMETYPE_BAROMETER_ALTITUDE = 0x09
+CRSF_FRAMETYPE_AIRSPEED_SENSOR = 0x0A
+CRSF_FRAMETYPE_HEARTBEAT = 0x0B
+CRSF_FRAMETYPE_RPM = 0x0C
+CRSF_FRAMETYPE_TEMP = 0x0D
+CRSF_FRAMETYPE_LINK_STATISTICS = 0x14
+CRSF_FRAMETYPE_RC_CHANNELS_PACKED = 0x16
+CRSF_FRAMETYPE_ATTITUDE = 0x1E
+CRSF_FRAMETYPE_FLIGHT_MODE = 0x21
+CRSF_FRAMETYPE_DEVICE_PING = 0x28
+CRSF_FRAMETYPE_DEVICE_INFO = 0x29
+
+FRAME_NAMES = {
+    0x02: "GPS",
+    0x07: "VARIO",
+    0x08: "BATTERY",
+    0x09: "BAROMETER",
+    0x0A: "AIRSPEED",
+    0x0B: "HEARTBEAT",
+    0x0C: "RPM",
+    0x0D: "TEMPERATURE",
+    0x14: "LINK_STATS",
+    0x16: "RC_CHANNELS",
+    0x1E: "ATTITUDE",
+    0x21: "FLIGHT_MODE",
+    0x28: "DEVICE_PING",
+    0x29: "DEVICE_INFO",
+}
+
+
+def frame_name(frame_type: int) -> str:
+    return FRAME_NAMES.get(frame_type, f"UNKNOWN(0x{frame_type:02X})")
+
+
+def _crc8_table(poly: int) -> bytes:
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
+CRC8_DVB_S2_TABLE = _crc8_table(0xD5)
+
+
+def crc8_dvb_s2(crc: int, data: bytes) -> int:
+    """Calculate CRC8 DVB-S2 (matches INAV implementation), one table lookup per byte"""
+    table = CRC8_DVB_S2_TABLE
+    for byte in data:
+        crc = table[crc ^ byte]
+    return crc
+
+
+def build_frame(address: int, frame_type: int, payload: bytes) -> bytes:
+    """[Address][Length][Type][Payload][CRC8] with CRC over Type + Payload"""
+    body = bytes([frame_type]) + bytes(payload)
+    return bytes([address, len(body) + 1]) + body + bytes([crc8_dvb_s2(0, body)])
+
+
+def validate_crsf_frame(data):
+    """
+    Validate CRSF frame structure matching EdgeTX requirements.
+
+    Returns:
+        (is_valid: bool, error_type: str, error_detail: str)
+
+    EdgeTX validation checks:
+    - Minimum frame length (4 bytes: Address + Length + Type + CRC)
+    - Valid address (0x00-0xFF, typically 0xC8 for FC, 0xEA for radio, 0xEC for receiver)
+    - Length field consistency (matches actual frame size)
+    - Valid payload length (Type + Payload + CRC = Length field)
+    - CRC8 DVB-S2 validation
+    - Frame size limits (max ~64 bytes for CRSF)
+    """
+    # Check minimum length
+    if len(data) < 4:
+        return (False, "LENGTH_TOO_SHORT", f"Frame too short: {len(data)} bytes (minimum 4)")
+
+    length_field = data[1]  # This is Type(1) + Payload(N) + CRC(1)
+
+    # Calculate expected total frame size
+    expected_total_len = length_field + 2  # +2 for Address and Length bytes
+
+    # Check if we have complete frame
+    if len(data) < expected_total_len:
+        return (False, "LENGTH_MISMATCH",
+                f"Incomplete frame: got {len(data)} bytes, expected {expected_total_len}")
+
+    if len(data) > expected_total_len:
+        return (False, "LENGTH_EXCESS",
+                f"Frame too long: got {len(data)} bytes, expected {expected_total_len}")
+
+    # Check maximum frame size (CRSF max payload is typically 60 bytes)
+    if expected_total_len > CRSF_FRAME_SIZE_MAX:
+        return (False, "FRAME_TOO_LARGE",
+                f"Frame exceeds maximum size: {expected_total_len} bytes (max {CRSF_FRAME_SIZE_MAX})")
+
+    # Check minimum payload (at least Type + CRC = 2 bytes)
+    if length_field < CRSF_FRAME_LENGTH_MIN:
+        return (False, "PAYLOAD_TOO_SHORT",
+                f"Length field too small: {length_field} (minimum 2 for Type+CRC)")
+
+    # Validate CRC
+    # CRC is calculated over Type + Payload (exclude Address, Length, and CRC itself)
+    expected_crc = data[-1]
+    calculated_crc = crc8_dvb_s2(0, data[2:-1])
+
+    if calculated_crc != expected_crc:
+        return (False, "CRC_MISMATCH",
+                f"CRC failed: expected 0x{expected_crc:02X}, calculated 0x{calculated_crc:02X}")
+
+    # Any address is accepted; EdgeTX expects FC=0xC8, Radio=0xEA,
+    # Receiver=0xEC, Broadcast=0x00
+
+    # All checks passed
+    return (True, None, None)
+
+
+class CRSFFrame:
+    """Parsed CRSF frame"""
+    def __init__(self, address: int, frame_type: int, payload: bytes, crc: int, valid: bool):
+        self.address = address
+        self.type = frame_type
+        self.payload = payload
+        self.crc = crc
+        self.valid = valid
+        self.size = 2 + 1 + len(payload) + 1  # addr + len + type + payload + crc
+
+    @property
+    def name(self) -> str:
+        return frame_name(self.type)
+
+    def to_bytes(self) -> bytes:
+        return bytes([self.address, len(self.payload) + 2, self.type]) + self.payload + bytes([self.crc])
+
+    def __str__(self):
+        status = "✓" if self.valid else "✗ CRC FAIL"
+        return f"[{status}] {self.name:12s} addr=0x{self.address:02X} len={len(self.payload):2d} crc=0x{self.crc:02X}"
+
+
+class CRSFStats:
+    """Running counters for one CRSF stream"""
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.frames = 0
+        self.frames_by_type: Dict[int, int] = {}
+        self.crc_errors = 0
+        self.crc_errors_by_type: Dict[int, int] = {}
+        self.sync_errors = 0        # bad length bytes that started a sync search
+        self.resync_bytes = 0       # bytes skipped while searching for a frame start
+        self.start_time = time.monotonic()
+
+    def record(self, frame: CRSFFrame):
+        self.frames += 1
+        self.frames_by_type[frame.type] = self.frames_by_type.get(frame.type, 0) + 1
+        if not frame.valid:
+            self.crc_errors += 1
+            self.crc_errors_by_type[frame.type] = self.crc_errors_by_type.get(frame.type, 0) + 1
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.start_time
+
+    def rates(self, elapsed: Optional[float] = None) -> Dict[int, float]:
+        """Frames per second by type (valid and CRC-failed) over `elapsed` seconds"""
+        elapsed = self.elapsed if elapsed is None else elapsed
+        if elapsed <= 0:
+            return {t: 0.0 for t in self.frames_by_type}
+        return {t: count / elapsed for t, count in self.frames_by_type.items()}
+
+    @property
+    def errors(self) -> int:
+        return self.crc_errors + self.sync_errors
+
+    def print_summary(self, elapsed: Optional[float] = None):
+        elapsed = self.elapsed if elapsed is None else elapsed
+        rates = self.rates(elapsed)
+        print(f"{self.frames} frames, {self.bytes_in} bytes in {elapsed:.1f}s")
+        for frame_type in sorted(self.frames_by_type):
+            bad = self.crc_errors_by_type.get(frame_type, 0)
+            crc_note = f", {bad} CRC fail" if bad else ""
+            print(f"  {frame_name(frame_type):15s}: {self.frames_by_type[frame_type]:7d} frames "
+                  f"({rates[frame_type]:7.2f} Hz{crc_note})")
+        print(f"CRC failures: {self.crc_errors}")
+        print(f"Sync errors: {self.sync_errors} ({self.resync_bytes} bytes skipped)")
+
+
+class CRSFStreamParser:
+    """
+    Incremental CRSF frame parser.
+
+    feed(data) returns the frames completed by `data`. Frames that fail
+    the CRC are returned with valid=False (and counted); their length byte
+    may be noise, so parsing resumes at the next byte that could start a
+    frame rather than after them. A length byte out of range counts a sync
+    error and skips the same way. With `sync_addresses` set, only those
+    bytes are accepted as frame starts, which resyncs faster on a noisy
+    line.
+    """
+
+    def __init__(self, sync_addresses: Optional[Iterable[int]] = None,
+                 stats: Optional[CRSFStats] = None):
+        self.sync_addresses = frozenset(sync_addresses) if sync_addresses is not None else None
+        self.stats = stats if stats is not None else CRSFStats()
+        self._buffer = bytearray()
+
+    @property
+    def pending(self) -> int:
+        """Bytes held back waiting for the rest of a frame"""
+        return len(self._buffer)
+
+    def _is_start(self, buf, pos: int) -> bool:
+        if self.sync_addresses is not None and buf[pos] not in self.sync_addresses:
+            return False
+        return pos + 1 >= len(buf) or CRSF_FRAME_LENGTH_MIN <= buf[pos + 1] <= CRSF_FRAME_LENGTH_MAX
+
+    def _resync(self, buf, pos: int) -> int:
+        """Position of the next possible frame start after `pos` (bounded by the buffer)"""
+        end = len(buf)
+        pos += 1
+        while pos < end and not self._is_start(buf, pos):
+            pos += 1
+        return pos
+
+    def feed(self, data: bytes) -> List[CRSFFrame]:
+        stats = self.stats
+        stats.bytes_in += len(data)
+        buf = self._buffer
+        buf += data
+        end = len(buf)
+        pos = 0
+        frames = []
+        table = CRC8_DVB_S2_TABLE
+        sync = self.sync_addresses
+
+        while end - pos >= 2:
+            length = buf[pos + 1]
+            if (length < CRSF_FRAME_LENGTH_MIN or length > CRSF_FRAME_LENGTH_MAX
+                    or (sync is not None and buf[pos] not in sync)):
+                stats.sync_errors += 1
+                start = pos
+                pos = self._resync(buf, pos)
+                stats.resync_bytes += pos - start
+                continue
+
+            frame_end = pos + 2 + length
+            if frame_end > end:
+                break  # Need more data
+
+            crc = 0
+            for i in range(pos + 2, frame_end - 1):
+                crc = table[crc ^ buf[i]]
+            frame = CRSFFrame(buf[pos], buf[pos + 2], bytes(buf[pos + 3:frame_end - 1]),
+                              buf[frame_end - 1], crc == buf[frame_end - 1])
+            stats.record(frame)
+            frames.append(frame)
+            if frame.valid:
+                pos = frame_end
+            else:
+                # A noise byte that looks like a length would swallow the
+                # real frames it covers; look for a start inside it instead
+                start = pos
+                pos = self._resync(buf, pos)
+                stats.resync_bytes += pos - start
+
+        # One compaction per feed(): what is left is less than one frame
+        if pos:
+            del buf[:pos]
+        return frames
+
+
+def parse_capture(data: bytes, **kwargs) -> Tuple[List[CRSFFrame], CRSFStats]:
+    """Parse a complete capture in one call; returns (frames, stats)"""
+    parser = CRSFStreamParser(**kwargs)
+    frames = parser.feed(data)
+    return frames, parser.stats
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+CRSF RC Channels Frame Encoder
+
+Builds RC_CHANNELS_PACKED (0x16) frames without per-frame Python loops over
+channels or CRC bits:
+
+- RCFrameEncoder keeps the 176-bit channel payload as one integer and only
+  converts and re-packs the channels that changed since the last frame.
+  Complete frames are cached by channel set, so a sender that repeats the
+  same sticks (the common case) gets the same bytes object back.
+- encode_rc_frames() encodes a whole stick trajectory at once with NumPy
+  (bit packing via np.packbits, CRC one table lookup per byte column for
+  all frames) into one contiguous (N, 26) uint8 array. A sender at 500 Hz
+  or more then only slices and writes.
+
+Channel values are CRSF ticks (0-2047, 992 = center). us_to_crsf() gives
+the 1000-2000us mapping crsf_rc_sender.py has always used
+(172 + (us - 1000) * 1.639, clamped to 172-1811).
+
+Frame: [0xC8][24][0x16][22 bytes: 16 x 11-bit channels, LSB first][CRC8]
+
+Usage:
+    from crsf_rc_encoder import RCFrameEncoder, encode_rc_frames, us_to_crsf
+
+    encoder = RCFrameEncoder()
+    frame = encoder.encode_us([1500] * 16)
+
+    frames = encode_rc_frames(us_to_crsf(trajectory_us))   # (N, 26) uint8
+    sock.sendall(frames[k].tobytes())
+"""
+
+from collections import OrderedDict
+from typing import Sequence
+
+from crsf_protocol import (
+    CRC8_DVB_S2_TABLE,
+    CRSF_ADDRESS_FLIGHT_CONTROLLER,
+    CRSF_FRAMETYPE_RC_CHANNELS_PACKED,
+    crc8_dvb_s2,
+)
+
+RC_CHANNEL_COUNT = 16
+RC_CHANNEL_BITS = 11
+RC_CHANNEL_MASK = (1 << RC_CHANNEL_BITS) - 1
+RC_PAYLOAD_SIZE = RC_CHANNEL_COUNT * RC_CHANNEL_BITS // 8     # 22
+RC_FRAME_SIZE = RC_PAYLOAD_SIZE + 4                             # addr + len + type + crc
+
+# Microsecond mapping used by crsf_rc_sender.py
+CRSF_US_MIN_TICKS = 172
+CRSF_US_MAX_TICKS = 1811
+CRSF_US_SCALE = 1.639
+
+_HEADER = bytes([CRSF_ADDRESS_FLIGHT_CONTROLLER, RC_PAYLOAD_SIZE + 2, CRSF_FRAMETYPE_RC_CHANNELS_PACKED])
+
+
+def us_to_tick(us: float) -> int:
+    """1000-2000us -> CRSF ticks, truncated like int() and clamped to 172-1811"""
+    return max(CRSF_US_MIN_TICKS, min(CRSF_US_MAX_TICKS, int((us - 1000) * CRSF_US_SCALE + CRSF_US_MIN_TICKS)))
+
+
+def us_to_crsf(channels_us):
+    """
+    us_to_tick() for every channel. Takes a sequence (returns a list) or a
+    NumPy array (returns an int64 array).
+    """
+    if hasattr(channels_us, 'dtype'):
+        import numpy as np
+        ticks = np.trunc((np.asarray(channels_us, dtype=np.float64) - 1000) * CRSF_US_SCALE + CRSF_US_MIN_TICKS)
+        return np.clip(ticks, CRSF_US_MIN_TICKS, CRSF_US_MAX_TICKS).astype(np.int64)
+    return [us_to_tick(us) for us in channels_us]
+
+
+def pack_channels(ticks: Sequence[int]) -> bytes:
+    """16 channels (0-2047) -> 22-byte payload, 11 bits each, LSB first"""
+    bits = 0
+    for i, value in enumerate(ticks):
+        bits |= (int(value) & RC_CHANNEL_MASK) << (i * RC_CHANNEL_BITS)
+    return bits.to_bytes(RC_PAYLOAD_SIZE, 'little')
+
+
+def build_rc_frame(payload: bytes) -> bytes:
+    """Complete RC_CHANNELS_PACKED frame around a 22-byte payload"""
+    crc = crc8_dvb_s2(CRC8_DVB_S2_TABLE[CRSF_FRAMETYPE_RC_CHANNELS_PACKED], payload)
+    return _HEADER + payload + bytes([crc])
+
+
+class RCFrameEncoder:
+    """
+    Incremental RC frame encoder with a cache of recent channel sets.
+
+    encode(ticks) returns the frame bytes for 16 channel values (CRSF
+    ticks, clamped to 0-2047). Only channels that differ from the previous
+    call are re-packed; up to `cache_size` recent channel sets keep their
+    finished frame.
+    """
+
+    def __init__(self, cache_size: int = 256):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()       # ticks -> frame
+        self._us_cache = OrderedDict()    # microseconds -> frame
+        self._ticks = [0] * RC_CHANNEL_COUNT
+        self._us = [None] * RC_CHANNEL_COUNT
+        self._us_ticks = [0] * RC_CHANNEL_COUNT
+        self._bits = 0
+        self.hits = 0
+        self.misses = 0
+
+    def encode(self, ticks: Sequence[int]) -> bytes:
+        key = tuple(ticks)
+        frame = self._cache.get(key)
+        if frame is not None:
+            self._cache.move_to_end(key)
+            self.hits += 1
+            return frame
+        self.misses += 1
+
+        if len(key) != RC_CHANNEL_COUNT:
+            raise ValueError(f"expected {RC_CHANNEL_COUNT} channels, got {len(key)}")
+        # Work on copies and commit once the frame is packed, so a bad value
+        # leaves the encoder state as it was
+        bits = self._bits
+        current = list(self._ticks)
+        for i, value in enumerate(key):
+            if value == current[i]:
+                continue
+            # NumPy integers would overflow int64 in the shift below
+            value = max(0, min(RC_CHANNEL_MASK, int(value)))
+            if value != current[i]:
+                shift = i * RC_CHANNEL_BITS
+                bits = (bits & ~(RC_CHANNEL_MASK << shift)) | (value << shift)
+                current[i] = value
+        self._bits = bits
+        self._ticks = current
+
+        frame = build_rc_frame(bits.to_bytes(RC_PAYLOAD_SIZE, 'little'))
+        self._remember(self._cache, key, frame)
+        return frame
+
+    def encode_us(self, channels_us: Sequence[float]) -> bytes:
+        """encode() for 1000-2000us channel values (crsf_rc_sender.py mapping)"""
+        key = tuple(channels_us)
+        frame = self._us_cache.get(key)
+        if frame is not None:
+            self._us_cache.move_to_end(key)
+            self.hits += 1
+            return frame
+        if len(key) != RC_CHANNEL_COUNT:
+            raise ValueError(f"expected {RC_CHANNEL_COUNT} channels, got {len(key)}")
+        # Convert only the channels that changed since the last call
+        last_us = list(self._us)
+        ticks = list(self._us_ticks)
+        for i, us in enumerate(key):
+            if us != last_us[i]:
+                ticks[i] = us_to_tick(us)
+                last_us[i] = us
+        frame = self.encode(ticks)
+        self._us, self._us_ticks = last_us, ticks
+        self._remember(self._us_cache, key, frame)
+        return frame
+
+    def _remember(self, cache: OrderedDict, key: tuple, frame: bytes):
+        cache[key] = frame
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+
+def encode_rc_frames(ticks):
+    """
+    Encode N channel sets at once.
+
+    Args:
+        ticks: (N, 16) array-like of CRSF ticks (clamped to 0-2047)
+
+    Returns:
+        (N, RC_FRAME_SIZE) uint8 array, C-contiguous: frames[k].tobytes()
+        is frame k and frames.tobytes() is the whole stream back to back.
+    """
+    import numpy as np
+
+    ticks = np.clip(np.asarray(ticks, dtype=np.int64), 0, RC_CHANNEL_MASK)
+    if ticks.ndim != 2 or ticks.shape[1] != RC_CHANNEL_COUNT:
+        raise ValueError(f"expected (N, {RC_CHANNEL_COUNT}) channels, got {ticks.shape}")
+    count = len(ticks)
+
+    frames = np.empty((count, RC_FRAME_SIZE), dtype=np.uint8)
+    frames[:, :3] = np.frombuffer(_HEADER, dtype=np.uint8)
+
+    # Each channel's 11 bits LSB first, then 8 bits per byte LSB first
+    bits = ((ticks[:, :, None] >> np.arange(RC_CHANNEL_BITS)) & 1).astype(np.uint8)
+    frames[:, 3:3 + RC_PAYLOAD_SIZE] = np.packbits(bits.reshape(count, -1), axis=1, bitorder='little')
+
+    # CRC over type + payload, one table lookup per column for all frames
+    table = np.frombuffer(CRC8_DVB_S2_TABLE, dtype=np.uint8)
+    crc = np.zeros(count, dtype=np.uint8)
+    for column in range(2, 3 + RC_PAYLOAD_SIZE):
+        crc = table[crc ^ frames[:, column]]
+    frames[:, -1] = crc
+    return frames
+
+
+def encode_trajectory_us(channels_us):
+    """encode_rc_frames() for an (N, 16) array of 1000-2000us values"""
+    import numpy as np
+    return encode_rc_frames(us_to_crsf(np.asarray(channels_us, dtype=np.float64)))
@@ -43,6 +43,8 @@ BEHAVIOR:
       RC sender before/during SITL boot)
     - Sends all 16 channels at midpoint (1500us) at specified rate
     - Continuously reads telemetry frames from FC on same socket
+    - RC frames go out on a monotonic-clock slot schedule, telemetry is
+      decoded on the same event loop (crsf_link_emulator.py), 50-1000 Hz
     - Updates every 50 frames with actual send rate and telemetry stats
     - Optionally displays telemetry frames to STDOUT (use --show-telemetry)
 
@@ -51,8 +53,8 @@ ERROR DETECTION (EdgeTX-Compatible):
     - CRC8 DVB-S2 validation (detects corrupted frames)
     - Frame length consistency (detects truncated/malformed frames)
     - Payload length validation (detects invalid frame structures)
-    - Sync/framing error detection (attempts resynchronization on corruption)
-    - Buffer overflow protection (prevents unbounded memory growth)
+    - Sync/framing error detection (resynchronizes on corruption, see crsf_protocol.py)
+    - Bounded receive buffer (never more than one partial frame, nothing dropped)
 
     Error types detected and reported:
     - CRC_MISMATCH: Frame failed CRC check
@@ -62,7 +64,6 @@ ERROR DETECTION (EdgeTX-Compatible):
     - FRAME_TOO_LARGE: Frame exceeds maximum CRSF size (64 bytes)
     - PAYLOAD_TOO_SHORT: Length field < 2 (Type + CRC minimum)
     - Sync/Framing Errors: Invalid length field, stream corruption
-    - Buffer Overflows: Receive buffer exceeded 512 bytes
 
     Summary includes stream health indicator:
     - EXCELLENT: 0% error rate
@@ -81,46 +82,50 @@ OUTPUT:
     With --show-telemetry:
     - Valid frames: [TELEM] FRAME_NAME (bytes, CRC:✓): hex dump
     - Error frames: [ERROR] ERROR_TYPE: detailed error message
-    - Warning messages: [WARN] sync errors, buffer overflows
+    - Warning messages: [WARN] sync errors
 
     Summary always shows:
+    - Send interval histogram, send lateness, missed slots
+    - Telemetry latency after the last RC frame, by frame type
     - Telemetry frame breakdown by type
     - Validation error counts by type
-    - Stream error counts (sync/framing, buffer overflow)
+    - Stream error counts (sync/framing)
     - Overall stream health indicator
 """
 
 import socket
-import struct
 import time
 import sys
-import select
 
-# CRSF Constants
-CRSF_ADDRESS_FLIGHT_CONTROLLER = 0xC8
-CRSF_ADDRESS_BROADCAST = 0x00
-CRSF_FRAMETYPE_RC_CHANNELS_PACKED = 0x16
+from crsf_protocol import (
+    CRSF_ADDRESS_BROADCAST,
+    CRSF_ADDRESS_FLIGHT_CONTROLLER,
+    CRSF_FRAMETYPE_ATTITUDE,
+    CRSF_FRAMETYPE_BATTERY_SENSOR,
+    CRSF_FRAMETYPE_FLIGHT_MODE,
+    CRSF_FRAMETYPE_GPS,
+    CRSF_FRAMETYPE_HEARTBEAT,
+    CRSF_FRAMETYPE_LINK_STATISTICS,
+    CRSF_FRAMETYPE_RC_CHANNELS_PACKED,
+    CRSF_FRAMETYPE_VARIO_SENSOR as CRSF_FRAMETYPE_VARIO,
+    crc8_dvb_s2,
+    validate_crsf_frame,
+)
+from crsf_link_emulator import RCLinkEmulator
+from crsf_rc_encoder import RCFrameEncoder, pack_channels, us_to_crsf
+
 CRSF_FRAME_RC_CHANNELS_PAYLOAD_SIZE = 22  # 11 bits per channel * 16 channels = 22 bytes
 
-# CRSF Telemetry Frame Types
-CRSF_FRAMETYPE_GPS = 0x02
-CRSF_FRAMETYPE_BATTERY_SENSOR = 0x08
-CRSF_FRAMETYPE_LINK_STATISTICS = 0x14
-CRSF_FRAMETYPE_FLIGHT_MODE = 0x21
-CRSF_FRAMETYPE_ATTITUDE = 0x1E
-CRSF_FRAMETYPE_VARIO = 0x07
-CRSF_FRAMETYPE_HEARTBEAT = 0x0B
-
-def crc8_dvb_s2(crc: int, data: bytes) -> int:
-    """Calculate CRC8 DVB-S2 (matches INAV implementation)"""
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc = ((crc << 1) ^ 0xD5) & 0xFF
-            else:
-                crc = (crc << 1) & 0xFF
-    return crc
+# The constants and CRC/validation helpers now live in crsf_protocol.py;
+# they stay importable from here for test_crsf_frames.py and friends
+__all__ = [
+    'CRSF_ADDRESS_BROADCAST', 'CRSF_ADDRESS_FLIGHT_CONTROLLER', 'CRSF_FRAMETYPE_ATTITUDE',
+    'CRSF_FRAMETYPE_BATTERY_SENSOR', 'CRSF_FRAMETYPE_FLIGHT_MODE', 'CRSF_FRAMETYPE_GPS',
+    'CRSF_FRAMETYPE_HEARTBEAT', 'CRSF_FRAMETYPE_LINK_STATISTICS',
+    'CRSF_FRAMETYPE_RC_CHANNELS_PACKED', 'CRSF_FRAMETYPE_VARIO',
+    'CRSF_FRAME_RC_CHANNELS_PAYLOAD_SIZE', 'crc8_dvb_s2', 'validate_crsf_frame',
+    'pack_rc_channels', 'create_rc_frame', 'parse_telemetry_frame', 'send_rc_frames',
+]
 
 def pack_rc_channels(channels):
     """
@@ -128,34 +133,11 @@ def pack_rc_channels(channels):
 
     Channel values: 172-1811 (988-2012us), center at 992 (1500us)
     """
-    # Clamp and convert to 11-bit range
-    packed = []
-    for ch in channels:
-        # Convert 1000-2000us to 172-1811 (11-bit range)
-        # Formula: (value - 1000) * 1.639 + 172
-        value = int((ch - 1000) * 1.639 + 172)
-        value = max(172, min(1811, value))  # Clamp to valid range
-        packed.append(value)
-
-    # Pack 16 channels (11 bits each) into bytes
-    bits = 0
-    bit_count = 0
-    result = bytearray()
-
-    for ch_val in packed:
-        bits |= (ch_val << bit_count)
-        bit_count += 11
-
-        while bit_count >= 8:
-            result.append(bits & 0xFF)
-            bits >>= 8
-            bit_count -= 8
-
-    # Add any remaining bits
-    if bit_count > 0:
-        result.append(bits & 0xFF)
-
-    return bytes(result[:22])  # Should be exactly 22 bytes
+    # Convert 1000-2000us to 172-1811 (11-bit range), see crsf_rc_encoder.py
+    return pack_channels(us_to_crsf(channels))
+
+# Frames for recently used channel sets are cached
+_rc_encoder = RCFrameEncoder()
 
 def create_rc_frame(channels):
     """
@@ -164,83 +146,7 @@ def create_rc_frame(channels):
     Frame structure:
     [Address][Length][Type][Payload (22 bytes)][CRC8]
     """
-    # Pack channel data
-    payload = pack_rc_channels(channels)
-
-    # Build frame
-    frame = bytearray()
-    frame.append(CRSF_ADDRESS_FLIGHT_CONTROLLER)
-    frame.append(CRSF_FRAME_RC_CHANNELS_PAYLOAD_SIZE + 2)  # Type + Payload + CRC
-    frame.append(CRSF_FRAMETYPE_RC_CHANNELS_PACKED)
-    frame.extend(payload)
-
-    # Calculate CRC over Type + Payload
-    crc = crc8_dvb_s2(0, bytes(frame[2:]))
-    frame.append(crc)
-
-    return bytes(frame)
-
-def validate_crsf_frame(data):
-    """
-    Validate CRSF frame structure matching EdgeTX requirements.
-
-    Returns:
-        (is_valid: bool, error_type: str, error_detail: str)
-
-    EdgeTX validation checks:
-    - Minimum frame length (4 bytes: Address + Length + Type + CRC)
-    - Valid address (0x00-0xFF, typically 0xC8 for FC, 0xEA for radio, 0xEC for receiver)
-    - Length field consistency (matches actual frame size)
-    - Valid payload length (Type + Payload + CRC = Length field)
-    - CRC8 DVB-S2 validation
-    - Frame size limits (max ~64 bytes for CRSF)
-    """
-    # Check minimum length
-    if len(data) < 4:
-        return (False, "LENGTH_TOO_SHORT", f"Frame too short: {len(data)} bytes (minimum 4)")
-
-    address = data[0]
-    length_field = data[1]  # This is Type(1) + Payload(N) + CRC(1)
-    frame_type = data[2]
-
-    # Calculate expected total frame size
-    expected_total_len = length_field + 2  # +2 for Address and Length bytes
-
-    # Check if we have complete frame
-    if len(data) < expected_total_len:
-        return (False, "LENGTH_MISMATCH",
-                f"Incomplete frame: got {len(data)} bytes, expected {expected_total_len}")
-
-    if len(data) > expected_total_len:
-        return (False, "LENGTH_EXCESS",
-                f"Frame too long: got {len(data)} bytes, expected {expected_total_len}")
-
-    # Check maximum frame size (CRSF max payload is typically 60 bytes)
-    if expected_total_len > 64:
-        return (False, "FRAME_TOO_LARGE",
-                f"Frame exceeds maximum size: {expected_total_len} bytes (max 64)")
-
-    # Check minimum payload (at least Type + CRC = 2 bytes)
-    if length_field < 2:
-        return (False, "PAYLOAD_TOO_SHORT",
-                f"Length field too small: {length_field} (minimum 2 for Type+CRC)")
-
-    # Validate CRC
-    # CRC is calculated over Type + Payload (exclude Address, Length, and CRC itself)
-    crc_data = data[2:-1]  # Type + Payload
-    expected_crc = data[-1]
-    calculated_crc = crc8_dvb_s2(0, crc_data)
-
-    if calculated_crc != expected_crc:
-        return (False, "CRC_MISMATCH",
-                f"CRC failed: expected 0x{expected_crc:02X}, calculated 0x{calculated_crc:02X}")
-
-    # Check for valid address range (permissive - allow any address for now)
-    # EdgeTX expects: FC=0xC8, Radio=0xEA, Receiver=0xEC, Broadcast=0x00
-    # But we'll accept any address to be compatible
-
-    # All checks passed
-    return (True, None, None)
+    return _rc_encoder.encode_us(channels)
 
 
 def parse_telemetry_frame(data, show_telemetry, error_stats):
@@ -341,9 +247,6 @@ def send_rc_frames(uart_num=2, rate_hz=50, duration_sec=None, connect_timeout=30
 
     print(f"✓ Connected to 127.0.0.1:{port} (after {retry_count} retries)")
 
-    # Set socket to non-blocking for select()
-    sock.setblocking(False)
-
     print(f"\nSending RC frames at {rate_hz}Hz...")
     print("Channels: All at 1500us (midpoint)")
     print(f"Telemetry display: {'ENABLED' if show_telemetry else 'DISABLED (use --show-telemetry to enable)'}")
@@ -354,131 +257,51 @@ def send_rc_frames(uart_num=2, rate_hz=50, duration_sec=None, connect_timeout=30
     print()
 
     # Default channels - all at midpoint (1500us)
-    channels = [1500] * 16
+    # Set throttle low, then arm, then raise throttle
+    def channels(throttle, arm):
+        values = [1500] * 16
+        values[2] = throttle
+        values[4] = arm
+        return values
+
+    frame_disarmed = create_rc_frame(channels(1000, 1000))
+    frame_armed = create_rc_frame(channels(1000, 2000))
+    frame_throttle_up = create_rc_frame(channels(1600, 2000))
+
+    def rc_frame_at(k, elapsed):
+        if elapsed > 4:
+            return frame_throttle_up
+        if elapsed > 3:
+            return frame_armed
+        return frame_disarmed
 
-    frame_interval = 1.0 / rate_hz
-    frame_count = 0
-    telemetry_count = 0
     telemetry_frames = {}  # Count by frame type
     error_stats = {}       # Count by error type
-    rx_buffer = bytearray()
-    sync_errors = 0        # Count framing/sync losses
-    buffer_overflows = 0   # Count buffer overflow events
-    start_time = time.time()
-    next_send_time = start_time
 
-    # Buffer management
-    MAX_BUFFER_SIZE = 512  # Prevent buffer from growing unbounded
+    def on_telemetry(frame, latency):
+        # Validate each complete frame (CRC failures included)
+        frame_type = parse_telemetry_frame(frame.to_bytes(), show_telemetry, error_stats)
+        telemetry_frames[frame_type] = telemetry_frames.get(frame_type, 0) + 1
+
+    def on_frame(k):
+        # Status update every 50 frames
+        sent = link.report.sent
+        if sent % 50 == 0:
+            elapsed = time.perf_counter() - run_start
+            actual_rate = sent / elapsed if elapsed > 0 else 0
+            telem_summary = ', '.join(f"{k}:{v}" for k, v in sorted(telemetry_frames.items()))
+            print(f"Sent {sent} frames ({actual_rate:.1f} Hz) | "
+                  f"Received {sum(telemetry_frames.values())} telemetry frames [{telem_summary}]")
+
+    # RC slots on a monotonic schedule, telemetry decoded on the same loop
+    link = RCLinkEmulator(sock, rate_hz, rc_frame_at, on_frame=on_frame, on_telemetry=on_telemetry)
+    rx_stream = link.parser
+    run_start = time.perf_counter()
 
     try:
-        while True:
-            current_time = time.time()
-
-            # Calculate time until next RC frame
-            time_until_send = next_send_time - current_time
-
-            # Check for incoming telemetry (non-blocking with timeout)
-            if time_until_send > 0:
-                # Wait for readable data with timeout
-                readable, _, _ = select.select([sock], [], [], min(time_until_send, 0.01))
-            else:
-                # Time to send, check for data without blocking
-                readable, _, _ = select.select([sock], [], [], 0)
-
-            # Read telemetry if available
-            if readable:
-                try:
-                    chunk = sock.recv(256)
-                    if chunk:
-                        rx_buffer.extend(chunk)
-
-                        # Check for buffer overflow
-                        if len(rx_buffer) > MAX_BUFFER_SIZE:
-                            buffer_overflows += 1
-                            if show_telemetry:
-                                print(f"[WARN] Buffer overflow: {len(rx_buffer)} bytes, discarding excess")
-                            # Keep only the most recent data
-                            rx_buffer = rx_buffer[-MAX_BUFFER_SIZE:]
-
-                        # Parse complete frames from buffer
-                        while len(rx_buffer) >= 4:
-                            # CRSF frame: [Address][Length][Type][Payload...][CRC]
-                            # Length field is: Type + Payload + CRC
-                            length_field = rx_buffer[1]
-                            expected_len = length_field + 2  # +2 for Address and Length bytes
-
-                            # Sanity check on length field
-                            if length_field < 2 or expected_len > 64:
-                                # Invalid length field - possible framing error
-                                # Try to resync by looking for next valid frame start
-                                sync_errors += 1
-                                if show_telemetry:
-                                    hex_preview = ' '.join(f'{b:02X}' for b in rx_buffer[:min(8, len(rx_buffer))])
-                                    print(f"[WARN] Sync error: invalid length field {length_field}, buffer: {hex_preview}...")
-
-                                # Try to find next potential frame (search for common addresses)
-                                found_sync = False
-                                for i in range(1, len(rx_buffer)-3):
-                                    if rx_buffer[i+1] >= 2 and rx_buffer[i+1] <= 63:  # Valid length range
-                                        # Discard garbage bytes
-                                        if show_telemetry and i > 0:
-                                            discarded = ' '.join(f'{b:02X}' for b in rx_buffer[:i])
-                                            print(f"[WARN] Discarded {i} bytes: {discarded}")
-                                        rx_buffer = rx_buffer[i:]
-                                        found_sync = True
-                                        break
-
-                                if not found_sync:
-                                    # No valid frame found, clear buffer
-                                    if show_telemetry:
-                                        print(f"[WARN] No sync found, clearing {len(rx_buffer)} bytes")
-                                    rx_buffer.clear()
-                                break
-
-                            if len(rx_buffer) >= expected_len:
-                                # Extract frame
-                                frame_data = bytes(rx_buffer[:expected_len])
-                                rx_buffer = rx_buffer[expected_len:]
-
-                                # Parse and validate
-                                frame_type = parse_telemetry_frame(frame_data, show_telemetry, error_stats)
-                                telemetry_count += 1
-                                telemetry_frames[frame_type] = telemetry_frames.get(frame_type, 0) + 1
-                            else:
-                                # Incomplete frame, wait for more data
-                                break
-                except BlockingIOError:
-                    pass  # No data available
-
-            # Send RC frame if it's time
-            if current_time >= next_send_time:
-                frame = create_rc_frame(channels)
-                sock.sendall(frame)
-                frame_count += 1
-                next_send_time += frame_interval
-
-                # Status update every 50 frames
-                if frame_count % 50 == 0:
-                    elapsed = time.time() - start_time
-                    # Set throttle low, then arm, then raise throttle
-                    if (elapsed > 4):
-                      channels[2] = 1600
-                      channels[4] = 2000
-                    elif (elapsed > 3):
-                      channels[2] = 1000
-                      channels[4] = 2000
-                    else:
-                      channels[2] = 1000
-                      channels[4] = 1000
-
-                    actual_rate = frame_count / elapsed if elapsed > 0 else 0
-                    telem_summary = ', '.join(f"{k}:{v}" for k, v in sorted(telemetry_frames.items()))
-                    print(f"Sent {frame_count} frames ({actual_rate:.1f} Hz) | Received {telemetry_count} telemetry frames [{telem_summary}]")
-
-                # Check duration
-                if duration_sec and (time.time() - start_time) >= duration_sec:
-                    break
-
+        link.run(duration_sec)
+        if link.closed:
+            print("\n✗ Connection closed by SITL")
     except KeyboardInterrupt:
         print("\n\n✓ Stopped by user")
     except Exception as e:
@@ -487,13 +310,17 @@ def send_rc_frames(uart_num=2, rate_hz=50, duration_sec=None, connect_timeout=30
     finally:
         sock.close()
 
-    elapsed = time.time() - start_time
-    total_errors = sum(error_stats.values()) + sync_errors + buffer_overflows
+    report = link.report
+    frame_count = report.sent
+    elapsed = report.elapsed_s
+    telemetry_count = sum(telemetry_frames.values())
+    sync_errors = rx_stream.stats.sync_errors
+    total_errors = sum(error_stats.values()) + sync_errors
 
     print(f"\n{'='*70}")
     print(f"SUMMARY")
     print(f"{'='*70}")
-    print(f"RC Frames Sent: {frame_count} in {elapsed:.1f} seconds ({frame_count/elapsed:.1f} Hz avg)")
+    print(f"RC Frames Sent: {frame_count} in {elapsed:.1f} seconds ({frame_count/elapsed if elapsed > 0 else 0:.1f} Hz avg)")
     print(f"Telemetry Received: {telemetry_count} frames")
 
     if telemetry_frames:
@@ -516,12 +343,10 @@ def send_rc_frames(uart_num=2, rate_hz=50, duration_sec=None, connect_timeout=30
         print(f"   Check CRSF configuration and TELEMETRY feature flag")
 
     # Display framing/stream errors
-    if sync_errors > 0 or buffer_overflows > 0:
+    if sync_errors > 0:
         print(f"\n⚠ Stream Errors:")
-        if sync_errors > 0:
-            print(f"  Sync/Framing Errors : {sync_errors:4d} (invalid length field or corrupted data)")
-        if buffer_overflows > 0:
-            print(f"  Buffer Overflows    : {buffer_overflows:4d} (receive buffer exceeded {MAX_BUFFER_SIZE} bytes)")
+        print(f"  Sync/Framing Errors : {sync_errors:4d} (invalid length field or corrupted data, "
+              f"{rx_stream.stats.resync_bytes} bytes skipped)")
 
     # Overall health indicator
     if total_errors == 0:
@@ -534,6 +359,9 @@ def send_rc_frames(uart_num=2, rate_hz=50, duration_sec=None, connect_timeout=30
         print(f"\n✗ CRSF Stream Health: POOR - {total_errors} errors ({100*total_errors/(telemetry_count+total_errors):.2f}% error rate)")
         print(f"   This error rate would likely cause issues with EdgeTX telemetry parsing")
 
+    print(f"\nLink Timing:")
+    report.print_report(rx_stream.stats)
+
     print(f"{'='*70}")
 
     return 0
@@ -545,7 +373,7 @@ if __name__ == "__main__":
     parser.add_argument('uart', type=int, nargs='?', default=2,
                        help='UART number (default: 2)')
     parser.add_argument('--rate', type=int, default=50,
-                       help='Frame rate in Hz (default: 50)')
+                       help='Frame rate in Hz, 50-1000 (default: 50)')
     parser.add_argument('--duration', type=int, default=None,
                        help='Duration in seconds (default: infinite)')
     parser.add_argument('--show-telemetry', action='store_true',
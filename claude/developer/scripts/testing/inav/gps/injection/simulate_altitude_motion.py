@@ -37,6 +37,10 @@ sys.path.insert(0, unavlib_path)
 from unavlib.main import MSPy
 from unavlib.enums.msp_codes import MSPCodes
 
+# Shared CRSF RC frame encoder
+sys.path.insert(0, os.path.join(script_dir, '..', '..', 'crsf'))
+from crsf_rc_encoder import RCFrameEncoder
+
 # CRSF protocol constants
 CRSF_SYNC = 0xC8
 CRSF_FRAMETYPE_RC_CHANNELS_PACKED = 0x16
@@ -61,18 +65,7 @@ VARIO_KL = 0.001525902  # Logarithmic vario constants
 VARIO_KR = 0.1677923
 
 
-def crc8_dvb_s2(data):
-    """Calculate CRC8 DVB-S2"""
-    crc = 0
-    for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            if crc & 0x80:
-                crc = (crc << 1) ^ 0xD5
-            else:
-                crc = crc << 1
-            crc &= 0xFF
-    return crc
+_rc_encoder = RCFrameEncoder()
 
 
 def encode_rc_frame(channels):
@@ -85,30 +78,8 @@ def encode_rc_frame(channels):
     Returns:
         bytes: Complete CRSF RC frame with sync, length, type, data, and CRC
     """
-    # Pack 16 channels into 11-bit values (22 bytes total)
-    packed = bytearray()
-    bits = 0
-    bit_count = 0
-
-    for ch in channels:
-        # Clamp to 11-bit range
-        val = max(0, min(2047, ch))
-        bits |= (val << bit_count)
-        bit_count += 11
-
-        while bit_count >= 8:
-            packed.append(bits & 0xFF)
-            bits >>= 8
-            bit_count -= 8
-
-    # Build frame: sync + length + type + data + CRC
-    frame = bytearray([CRSF_SYNC])
-    payload = bytearray([CRSF_FRAMETYPE_RC_CHANNELS_PACKED]) + packed
-    frame.append(len(payload) + 1)  # +1 for CRC
-    frame.extend(payload)
-    frame.append(crc8_dvb_s2(payload))
-
-    return bytes(frame)
+    # Clamped to the 11-bit range; unchanged channel sets come from the cache
+    return _rc_encoder.encode(channels)
 
 
 def decode_altitude(altitude_packed):
@@ -0,0 +1,404 @@
+#!/usr/bin/env python3
+"""
+MSP Pipeline Benchmark - per-command latency and throughput-knee sweep
+
+Replaces the "fire everything, sleep, count $M> markers" approach of the
+older msp_benchmark*.py scripts with a single engine that:
+
+1. Keeps a configurable number of requests in flight (pipeline depth)
+2. Parses every reply and correlates it to the request that produced it
+3. Reports p50/p95/p99/max round-trip latency per MSP command
+4. Sweeps depth 1..N so the throughput knee of the firmware MSP task
+   becomes visible (the depth after which req/s stops improving and
+   only latency grows)
+
+Works over TCP (SITL UARTs, port 5760 + uart - 1) and serial (USB/UART FC).
+
+Correlation:
+    The firmware answers requests on one port strictly in order, so each
+    reply is matched to the oldest outstanding request with the same
+    command ID. Requests that stay unanswered longer than --timeout are
+    counted as lost and removed from the pipeline.
+
+Usage:
+    # SITL, sweep depth 1..8 over the default command mix
+    python3 msp_pipeline_benchmark.py tcp:localhost:5761 --max-depth 8
+
+    # Hardware FC, explicit depth list and command set
+    python3 msp_pipeline_benchmark.py /dev/ttyACM0 --baud 115200 \\
+        --depths 1,2,4 --commands MSP_IDENT,MSP_STATUS,MSP_ATTITUDE
+
+    # Save machine-readable results and show latency histograms
+    python3 msp_pipeline_benchmark.py tcp:localhost:5761 --json out.json --histogram
+"""
+
+import argparse
+import json
+import math
+import os
+import select
+import socket
+import sys
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from msp_frame import MSPFrameDecoder, encode_request
+
+# Common MSP commands to test (read-only, safe commands)
+MSP_COMMANDS = {
+    'MSP_API_VERSION': 1,
+    'MSP_FC_VARIANT': 2,
+    'MSP_FC_VERSION': 3,
+    'MSP_BOARD_INFO': 4,
+    'MSP_IDENT': 100,
+    'MSP_STATUS': 101,
+    'MSP_RAW_IMU': 102,
+    'MSP_SERVO': 103,
+    'MSP_MOTOR': 104,
+    'MSP_RC': 105,
+    'MSP_RAW_GPS': 106,
+    'MSP_COMP_GPS': 107,
+    'MSP_ATTITUDE': 108,
+    'MSP_ALTITUDE': 109,
+    'MSP_ANALOG': 110,
+    'MSP_MISC': 114,
+    'MSP_BOXIDS': 119,
+    'MSP_STATUS_EX': 150,
+    'MSP2_INAV_STATUS': 0x2000,
+    'MSP2_INAV_ANALOG': 0x2002,
+    'MSP2_INAV_DEBUG': 0x2019,
+}
+
+DEFAULT_COMMANDS = ['MSP_IDENT', 'MSP_STATUS', 'MSP_ATTITUDE', 'MSP_ANALOG', 'MSP_ALTITUDE']
+
+# Upper bucket edges (ms) for --histogram output
+HISTOGRAM_EDGES_MS = [0.25, 0.5, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024]
+
+
+class TcpTransport:
+    """MSP link to SITL over TCP."""
+
+    def __init__(self, host: str, port: int):
+        self.sock = socket.create_connection((host, port), timeout=5.0)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sock.setblocking(False)
+        self.name = f"tcp:{host}:{port}"
+
+    def write(self, data: bytes):
+        self.sock.setblocking(True)
+        try:
+            self.sock.sendall(data)
+        finally:
+            self.sock.setblocking(False)
+
+    def read(self, timeout: float) -> bytes:
+        ready, _, _ = select.select([self.sock], [], [], timeout)
+        if not ready:
+            return b''
+        chunk = self.sock.recv(65536)
+        if not chunk:
+            raise ConnectionError("connection closed by peer")
+        return chunk
+
+    def drain(self):
+        while self.read(0.05):
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+class SerialTransport:
+    """MSP link to a hardware FC (or virtual port) over serial."""
+
+    def __init__(self, port: str, baudrate: int):
+        import serial  # only needed for serial targets
+
+        self.ser = serial.Serial(port, baudrate, timeout=0)
+        if hasattr(self.ser, 'set_buffer_size'):
+            self.ser.set_buffer_size(rx_size=65536, tx_size=8192)
+        self.name = f"{port}@{baudrate}"
+
+    def write(self, data: bytes):
+        self.ser.write(data)
+
+    def read(self, timeout: float) -> bytes:
+        self.ser.timeout = timeout
+        waiting = self.ser.in_waiting
+        return self.ser.read(waiting if waiting else 1)
+
+    def drain(self):
+        time.sleep(0.05)
+        self.ser.reset_input_buffer()
+
+    def close(self):
+        self.ser.close()
+
+
+def open_transport(target: str, baudrate: int):
+    """Open 'tcp:host:port', 'host:port' or a serial device path."""
+    if target.startswith('tcp:'):
+        target = target[4:]
+    if ':' in target and not target.startswith('/'):
+        host, port = target.rsplit(':', 1)
+        return TcpTransport(host or 'localhost', int(port))
+    return SerialTransport(target, baudrate)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return float('nan')
+    # pct * n first: exact for integer pct, so p50 of an even count is not rounded up
+    rank = max(0, min(len(sorted_values) - 1, math.ceil(pct * len(sorted_values) / 100.0) - 1))
+    return sorted_values[rank]
+
+
+def latency_summary(samples_ms: List[float]) -> Dict[str, float]:
+    """p50/p95/p99/max/mean of a list of latencies in ms."""
+    values = sorted(samples_ms)
+    return {
+        'count': len(values),
+        'mean': sum(values) / len(values) if values else float('nan'),
+        'p50': percentile(values, 50),
+        'p95': percentile(values, 95),
+        'p99': percentile(values, 99),
+        'max': values[-1] if values else float('nan'),
+    }
+
+
+def latency_histogram(samples_ms: List[float]) -> List[int]:
+    """Bucket latencies into HISTOGRAM_EDGES_MS (last bucket is overflow)."""
+    counts = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+    for value in samples_ms:
+        for i, edge in enumerate(HISTOGRAM_EDGES_MS):
+            if value <= edge:
+                counts[i] += 1
+                break
+        else:
+            counts[-1] += 1
+    return counts
+
+
+def run_depth(transport, commands: List[int], total: int, depth: int,
+              timeout: float) -> Dict:
+    """
+    Send `total` requests cycling through `commands`, never more than
+    `depth` unanswered at once, and time every reply.
+    """
+    requests = [encode_request(cmd) for cmd in commands]
+    outstanding: Dict[int, Deque[float]] = {cmd: deque() for cmd in commands}
+    order: Deque[Tuple[float, int]] = deque()  # (send_time, cmd) in send order
+    latencies: Dict[int, List[float]] = {cmd: [] for cmd in commands}
+    errors = {cmd: 0 for cmd in commands}
+    lost = 0
+    unexpected = 0
+    sent = 0
+    answered = 0
+    decoder = MSPFrameDecoder()
+    clock = time.perf_counter
+
+    transport.drain()
+    start = clock()
+
+    while answered + lost < total:
+        # Top up the pipeline
+        while sent < total and len(order) < depth:
+            idx = sent % len(commands)
+            now = clock()
+            transport.write(requests[idx])
+            outstanding[commands[idx]].append(now)
+            order.append((now, commands[idx]))
+            sent += 1
+
+        chunk = transport.read(min(timeout, 0.05))
+        now = clock()
+
+        if chunk:
+            for frame in decoder.feed(chunk):
+                if frame.is_request:
+                    continue
+                cmd = frame.cmd
+                pending = outstanding.get(cmd)
+                if not pending:
+                    unexpected += 1
+                    continue
+                sent_at = pending.popleft()
+                order.remove((sent_at, cmd))
+                answered += 1
+                if frame.is_error:
+                    errors[cmd] += 1
+                else:
+                    latencies[cmd].append((now - sent_at) * 1000.0)
+
+        # Expire requests the firmware dropped
+        while order and now - order[0][0] > timeout:
+            sent_at, cmd = order.popleft()
+            outstanding[cmd].remove(sent_at)
+            lost += 1
+
+    elapsed = clock() - start
+    all_samples = [v for values in latencies.values() for v in values]
+
+    return {
+        'depth': depth,
+        'sent': sent,
+        'answered': answered,
+        'lost': lost,
+        'unexpected': unexpected,
+        'crc_errors': decoder.crc_errors,
+        'elapsed_s': elapsed,
+        'throughput': answered / elapsed if elapsed > 0 else 0.0,
+        'overall': latency_summary(all_samples),
+        'histogram': latency_histogram(all_samples),
+        'per_command': {
+            cmd: dict(latency_summary(latencies[cmd]), errors=errors[cmd],
+                      histogram=latency_histogram(latencies[cmd]))
+            for cmd in commands
+        },
+    }
+
+
+def find_knee(results: List[Dict], min_gain: float = 0.05) -> Optional[int]:
+    """
+    Smallest depth after which adding another in-flight request improves
+    throughput by less than min_gain (fractional). None if it never flattens.
+    """
+    for prev, cur in zip(results, results[1:]):
+        if prev['throughput'] <= 0:
+            continue
+        if (cur['throughput'] - prev['throughput']) / prev['throughput'] < min_gain:
+            return prev['depth']
+    return None
+
+
+def _command_name(cmd: int) -> str:
+    for name, value in MSP_COMMANDS.items():
+        if value == cmd:
+            return name
+    return str(cmd)
+
+
+def print_depth_result(result: Dict, show_histogram: bool = False):
+    overall = result['overall']
+    print(f"\n--- depth {result['depth']} ---")
+    print(f"  {result['answered']}/{result['sent']} answered, {result['lost']} lost, "
+          f"{result['unexpected']} unexpected in {result['elapsed_s']:.3f}s "
+          f"-> {result['throughput']:.1f} req/s")
+    print(f"  {'command':<20} {'n':>6} {'err':>4} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}  (ms)")
+    for cmd, stats in result['per_command'].items():
+        print(f"  {_command_name(cmd):<20} {stats['count']:>6} {stats['errors']:>4} "
+              f"{stats['p50']:>8.2f} {stats['p95']:>8.2f} {stats['p99']:>8.2f} {stats['max']:>8.2f}")
+    print(f"  {'ALL':<20} {overall['count']:>6} {'':>4} "
+          f"{overall['p50']:>8.2f} {overall['p95']:>8.2f} {overall['p99']:>8.2f} {overall['max']:>8.2f}")
+
+    if show_histogram:
+        counts = result['histogram']
+        peak = max(counts) or 1
+        labels = [f"<={edge:g}" for edge in HISTOGRAM_EDGES_MS] + [f">{HISTOGRAM_EDGES_MS[-1]:g}"]
+        for label, count in zip(labels, counts):
+            if count:
+                print(f"    {label:>7} ms | {'#' * max(1, count * 40 // peak)} {count}")
+
+
+def print_sweep_summary(results: List[Dict]):
+    print(f"\n{'='*60}")
+    print("Sweep summary")
+    print(f"{'='*60}")
+    print(f"  {'depth':>5} {'req/s':>9} {'p50':>8} {'p99':>8} {'max':>8} {'lost':>5}")
+    for r in results:
+        o = r['overall']
+        print(f"  {r['depth']:>5} {r['throughput']:>9.1f} {o['p50']:>8.2f} {o['p99']:>8.2f} "
+              f"{o['max']:>8.2f} {r['lost']:>5}")
+
+    knee = find_knee(results)
+    if knee is None:
+        print("\n  Throughput still rising at the largest depth - try a higher --max-depth")
+    else:
+        print(f"\n  Throughput knee at depth {knee}: deeper pipelines only add latency")
+    print(f"{'='*60}\n")
+
+
+def parse_commands(spec: str) -> List[int]:
+    commands = []
+    for item in spec.split(','):
+        item = item.strip()
+        if item in MSP_COMMANDS:
+            commands.append(MSP_COMMANDS[item])
+        else:
+            commands.append(int(item, 0))
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pipelined MSP latency/throughput benchmark')
+    parser.add_argument('target', nargs='?', default='tcp:localhost:5761',
+                        help='tcp:host:port or serial device (default: tcp:localhost:5761)')
+    parser.add_argument('--baud', type=int, default=115200, help='Serial baud rate')
+    parser.add_argument('--commands', default=','.join(DEFAULT_COMMANDS),
+                        help='Comma-separated MSP command names or IDs')
+    parser.add_argument('--requests', type=int, default=500, help='Requests per depth step')
+    parser.add_argument('--max-depth', type=int, default=8, help='Sweep depth 1..N')
+    parser.add_argument('--depths', help='Explicit comma-separated depth list (overrides --max-depth)')
+    parser.add_argument('--timeout', type=float, default=1.0, help='Seconds before a request counts as lost')
+    parser.add_argument('--histogram', action='store_true', help='Print latency histogram per depth')
+    parser.add_argument('--json', help='Write results to this JSON file')
+    args = parser.parse_args()
+
+    commands = parse_commands(args.commands)
+    if args.depths:
+        depths = [int(d) for d in args.depths.split(',')]
+    else:
+        depths = list(range(1, args.max_depth + 1))
+
+    print(f"\n{'='*60}")
+    print("MSP Pipeline Benchmark")
+    print(f"{'='*60}")
+    print(f"Target:   {args.target}")
+    print(f"Commands: {', '.join(_command_name(c) for c in commands)}")
+    print(f"Requests: {args.requests} per depth")
+    print(f"Depths:   {depths}")
+    print(f"{'='*60}")
+
+    try:
+        transport = open_transport(args.target, args.baud)
+    except Exception as e:
+        print(f"ERROR: cannot open {args.target}: {e}")
+        sys.exit(1)
+
+    results = []
+    try:
+        for depth in depths:
+            result = run_depth(transport, commands, args.requests, depth, args.timeout)
+            results.append(result)
+            print_depth_result(result, args.histogram)
+    except KeyboardInterrupt:
+        print("\nInterrupted by user")
+    except ConnectionError as e:
+        print(f"\nERROR: {e}")
+    finally:
+        transport.close()
+
+    if not results:
+        sys.exit(1)
+
+    print_sweep_summary(results)
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'target': args.target,
+                'commands': commands,
+                'histogram_edges_ms': HISTOGRAM_EDGES_MS,
+                'knee_depth': find_knee(results),
+                'results': results,
+            }, f, indent=2)
+        print(f"Results written to {args.json}")
+
+    sys.exit(0 if all(r['answered'] for r in results) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+msp_firmware_model.py - Stateful INAV firmware model for the MSP mock responders
+
+The model answers MSP v1/v2 requests from live state instead of a static
+table, so client tools (and SITL-style test harnesses) can be exercised
+without a running SITL:
+
+- Arming flags: derived from RC link age, ARM mode range on AUX channels,
+  HITL (MSP_SIMULATOR) and sensor calibration, like updateArmingStatus()
+- RC channels: written by MSP_SET_RAW_RC, read back by MSP_RC
+- debug[]: MSP2_INAV_DEBUG / MSP_DEBUG, either set directly or derived
+  from RC when debug_mode == RATE_DYNAMICS (debug[0..5] = rcCommand R/P/Y)
+- Settings by name: MSP2_COMMON_SETTING / MSP2_COMMON_SET_SETTING
+
+One model instance is shared by every connection of a server, so an MSP
+port and an RC port see the same "flight controller".
+
+Extending: subclass FirmwareModel and register extra handlers:
+
+    class MyModel(FirmwareModel):
+        def __init__(self):
+            super().__init__()
+            self.handlers[0x2002] = self.msp2_inav_analog
+
+        def msp2_inav_analog(self, payload, now):
+            return bytes(24)
+
+then run  msp_mock_responder_tcp.py --model my_model.py:MyModel
+"""
+
+import importlib.util
+import struct
+import time
+from typing import Callable, Dict, List, Optional
+
+# MSP command IDs
+MSP_API_VERSION        = 1
+MSP_FC_VARIANT         = 2
+MSP_FC_VERSION         = 3
+MSP_BOARD_INFO         = 4
+MSP_MODE_RANGES        = 34
+MSP_SET_MODE_RANGE     = 35
+MSP_RX_CONFIG          = 44
+MSP_SET_RX_CONFIG      = 45
+MSP_REBOOT             = 68
+MSP_IDENT              = 100
+MSP_STATUS             = 101
+MSP_RC                 = 105
+MSP_ATTITUDE           = 108
+MSP_ALTITUDE           = 109
+MSP_ANALOG             = 110
+MSP_STATUS_EX          = 150
+MSP_SET_RAW_RC         = 200
+MSP_SET_RAW_GPS        = 201
+MSP_EEPROM_WRITE       = 250
+MSP_DEBUG              = 254
+MSP2_COMMON_SETTING    = 0x1003
+MSP2_COMMON_SET_SETTING = 0x1004
+MSP2_INAV_STATUS       = 0x2000
+MSP2_INAV_DEBUG        = 0x2019
+MSP_SIMULATOR          = 0x201F
+
+# armingFlag_e bits (runtime_config.h)
+ARMED                               = 1 << 2
+WAS_EVER_ARMED                      = 1 << 3
+SIMULATOR_MODE_HITL                 = 1 << 4
+ARMING_DISABLED_FAILSAFE_SYSTEM     = 1 << 7
+ARMING_DISABLED_SENSORS_CALIBRATING = 1 << 9
+ARMING_DISABLED_ARM_SWITCH          = 1 << 14
+ARMING_DISABLED_RC_LINK             = 1 << 18
+ARMING_DISABLED_THROTTLE            = 1 << 19
+
+ARMING_BLOCKERS = (ARMING_DISABLED_FAILSAFE_SYSTEM | ARMING_DISABLED_SENSORS_CALIBRATING |
+                   ARMING_DISABLED_ARM_SWITCH | ARMING_DISABLED_RC_LINK | ARMING_DISABLED_THROTTLE)
+
+BOXARM = 0
+DEBUG_RATE_DYNAMICS = 18
+RX_TYPE_MSP = 2
+
+PERIOD_RXDATA_FAILURE_S = 0.2   # failsafe.h
+SENSOR_CALIBRATION_S = 2.0      # until ARMING_DISABLED_SENSORS_CALIBRATING clears without HITL
+
+# Legacy fixed payloads (what the old static-table mock returned)
+STATIC_RESPONSES = {
+    MSP_IDENT: b'\x07INAV900',
+    102: b'\x00\x00' * 9,  # MSP_RAW_IMU
+    103: b'\x00\x00' * 8,  # MSP_SERVO
+    104: b'\x00\x00' * 8,  # MSP_MOTOR
+    106: b'\x00' * 16,     # MSP_RAW_GPS
+    107: b'\x00' * 5,      # MSP_COMP_GPS
+    114: b'\x00' * 22,     # MSP_MISC
+    119: b'\x00' * 10,     # MSP_BOXIDS
+}
+
+Handler = Callable[[bytes, float], Optional[bytes]]
+
+
+class FirmwareModel:
+    """
+    Mutable FC state plus a cmd -> handler table.
+
+    handle() returns the reply payload, or None for unsupported commands
+    (the server answers those with an MSP error frame, like the firmware).
+    """
+
+    def __init__(self):
+        self.start_time = time.monotonic()
+        self.arming_flags = ARMING_DISABLED_SENSORS_CALIBRATING | ARMING_DISABLED_RC_LINK
+        self.rc_channels: List[int] = [1500] * 18
+        self.rc_channels[2] = 1000
+        self.last_rc_time: Optional[float] = None
+        self.debug: List[int] = [0] * 8
+        self.hitl = False
+        self.attitude = [0, 0, 0]       # decidegrees roll/pitch, degrees yaw
+        self.altitude_cm = 0
+        self.vbat_cv = 1680             # centivolts
+        self.cycle_time_us = 1000
+        self.cpu_load = 10
+        self.mode_ranges: List[bytes] = [bytes(4)] * 40   # (box, aux, start, end)
+        self.mode_ranges[0] = bytes([BOXARM, 0, 32, 48])   # ARM on AUX1 1700-2100
+        self.rx_config = bytearray(24)
+        self.rx_config[23] = RX_TYPE_MSP
+        self.settings: Dict[str, bytes] = {
+            'debug_mode': bytes([0]),
+            'failsafe_delay': bytes([5]),
+            'receiver_type': bytes([RX_TYPE_MSP]),
+            'nav_mc_hover_thr': struct.pack('<H', 1300),
+        }
+
+        self.handlers: Dict[int, Handler] = {
+            MSP_API_VERSION: lambda p, now: bytes([0, 2, 5]),
+            MSP_FC_VARIANT: lambda p, now: b'INAV',
+            MSP_FC_VERSION: lambda p, now: bytes([9, 0, 0]),
+            MSP_BOARD_INFO: lambda p, now: b'MOCK' + bytes(4),
+            MSP_STATUS: self.msp_status,
+            MSP_STATUS_EX: self.msp_status_ex,
+            MSP_RC: self.msp_rc,
+            MSP_ATTITUDE: lambda p, now: struct.pack('<hhh', *self.attitude),
+            MSP_ALTITUDE: lambda p, now: struct.pack('<ihi', self.altitude_cm, 0, self.altitude_cm),
+            MSP_ANALOG: lambda p, now: struct.pack('<BHHh', self.vbat_cv // 10, 0, 0, 0),
+            MSP_SET_RAW_RC: self.msp_set_raw_rc,
+            MSP_SET_RAW_GPS: lambda p, now: b'',
+            MSP_MODE_RANGES: lambda p, now: b''.join(self.mode_ranges),
+            MSP_SET_MODE_RANGE: self.msp_set_mode_range,
+            MSP_RX_CONFIG: lambda p, now: bytes(self.rx_config),
+            MSP_SET_RX_CONFIG: self.msp_set_rx_config,
+            MSP_EEPROM_WRITE: lambda p, now: b'',
+            MSP_REBOOT: self.msp_reboot,
+            MSP_DEBUG: lambda p, now: struct.pack('<4H', *[v & 0xFFFF for v in self._debug_values()[:4]]),
+            MSP2_INAV_STATUS: self.msp2_inav_status,
+            MSP2_INAV_DEBUG: lambda p, now: struct.pack('<8i', *self._debug_values()),
+            MSP2_COMMON_SETTING: self.msp2_common_setting,
+            MSP2_COMMON_SET_SETTING: self.msp2_common_set_setting,
+            MSP_SIMULATOR: self.msp_simulator,
+        }
+        for cmd, payload in STATIC_RESPONSES.items():
+            self.handlers.setdefault(cmd, lambda p, now, payload=payload: payload)
+
+    # ------------------------------------------------------------------
+    # Dispatch
+    # ------------------------------------------------------------------
+
+    def handle(self, cmd: int, payload: bytes, now: float) -> Optional[bytes]:
+        handler = self.handlers.get(cmd)
+        if handler is None:
+            return None
+        return handler(payload, now)
+
+    def apply(self, changes: dict):
+        """Apply a dict of state changes (used by --state and --script)."""
+        for key, value in changes.items():
+            if key == 'settings':
+                for name, setting in value.items():
+                    self.settings[name] = _setting_bytes(setting)
+            elif key == 'debug':
+                self.debug[:len(value)] = value
+            elif key == 'rc_channels':
+                self.rc_channels[:len(value)] = value
+            elif hasattr(self, key):
+                setattr(self, key, value)
+            else:
+                raise KeyError(f"unknown model field: {key}")
+
+    # ------------------------------------------------------------------
+    # State evolution (evaluated lazily on every request)
+    # ------------------------------------------------------------------
+
+    def _setting_u8(self, name: str) -> int:
+        value = self.settings.get(name, b'\x00')
+        return value[0] if value else 0
+
+    def _rc_link_ok(self, now: float) -> bool:
+        if self.last_rc_time is None:
+            return False
+        timeout = PERIOD_RXDATA_FAILURE_S + self._setting_u8('failsafe_delay') * 0.1
+        return now - self.last_rc_time <= timeout
+
+    def _arm_switch_on(self) -> bool:
+        for rng in self.mode_ranges:
+            box, aux, start, end = rng
+            # MSP_SET_MODE_RANGE takes any aux index; a range on a channel
+            # the model doesn't have is never active
+            if box == BOXARM and end > start and 4 + aux < len(self.rc_channels):
+                value = self.rc_channels[4 + aux]
+                if 900 + 25 * start <= value < 900 + 25 * end:
+                    return True
+        return False
+
+    def update(self, now: float):
+        flags = self.arming_flags
+
+        if self.hitl or now - self.start_time > SENSOR_CALIBRATION_S:
+            flags &= ~ARMING_DISABLED_SENSORS_CALIBRATING
+
+        link_ok = self._rc_link_ok(now)
+        arm_switch = self._arm_switch_on()
+
+        if flags & ARMED:
+            if not arm_switch or not link_ok:
+                flags &= ~ARMED
+                if not arm_switch:
+                    flags &= ~ARMING_DISABLED_ARM_SWITCH
+        else:
+            # RC_LINK is only tracked while disarmed (updateArmingStatus)
+            flags = flags & ~ARMING_DISABLED_RC_LINK if link_ok else flags | ARMING_DISABLED_RC_LINK
+            if self.rc_channels[2] > 1100:
+                flags |= ARMING_DISABLED_THROTTLE
+            else:
+                flags &= ~ARMING_DISABLED_THROTTLE
+            if not arm_switch:
+                flags &= ~ARMING_DISABLED_ARM_SWITCH
+            elif not (flags & ARMING_BLOCKERS):
+                flags |= ARMED | WAS_EVER_ARMED
+            else:
+                # Switch was already on while something blocked arming
+                flags |= ARMING_DISABLED_ARM_SWITCH
+
+        if self.hitl:
+            flags |= SIMULATOR_MODE_HITL
+        self.arming_flags = flags
+
+    def _debug_values(self) -> List[int]:
+        if self._setting_u8('debug_mode') == DEBUG_RATE_DYNAMICS:
+            if self.last_rc_time is None:
+                return [0] * 8
+            r, p, y = (self.rc_channels[i] - 1500 for i in (0, 1, 3))
+            return [r, r, p, p, y, y, 0, 0]
+        return list(self.debug)
+
+    # ------------------------------------------------------------------
+    # Handlers
+    # ------------------------------------------------------------------
+
+    def msp_status(self, payload: bytes, now: float) -> bytes:
+        self.update(now)
+        mode_flags = 1 if self.arming_flags & ARMED else 0
+        return struct.pack('<HHHIB', self.cycle_time_us, 0, 0, mode_flags, 0)
+
+    def msp_status_ex(self, payload: bytes, now: float) -> bytes:
+        return self.msp_status(payload, now) + \
+            struct.pack('<HHB', self.cpu_load, self.arming_flags & 0xFFFF, 0)
+
+    def msp2_inav_status(self, payload: bytes, now: float) -> bytes:
+        self.update(now)
+        mode_flags = 1 if self.arming_flags & ARMED else 0
+        return struct.pack('<HHHHBIQB', self.cycle_time_us, 0, 0, self.cpu_load, 0,
+                           self.arming_flags, mode_flags, 0)
+
+    def msp_rc(self, payload: bytes, now: float) -> bytes:
+        return struct.pack(f'<{len(self.rc_channels)}H', *self.rc_channels)
+
+    def msp_set_raw_rc(self, payload: bytes, now: float) -> bytes:
+        count = min(len(payload) // 2, len(self.rc_channels))
+        self.rc_channels[:count] = struct.unpack_from(f'<{count}H', payload)
+        self.last_rc_time = now
+        self.update(now)
+        return b''
+
+    def msp_set_mode_range(self, payload: bytes, now: float) -> bytes:
+        if len(payload) >= 5 and payload[0] < len(self.mode_ranges):
+            self.mode_ranges[payload[0]] = bytes(payload[1:5])
+        return b''
+
+    def msp_set_rx_config(self, payload: bytes, now: float) -> bytes:
+        self.rx_config[:len(payload)] = payload[:len(self.rx_config)]
+        return b''
+
+    def msp_reboot(self, payload: bytes, now: float) -> bytes:
+        self.arming_flags = ARMING_DISABLED_SENSORS_CALIBRATING | ARMING_DISABLED_RC_LINK
+        self.start_time = now
+        self.last_rc_time = None
+        self.hitl = False
+        return b''
+
+    def msp_simulator(self, payload: bytes, now: float) -> bytes:
+        self.hitl = len(payload) >= 2 and bool(payload[1] & 0x01)
+        if not self.hitl:
+            self.arming_flags &= ~SIMULATOR_MODE_HITL
+        self.update(now)
+        return b''
+
+    def msp2_common_setting(self, payload: bytes, now: float) -> Optional[bytes]:
+        name = bytes(payload).split(b'\x00', 1)[0].decode(errors='replace')
+        return self.settings.get(name)
+
+    def msp2_common_set_setting(self, payload: bytes, now: float) -> Optional[bytes]:
+        name, _, value = bytes(payload).partition(b'\x00')
+        key = name.decode(errors='replace')
+        if key not in self.settings:
+            return None
+        self.settings[key] = value
+        return b''
+
+
+def _setting_bytes(value) -> bytes:
+    if isinstance(value, int):
+        return bytes([value]) if 0 <= value <= 255 else struct.pack('<i', value)
+    if isinstance(value, str):
+        return value.encode()
+    return bytes(value)
+
+
+def load_model(spec: Optional[str]) -> FirmwareModel:
+    """Instantiate FirmwareModel, or 'path/to/file.py:ClassName' for a custom one."""
+    if not spec:
+        return FirmwareModel()
+    path, _, class_name = spec.partition(':')
+    module_spec = importlib.util.spec_from_file_location('custom_msp_model', path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return getattr(module, class_name or 'Model')()
@@ -7,13 +7,11 @@ and sending back valid responses to test the benchmark client.
 """
 
 import serial
-import struct
+import os
 import sys
-import time
 
-# MSP message format
-MSP_HEADER_REQUEST = b'$M<'
-MSP_HEADER_RESPONSE = b'$M>'
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from msp_frame import MSPFrameDecoder, encode_reply
 
 # MSP commands and their typical response sizes
 MSP_RESPONSES = {
@@ -33,52 +31,6 @@ MSP_RESPONSES = {
 }
 
 
-def calculate_checksum(size: int, cmd: int, data: bytes = b'') -> int:
-    """Calculate MSPv1 checksum (XOR)"""
-    checksum = size ^ cmd
-    for byte in data:
-        checksum ^= byte
-    return checksum
-
-
-def build_msp_response(cmd: int, data: bytes) -> bytes:
-    """Build MSPv1 response packet"""
-    size = len(data)
-    checksum = calculate_checksum(size, cmd, data)
-    return MSP_HEADER_RESPONSE + struct.pack('BB', size, cmd) + data + struct.pack('B', checksum)
-
-
-def parse_msp_request(data: bytes) -> tuple:
-    """
-    Parse MSP request from buffer.
-    Returns: (cmd, consumed_bytes) or (None, 0) if incomplete
-    """
-    if len(data) < 6:  # Minimum MSP packet size
-        return None, 0
-
-    # Look for MSP header
-    if data[0:3] != MSP_HEADER_REQUEST:
-        return None, 1  # Skip this byte
-
-    size = data[3]
-    cmd = data[4]
-
-    # Check if we have the full packet
-    packet_len = 3 + 1 + 1 + size + 1  # header + size + cmd + data + checksum
-    if len(data) < packet_len:
-        return None, 0  # Need more data
-
-    # Extract and verify checksum
-    expected_checksum = calculate_checksum(size, cmd, data[5:5+size])
-    actual_checksum = data[5 + size]
-
-    if expected_checksum != actual_checksum:
-        print(f"[MOCK] Checksum error: cmd={cmd}, expected={expected_checksum}, got={actual_checksum}")
-        return None, packet_len  # Skip bad packet
-
-    return cmd, packet_len
-
-
 def run_mock_responder(port_name: str, baudrate: int, verbose: bool = False):
     """Run the mock MSP responder"""
 
@@ -88,49 +40,33 @@ def run_mock_responder(port_name: str, baudrate: int, verbose: bool = False):
         print(f"[MOCK] Mock INAV responder listening on {port_name} at {baudrate} baud")
         print(f"[MOCK] Press Ctrl+C to stop")
 
-        buffer = b''
+        decoder = MSPFrameDecoder()
         requests_received = 0
         responses_sent = 0
 
         while True:
-            # Read incoming data
+            # Read incoming data and answer every complete request
             chunk = ser.read(1024)
-            if chunk:
-                buffer += chunk
-
-            # Process all complete requests in buffer
-            while len(buffer) >= 6:
-                cmd, consumed = parse_msp_request(buffer)
-
-                if consumed > 0:
-                    buffer = buffer[consumed:]
-
-                    if cmd is not None:
-                        requests_received += 1
-
-                        # Send response
-                        if cmd in MSP_RESPONSES:
-                            response_data = MSP_RESPONSES[cmd]
-                            response_packet = build_msp_response(cmd, response_data)
-                            ser.write(response_packet)
-                            responses_sent += 1
-
-                            if verbose and responses_sent % 50 == 0:
-                                print(f"[MOCK] Requests: {requests_received}, Responses: {responses_sent}")
-                        else:
-                            print(f"[MOCK] Unknown command: {cmd}")
-                else:
-                    break  # Need more data
+            if not chunk:
+                continue
+
+            for frame in decoder.feed(chunk):
+                if not frame.is_request:
+                    continue
+                requests_received += 1
 
-            # Prevent buffer from growing too large
-            if len(buffer) > 10000:
-                print(f"[MOCK] WARNING: Buffer overflow, clearing {len(buffer)} bytes")
-                buffer = b''
+                if frame.cmd in MSP_RESPONSES:
+                    ser.write(encode_reply(frame.cmd, MSP_RESPONSES[frame.cmd], frame.version))
+                    responses_sent += 1
 
-            time.sleep(0.001)  # Small sleep to prevent CPU spinning
+                    if verbose and responses_sent % 50 == 0:
+                        print(f"[MOCK] Requests: {requests_received}, Responses: {responses_sent}")
+                else:
+                    print(f"[MOCK] Unknown command: {frame.cmd}")
 
     except KeyboardInterrupt:
-        print(f"\n[MOCK] Stopped. Total requests: {requests_received}, responses: {responses_sent}")
+        print(f"\n[MOCK] Stopped. Total requests: {requests_received}, responses: {responses_sent}, "
+              f"checksum errors: {decoder.crc_errors}")
 
     finally:
         ser.close()
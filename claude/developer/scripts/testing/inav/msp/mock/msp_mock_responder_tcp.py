@@ -2,179 +2,263 @@
 """
 MSP Mock Responder TCP - Simulates INAV firmware responding to MSP requests over TCP
 
-This script acts as a mock flight controller, receiving MSP requests via TCP socket
-and sending back valid responses to test the benchmark client.
+Acts as a mock flight controller for load-testing MSP clients (benchmark
+tools, test harnesses, the configurator) without a running SITL:
+
+- asyncio server: any number of concurrent connections, on one or more
+  ports (e.g. 5760 + 5761 like SITL UART1/UART2), all sharing one
+  firmware state model
+- Answers MSP v1 and v2 in the version of the request; unknown commands
+  get an MSP error ('!') reply like the firmware
+- Replies come from a stateful model (msp_firmware_model.py): arming
+  flags, RC channels, debug[] values, settings by name. Pass --model to
+  plug in a subclass, --state to preset fields, --script for timed changes
+- Fault injection: fixed latency, jitter and drop probability. Replies
+  stay in request order per connection, as on a real FC port
+- Sustains well over 20k requests/sec on one core with no faults
+  configured (check with --bench)
+
+Usage:
+    # Drop-in replacement for the old single-client mock
+    python3 msp_mock_responder_tcp.py localhost 5761
+
+    # Two "UARTs" sharing one FC model, 2ms +/- 1ms latency, 1% drops
+    python3 msp_mock_responder_tcp.py --ports 5760,5761 --latency-ms 2 --jitter-ms 1 --drop 0.01
+
+    # Preset state and script changes over time
+    python3 msp_mock_responder_tcp.py --state '{"debug": [1, 2, 3]}' \\
+        --script '[{"at": 5, "set": {"arming_flags": 128}}]'
+
+    # Self load-test: 4 pipelined clients against an in-process server
+    python3 msp_mock_responder_tcp.py --bench
 """
 
-import socket
-import struct
+import argparse
+import asyncio
+import json
+import os
+import random
 import sys
 import time
-
-# MSP message format
-MSP_HEADER_REQUEST = b'$M<'
-MSP_HEADER_RESPONSE = b'$M>'
-
-# MSP commands and their typical response sizes
-MSP_RESPONSES = {
-    100: b'\x07INAV900',  # MSP_IDENT - 7 bytes
-    101: b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',  # MSP_STATUS - 11 bytes
-    102: b'\x00\x00' * 9,  # MSP_RAW_IMU - 18 bytes
-    103: b'\x00\x00' * 8,  # MSP_SERVO - 16 bytes
-    104: b'\x00\x00' * 8,  # MSP_MOTOR - 16 bytes
-    105: b'\x00\x00' * 8,  # MSP_RC - 16 bytes
-    106: b'\x00' * 16,     # MSP_RAW_GPS - 16 bytes
-    107: b'\x00' * 5,      # MSP_COMP_GPS - 5 bytes
-    108: b'\x00\x00\x00\x00\x00\x00',  # MSP_ATTITUDE - 6 bytes
-    109: b'\x00\x00\x00\x00',  # MSP_ALTITUDE - 4 bytes
-    110: b'\x00\x00\x00\x00\x00\x00\x00',  # MSP_ANALOG - 7 bytes
-    114: b'\x00' * 22,     # MSP_MISC - 22 bytes
-    119: b'\x00' * 10,     # MSP_BOXIDS - 10 bytes
-}
-
-
-def calculate_checksum(size: int, cmd: int, data: bytes = b'') -> int:
-    """Calculate MSPv1 checksum (XOR)"""
-    checksum = size ^ cmd
-    for byte in data:
-        checksum ^= byte
-    return checksum
-
-
-def build_msp_response(cmd: int, data: bytes) -> bytes:
-    """Build MSPv1 response packet"""
-    size = len(data)
-    checksum = calculate_checksum(size, cmd, data)
-    return MSP_HEADER_RESPONSE + struct.pack('BB', size, cmd) + data + struct.pack('B', checksum)
-
-
-def parse_msp_request(data: bytes) -> tuple:
-    """
-    Parse MSP request from buffer.
-    Returns: (cmd, consumed_bytes) or (None, 0) if incomplete
-    """
-    if len(data) < 6:  # Minimum MSP packet size
-        return None, 0
-
-    # Look for MSP header
-    if data[0:3] != MSP_HEADER_REQUEST:
-        return None, 1  # Skip this byte
-
-    size = data[3]
-    cmd = data[4]
-
-    # Check if we have the full packet
-    packet_len = 3 + 1 + 1 + size + 1  # header + size + cmd + data + checksum
-    if len(data) < packet_len:
-        return None, 0  # Need more data
-
-    # Extract and verify checksum
-    expected_checksum = calculate_checksum(size, cmd, data[5:5+size])
-    actual_checksum = data[5 + size]
-
-    if expected_checksum != actual_checksum:
-        print(f"[MOCK] Checksum error: cmd={cmd}, expected={expected_checksum}, got={actual_checksum}")
-        return None, packet_len  # Skip bad packet
-
-    return cmd, packet_len
-
-
-def handle_client(conn, addr, verbose: bool = False):
-    """Handle a single client connection"""
-    print(f"[MOCK] Client connected from {addr}")
-
-    buffer = b''
-    requests_received = 0
-    responses_sent = 0
-
-    conn.settimeout(0.01)
-
-    try:
-        while True:
-            # Read incoming data
-            try:
-                chunk = conn.recv(1024)
-                if not chunk:
-                    break  # Connection closed
-                buffer += chunk
-            except socket.timeout:
-                pass  # No data available
-
-            # Process all complete requests in buffer
-            while len(buffer) >= 6:
-                cmd, consumed = parse_msp_request(buffer)
-
-                if consumed > 0:
-                    buffer = buffer[consumed:]
-
-                    if cmd is not None:
-                        requests_received += 1
-
-                        # Send response
-                        if cmd in MSP_RESPONSES:
-                            response_data = MSP_RESPONSES[cmd]
-                            response_packet = build_msp_response(cmd, response_data)
-                            conn.sendall(response_packet)
-                            responses_sent += 1
-
-                            if verbose and responses_sent % 50 == 0:
-                                print(f"[MOCK] Requests: {requests_received}, Responses: {responses_sent}")
-                        else:
-                            print(f"[MOCK] Unknown command: {cmd}")
-                else:
-                    break  # Need more data
-
-            # Prevent buffer from growing too large
-            if len(buffer) > 10000:
-                print(f"[MOCK] WARNING: Buffer overflow, clearing {len(buffer)} bytes")
-                buffer = b''
-
-            time.sleep(0.001)  # Small sleep to prevent CPU spinning
-
-    except Exception as e:
-        print(f"[MOCK] Error: {e}")
-
-    finally:
-        print(f"[MOCK] Client disconnected. Total requests: {requests_received}, responses: {responses_sent}")
-        conn.close()
-
-
-def run_mock_responder(host: str, port: int, verbose: bool = False):
-    """Run the mock MSP responder on TCP socket"""
-
-    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-    sock.bind((host, port))
-    sock.listen(1)
-
-    print(f"[MOCK] Mock INAV responder listening on {host}:{port}")
+from typing import List, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from msp_frame import MSPFrameDecoder, encode_reply, encode_request
+from msp_firmware_model import FirmwareModel, load_model
+
+
+class FaultProfile:
+    """Injected reply latency (ms), uniform jitter (+/- ms) and drop probability."""
+
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, drop: float = 0.0,
+                 seed: Optional[int] = None):
+        self.latency = latency_ms / 1000.0
+        self.jitter = jitter_ms / 1000.0
+        self.drop = drop
+        self._rng = random.Random(seed)
+
+    @property
+    def immediate(self) -> bool:
+        return not (self.latency or self.jitter)
+
+    def dropped(self) -> bool:
+        return self.drop > 0 and self._rng.random() < self.drop
+
+    def delay(self) -> float:
+        if not self.jitter:
+            return self.latency
+        return max(0.0, self.latency + self._rng.uniform(-self.jitter, self.jitter))
+
+
+class ServerStats:
+    def __init__(self):
+        self.connections = 0
+        self.requests = 0
+        self.replies = 0
+        self.errors = 0
+        self.dropped = 0
+        self.crc_errors = 0
+
+
+class MSPMockProtocol(asyncio.Protocol):
+    """One client connection: decode requests, answer from the shared model."""
+
+    def __init__(self, model: FirmwareModel, faults: FaultProfile, stats: ServerStats,
+                 verbose: bool = False):
+        self.model = model
+        self.faults = faults
+        self.stats = stats
+        self.verbose = verbose
+        self.decoder = MSPFrameDecoder()
+        self.transport = None
+        self._last_reply_at = 0.0
+        self._loop = asyncio.get_event_loop()
+
+    def connection_made(self, transport):
+        self.transport = transport
+        self.stats.connections += 1
+        self.peer = transport.get_extra_info('peername')
+        if self.verbose:
+            print(f"[MOCK] Client connected from {self.peer}")
+
+    def connection_lost(self, exc):
+        self.stats.crc_errors += self.decoder.crc_errors
+        if self.verbose:
+            print(f"[MOCK] Client {self.peer} disconnected "
+                  f"(checksum errors: {self.decoder.crc_errors})")
+
+    def data_received(self, data: bytes):
+        model = self.model
+        faults = self.faults
+        stats = self.stats
+        now = time.monotonic()
+        out = []
+
+        for frame in self.decoder.feed(data):
+            if not frame.is_request:
+                continue
+            stats.requests += 1
+            if faults.dropped():
+                stats.dropped += 1
+                continue
+
+            payload = model.handle(frame.cmd, frame.payload, now)
+            if payload is None:
+                stats.errors += 1
+                reply = encode_reply(frame.cmd, b'', frame.version, error=True)
+            else:
+                stats.replies += 1
+                reply = encode_reply(frame.cmd, payload, frame.version)
+
+            if faults.immediate:
+                out.append(reply)
+            else:
+                # Never let jitter reorder replies on one connection
+                send_at = max(self._last_reply_at, self._loop.time() + faults.delay())
+                self._last_reply_at = send_at
+                self._loop.call_at(send_at, self._write, reply)
+
+        if out:
+            self.transport.write(b''.join(out))
+
+        if self.verbose and stats.requests and stats.requests % 1000 == 0:
+            print(f"[MOCK] Requests: {stats.requests}, Replies: {stats.replies}")
+
+    def _write(self, reply: bytes):
+        if not self.transport.is_closing():
+            self.transport.write(reply)
+
+
+async def run_script(model: FirmwareModel, script: List[dict]):
+    """Apply [{"at": seconds, "set": {...}}, ...] to the model on schedule."""
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    for step in sorted(script, key=lambda s: s['at']):
+        await asyncio.sleep(max(0.0, start + step['at'] - loop.time()))
+        model.apply(step['set'])
+        print(f"[MOCK] t={step['at']:.1f}s applied {step['set']}")
+
+
+async def start_servers(host: str, ports: List[int], model: FirmwareModel,
+                        faults: FaultProfile, stats: ServerStats, verbose: bool = False):
+    loop = asyncio.get_running_loop()
+    servers = []
+    for port in ports:
+        server = await loop.create_server(
+            lambda: MSPMockProtocol(model, faults, stats, verbose), host, port, reuse_address=True)
+        servers.append(server)
+    return servers
+
+
+async def run_mock_responder(host: str, ports: List[int], model: FirmwareModel,
+                             faults: FaultProfile, script: Optional[List[dict]] = None,
+                             verbose: bool = False):
+    """Run the mock MSP responder until cancelled."""
+    stats = ServerStats()
+    servers = await start_servers(host, ports, model, faults, stats, verbose)
+
+    print(f"[MOCK] Mock INAV responder listening on {host}:{','.join(map(str, ports))}")
+    if not faults.immediate or faults.drop:
+        print(f"[MOCK] Faults: latency={faults.latency * 1000:g}ms jitter=+/-{faults.jitter * 1000:g}ms "
+              f"drop={faults.drop:.1%}")
     print(f"[MOCK] Press Ctrl+C to stop")
 
+    tasks = [asyncio.create_task(run_script(model, script))] if script else []
     try:
-        while True:
-            conn, addr = sock.accept()
-            handle_client(conn, addr, verbose)
-    except KeyboardInterrupt:
-        print(f"\n[MOCK] Stopped")
+        await asyncio.gather(*(s.serve_forever() for s in servers), *tasks)
     finally:
-        sock.close()
+        print(f"[MOCK] Stopped. Connections: {stats.connections}, requests: {stats.requests}, "
+              f"replies: {stats.replies}, errors: {stats.errors}, dropped: {stats.dropped}")
+
+
+async def _bench(clients: int = 4, seconds: float = 3.0, depth: int = 32):
+    """Pipelined load test against an in-process server on an ephemeral port."""
+    stats = ServerStats()
+    servers = await start_servers('127.0.0.1', [0], FirmwareModel(), FaultProfile(), stats)
+    port = servers[0].sockets[0].getsockname()[1]
+    request = encode_request(101) + encode_request(0x2000) + encode_request(0x2019) + encode_request(105)
+    per_batch = 4
+
+    async def client():
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        decoder = MSPFrameDecoder()
+        received = 0
+        in_flight = 0
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline or in_flight:
+            while in_flight < depth and time.monotonic() < deadline:
+                writer.write(request)
+                in_flight += per_batch
+            frames = decoder.feed(await reader.read(65536))
+            received += len(frames)
+            in_flight -= len(frames)
+        writer.close()
+        return received
+
+    start = time.perf_counter()
+    totals = await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    for server in servers:
+        server.close()
+
+    print(f"{clients} clients, depth {depth}: {sum(totals)} replies in {elapsed:.2f}s "
+          f"-> {sum(totals) / elapsed:,.0f} req/s (server and clients share one core)")
 
 
 def main():
-    if len(sys.argv) > 1:
-        host = sys.argv[1]
-    else:
-        host = 'localhost'
-
-    if len(sys.argv) > 2:
-        port = int(sys.argv[2])
-    else:
-        port = 5761
-
-    verbose = '--verbose' in sys.argv or '-v' in sys.argv
+    parser = argparse.ArgumentParser(description='Stateful MSP mock flight controller (TCP)')
+    parser.add_argument('host', nargs='?', default='localhost')
+    parser.add_argument('port', nargs='?', type=int, default=5761)
+    parser.add_argument('--ports', help='Comma-separated ports sharing one model (overrides port)')
+    parser.add_argument('--model', help="Custom model as 'file.py:ClassName'")
+    parser.add_argument('--state', help='JSON object of initial model fields')
+    parser.add_argument('--script', help='JSON list (or @file) of {"at": s, "set": {...}} steps')
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--drop', type=float, default=0.0, help='Probability of ignoring a request')
+    parser.add_argument('--seed', type=int, help='RNG seed for jitter/drop')
+    parser.add_argument('--bench', action='store_true', help='Run in-process load test and exit')
+    parser.add_argument('--verbose', '-v', action='store_true')
+    args = parser.parse_args()
+
+    if args.bench:
+        asyncio.run(_bench())
+        return
+
+    ports = [int(p) for p in args.ports.split(',')] if args.ports else [args.port]
+    model = load_model(args.model)
+    if args.state:
+        model.apply(json.loads(args.state))
+
+    script = None
+    if args.script:
+        text = open(args.script[1:]).read() if args.script.startswith('@') else args.script
+        script = json.loads(text)
+
+    faults = FaultProfile(args.latency_ms, args.jitter_ms, args.drop, args.seed)
 
     try:
-        run_mock_responder(host, port, verbose)
+        asyncio.run(run_mock_responder(args.host, ports, model, faults, script, args.verbose))
     except KeyboardInterrupt:
         print("\n[MOCK] Interrupted by user")
         sys.exit(0)
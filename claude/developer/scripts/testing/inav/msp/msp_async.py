@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""
+msp_async.py - asyncio MSP client with request multiplexing
+
+One TCP connection per SITL UART (or any stream pair), with a background
+reader task that decodes replies (msp_frame.MSPFrameDecoder) and resolves
+the future waiting for that command ID. Requests for different commands
+can therefore be in flight at the same time on one connection:
+
+    flags, debug = await asyncio.gather(
+        client.request(MSP2_INAV_STATUS),
+        client.request(MSP2_INAV_DEBUG),
+    )
+
+Several requests for the same command ID are resolved in FIFO order, which
+matches the firmware answering each port strictly in sequence.
+
+RCStream replaces the old RCSender thread: a periodic coroutine that sends
+MSP_SET_RAW_RC on a monotonic schedule (no drift from sleep overshoot) on
+the same event loop as the test code.
+
+Usage:
+    import asyncio
+    from msp_async import AsyncMSPClient, RCStream
+
+    async def main():
+        msp = await AsyncMSPClient.connect('localhost', 5760)
+        rc = await AsyncMSPClient.connect('localhost', 5761)
+        stream = RCStream(rc, rate_hz=50)
+        stream.start()
+        stream.set(aux1=2000)
+        status = await msp.request(0x2000)
+        await stream.stop()
+        await msp.close(); await rc.close()
+
+    asyncio.run(main())
+"""
+
+import asyncio
+import struct
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, TypeVar
+
+from msp_frame import MSPFrameDecoder, encode_request
+
+MSP_SET_RAW_RC = 200
+
+RC_MIN = 1000
+RC_MID = 1500
+
+T = TypeVar('T')
+
+
+class AsyncMSPClient:
+    """
+    Multiplexed MSP client over an asyncio stream pair.
+
+    request() returns the reply payload as bytes, or None on timeout or an
+    MSP error ('!') reply - the same contract as the blocking xchg() helpers.
+    """
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, label: str = ""):
+        self.label = label
+        self._reader = reader
+        self._writer = writer
+        self._decoder = MSPFrameDecoder()
+        self._pending: Dict[int, Deque[asyncio.Future]] = {}
+        self._reader_task = asyncio.get_running_loop().create_task(self._read_loop())
+
+        self.requests_sent = 0
+        self.replies = 0
+        self.error_replies = 0
+        self.unsolicited = 0
+        self.timeouts = 0
+
+    @classmethod
+    async def connect(cls, host: str, port: int, label: str = "",
+                      timeout: float = 5.0) -> 'AsyncMSPClient':
+        """Connect to a SITL TCP port, retrying until timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                reader, writer = await asyncio.open_connection(host, port)
+                return cls(reader, writer, label or f"{host}:{port}")
+            except OSError:
+                if time.monotonic() >= deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+    @property
+    def closed(self) -> bool:
+        return self._reader_task.done()
+
+    async def _read_loop(self):
+        try:
+            while True:
+                chunk = await self._reader.read(65536)
+                if not chunk:
+                    break
+                for frame in self._decoder.feed(chunk):
+                    if frame.is_request:
+                        continue
+                    waiters = self._pending.get(frame.cmd)
+                    while waiters and waiters[0].done():
+                        waiters.popleft()  # timed out / cancelled
+                    if not waiters:
+                        self.unsolicited += 1
+                        continue
+                    future = waiters.popleft()
+                    if frame.is_error:
+                        self.error_replies += 1
+                        future.set_result(None)
+                    else:
+                        self.replies += 1
+                        future.set_result(bytes(frame.payload))
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self):
+        for waiters in self._pending.values():
+            for future in waiters:
+                if not future.done():
+                    future.set_result(None)
+            waiters.clear()
+
+    def send(self, cmd: int, payload: bytes = b''):
+        """Fire-and-forget: the reply (if any) is discarded by the reader."""
+        self._writer.write(encode_request(cmd, payload))
+
+    async def request(self, cmd: int, payload: bytes = b'', timeout: float = 2.0) -> Optional[bytes]:
+        """Send a request and await its reply payload (None on timeout/error)."""
+        if self.closed:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._pending.setdefault(cmd, deque()).append(future)
+        self._writer.write(encode_request(cmd, payload))
+        self.requests_sent += 1
+        try:
+            await self._writer.drain()
+            return await asyncio.wait_for(future, timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            return None
+
+    async def close(self):
+        self._reader_task.cancel()
+        try:
+            await self._reader_task
+        except asyncio.CancelledError:
+            pass
+        self._writer.close()
+        try:
+            await self._writer.wait_closed()
+        except ConnectionError:
+            pass
+
+
+class RCStream:
+    """
+    Periodic MSP_SET_RAW_RC sender running as a coroutine.
+
+    Channels are sent in TX order (AETR default: roll, pitch, throttle, yaw,
+    aux1, aux2, ...). Frames are scheduled against loop.time() deadlines, so
+    the average rate stays exact even when individual wakeups are late.
+    """
+
+    CHANNEL_NAMES = ('roll', 'pitch', 'throttle', 'yaw', 'aux1', 'aux2', 'aux3', 'aux4')
+
+    def __init__(self, client: AsyncMSPClient, rate_hz: float = 50.0, channel_count: int = 16,
+                 extra_frames: Optional[Callable[[int], None]] = None):
+        self.client = client
+        self.period = 1.0 / rate_hz
+        self.channels: List[int] = [RC_MID] * channel_count
+        self.channels[2] = RC_MIN  # throttle
+        self.channels[4] = RC_MIN  # aux1 (ARM)
+        self.frame_count = 0
+        self.late_frames = 0
+        self._extra_frames = extra_frames
+        self._task: Optional[asyncio.Task] = None
+
+    def set(self, **kwargs):
+        """Update channels by name (roll=, pitch=, throttle=, yaw=, aux1=...)."""
+        for name, value in kwargs.items():
+            if value is not None:
+                self.channels[self.CHANNEL_NAMES.index(name)] = value
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_send = loop.time()
+        while not self.client.closed:
+            self.client.send(MSP_SET_RAW_RC, struct.pack(f'<{len(self.channels)}H', *self.channels))
+            self.frame_count += 1
+            if self._extra_frames:
+                self._extra_frames(self.frame_count)
+
+            next_send += self.period
+            delay = next_send - loop.time()
+            if delay < 0:
+                # Fell behind by more than a period: resync rather than burst
+                self.late_frames += 1
+                next_send = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+
+async def poll_until(fetch: Callable[[], Awaitable[T]], predicate: Callable[[T], bool],
+                     timeout: float, interval: float = 0.0) -> Optional[tuple]:
+    """
+    Repeatedly await fetch() until predicate(result) holds.
+
+    Returns (result, elapsed_s) measured at reply arrival, or None on timeout.
+    interval=0 polls back-to-back (one request in flight at a time).
+    """
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        result = await fetch()
+        if result is not None and predicate(result):
+            return result, time.monotonic() - start
+        if interval:
+            await asyncio.sleep(interval)
+    return None
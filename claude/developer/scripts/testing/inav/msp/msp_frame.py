@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+msp_frame.py - Shared MSP v1/v2 frame encoder and streaming decoder
+
+One implementation of MSP framing for the test tools, replacing the
+per-script parse_frame()/parse_msp_request()/_read_response() copies.
+
+Decoder design:
+- Bytes land in one preallocated bytearray (read/write offsets, compacted
+  in place), so sockets can recv_into() it directly - no per-chunk
+  concatenation and no front-of-buffer deletes.
+- Header search uses bytearray.find() (C speed), so garbage between frames
+  costs almost nothing and the decoder resyncs on the next '$'.
+- Checksums are table-driven (CRC8-DVB-S2 for v2, XOR for v1).
+- Frames carry a memoryview of the payload inside the buffer. The view is
+  only valid until the next feed()/recv_from(); call bytes(frame.payload)
+  to keep it.
+
+Throughput is several MB/s on one core, far above a saturated 2 Mbaud
+link (~200 KB/s). Check on your machine with:
+
+    python3 msp_frame.py --bench
+
+Usage from another script:
+
+    from msp_frame import MSPFrameDecoder, encode_request
+
+    decoder = MSPFrameDecoder()
+    sock.sendall(encode_request(MSP_STATUS))
+    decoder.recv_from(sock)
+    for frame in decoder.frames():
+        print(frame.cmd, bytes(frame.payload))
+"""
+
+import argparse
+import struct
+import sys
+import time
+from functools import reduce
+from operator import xor
+from typing import List, NamedTuple, Union
+
+MSP_V1 = 1
+MSP_V2 = 2
+
+DIR_REQUEST = 0x3C   # '<'
+DIR_REPLY = 0x3E     # '>'
+DIR_ERROR = 0x21     # '!'
+
+_PROTO_V1 = 0x4D     # 'M'
+_PROTO_V2 = 0x58     # 'X'
+_DIRECTIONS = (DIR_REQUEST, DIR_REPLY, DIR_ERROR)
+
+V1_OVERHEAD = 6      # $ M dir size cmd ... xor
+V2_OVERHEAD = 9      # $ X dir flag cmd16 size16 ... crc8
+
+BytesLike = Union[bytes, bytearray, memoryview]
+
+
+def _build_crc8_dvb_s2_table() -> bytes:
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0xD5) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
+CRC8_DVB_S2_TABLE = _build_crc8_dvb_s2_table()
+
+
+def crc8_dvb_s2(data: BytesLike, crc: int = 0) -> int:
+    """Table-driven CRC8-DVB-S2 (poly 0xD5), continuing from crc."""
+    table = CRC8_DVB_S2_TABLE
+    for byte in data:
+        crc = table[crc ^ byte]
+    return crc
+
+
+def xor_checksum(data: BytesLike, checksum: int = 0) -> int:
+    """MSP v1 XOR checksum, continuing from checksum."""
+    return reduce(xor, data, checksum)
+
+
+def encode_v1(cmd: int, payload: BytesLike = b'', direction: int = DIR_REQUEST) -> bytes:
+    """Build an MSP v1 frame."""
+    size = len(payload)
+    if size > 255 or cmd > 255:
+        raise ValueError(f"MSP v1 cannot carry cmd={cmd} with {size} byte payload")
+    checksum = xor_checksum(payload, size ^ cmd)
+    return bytes((0x24, _PROTO_V1, direction, size, cmd)) + bytes(payload) + bytes((checksum,))
+
+
+def encode_v2(cmd: int, payload: BytesLike = b'', direction: int = DIR_REQUEST, flags: int = 0) -> bytes:
+    """Build an MSP v2 frame."""
+    header = struct.pack('<BHH', flags, cmd, len(payload))
+    crc = crc8_dvb_s2(payload, crc8_dvb_s2(header))
+    return b'$X' + bytes((direction,)) + header + bytes(payload) + bytes((crc,))
+
+
+def encode_request(cmd: int, payload: BytesLike = b'') -> bytes:
+    """Build a request, picking v1 when it fits and v2 otherwise."""
+    if cmd <= 255 and len(payload) <= 255:
+        return encode_v1(cmd, payload)
+    return encode_v2(cmd, payload)
+
+
+def encode_reply(cmd: int, payload: BytesLike = b'', version: int = MSP_V1, error: bool = False) -> bytes:
+    """Build a reply ('>' or '!') in the given protocol version."""
+    direction = DIR_ERROR if error else DIR_REPLY
+    if version == MSP_V1:
+        return encode_v1(cmd, payload, direction)
+    return encode_v2(cmd, payload, direction)
+
+
+class MSPFrame(NamedTuple):
+    """One decoded MSP frame. payload is a view into the decoder buffer."""
+    version: int
+    direction: int
+    cmd: int
+    flags: int
+    payload: memoryview
+
+    @property
+    def is_request(self) -> bool:
+        return self.direction == DIR_REQUEST
+
+    @property
+    def is_error(self) -> bool:
+        return self.direction == DIR_ERROR
+
+
+class MSPFrameDecoder:
+    """
+    Incremental MSP v1/v2 decoder over a fixed-capacity buffer.
+
+    Accepts both directions; filter on frame.direction as needed.
+    Statistics: frames, crc_errors, resync_bytes, overflow_bytes.
+    """
+
+    def __init__(self, capacity: int = 1 << 17):
+        # Must hold the largest possible v2 frame (65535 + 9)
+        self.capacity = max(capacity, 65535 + V2_OVERHEAD)
+        self._buf = bytearray(self.capacity)
+        self._view = memoryview(self._buf)
+        self._rd = 0
+        self._wr = 0
+
+        self.frames_decoded = 0
+        self.crc_errors = 0
+        self.resync_bytes = 0
+        self.overflow_bytes = 0
+
+    def __len__(self) -> int:
+        """Bytes buffered but not yet consumed."""
+        return self._wr - self._rd
+
+    def reset(self):
+        self._rd = self._wr = 0
+
+    def _make_room(self, needed: int):
+        """Ensure `needed` free bytes after the write offset."""
+        if self.capacity - self._wr >= needed:
+            return
+        pending = self._wr - self._rd
+        if pending + needed > self.capacity:
+            # Cannot fit: drop the oldest pending bytes
+            drop = min(pending, pending + needed - self.capacity)
+            self.overflow_bytes += drop
+            self._rd += drop
+            pending -= drop
+        if pending:
+            self._buf[0:pending] = self._view[self._rd:self._wr]
+        self._rd = 0
+        self._wr = pending
+
+    def writable(self, min_space: int = 4096) -> memoryview:
+        """Free space for recv_into()/readinto(); follow with commit(n)."""
+        self._make_room(min_space)
+        return self._view[self._wr:]
+
+    def commit(self, count: int):
+        """Mark `count` bytes written into writable() as received."""
+        self._wr += count
+
+    def recv_from(self, sock, min_space: int = 4096) -> int:
+        """recv_into() straight into the buffer. Returns bytes read (0 = EOF)."""
+        count = sock.recv_into(self.writable(min_space))
+        self._wr += count
+        return count
+
+    def feed(self, data: BytesLike) -> List[MSPFrame]:
+        """Append raw bytes and return every frame now complete."""
+        size = len(data)
+        if size > self.capacity:
+            self.overflow_bytes += size - self.capacity
+            data = data[-self.capacity:]
+            size = self.capacity
+        self._make_room(size)
+        self._buf[self._wr:self._wr + size] = data
+        self._wr += size
+        return self.frames()
+
+    def frames(self) -> List[MSPFrame]:
+        """Decode all complete frames currently buffered."""
+        buf = self._buf
+        view = self._view
+        table = CRC8_DVB_S2_TABLE
+        pos = self._rd
+        end = self._wr
+        out = []
+
+        while pos < end:
+            start = buf.find(b'$', pos, end)
+            if start < 0:
+                self.resync_bytes += end - pos
+                pos = end
+                break
+            self.resync_bytes += start - pos
+            pos = start
+            if end - pos < 3:
+                break
+
+            proto = buf[pos + 1]
+            direction = buf[pos + 2]
+            if direction not in _DIRECTIONS or proto not in (_PROTO_V1, _PROTO_V2):
+                self.resync_bytes += 1
+                pos += 1
+                continue
+
+            if proto == _PROTO_V1:
+                if end - pos < V1_OVERHEAD:
+                    break
+                size = buf[pos + 3]
+                cmd = buf[pos + 4]
+                total = V1_OVERHEAD + size
+                if end - pos < total:
+                    break
+                data_start = pos + 5
+                ok = reduce(xor, view[pos + 3:data_start + size], 0) == buf[data_start + size]
+                version, flags = MSP_V1, 0
+            else:
+                if end - pos < V2_OVERHEAD:
+                    break
+                flags = buf[pos + 3]
+                cmd = buf[pos + 4] | (buf[pos + 5] << 8)
+                size = buf[pos + 6] | (buf[pos + 7] << 8)
+                total = V2_OVERHEAD + size
+                if end - pos < total:
+                    break
+                data_start = pos + 8
+                crc = 0
+                for byte in view[pos + 3:data_start + size]:
+                    crc = table[crc ^ byte]
+                ok = crc == buf[data_start + size]
+                version = MSP_V2
+
+            if not ok:
+                self.crc_errors += 1
+                self.resync_bytes += 1
+                pos += 1
+                continue
+
+            out.append(MSPFrame(version, direction, cmd, flags, view[data_start:data_start + size]))
+            pos += total
+
+        self._rd = pos
+        if pos == end:
+            self._rd = self._wr = 0
+        self.frames_decoded += len(out)
+        return out
+
+
+def _bench(seconds: float = 2.0):
+    """Decode a synthetic reply stream and compare with a 2 Mbaud link."""
+    stream = bytearray()
+    for i in range(2000):
+        stream += encode_reply(101, bytes(11))
+        stream += encode_reply(0x2019, struct.pack('<8i', *range(i, i + 8)), version=MSP_V2)
+        stream += encode_reply(108, bytes(6))
+        if i % 50 == 0:
+            stream += b'\x00garbage$M'
+    chunk = 512
+    decoder = MSPFrameDecoder()
+    total_bytes = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        for off in range(0, len(stream), chunk):
+            decoder.feed(stream[off:off + chunk])
+        total_bytes += len(stream)
+    elapsed = time.perf_counter() - start
+
+    rate = total_bytes / elapsed
+    line_rate = 2_000_000 / 10  # 8N1: 10 bits per byte
+    print(f"Decoded {decoder.frames_decoded} frames, {total_bytes / 1e6:.1f} MB in {elapsed:.2f}s")
+    print(f"  {rate / 1e6:.2f} MB/s = {rate / line_rate:.1f}x a saturated 2 Mbaud link "
+          f"({100.0 * line_rate / rate:.1f}% of one core at line rate)")
+    print(f"  CRC errors: {decoder.crc_errors}, resync bytes: {decoder.resync_bytes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='MSP frame decoder self-benchmark')
+    parser.add_argument('--bench', action='store_true', help='Measure decode throughput')
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    if not args.bench:
+        parser.print_help()
+        sys.exit(0)
+    _bench(args.seconds)
+
+
+if __name__ == '__main__':
+    main()
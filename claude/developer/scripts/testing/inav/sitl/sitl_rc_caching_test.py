@@ -16,6 +16,9 @@ Tests:
      until the first RX update
 
 Approach:
+  - MSP I/O for the arming tests uses msp/msp_async.py: one multiplexed connection
+    per SITL UART, RC streamed by a coroutine, debug[]/MSP_RC/arming flags polled
+    concurrently instead of one blocking xchg() at a time
   - Uses MSP2_INAV_DEBUG (code 8217) with debug_mode=RATE_DYNAMICS (value 18, not 17 - AUTOTUNE is 17)
   - debug[] is populated by DEBUG_SET() in processPilotAndFailSafeActions():
       debug[0] = rcCommand[ROLL]  (before rate dynamics)
@@ -39,9 +42,13 @@ import time
 import struct
 import socket
 import subprocess
-import threading
+import asyncio
 import argparse
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'msp'))
+from msp_frame import MSPFrameDecoder, encode_v1, encode_v2
+from msp_async import AsyncMSPClient, RCStream, poll_until
+
 # ============================================================
 #  MSP message codes
 # ============================================================
@@ -97,54 +104,14 @@ CH_AUX1     = 4
 #  MSP frame builders / parser
 # ============================================================
 
-def _crc8_dvb_s2(data: bytes) -> int:
-    crc = 0
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            crc = ((crc << 1) ^ 0xD5) & 0xFF if (crc & 0x80) else (crc << 1) & 0xFF
-    return crc
-
-
 def v1(cmd: int, data=None) -> bytes:
     """Build an MSPv1 frame."""
-    d = bytes(data or [])
-    cs = len(d) ^ cmd
-    for b in d:
-        cs ^= b
-    return bytes([0x24, 0x4D, 0x3C, len(d), cmd]) + d + bytes([cs])
+    return encode_v1(cmd, bytes(data or []))
 
 
 def v2(cmd: int, data=None) -> bytes:
     """Build an MSPv2 frame."""
-    p = bytes(data or [])
-    h = bytes([
-        0x24, 0x58, 0x3C, 0x00,
-        cmd & 0xFF, (cmd >> 8) & 0xFF,
-        len(p) & 0xFF, (len(p) >> 8) & 0xFF,
-    ])
-    return h + p + bytes([_crc8_dvb_s2(h[3:] + p)])
-
-
-def parse_frame(buf: bytes):
-    """Try to parse the first complete MSP frame from buf.
-    Returns (cmd, payload) or (None, None)."""
-    i = 0
-    while i < len(buf) - 4:
-        if buf[i] != 0x24:
-            i += 1
-            continue
-        if buf[i + 1] == 0x4D and i + 5 <= len(buf):   # MSPv1
-            sz = buf[i + 3]
-            if i + 5 + sz <= len(buf):
-                return buf[i + 4], buf[i + 5: i + 5 + sz]
-        elif buf[i + 1] == 0x58 and i + 9 <= len(buf):  # MSPv2
-            sz  = buf[i + 6] | (buf[i + 7] << 8)
-            cmd = buf[i + 4] | (buf[i + 5] << 8)
-            if i + 9 + sz <= len(buf):
-                return cmd, buf[i + 8: i + 8 + sz]
-        i += 1
-    return None, None
+    return encode_v2(cmd, bytes(data or []))
 
 
 def xchg(sock: socket.socket, frame: bytes, timeout: float = 2.0):
@@ -156,20 +123,18 @@ def xchg(sock: socket.socket, frame: bytes, timeout: float = 2.0):
         return None, None
 
     sock.settimeout(timeout)
-    buf = b""
+    decoder = MSPFrameDecoder()
     deadline = time.time() + timeout
     while time.time() < deadline:
         try:
-            chunk = sock.recv(4096)
-            if not chunk:
+            if not decoder.recv_from(sock):
                 break
-            buf += chunk
-            cmd, payload = parse_frame(buf)
-            if cmd is not None:
-                return cmd, payload
+            for reply in decoder.frames():
+                if not reply.is_request:
+                    return reply.cmd, bytes(reply.payload)
         except socket.timeout:
             break
-    return parse_frame(buf)
+    return None, None
 
 
 def send_drop(sock: socket.socket, frame: bytes) -> None:
@@ -235,11 +200,6 @@ def get_arming_flags(sock: socket.socket):
     return None
 
 
-def is_armed(sock: socket.socket) -> bool:
-    flags = get_arming_flags(sock)
-    return bool(flags & BIT_ARMED) if flags is not None else False
-
-
 def decode_flags(flags: int) -> list:
     """Decode arming flags into human-readable names."""
     flag_map = {
@@ -276,26 +236,6 @@ def get_debug_mode(sock: socket.socket):
     return None
 
 
-def set_named_setting_u8(sock: socket.socket, setting_name: str, value: int) -> bool:
-    """Set a named uint8 setting via MSP2_COMMON_SET_SETTING. Returns True on success."""
-    name_bytes = setting_name.encode() + b'\x00'
-    payload = name_bytes + bytes([value & 0xFF])
-    cmd, d = xchg(sock, v2(MSP2_COMMON_SET_SETTING, payload))
-    if d is None:
-        print(f"  WARNING: No response setting {setting_name}={value}")
-        return False
-    return True
-
-
-def get_named_setting_u8(sock: socket.socket, setting_name: str):
-    """Get a named uint8 setting via MSP2_COMMON_SETTING. Returns value or None."""
-    name_bytes = setting_name.encode() + b'\x00'
-    cmd, d = xchg(sock, v2(MSP2_COMMON_SETTING, name_bytes))
-    if d and len(d) >= 1:
-        return d[0]
-    return None
-
-
 def read_debug_values(sock: socket.socket):
     """Read MSP2_INAV_DEBUG and return list of 8 int32 values, or None."""
     cmd, d = xchg(sock, v2(MSP2_INAV_DEBUG))
@@ -315,19 +255,6 @@ def read_msp_debug_v1(sock: socket.socket):
     return None
 
 
-def build_rc_frame(channels: list) -> bytes:
-    """Build MSP_SET_RAW_RC payload from a list of channel values."""
-    return b"".join(struct.pack('<H', c) for c in channels)
-
-
-def send_rc(sock: socket.socket, roll=RC_MID, pitch=RC_MID, throttle=RC_MIN,
-            yaw=RC_MID, aux1=RC_MIN, extra_channels=12):
-    """Send a single RC frame (fire and forget)."""
-    channels = [roll, pitch, throttle, yaw, aux1] + [RC_MID] * extra_channels
-    data = build_rc_frame(channels)
-    send_drop(sock, v1(MSP_SET_RAW_RC, data))
-
-
 # MSP protocol constants for setup
 MSP_RX_CONFIG     = 44
 MSP_SET_RX_CONFIG = 45
@@ -486,122 +413,150 @@ class TestResults:
 
 
 # ============================================================
-#  Continuous RC sender (keeps RC_LINK alive)
+#  Async MSP helpers (one multiplexed connection per SITL UART)
 # ============================================================
 
-class RCSender(threading.Thread):
-    """Continuously sends RC frames at ~50 Hz to keep RC_LINK alive."""
-    def __init__(self, sock: socket.socket):
-        super().__init__(daemon=True)
-        self._sock = sock
-        self._lock = threading.Lock()
-        self._roll     = RC_MID
-        self._pitch    = RC_MID
-        self._throttle = RC_MIN
-        self._yaw      = RC_MID
-        self._aux1     = RC_MIN
-        self._running  = True
-        self._frame_count = 0
-
-    def set(self, roll=None, pitch=None, throttle=None, yaw=None, aux1=None):
-        with self._lock:
-            if roll     is not None: self._roll     = roll
-            if pitch    is not None: self._pitch    = pitch
-            if throttle is not None: self._throttle = throttle
-            if yaw      is not None: self._yaw      = yaw
-            if aux1     is not None: self._aux1     = aux1
-
-    def get_frame_count(self) -> int:
-        with self._lock:
-            return self._frame_count
-
-    def run(self):
-        while self._running:
-            with self._lock:
-                r, p, t, y, a1 = self._roll, self._pitch, self._throttle, self._yaw, self._aux1
-                self._frame_count += 1
-            send_rc(self._sock, roll=r, pitch=p, throttle=t, yaw=y, aux1=a1)
-            time.sleep(0.02)  # 50 Hz
-
-    def stop(self):
-        self._running = False
-        self.join(1.0)
+async def async_enable_hitl(client: AsyncMSPClient) -> bool:
+    payload = struct.pack('<BB', SIMULATOR_MSP_VERSION, HITL_ENABLE)
+    return await client.request(MSP_SIMULATOR, payload) is not None
+
+
+async def async_get_arming_flags(client: AsyncMSPClient):
+    """Return raw arming flags from MSP2_INAV_STATUS, or None on error."""
+    d = await client.request(MSP2_INAV_STATUS)
+    if d and len(d) >= 13:
+        return struct.unpack_from('<I', d, 9)[0]
+    return None
+
+
+async def async_read_debug_values(client: AsyncMSPClient):
+    """Read MSP2_INAV_DEBUG and return the int32 debug[] values, or None."""
+    d = await client.request(MSP2_INAV_DEBUG)
+    if not d or len(d) < 4:
+        return None
+    return list(struct.unpack_from(f'<{len(d) // 4}i', d))
+
+
+async def async_read_rc_channels(client: AsyncMSPClient):
+    """Read MSP_RC and return the channel list, or None."""
+    d = await client.request(MSP_RC)
+    if not d or len(d) < 2:
+        return None
+    return list(struct.unpack_from(f'<{len(d) // 2}H', d))
+
+
+async def async_get_setting_u8(client: AsyncMSPClient, setting_name: str):
+    d = await client.request(MSP2_COMMON_SETTING, setting_name.encode() + b'\x00')
+    return d[0] if d else None
+
+
+async def async_set_setting_u8(client: AsyncMSPClient, setting_name: str, value: int) -> bool:
+    payload = setting_name.encode() + b'\x00' + bytes([value & 0xFF])
+    if await client.request(MSP2_COMMON_SET_SETTING, payload) is None:
+        print(f"  WARNING: No response setting {setting_name}={value}")
+        return False
+    return True
+
+
+async def async_connect(host: str, port: int, label: str = "", timeout: float = 5.0):
+    """Open an AsyncMSPClient. Returns the client or None."""
+    try:
+        client = await AsyncMSPClient.connect(host, port, label, timeout=timeout)
+    except OSError:
+        print(f"  ERROR: Could not connect to {host}:{port}" + (f" ({label})" if label else ""))
+        print("  Note: If running in sandbox, this requires dangerouslyDisableSandbox=true")
+        return None
+    print(f"  Connected to {host}:{port}" + (f" ({label})" if label else ""))
+    return client
+
+
+async def hitl_refresh_for(client: AsyncMSPClient, seconds: float, interval: float = 0.1):
+    """Keep re-enabling HITL (clears SENSORS_CALIBRATING) for `seconds`."""
+    loop = asyncio.get_running_loop()
+    end = loop.time() + seconds
+    while loop.time() < end:
+        await asyncio.sleep(interval)
+        await async_enable_hitl(client)
+
+
+async def close_clients(*clients):
+    for client in clients:
+        if client is not None:
+            await client.close()
 
 
 # ============================================================
 #  Shared arming sequence (proven approach from sitl_arm_test.py)
 # ============================================================
 
-def arm_sitl(host: str, msp_port: int, rc_port: int) -> tuple:
+async def arm_sitl(host: str, msp_port: int, rc_port: int) -> tuple:
     """
     Arm SITL using the proven sequence from sitl_arm_test.py:
     1. Connect to MSP (port 5760) and RC (port 5761)
-    2. Enable HITL mode on MSP socket
-    3. Send RC at 50Hz with AUX1 LOW for 2 seconds (establishes RC link, clears calibration)
+    2. Enable HITL mode on MSP connection
+    3. Stream RC at 50Hz with AUX1 LOW for 2 seconds (establishes RC link, clears calibration)
     4. Raise AUX1 HIGH, keep polling with HITL refresh for up to 5s
 
-    Returns (msp_sock, rc_sock, sender, armed_bool).
-    Caller is responsible for stopping sender and closing sockets.
+    Returns (msp, rc, rc_stream, armed_bool).
+    Caller is responsible for stopping rc_stream and closing both clients.
     """
-    msp = connect(host, msp_port, "MSP")
+    msp = await async_connect(host, msp_port, "MSP")
     if msp is None:
         return None, None, None, False
 
-    rc_sock = connect(host, rc_port, "RC/UART2")
-    if rc_sock is None:
-        msp.close()
+    rc = await async_connect(host, rc_port, "RC/UART2")
+    if rc is None:
+        await msp.close()
         return None, None, None, False
 
-    if not verify_fc_responding(msp):
-        msp.close()
-        rc_sock.close()
+    if await msp.request(MSP_API_VERSION) is None:
+        print("  ERROR: FC not responding to MSP_API_VERSION")
+        print("  Is SITL running? Try: pkill -9 SITL.elf && start_sitl.sh")
+        await close_clients(msp, rc)
         return None, None, None, False
 
     # Enable HITL to bypass sensor calibration
     print("  Enabling HITL mode...")
-    enable_hitl(msp)
-    time.sleep(0.2)
+    await async_enable_hitl(msp)
+    await asyncio.sleep(0.2)
 
-    # Start RC sender with AUX1 LOW for 2 seconds
+    # Stream RC with AUX1 LOW for 2 seconds
     # This matches sitl_arm_test.py which sends for 2s at 50Hz before arming.
     # 2 seconds ensures:
     #   (a) RC link is established
     #   (b) ARM_SWITCH flag clears (FC sees AUX1 in safe/low position)
     #   (c) Sensor calibration completes (aided by HITL refreshes below)
     print("  Pre-arm: sending RC with AUX1 LOW for 2s (establishes link, clears ARM_SWITCH)...")
-    sender = RCSender(rc_sock)
-    sender.set(roll=RC_MID, pitch=RC_MID, throttle=RC_MIN, yaw=RC_MID, aux1=RC_MIN)
-    sender.start()
+    stream = RCStream(rc, rate_hz=50)
+    stream.set(roll=RC_MID, pitch=RC_MID, throttle=RC_MIN, yaw=RC_MID, aux1=RC_MIN)
+    stream.start()
 
     # Refresh HITL every 0.1s during the 2-second pre-arm phase
-    for _ in range(20):
-        time.sleep(0.1)
-        enable_hitl(msp)
+    await hitl_refresh_for(msp, 2.0)
 
     # Raise AUX1 to arm
     print("  Raising AUX1 to arm...")
-    sender.set(aux1=RC_MAX)
+    stream.set(aux1=RC_MAX)
 
-    # Poll for armed state with HITL refresh (proven pattern from sitl_arm_test.py)
+    # Poll for armed state; HITL refresh and status poll are pipelined on one connection
     print("  Waiting for arm (up to 5s)...")
-    armed = False
-    for _ in range(50):
-        time.sleep(0.1)
-        enable_hitl(msp)    # Critical: refreshing HITL clears SENSORS_CALIBRATING each cycle
-        if is_armed(msp):
-            armed = True
-            break
 
+    async def refresh_and_read_flags():
+        # Critical: refreshing HITL clears SENSORS_CALIBRATING each cycle
+        _, flags = await asyncio.gather(async_enable_hitl(msp), async_get_arming_flags(msp))
+        return flags
+
+    hit = await poll_until(refresh_and_read_flags, lambda f: bool(f & BIT_ARMED),
+                           timeout=5.0, interval=0.1)
+    armed = hit is not None
+
+    flags = await async_get_arming_flags(msp)
     if armed:
-        flags = get_arming_flags(msp)
         print(f"  FC is ARMED (flags=0x{flags or 0:08X})")
     else:
-        flags = get_arming_flags(msp)
-        flag_names = decode_flags(flags or 0)
-        print(f"  FC did NOT arm. flags=0x{flags or 0:08X}: {flag_names}")
-
-    return msp, rc_sock, sender, armed
+        print(f"  FC did NOT arm. flags=0x{flags or 0:08X}: {decode_flags(flags or 0)}")
 
+    return msp, rc, stream, armed
 
 # ============================================================
 #  Individual test functions
@@ -668,77 +623,44 @@ def test_initial_cache_zero(host: str, msp_port: int) -> tuple:
         sock.close()
 
 
-def test_new_rx_updates_rccommand(host: str, msp_port: int, rc_port: int) -> tuple:
-    """
-    Test 2: New RX data -> values recomputed.
-
-    1. Arm FC, send RC with roll=MID for 300ms
-    2. Switch to roll=HIGH for 300ms
-    3. Switch back to roll=LOW for 300ms
-    4. Verify rcCommand[ROLL] and RC channels updated in both directions
-
-    If rcCommand never changes when RC input changes, the cache is broken.
-
-    FIX (v2): Uses arm_sitl() which matches the proven sitl_arm_test.py approach:
-    - 2 seconds of AUX1 LOW (not 0.6s) to fully clear ARM_SWITCH and calibration
-    - HITL refreshed on every poll during arm wait
-    - Requires reboot_sitl_and_wait() to be called before this test
-    """
+async def _test_new_rx_updates_rccommand(host: str, msp_port: int, rc_port: int) -> tuple:
     name = "Test 2: New RX data -> rcCommand updates"
 
     print(f"\n--- {name} ---")
 
-    msp, rc_sock, sender, armed = arm_sitl(host, msp_port, rc_port)
+    msp, rc, stream, armed = await arm_sitl(host, msp_port, rc_port)
 
     if msp is None:
         return name, FAIL, "Could not connect to SITL ports"
 
+    async def sample(roll: int, label: str):
+        """Hold roll for 300ms, then read RC and debug[] concurrently."""
+        stream.set(roll=roll)
+        await asyncio.sleep(0.3)
+        channels, debug = await asyncio.gather(async_read_rc_channels(msp),
+                                               async_read_debug_values(msp))
+        rc0 = channels[0] if channels else None
+        print(f"  At roll={label}: RC[0]={rc0}, debug={debug}")
+        return rc0, debug
+
     try:
         if not armed:
-            flags = get_arming_flags(msp)
-            sender.stop() if sender else None
+            flags = await async_get_arming_flags(msp)
             return name, SKIP, (
                 f"FC did not arm (flags=0x{flags or 0:08X}, "
                 f"active: {decode_flags(flags or 0)}). Prerequisite failure."
             )
 
         print("  FC armed. Sending roll=MID for 300ms...")
-        sender.set(roll=RC_MID)
-        time.sleep(0.3)
-
-        # Read RC channel and debug at ROLL=MID
-        cmd, d = xchg(msp, v1(MSP_RC))
-        rc_mid = None
-        if d and len(d) >= 2:
-            rc_mid = struct.unpack_from('<H', d, 0)[0]
-        debug_mid = read_debug_values(msp)
-        print(f"  At roll=MID: RC[0]={rc_mid}, debug={debug_mid}")
-
-        # Switch to ROLL=HIGH
-        print(f"  Switching roll to {RC_ROLL_HIGH} for 300ms...")
-        sender.set(roll=RC_ROLL_HIGH)
-        time.sleep(0.3)
+        rc_mid, debug_mid = await sample(RC_MID, "MID")
 
-        cmd, d = xchg(msp, v1(MSP_RC))
-        rc_high = None
-        if d and len(d) >= 2:
-            rc_high = struct.unpack_from('<H', d, 0)[0]
-        debug_high = read_debug_values(msp)
-        print(f"  At roll={RC_ROLL_HIGH}: RC[0]={rc_high}, debug={debug_high}")
+        print(f"  Switching roll to {RC_ROLL_HIGH} for 300ms...")
+        rc_high, debug_high = await sample(RC_ROLL_HIGH, str(RC_ROLL_HIGH))
 
-        # Switch back to ROLL=LOW
         print(f"  Switching roll back to LOW ({RC_ROLL_LOW}) for 300ms...")
-        sender.set(roll=RC_ROLL_LOW)
-        time.sleep(0.3)
-
-        cmd, d = xchg(msp, v1(MSP_RC))
-        rc_back = None
-        if d and len(d) >= 2:
-            rc_back = struct.unpack_from('<H', d, 0)[0]
-        debug_back = read_debug_values(msp)
-        print(f"  At roll={RC_ROLL_LOW}: RC[0]={rc_back}, debug={debug_back}")
+        rc_back, debug_back = await sample(RC_ROLL_LOW, str(RC_ROLL_LOW))
 
-        sender.stop()
+        await stream.stop()
 
         # Verify RC channels updated in both directions
         rc_changes = []
@@ -776,38 +698,42 @@ def test_new_rx_updates_rccommand(host: str, msp_port: int, rc_port: int) -> tup
             )
 
     finally:
-        msp.close()
-        try:
-            rc_sock.close()
-        except Exception:
-            pass
+        await stream.stop()
+        await close_clients(msp, rc)
 
 
-def test_caching_holds_value(host: str, msp_port: int, rc_port: int) -> tuple:
+def test_new_rx_updates_rccommand(host: str, msp_port: int, rc_port: int) -> tuple:
     """
-    Test 1: No new RX data -> cached values used.
+    Test 2: New RX data -> values recomputed.
 
-    1. Arm FC and send RC with roll=RC_ROLL_HIGH for several cycles
-    2. Stop sending RC briefly (50ms window, before RC_LINK timeout)
-    3. Verify rcCommand stays constant (proving the cache is holding the last value)
-    4. Resume RC with different value and verify it updates
+    1. Arm FC, send RC with roll=MID for 300ms
+    2. Switch to roll=HIGH for 300ms
+    3. Switch back to roll=LOW for 300ms
+    4. Verify rcCommand[ROLL] and RC channels updated in both directions
 
-    FIX (v2): Uses arm_sitl() (proven 2s pre-arm with HITL refresh).
-    Requires reboot_sitl_and_wait() before this test.
+    If rcCommand never changes when RC input changes, the cache is broken.
+
+    FIX (v2): Uses arm_sitl() which matches the proven sitl_arm_test.py approach:
+    - 2 seconds of AUX1 LOW (not 0.6s) to fully clear ARM_SWITCH and calibration
+    - HITL refreshed on every poll during arm wait
+    - Requires reboot_sitl_and_wait() to be called before this test
     """
+    return asyncio.run(_test_new_rx_updates_rccommand(host, msp_port, rc_port))
+
+
+async def _test_caching_holds_value(host: str, msp_port: int, rc_port: int) -> tuple:
     name = "Test 1: No new RX -> cached values hold"
 
     print(f"\n--- {name} ---")
 
-    msp, rc_sock, sender, armed = arm_sitl(host, msp_port, rc_port)
+    msp, rc, stream, armed = await arm_sitl(host, msp_port, rc_port)
 
     if msp is None:
         return name, FAIL, "Could not connect to SITL ports"
 
     try:
         if not armed:
-            flags = get_arming_flags(msp)
-            sender.stop() if sender else None
+            flags = await async_get_arming_flags(msp)
             return name, SKIP, (
                 f"FC did not arm (flags=0x{flags or 0:08X}, "
                 f"active: {decode_flags(flags or 0)}). "
@@ -818,61 +744,53 @@ def test_caching_holds_value(host: str, msp_port: int, rc_port: int) -> tuple:
         print("  FC is armed! Now testing caching behavior...")
 
         # Step 1: Set roll to HIGH and let it stabilize for ~15 RX frames (300ms)
-        sender.set(roll=RC_ROLL_HIGH)
-        time.sleep(0.3)
+        stream.set(roll=RC_ROLL_HIGH)
+        await asyncio.sleep(0.3)
 
-        # Read debug values while RC is being continuously sent
-        debug_with_rc = read_debug_values(msp)
-        rc_channels_with_rc = None
-        cmd, d = xchg(msp, v1(MSP_RC))
-        if d and len(d) >= 10:
-            rc_channels_with_rc = list(struct.unpack_from(f'<{len(d)//2}H', d))
+        # Read debug values and RC channels while RC is being continuously sent
+        debug_with_rc, rc_channels_with_rc = await asyncio.gather(
+            async_read_debug_values(msp), async_read_rc_channels(msp))
 
         print(f"  RC channels (roll=HIGH, continuous): {rc_channels_with_rc}")
         print(f"  Debug values (roll=HIGH, continuous): {debug_with_rc}")
 
-        # Step 2: Stop RC sender (simulates no new RX frames arriving)
-        # In the 50ms window BEFORE RC_LINK timeout (200ms): isRXDataNew=false,
+        # Step 2: Stop RC stream (simulates no new RX frames arriving)
+        # In the window BEFORE RC_LINK timeout (200ms): isRXDataNew=false,
         # so the cached rcCommand should NOT be recomputed.
-        print("  Stopping RC sender (simulating no new RX frames for 50ms)...")
-        sender.stop()
+        print("  Stopping RC stream (simulating no new RX frames for 120ms)...")
+        await stream.stop()
 
-        # Read RC channels and debug values rapidly within 50ms window
+        # Sample debug[] and RC channels concurrently (both requests in flight
+        # on the MSP connection) for as long as the window allows
         cache_readings = []
         rc_readings = []
-        start = time.time()
-        while time.time() - start < 0.12:   # 120ms window — well inside the 200ms RC_LINK timeout
-            dbg = read_debug_values(msp)
-            cmd, d = xchg(msp, v1(MSP_RC))
-            if d and len(d) >= 10:
-                rc_vals = list(struct.unpack_from(f'<{len(d)//2}H', d))
-                rc_readings.append(rc_vals[0] if rc_vals else None)
+        loop = asyncio.get_running_loop()
+        window_end = loop.time() + 0.12   # 120ms window — well inside the 200ms RC_LINK timeout
+        while loop.time() < window_end:
+            dbg, rc_vals = await asyncio.gather(async_read_debug_values(msp),
+                                                async_read_rc_channels(msp))
+            if rc_vals:
+                rc_readings.append(rc_vals[0])
             if dbg:
                 cache_readings.append(dbg[0])  # rcCommand[ROLL] before rate dynamics
 
-        print(f"  Readings during 50ms gap (no new RC):")
+        print(f"  Readings during gap (no new RC):")
         print(f"    RC ROLL channel readings: {rc_readings[:10]}")
         if debug_with_rc:
             print(f"    rcCommand[ROLL] debug readings: {cache_readings[:10]}")
 
         # Step 3: Send RC again with different value
-        print("  Resuming RC sender with roll=MID...")
-        sender2 = RCSender(rc_sock)
-        sender2.set(roll=RC_MID, pitch=RC_MID, throttle=RC_MIN, yaw=RC_MID, aux1=RC_MAX)
-        sender2.start()
-        try:
-            time.sleep(0.1)
+        print("  Resuming RC stream with roll=MID...")
+        stream.set(roll=RC_MID, pitch=RC_MID, throttle=RC_MIN, yaw=RC_MID, aux1=RC_MAX)
+        stream.start()
+        await asyncio.sleep(0.1)
 
-            debug_after_update = read_debug_values(msp)
-            cmd, d = xchg(msp, v1(MSP_RC))
-            rc_channels_after = None
-            if d and len(d) >= 10:
-                rc_channels_after = list(struct.unpack_from(f'<{len(d)//2}H', d))
+        debug_after_update, rc_channels_after = await asyncio.gather(
+            async_read_debug_values(msp), async_read_rc_channels(msp))
+        await stream.stop()
 
-            print(f"  RC channels (roll=MID after update): {rc_channels_after}")
-            print(f"  Debug values (roll=MID after update): {debug_after_update}")
-        finally:
-            sender2.stop()
+        print(f"  RC channels (roll=MID after update): {rc_channels_after}")
+        print(f"  Debug values (roll=MID after update): {debug_after_update}")
 
         # Analysis: debug[0] (rcCommand[ROLL] PRE rate-dynamics) during gap should be constant
         if debug_with_rc:
@@ -881,7 +799,7 @@ def test_caching_holds_value(host: str, msp_port: int, rc_port: int) -> tuple:
                 if len(unique_vals) == 1:
                     return name, PASS, (
                         f"rcCommand[ROLL]={cache_readings[0]} (constant across "
-                        f"{len(cache_readings)} reads in 50ms gap) - cache is stable.\n"
+                        f"{len(cache_readings)} reads in 120ms gap) - cache is stable.\n"
                         f"RC channel also stable at: {set(rc_readings)}\n"
                         f"After new RC at MID: rcCommand[ROLL] debug={debug_after_update[0] if debug_after_update else 'N/A'}"
                     )
@@ -897,7 +815,7 @@ def test_caching_holds_value(host: str, msp_port: int, rc_port: int) -> tuple:
 
         # Fallback: check RC channel consistency
         if rc_readings:
-            unique_rc = set(r for r in rc_readings if r is not None)
+            unique_rc = set(rc_readings)
             if len(unique_rc) <= 1:
                 return name, PASS, (
                     f"RC ROLL channel stable at {unique_rc} during no-RC window.\n"
@@ -911,188 +829,176 @@ def test_caching_holds_value(host: str, msp_port: int, rc_port: int) -> tuple:
         return name, SKIP, "Insufficient data to verify (no debug mode, no RC readings)"
 
     finally:
-        msp.close()
-        try:
-            rc_sock.close()
-        except Exception:
-            pass
+        await stream.stop()
+        await close_clients(msp, rc)
 
 
-def test_failsafe_gate(host: str, msp_port: int, rc_port: int) -> tuple:
+def test_caching_holds_value(host: str, msp_port: int, rc_port: int) -> tuple:
     """
-    Test 3: Failsafe gate - failsafeUpdateRcCommandValues() called only on RX cycles.
+    Test 1: No new RX data -> cached values used.
 
-    The PR gates failsafeUpdateRcCommandValues() behind isRXDataNew. Observable
-    consequence: when RC stops, the RC_LINK flag (ARMING_DISABLED_RC_LINK) should
-    set after the configured rxDataFailurePeriod = PERIOD_RXDATA_FAILURE(200ms) +
-    failsafe_delay * 100ms.
+    1. Arm FC and send RC with roll=RC_ROLL_HIGH for several cycles
+    2. Stop sending RC briefly (120ms window, before RC_LINK timeout)
+    3. Verify rcCommand stays constant (proving the cache is holding the last value)
+    4. Resume RC with different value and verify it updates
 
-    CRITICAL INSIGHT: ARMING_DISABLED_RC_LINK is only updated in updateArmingStatus()
-    which runs its RC_LINK check ONLY when the FC is NOT ARMED. The check is:
-        if (!failsafeIsReceivingRxData()) {
-            ENABLE_ARMING_FLAG(ARMING_DISABLED_RC_LINK);
-        }
-    When ARMED, this entire block is skipped.
+    debug[] and MSP_RC are requested concurrently on the MSP connection, so
+    the gap window collects roughly twice as many samples as serial polling.
 
-    Therefore: this test must be conducted while DISARMED (AUX1 kept LOW).
-    We establish RC link with AUX1 LOW, confirm RC_LINK is healthy, then stop RC
-    and watch for ARMING_DISABLED_RC_LINK to appear in the arming flags.
+    FIX (v2): Uses arm_sitl() (proven 2s pre-arm with HITL refresh).
+    Requires reboot_sitl_and_wait() before this test.
+    """
+    return asyncio.run(_test_caching_holds_value(host, msp_port, rc_port))
 
-    FIX (v3): Test while DISARMED.
-    - Set failsafe_delay=1 (100ms) -> rxDataFailurePeriod = 300ms
-    - Send RC with AUX1 LOW (disarmed) for 2s to establish link
-    - Confirm RC_LINK not set (link is healthy)
-    - Stop RC sender
-    - Monitor arming flags for 2000ms watching for RC_LINK to set
-    - Expected: RC_LINK flag appears within ~350ms (300ms + polling overhead)
 
-    Timing details:
-    - failsafe_delay=1 decisecond = 100ms
-    - PERIOD_RXDATA_FAILURE = 200ms (hardcoded in failsafe.h)
-    - Total rxDataFailurePeriod = 200ms + 100ms = 300ms
-    - Plus MSP rx rxSignalTimeout = 200ms (DELAY_5_HZ) before data is "failed"
-    - Maximum expected total: ~500ms from last RC frame to RC_LINK flag
-    - We monitor for 2000ms which is 4x the maximum expected timeout
-    """
+async def _test_failsafe_gate(host: str, msp_port: int, rc_port: int) -> tuple:
     name = "Test 3: Failsafe gate (failsafeUpdateRcCommandValues per-RX-frame)"
 
     print(f"\n--- {name} ---")
 
-    msp = connect(host, msp_port, "MSP")
+    msp = await async_connect(host, msp_port, "MSP")
     if msp is None:
         return name, FAIL, "Could not connect to MSP port"
 
-    rc_sock = connect(host, rc_port, "RC/UART2")
-    if rc_sock is None:
-        msp.close()
+    rc = await async_connect(host, rc_port, "RC/UART2")
+    if rc is None:
+        await msp.close()
         return name, FAIL, "Could not connect to RC port"
 
+    stream = RCStream(rc, rate_hz=50)
+    original_failsafe_delay = None
+
+    async def restore_failsafe_delay():
+        print(f"  Restoring failsafe_delay to {original_failsafe_delay or 5}...")
+        await async_set_setting_u8(msp, "failsafe_delay", original_failsafe_delay or 5)
+        await msp.request(MSP_EEPROM_WRITE)
+        await asyncio.sleep(0.2)
+
     try:
-        if not verify_fc_responding(msp):
+        if await msp.request(MSP_API_VERSION) is None:
             return name, FAIL, "FC not responding"
 
         # Read and record original failsafe_delay before changing it
-        original_failsafe_delay = get_named_setting_u8(msp, "failsafe_delay")
+        original_failsafe_delay = await async_get_setting_u8(msp, "failsafe_delay")
         print(f"  Original failsafe_delay: {original_failsafe_delay}")
 
         # Set failsafe_delay = 1 (100ms) so total rxDataFailurePeriod = 300ms
         FAILSAFE_DELAY_TEST = 1   # 1 decisecond = 100ms
         print(f"  Setting failsafe_delay={FAILSAFE_DELAY_TEST} (100ms) for test...")
-        ok = set_named_setting_u8(msp, "failsafe_delay", FAILSAFE_DELAY_TEST)
-        if not ok:
+        if not await async_set_setting_u8(msp, "failsafe_delay", FAILSAFE_DELAY_TEST):
             return name, SKIP, "Could not set failsafe_delay via MSP - cannot verify failsafe timing."
 
         # Save to EEPROM so the new setting takes effect
-        cmd, d = xchg(msp, v1(MSP_EEPROM_WRITE))
-        time.sleep(0.3)
+        await msp.request(MSP_EEPROM_WRITE)
+        await asyncio.sleep(0.3)
 
         # Verify setting was applied
-        applied_delay = get_named_setting_u8(msp, "failsafe_delay")
+        applied_delay = await async_get_setting_u8(msp, "failsafe_delay")
         print(f"  failsafe_delay after set: {applied_delay}")
         if applied_delay != FAILSAFE_DELAY_TEST:
             print(f"  WARNING: failsafe_delay={applied_delay}, expected {FAILSAFE_DELAY_TEST}")
 
         # Enable HITL to clear SENSORS_CALIBRATING (needed to get RC_LINK check to work)
         print("  Enabling HITL mode (to clear sensor calibration flags)...")
-        enable_hitl(msp)
-        time.sleep(0.2)
+        await async_enable_hitl(msp)
+        await asyncio.sleep(0.2)
 
-        # Send RC with AUX1 LOW (DISARMED state) for 2 seconds to establish RC link
+        # Stream RC with AUX1 LOW (DISARMED state) for 2 seconds to establish RC link
         # CRITICAL: Do NOT raise AUX1 - we test RC_LINK while DISARMED because
         # updateArmingStatus() only checks ARMING_DISABLED_RC_LINK when not armed.
         print("  Establishing RC link with AUX1 LOW (staying DISARMED) for 2s...")
-        sender = RCSender(rc_sock)
-        sender.set(roll=RC_MID, pitch=RC_MID, throttle=RC_MIN, yaw=RC_MID, aux1=RC_MIN)
-        sender.start()
+        stream.set(roll=RC_MID, pitch=RC_MID, throttle=RC_MIN, yaw=RC_MID, aux1=RC_MIN)
+        stream.start()
 
         # Refresh HITL during link establishment phase
-        for _ in range(20):
-            time.sleep(0.1)
-            enable_hitl(msp)
+        await hitl_refresh_for(msp, 2.0)
 
         # Verify SITL is NOT armed (AUX1 is LOW).
         # If it IS armed (can happen if SITL software reset preserved in-memory state),
         # try to disarm by continuing to send AUX1 LOW for another 2 seconds.
         # In INAV, ARM switch going LOW while armed triggers disarm.
-        flags_now = get_arming_flags(msp)
+        flags_now = await async_get_arming_flags(msp)
         if flags_now is not None and (flags_now & BIT_ARMED):
             print(f"  WARNING: FC is armed (flags=0x{flags_now:08X}) after pre-arm phase.")
             print("  Attempting to disarm by sending AUX1 LOW for 2 more seconds...")
-            disarmed = False
-            for _ in range(20):
-                time.sleep(0.1)
-                enable_hitl(msp)
-                flags_check = get_arming_flags(msp)
-                if flags_check is not None and not (flags_check & BIT_ARMED):
-                    disarmed = True
-                    flags_now = flags_check
-                    print(f"  Disarmed successfully (flags=0x{flags_now:08X})")
-                    break
-            if not disarmed:
-                sender.stop()
-                # Restore failsafe_delay
-                set_named_setting_u8(msp, "failsafe_delay", original_failsafe_delay or 5)
-                xchg(msp, v1(MSP_EEPROM_WRITE))
+
+            async def refresh_and_read_flags():
+                _, flags = await asyncio.gather(async_enable_hitl(msp), async_get_arming_flags(msp))
+                return flags
+
+            hit = await poll_until(refresh_and_read_flags, lambda f: not (f & BIT_ARMED),
+                                   timeout=2.0, interval=0.1)
+            if hit is None:
+                await stream.stop()
+                await restore_failsafe_delay()
                 return name, SKIP, (
                     f"FC remained armed (flags=0x{flags_now or 0:08X}) after disarm attempt."
                     " Test requires DISARMED state. Try running with a fresh SITL EEPROM."
                 )
+            flags_now = hit[0]
+            print(f"  Disarmed successfully (flags=0x{flags_now:08X})")
         print(f"  FC is DISARMED (flags=0x{flags_now or 0:08X})")
 
         # Check current arming flags - RC_LINK should NOT be set while sending
         flags_with_rc = []
         for _ in range(5):
-            flags = get_arming_flags(msp)
+            flags = await async_get_arming_flags(msp)
             if flags is not None:
                 flags_with_rc.append(flags)
-            time.sleep(0.02)
+            await asyncio.sleep(0.02)
 
         rc_link_while_sending = all(not (f & BIT_RC_LINK) for f in flags_with_rc)
         print(f"  Arming flags while RC flowing: {[hex(f) for f in flags_with_rc]}")
         print(f"  RC_LINK healthy while sending: {rc_link_while_sending}")
 
         if not rc_link_while_sending:
-            sender.stop()
-            # Restore failsafe_delay
-            set_named_setting_u8(msp, "failsafe_delay", original_failsafe_delay or 5)
-            xchg(msp, v1(MSP_EEPROM_WRITE))
+            await stream.stop()
+            await restore_failsafe_delay()
             return name, FAIL, (
                 "ARMING_DISABLED_RC_LINK was set even while RC frames are flowing. "
                 "RC link is not being tracked correctly while DISARMED."
             )
 
-        # Stop RC sender and measure how long until RC_LINK flag appears.
+        # Stop RC stream and measure how long until RC_LINK flag appears.
         # Expected timeline (from last RC frame):
         #   ~200ms: rxSignalReceived goes false (MSP RX rxSignalTimeout = DELAY_5_HZ)
         #   ~200-500ms: failsafeOnValidDataFailed accumulates until
         #               (validRxDataFailedAt - validRxDataReceivedAt) > 300ms
         #   Total: ~300-500ms from last RC frame to ARMING_DISABLED_RC_LINK set
         # We monitor for 2000ms which is 4x the expected maximum.
-        print(f"  Stopping RC sender, measuring RC_LINK timeout...")
+        print(f"  Stopping RC stream, measuring RC_LINK timeout...")
         print(f"  Expected timeout: ~300-500ms from last RC frame")
-        sender.stop()
+        await stream.stop()
 
-        stop_time = time.time()
-        rc_link_lost_at = None
+        # Watch the flags back-to-back while debug[] is sampled alongside on
+        # the same connection, so the timeout is resolved to one MSP round trip
+        debug_samples = []
+        flag_watch_done = asyncio.Event()
 
-        for _ in range(200):   # Poll for up to 2000ms
-            time.sleep(0.01)
-            flags = get_arming_flags(msp)
-            if flags is not None and (flags & BIT_RC_LINK):
-                rc_link_lost_at = time.time() - stop_time
-                print(f"  RC_LINK flag detected at {rc_link_lost_at*1000:.1f}ms")
-                break
+        async def sample_debug():
+            while not flag_watch_done.is_set():
+                dbg = await async_read_debug_values(msp)
+                if dbg:
+                    debug_samples.append(dbg[0])
 
-        # Restore failsafe_delay to original value
-        print(f"  Restoring failsafe_delay to {original_failsafe_delay or 5}...")
-        restore_sock = connect(host, msp_port, "restore", timeout=3.0)
-        if restore_sock:
+        async def watch_rc_link():
             try:
-                set_named_setting_u8(restore_sock, "failsafe_delay", original_failsafe_delay or 5)
-                xchg(restore_sock, v1(MSP_EEPROM_WRITE))
-                time.sleep(0.2)
+                return await poll_until(lambda: async_get_arming_flags(msp),
+                                        lambda f: bool(f & BIT_RC_LINK), timeout=2.0)
             finally:
-                restore_sock.close()
+                flag_watch_done.set()
+
+        stop_time = time.monotonic()
+        hit, _ = await asyncio.gather(watch_rc_link(), sample_debug())
+        rc_link_lost_at = hit[1] if hit else None
+        if rc_link_lost_at is not None:
+            print(f"  RC_LINK flag detected at {rc_link_lost_at*1000:.1f}ms")
+        if debug_samples:
+            print(f"  rcCommand[ROLL] during failsafe window: {len(debug_samples)} samples, "
+                  f"values {sorted(set(debug_samples))[:10]}")
+
+        # Restore failsafe_delay to original value
+        await restore_failsafe_delay()
 
         if rc_link_lost_at is not None:
             timeout_ms = rc_link_lost_at * 1000
@@ -1118,7 +1024,7 @@ def test_failsafe_gate(host: str, msp_port: int, rc_port: int) -> tuple:
                 )
                 status = FAIL
         else:
-            elapsed_at_end = (time.time() - stop_time) * 1000
+            elapsed_at_end = (time.monotonic() - stop_time) * 1000
             detail = (
                 f"ARMING_DISABLED_RC_LINK NOT detected after {elapsed_at_end:.0f}ms of no RC.\n"
                 f"Expected ~300-500ms timeout (failsafe_delay=1 applied, verified={applied_delay}).\n"
@@ -1135,11 +1041,47 @@ def test_failsafe_gate(host: str, msp_port: int, rc_port: int) -> tuple:
         return name, status, detail
 
     finally:
-        msp.close()
-        try:
-            rc_sock.close()
-        except Exception:
-            pass
+        await stream.stop()
+        await close_clients(msp, rc)
+
+
+def test_failsafe_gate(host: str, msp_port: int, rc_port: int) -> tuple:
+    """
+    Test 3: Failsafe gate - failsafeUpdateRcCommandValues() called only on RX cycles.
+
+    The PR gates failsafeUpdateRcCommandValues() behind isRXDataNew. Observable
+    consequence: when RC stops, the RC_LINK flag (ARMING_DISABLED_RC_LINK) should
+    set after the configured rxDataFailurePeriod = PERIOD_RXDATA_FAILURE(200ms) +
+    failsafe_delay * 100ms.
+
+    CRITICAL INSIGHT: ARMING_DISABLED_RC_LINK is only updated in updateArmingStatus()
+    which runs its RC_LINK check ONLY when the FC is NOT ARMED. The check is:
+        if (!failsafeIsReceivingRxData()) {
+            ENABLE_ARMING_FLAG(ARMING_DISABLED_RC_LINK);
+        }
+    When ARMED, this entire block is skipped.
+
+    Therefore: this test must be conducted while DISARMED (AUX1 kept LOW).
+    We establish RC link with AUX1 LOW, confirm RC_LINK is healthy, then stop RC
+    and watch for ARMING_DISABLED_RC_LINK to appear in the arming flags.
+
+    FIX (v3): Test while DISARMED.
+    - Set failsafe_delay=1 (100ms) -> rxDataFailurePeriod = 300ms
+    - Send RC with AUX1 LOW (disarmed) for 2s to establish link
+    - Confirm RC_LINK not set (link is healthy)
+    - Stop RC stream
+    - Poll arming flags back-to-back for 2000ms (debug[] sampled concurrently)
+    - Expected: RC_LINK flag appears within ~350ms (300ms + polling overhead)
+
+    Timing details:
+    - failsafe_delay=1 decisecond = 100ms
+    - PERIOD_RXDATA_FAILURE = 200ms (hardcoded in failsafe.h)
+    - Total rxDataFailurePeriod = 200ms + 100ms = 300ms
+    - Plus MSP rx rxSignalTimeout = 200ms (DELAY_5_HZ) before data is "failed"
+    - Maximum expected total: ~500ms from last RC frame to RC_LINK flag
+    - We monitor for 2000ms which is 4x the maximum expected timeout
+    """
+    return asyncio.run(_test_failsafe_gate(host, msp_port, rc_port))
 
 
 def verify_debug_mode(host: str, msp_port: int) -> tuple:
@@ -19,13 +19,27 @@ RX_BAUD = 420000
 
 # ── CRC-8 (poly 0xD5, used by both CRSF and ELRS bootloader) ─────────────────
 
+_CRC8_TABLES = {}
+
+
+def _crc8_table(poly):
+    table = bytearray(256)
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = ((crc << 1) ^ poly) & 0xFF if (crc & 0x80) else (crc << 1) & 0xFF
+        table[i] = crc
+    return bytes(table)
+
+
 def crc8(data, poly=0xD5):
+    table = _CRC8_TABLES.get(poly)
+    if table is None:
+        table = _CRC8_TABLES[poly] = _crc8_table(poly)
     crc = 0
     for byte in data:
-        crc ^= byte
-        for _ in range(8):
-            crc = ((crc << 1) ^ poly) if (crc & 0x80) else (crc << 1)
-    return crc & 0xFF
+        crc = table[crc ^ byte]
+    return crc
 
 # ── CRSF addresses and frame types ───────────────────────────────────────────
 